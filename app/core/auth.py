@@ -64,7 +64,8 @@ def get_current_user(
     user = db.query(User).filter(User.username == username).first()
 
     # If no such user exists in the database, credentials are invalid
-    if user is None:
+    # (accounts marked for deletion count as gone)
+    if user is None or user.deleted_at is not None:
         raise credentials_exception
 
     # If everything is fine, return the User object.
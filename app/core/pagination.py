@@ -0,0 +1,52 @@
+# app/core/pagination.py
+
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, status
+
+
+# Keyset (cursor) pagination helpers.
+#
+# Instead of OFFSET, list endpoints return a "next_cursor" that encodes
+# the sort key of the last row on the page. The client sends it back and
+# the next query continues with "WHERE (sort_key) < (cursor values)",
+# which stays fast no matter how deep the client scrolls.
+#
+# The cursor is opaque to clients: a url-safe base64 string of a JSON list.
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(*values) -> str:
+    """
+    Encode the sort key of the last row into an opaque cursor string.
+
+    Values must be JSON serializable (convert datetimes with isoformat()).
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decode a cursor created by encode_cursor.
+
+    - size: how many values the caller expects in the cursor.
+    - Raises 400 Bad Request if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+
+    return values
@@ -0,0 +1,63 @@
+# app/core/params.py
+
+from fastapi import HTTPException, status
+
+
+def parse_id_list(raw: str, max_count: int) -> list[int]:
+    """
+    Parse a comma separated id list from a query string, e.g. "?ids=3,1,3".
+
+    - Duplicates are removed, order of first appearance is kept.
+    - Raises 400 if a value is not a positive integer or there are too many.
+    """
+    ids: list[int] = []
+    seen: set[int] = set()
+
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if not part.isdigit() or int(part) <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid id: {part!r}.",
+            )
+        value = int(part)
+        if value not in seen:
+            seen.add(value)
+            ids.append(value)
+
+    if len(ids) > max_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {max_count} ids are allowed.",
+        )
+
+    return ids
+
+
+def parse_field_list(raw: str | None, allowed, default) -> list[str]:
+    """
+    Parse a comma separated field selector, e.g. "?fields=username,bio".
+
+    - No value (or an empty one) gives `default`.
+    - Duplicates are removed, order of first appearance is kept.
+    - Raises 400 for a field that is not in `allowed`.
+    """
+    if not raw or not raw.strip():
+        return list(default)
+
+    fields: list[str] = []
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if part not in allowed:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field: {part!r}. Allowed: {', '.join(allowed)}.",
+            )
+        if part not in fields:
+            fields.append(part)
+
+    return fields
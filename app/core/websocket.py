@@ -0,0 +1,61 @@
+# app/core/websocket.py
+
+from contextlib import contextmanager
+
+from fastapi import WebSocket, WebSocketDisconnect
+from jose import jwt
+from sqlalchemy.orm import Session
+
+from app.core.security import ALGORITHM, SECRET_KEY
+from app.db.database import SessionLocal
+
+
+# Helpers shared by the long-lived WebSocket endpoints (app.routers.chat,
+# app.routers.group_stream). They authenticate with ?token=<JWT> and
+# cannot use the get_db / get_current_user dependencies, which would hold
+# a session for the whole connection.
+
+
+def decode_username(token: str) -> str:
+    """
+    Decode JWT and return the username from the 'sub' claim.
+
+    Login puts the username (not the id) in "sub", same as get_current_user expects.
+    """
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    username = payload.get("sub")
+    if not isinstance(username, str):
+        raise ValueError("Token has no subject.")
+    return username
+
+
+def open_db_session() -> Session:
+    """Create a new database session for WebSocket handlers."""
+    return SessionLocal()
+
+
+@contextmanager
+def borrow_db():
+    """
+    Borrow a database session for one unit of work and give it back.
+
+    WebSocket handlers live for hours; holding a session (and a pooled
+    connection) for the whole connection would exhaust the pool long
+    before we run out of sockets. Use this only around actual DB work.
+    """
+    db = open_db_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def receive_data(websocket: WebSocket) -> str | bytes:
+    """Wait for the next text or binary frame."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+
+    if message.get("text") is not None:
+        return message["text"]
+    return message.get("bytes") or b""
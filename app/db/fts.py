@@ -0,0 +1,49 @@
+# app/db/fts.py
+
+from sqlalchemy import DDL, column, event, table
+
+
+def fts_index(source, name: str, columns: list[str], options: str = ""):
+    """
+    Declare an SQLite FTS5 index over columns of the source table.
+
+    External content table: the text lives only in the source table; three
+    triggers keep the index in sync on every insert, update and delete, so
+    code that writes the source table (including bulk DELETEs) needs no
+    extra work. Everything is created together with the source table
+    (after_create); other databases get nothing.
+
+    Returns a lightweight handle for queries, with the columns rowid,
+    <name> (for MATCH and auxiliary functions like snippet) and rank
+    (bm25, lower is better). It is not part of Base.metadata.
+    """
+    src = source.name
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    extra = f", {options}" if options else ""
+
+    statements = (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+        f"{cols}, content='{src}', content_rowid='id'{extra})",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {src} BEGIN
+            INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {src} BEGIN
+            INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {cols} ON {src} BEGIN
+            INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old});
+            INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new});
+        END
+        """,
+    )
+    for statement in statements:
+        event.listen(source, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+    return table(name, column("rowid"), column(name), column("rank"))
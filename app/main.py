@@ -1,22 +1,79 @@
 # app/main.py
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from app.db.database import Base, engine
+from app.db.database import Base, SessionLocal, engine
 from app import models  # make sure all models are imported
 from app.routers.auth import router as auth_router
 from app.routers.users import router as users_router
 from app.routers.posts import router as posts_router
 from app.routers.friend_request import router as friend_request_router
+from app.routers.media import router as media_router
+from app.routers.search import router as search_router
+from app.routers.tags import router as tags_router
+from app.routers.notifications import router as notifications_router
+from app.routers.sync import router as sync_router
 from app.routers import chat
+from app.services import avatars, change_log, counters, post_images, purge
+from app.services.notifications import dispatcher as notification_dispatcher
+from app.services.reactions import reaction_counts
+from app.services.tags import trending
+from app.services.ocr import ocr_queue
 
 from app.routers.group import router as groups_router
+from app.routers.group_stream import router as group_stream_router
+from app.services import group_stream
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start and stop background tasks that live as long as the worker.
+
+    - chat reaper: heartbeats and idle timeout for chat WebSockets
+    - group stream reaper: the same for group post subscriptions
+    - presence flusher: coalesced online/offline updates to friends
+    - counter reconciler: repairs drifted denormalized counters
+    - purge worker: deletes children of deleted groups/accounts in batches
+      (also resumes work left over from before a restart)
+    - OCR workers: text of uploaded post images, plus a sweeper that
+      retries failures and picks up pending images after a restart
+    - trending tags: loads the last checkpoint, then writes one regularly
+    - notification dispatcher: writes emitted notifications in batches
+    - reaction counts: writes the in-memory per-post deltas regularly
+    - change log compactor: drops sync log rows older than any valid token
+
+    The avatar thumbnail process pool starts on first upload and is
+    stopped here.
+    """
+    tasks = [
+        asyncio.create_task(chat.active_connections.run_reaper()),
+        asyncio.create_task(group_stream.group_streams.run_reaper()),
+        asyncio.create_task(chat.presence.run_flusher()),
+        asyncio.create_task(counters.run_reconciler(SessionLocal)),
+        asyncio.create_task(purge.run_purger(SessionLocal)),
+        asyncio.create_task(ocr_queue.run(SessionLocal, post_images.image_path)),
+        asyncio.create_task(trending.run_checkpointer(SessionLocal)),
+        asyncio.create_task(notification_dispatcher.run(SessionLocal)),
+        asyncio.create_task(reaction_counts.run(SessionLocal)),
+        asyncio.create_task(change_log.run_compactor(SessionLocal)),
+    ]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        avatars.shutdown_thumbnail_pool()
 
 
 # Main FastAPI application
 app = FastAPI(
     title="Social Network API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 
@@ -33,6 +90,12 @@ app.include_router(posts_router)     # posts on user walls
 app.include_router(friend_request_router)
 app.include_router(chat.router)
 app.include_router(groups_router)
+app.include_router(group_stream_router)
+app.include_router(media_router)     # avatar files
+app.include_router(search_router)    # full-text search
+app.include_router(tags_router)      # hashtags and trending
+app.include_router(notifications_router)
+app.include_router(sync_router)      # delta sync for clients
 
 
 @app.get("/")
@@ -0,0 +1,37 @@
+# app/models/block.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.db.database import Base
+
+
+class UserBlock(Base):
+    """
+    One user blocking or muting another.
+
+    - block: both users stop seeing each other's posts, messages and
+      search hits, and neither can send the other a friend request or
+      start a chat
+    - mute: only the muter stops seeing the muted user's posts and hits
+
+    At most one row per pair and direction; blocking a muted user turns
+    the row into a block. Reads go through the per-user cache in
+    app.services.blocks, not through this table.
+    """
+    __tablename__ = "user_blocks"
+
+    # Who blocks / mutes
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # Who is blocked / muted
+    target_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # One of BLOCK_KINDS in app.services.blocks
+    kind = Column(String(16), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # "Who blocked me": blocks hide in both directions
+        Index("ix_user_blocks_target_id", "target_id"),
+    )
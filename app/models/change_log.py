@@ -0,0 +1,50 @@
+# app/models/change_log.py
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.db.database import Base
+
+
+class ChangeLogEntry(Base):
+    """
+    "Something a user syncs has changed": one row per user and entity.
+
+    Written in the same transaction as the change (app.services.change_log)
+    and read by GET /sync (app.services.sync) as a range on (user_id, id).
+
+    - kind / entity_id: what changed ("post" 12, "friend" 7, ...)
+    - deleted: a tombstone; the entity is gone for this user
+
+    A new change of the same entity replaces the row (INSERT OR REPLACE
+    on the unique index), so a user's log holds at most one row per
+    entity however often it changes. AUTOINCREMENT keeps ids growing even
+    when the newest row is replaced or compacted away: an id is never
+    handed out twice, so "id > token" never misses a change.
+    """
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True)
+
+    # Whose log this row is in
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    # One of CHANGE_KINDS in app.services.change_log
+    kind = Column(String(16), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+
+    deleted = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Compaction on write: one row per (user, entity)
+        Index("ux_change_log_user_entity", "user_id", "kind", "entity_id", unique=True),
+        # A user's changes since a token
+        Index("ix_change_log_user_id_id", "user_id", "id"),
+        # Rows about one entity, in every log (account purge)
+        Index("ix_change_log_entity", "kind", "entity_id"),
+        # Rows no token can reach any more (compaction job)
+        Index("ix_change_log_created_at", "created_at"),
+        {"sqlite_autoincrement": True},
+    )
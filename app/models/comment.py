@@ -0,0 +1,52 @@
+# app/models/comment.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.db.database import Base
+
+
+class Comment(Base):
+    """
+    A comment on a wall post or group post, or a reply to a comment.
+
+    Threads are stored as a materialized path: `path` is the ids of the
+    top-level comment, ..., the parent and the comment itself, each
+    zero-padded to a fixed width and joined with "/". Sorting by path
+    gives a thread in reading order (every comment right before its
+    replies), and the replies of a comment, at any depth, are the paths
+    that start with its own path + "/": one index range.
+
+    Exactly one of post_id / group_post_id is set.
+    """
+    __tablename__ = "comments"
+
+    id = Column(Integer, primary_key=True)
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True)
+    group_post_id = Column(Integer, ForeignKey("group_posts.id", ondelete="CASCADE"), nullable=True)
+    # Copy from the group post, so a group purge finds its rows directly
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # None for a top-level comment
+    parent_id = Column(Integer, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)
+    # The top-level comment of the thread (itself for a top-level comment)
+    # and the path; both contain the comment's own id, so they are set
+    # right after the INSERT, in the same transaction
+    root_id = Column(Integer, nullable=True)
+    path = Column(String(200), nullable=True)
+    # 0 for a top-level comment
+    depth = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Top-level comments of a post in order (parent_id IS NULL)
+        Index("ix_comments_post_parent_id", "post_id", "parent_id", "id"),
+        Index("ix_comments_group_post_parent_id", "group_post_id", "parent_id", "id"),
+        # A thread, or the replies below one comment, in reading order
+        Index("ix_comments_root_path", "root_id", "path"),
+    )
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -7,8 +9,39 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id = Column(Integer, primary_key=True, index=True)
-    user1_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    user2_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Direct chats have two participants and no group.
+    # Group chat rooms have a group_id instead; the participants are the
+    # group's members (see app.services.membership_cache).
+    user1_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    user2_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    group_id = Column(
+        Integer,
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        nullable=True,
+        unique=True,  # one room per group
+    )
+
+    # Denormalized inbox fields, maintained when a message is written
+    # (see app.services.chat.save_message):
+    # - last_message_id: newest message in the chat (None for an empty chat)
+    # - last_activity_at: used to sort and paginate the inbox
+    last_message_id = Column(Integer, ForeignKey("messages.id", use_alter=True), nullable=True)
+    last_activity_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Per-participant read pointers: id of the last message each user has read.
+    # Unread count = messages after this id that were sent by the other user.
+    user1_last_read_id = Column(Integer, nullable=True)
+    user2_last_read_id = Column(Integer, nullable=True)
 
     # All messages in a chat
-    messages = relationship("Message", back_populates="conversation")
+    messages = relationship(
+        "Message",
+        back_populates="conversation",
+        foreign_keys="Message.conversation_id",
+    )
+
+    __table_args__ = (
+        # The inbox query filters by participant and sorts by activity
+        Index("ix_conversations_user1_activity", "user1_id", "last_activity_at"),
+        Index("ix_conversations_user2_activity", "user2_id", "last_activity_at"),
+    )
@@ -0,0 +1,27 @@
+# app/models/counter.py
+
+from sqlalchemy import Column, Integer, String
+
+from app.db.database import Base
+
+
+class Counter(Base):
+    """
+    A denormalized count, e.g. ("group_members", <group id>) -> 42.
+
+    Written in the same transaction as the rows it counts
+    (see app.services.counters), so reads never need COUNT(*).
+
+    Hot counters are split over several shard rows; the count is the
+    sum of its shards.
+    """
+    __tablename__ = "counters"
+
+    # What is counted, one of the names in app.services.counters
+    name = Column(String(32), primary_key=True)
+    # Id of the counted entity (group id, user id, ...)
+    entity_id = Column(Integer, primary_key=True)
+    # 0 .. shards-1; writers pick a random shard to spread row contention
+    shard = Column(Integer, primary_key=True, default=0)
+
+    value = Column(Integer, nullable=False, default=0)
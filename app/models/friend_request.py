@@ -17,8 +17,8 @@ class FriendRequest(Base):
     __tablename__ = "friend_request"
 
     id = Column(Integer, primary_key=True, index=True)
-    from_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
-    to_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    from_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    to_user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     status = Column(Enum(RequestStatus), default=RequestStatus.pending)
 
     from_user = relationship("User", foreign_keys=[from_user_id])
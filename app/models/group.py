@@ -2,6 +2,7 @@
 
 from datetime import datetime
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
     String,
@@ -9,11 +10,14 @@ from sqlalchemy import (
     DateTime,
     Table,
     ForeignKey,
+    Index,
+    false,
     func,
 )
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
+from app.db.fts import fts_index
 
 # group_members = Table(
 #     "group_members",
@@ -50,6 +54,11 @@ class Group(Base):
     # The user who created the group
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    # Set when the group is deleted. The group is hidden at once; its
+    # posts, memberships and chat room are removed in batches by the
+    # purge worker (app.services.purge), which then deletes this row.
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
     # Relationship to the User model
  
     owner = relationship(
@@ -58,10 +67,13 @@ class Group(Base):
     )
 
     # All membership rows for this group
+    # passive_deletes: never load children just to delete them; large
+    # groups are emptied in batches by app.services.purge
     memberships = relationship(
         "GroupMembership",
         back_populates="group",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     # members = relationship(
@@ -74,9 +86,20 @@ class Group(Base):
         "GroupPost",
         back_populates="group",
         cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # Directory: case-insensitive name order and name-prefix search
+        Index("ix_groups_name_lower", func.lower(name), "id"),
     )
 
 
+# Full-text index of group names and descriptions (SQLite FTS5), kept in
+# sync by triggers (see app.db.fts)
+groups_fts = fts_index(Group.__table__, "groups_fts", ["name", "description"])
+
+
 class GroupPost(Base):
     __tablename__ = "group_posts"
 
@@ -85,7 +108,18 @@ class GroupPost(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # True if the post was pushed into members' timelines (small group);
+    # False if home feeds pull it from the group (see app.services.feed)
+    fanned_out = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        # Posts of a group (listing, batched purge)
+        Index("ix_group_posts_group_id_id", "group_id", "id"),
+        # Newest pulled posts of a group, for home feeds
+        Index("ix_group_posts_feed_pull", "group_id", "fanned_out", "created_at", "id"),
+    )
 
     group = relationship(
         "Group",
@@ -98,3 +132,5 @@ class GroupPost(Base):
     )
 
 
+# Full-text index of group post text, for GET /search
+group_posts_fts = fts_index(GroupPost.__table__, "group_posts_fts", ["content"])
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, Boolean, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
@@ -47,4 +47,14 @@ class GroupMembership(Base):
 
     # Relationships
     group = relationship("Group", back_populates="memberships")
-    user = relationship("User", back_populates="group_memberships")
\ No newline at end of file
+    user = relationship("User", back_populates="group_memberships")
+
+    __table_args__ = (
+        # One membership per user and group; also serves "members of a
+        # group ordered by user_id" (keyset pagination)
+        Index("ux_group_memberships_group_user", "group_id", "user_id", unique=True),
+        # Admin-only member listing without scanning every member
+        Index("ix_group_memberships_group_admin_user", "group_id", "is_admin", "user_id"),
+        # Groups of a user (search, home feed, purge) without a full scan
+        Index("ix_group_memberships_user_group", "user_id", "group_id"),
+    )
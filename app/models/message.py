@@ -1,7 +1,8 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
+from app.db.fts import fts_index
 
 
 class Message(Base):
@@ -10,9 +11,35 @@ class Message(Base):
     id = Column(Integer, primary_key=True, index=True)
     conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
 
-    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    sender_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    # Optional id chosen by the client for this message.
+    # If the client resends the same nonce (retry after a dropped connection)
+    # we return the stored message instead of inserting a duplicate.
+    client_nonce = Column(String(64), nullable=True)
+
     # The chat the message belongs to
-    conversation = relationship("Conversation", back_populates="messages")
+    conversation = relationship(
+        "Conversation",
+        back_populates="messages",
+        foreign_keys=[conversation_id],
+    )
+
+    __table_args__ = (
+        # Unread counts scan "messages in this chat after id X"
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+        # One message per (chat, sender, nonce); NULL nonces never collide
+        Index(
+            "ux_messages_sender_nonce",
+            "conversation_id",
+            "sender_id",
+            "client_nonce",
+            unique=True,
+        ),
+    )
+
+
+# Full-text index of chat messages, for GET /search
+messages_fts = fts_index(Message.__table__, "messages_fts", ["content"])
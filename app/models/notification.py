@@ -0,0 +1,43 @@
+# app/models/notification.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.db.database import Base
+
+
+class Notification(Base):
+    """
+    Something that happened to a user: a friend request, an approval, a
+    new member in their group, a mention.
+
+    Rows are written in batches by the notification dispatcher
+    (app.services.notifications), never by the request that caused them.
+    """
+    __tablename__ = "notifications"
+
+    id = Column(Integer, primary_key=True)
+
+    # Recipient
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    # One of the kinds in app.services.notifications
+    kind = Column(String(32), nullable=False)
+
+    # Who caused it
+    actor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # What it is about (depends on kind)
+    friend_request_id = Column(Integer, ForeignKey("friend_request.id", ondelete="CASCADE"), nullable=True)
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # None while unread
+    read_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # A user's notifications, newest first (keyset pagination)
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
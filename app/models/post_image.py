@@ -0,0 +1,54 @@
+# app/models/post_image.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+
+from app.db.database import Base
+from app.db.fts import fts_index
+
+
+class PostImage(Base):
+    """
+    An image attached to a wall post or a group post.
+
+    The file is stored by content (media/images/<sha256>.<ext>). Text in
+    the image is extracted by the OCR workers after the upload
+    (app.services.ocr); until then ocr_status is "pending".
+    """
+    __tablename__ = "post_images"
+
+    id = Column(Integer, primary_key=True)
+
+    # Exactly one of post_id / group_post_id is set
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True, index=True)
+    group_post_id = Column(
+        Integer,
+        ForeignKey("group_posts.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+
+    # Author of the post (account purge)
+    uploader_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    digest = Column(String(64), nullable=False)
+    extension = Column(String(8), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # "pending" -> "done" | "failed" (after OCR_MAX_ATTEMPTS tries)
+    ocr_status = Column(String(10), nullable=False, default="pending")
+    ocr_attempts = Column(Integer, nullable=False, default=0)
+    # Earliest time of the next try after a failure (None: right away)
+    ocr_retry_at = Column(DateTime, nullable=True)
+    ocr_text = Column(Text, nullable=True)
+
+    __table_args__ = (
+        # Work left for the OCR workers (also after a restart)
+        Index("ix_post_images_ocr_pending", "ocr_status", "ocr_retry_at", "id"),
+    )
+
+
+# Full-text index of text found in images; filled when OCR stores
+# ocr_text (update trigger). GET /search reports matches as their post.
+post_images_fts = fts_index(PostImage.__table__, "post_images_fts", ["ocr_text"])
@@ -6,6 +6,7 @@ from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
+from app.db.fts import fts_index
 
 
 class Post(Base):
@@ -18,10 +19,14 @@ class Post(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Foreign key: which user owns this post
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
 
     # Relationship back to User
     owner = relationship(
         "User",
         back_populates="posts",
     )
+
+
+# Full-text index of post text, for GET /search (app.services.search)
+posts_fts = fts_index(Post.__table__, "posts_fts", ["content"])
@@ -0,0 +1,44 @@
+# app/models/reaction.py
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+
+from app.db.database import Base
+
+
+class Reaction(Base):
+    """
+    One user's reaction to one wall post or group post ("like", "love", ...).
+
+    At most one row per (user, post): reacting again changes the kind.
+    Exactly one of post_id / group_post_id is set. Counts per post are
+    not read from here but from counters written behind
+    (app.services.reactions).
+    """
+    __tablename__ = "reactions"
+
+    id = Column(Integer, primary_key=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True, index=True)
+    group_post_id = Column(
+        Integer,
+        ForeignKey("group_posts.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+    # Copy from the group post, so a group purge finds its rows directly
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    # One of REACTION_KINDS in app.services.reactions
+    kind = Column(String(16), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # One reaction per user and post; also "which of these posts did
+        # I react to" for a feed page (NULLs never conflict)
+        Index("ux_reactions_user_post", "user_id", "post_id", unique=True),
+        Index("ux_reactions_user_group_post", "user_id", "group_post_id", unique=True),
+    )
@@ -0,0 +1,57 @@
+# app/models/tag.py
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+
+from app.db.database import Base
+
+
+class PostTag(Base):
+    """
+    One hashtag of one wall post or group post: the tag -> post inverted
+    index behind GET /tags/{tag}.
+
+    Rows are rewritten from the post text on create and update
+    (app.services.tags). Exactly one of post_id / group_post_id is set.
+    """
+    __tablename__ = "post_tags"
+
+    id = Column(Integer, primary_key=True)
+
+    # Normalized tag, without "#" (see app.services.tags.extract_tags)
+    tag = Column(String(64), nullable=False)
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=True, index=True)
+    group_post_id = Column(
+        Integer,
+        ForeignKey("group_posts.id", ondelete="CASCADE"),
+        nullable=True,
+        index=True,
+    )
+
+    # Copies from the post: visibility and sorting read this table only
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Posts with a tag, newest first (keyset pagination)
+        Index("ix_post_tags_tag_created", "tag", "created_at", "id"),
+    )
+
+
+class TagTrend(Base):
+    """
+    Checkpoint of the in-memory trending counters (app.services.tags).
+
+    Written every TREND_CHECKPOINT_INTERVAL and read back at startup;
+    requests never read this table.
+    """
+    __tablename__ = "tag_trends"
+
+    # Window name, e.g. "1h"
+    window = Column(String(8), primary_key=True)
+    tag = Column(String(64), primary_key=True)
+
+    # Decayed count at `at` (epoch seconds)
+    score = Column(Float, nullable=False)
+    at = Column(Float, nullable=False)
@@ -0,0 +1,42 @@
+# app/models/timeline.py
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer
+
+from app.db.database import Base
+
+
+class TimelineEntry(Base):
+    """
+    A group post pushed into one member's home timeline.
+
+    Only posts of small groups are pushed (fan-out on write, one row per
+    member); posts of large groups are pulled when the feed is read.
+    See app.services.feed.
+    """
+    __tablename__ = "timeline_entries"
+
+    id = Column(Integer, primary_key=True)
+
+    # Whose timeline this entry is in
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    group_post_id = Column(
+        Integer,
+        ForeignKey("group_posts.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    group_id = Column(
+        Integer,
+        ForeignKey("groups.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+
+    # Copy of the post's created_at, so the feed sorts on this index alone
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # A user's timeline, newest first (keyset pagination)
+        Index("ix_timeline_entries_user_created", "user_id", "created_at", "group_post_id"),
+    )
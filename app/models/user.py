@@ -11,11 +11,13 @@ from sqlalchemy import (
     Text,
     Table,
     ForeignKey,
+    Index,
     func,
 )
 from sqlalchemy.orm import relationship
 
 from app.db.database import Base
+from app.db.fts import fts_index
 
 # Association table for "friendships" between users.
 # This is a self-referential many-to-many:
@@ -36,6 +38,8 @@ user_friends = Table(
         ForeignKey("users.id", ondelete="CASCADE"),
         primary_key=True,
     ),
+    # "Who has this user as a friend" (account purge)
+    Index("ix_user_friends_friend_id", "friend_id"),
 )
 
 
@@ -77,6 +81,11 @@ class User(Base):
     # - Can be used for soft deactivation (instead of deleting the row)
     is_active = Column(Boolean, default=True)
 
+    # Set when the account is deleted. The user can no longer log in;
+    # their content is removed in batches by the purge worker
+    # (app.services.purge), which then deletes this row.
+    deleted_at = Column(DateTime, nullable=True, index=True)
+
     created_at = Column(
         DateTime(timezone=True),     # timezone=True: stores date and time with timezone information.
         server_default=func.now(),   # server_default=func.now(): when the row is first inserted,
@@ -96,6 +105,7 @@ class User(Base):
     # Optional profile fields (user can update these later):
 
     # Display name shown in the UI (full name or nickname)
+    # - Searchable by word prefix (users_fts below)
     display_name = Column(String(100), nullable=True)
 
     # Short biography or description written by the user
@@ -109,10 +119,13 @@ class User(Base):
     # - "owner" is the attribute on the Post model that points back to User.
     # - cascade="all, delete-orphan" means:
     #     if a User is deleted, their posts are also deleted.
+    # - passive_deletes=True: children are not loaded just to be deleted;
+    #   accounts are emptied in batches by app.services.purge
     posts = relationship(
         "Post",
         back_populates="owner",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     # Many-to-many relationship for friendships between users.
@@ -135,6 +148,7 @@ class User(Base):
         "Group",
         back_populates="owner",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     # All group memberships for this user
@@ -142,6 +156,7 @@ class User(Base):
         "GroupMembership",
         back_populates="user",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
     # groups = relationship(
@@ -154,4 +169,20 @@ class User(Base):
          "GroupPost",
          back_populates="author",
          cascade="all, delete-orphan",
+         passive_deletes=True,
+    )
+
+    __table_args__ = (
+        # User search: case-insensitive username prefix as a range scan
+        Index("ix_users_username_lower", func.lower(username)),
     )
+
+
+# Full-text index of display names (SQLite FTS5), for GET /users/search.
+# Kept in sync by triggers (see app.db.fts), so registering and
+# PUT /users/me need no extra code.
+# Usernames are not in here: every username is its own word, so a prefix
+# like "alice*" would merge the entries of thousands of words. They are
+# searched with a range scan on ix_users_username_lower instead.
+# prefix='1 2 3': short prefixes read one precomputed entry list.
+users_fts = fts_index(User.__table__, "users_fts", ["display_name"], options="prefix='1 2 3'")
@@ -1,26 +1,68 @@
-from typing import Dict, List
-
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from jose import JWTError, jwt
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from jose import JWTError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
 from app.core.auth import get_current_user
 from app.db.database import get_db
 from app.models.user import User
 from app.models.friend_request import FriendRequest, RequestStatus
-from app.schemas.conversation import ConversationRead, ConversationStart
+from app.schemas.conversation import (
+    ConversationRead,
+    ConversationStart,
+    ConversationInboxPage,
+    ConversationMarkRead,
+)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.authors import embed_authors, wants_author
+from app.services.blocks import check_not_blocked, hidden_set
+from app.services.chat import (
+    get_or_create_group_room,
+    store_message_once,
+    mark_conversation_read,
+    list_inbox,
+)
+from app.services.chat_protocol import (
+    ChatFrameError,
+    ControlFrame,
+    ack_frame,
+    error_frame,
+    message_frame,
+    negotiate_codec,
+    parse_incoming,
+    pong_frame,
+)
+from app.services.chat_connections import ChatConnection, ConnectionRegistry, fan_out
+from app.services.group_helpers import get_group_with_role
+from app.services.membership_cache import group_members
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.services.presence import (
+    PresenceTracker,
+    presence_snapshot_frame,
+    typing_frame,
+)
+from app.core.params import parse_id_list
+from app.core.websocket import borrow_db, decode_username, receive_data
+from app.models.user import user_friends
 
-from app.core.security import SECRET_KEY, ALGORITHM
-from app.db.database import SessionLocal
 from app.models.conversation import Conversation
 from app.models.message import Message
 
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-# chat_id -> active websocket connections
-active_connections: Dict[int, List[WebSocket]] = {}
+
+
+# All open chat sockets of this worker, indexed by chat and by user
+active_connections = ConnectionRegistry()
+
+# Online/offline state and typing throttles, built on the registry above
+presence = PresenceTracker(active_connections)
+
+# Maximum ids per bulk presence lookup
+MAX_PRESENCE_IDS = 200
+
 
 @router.post("/chats/start", response_model=ConversationRead)
 def start_conversation(
@@ -36,12 +78,98 @@ def start_conversation(
     if not receiver:
         raise HTTPException(status_code=404, detail="Receiver not found.")
 
+    check_not_blocked(db, current_user.id, payload.receiver_id)
+
     if not _are_friends(db, current_user.id, payload.receiver_id):
         raise HTTPException(status_code=403, detail="Users are not friends.")
 
     return _get_or_create_conversation(db, current_user.id, payload.receiver_id)
 
 
+@router.post("/groups/{group_id}/room", response_model=ConversationRead)
+def open_group_room(
+    group_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Return the group's chat room (created on first use).
+
+    Only members can open it. Connect to /chat/ws/{id} with the returned id.
+    """
+    if not get_group_with_role(db, group_id, current_user.id).is_member:
+        raise HTTPException(status_code=403, detail="You must join the group to chat.")
+
+    return get_or_create_group_room(db, group_id)
+
+
+@router.get("/conversations", response_model=ConversationInboxPage)
+def list_conversations(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Chat list of the current user, newest activity first.
+
+    Each item carries the last message and the unread count,
+    all loaded with a single query (see list_inbox).
+    ?expand=author adds the sender of each last message (one more query).
+    """
+    expand_author = wants_author(expand)
+    page = list_inbox(db, current_user.id, limit=limit, cursor=cursor)
+    if expand_author:
+        messages = [item.last_message for item in page.items if item.last_message]
+        embed_authors(db, messages, id_attr="sender_id", attr="author")
+    return page
+
+
+@router.post("/conversations/{chat_id}/read", status_code=status.HTTP_204_NO_CONTENT)
+def mark_read(
+    chat_id: int,
+    payload: ConversationMarkRead,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Mark messages in a conversation as read for the current user."""
+    convo = db.get(Conversation, chat_id)
+    if not convo or not _is_participant(convo, current_user.id):
+        raise HTTPException(status_code=404, detail="Conversation not found.")
+
+    mark_conversation_read(db, convo, current_user.id, payload.message_id)
+    return
+
+
+@router.get("/presence")
+def read_presence(
+    ids: str = Query(..., description="Comma separated user ids, e.g. 3,7,9"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Online state of many users at once, for rendering a friend list.
+
+    - Only the caller's friends are reported; other ids are left out.
+    - One indexed query for the friendship check; the presence state
+      itself comes from memory.
+    """
+    user_ids = parse_id_list(ids, MAX_PRESENCE_IDS)
+    if not user_ids:
+        return []
+
+    friend_ids = {
+        row[0]
+        for row in db.query(user_friends.c.friend_id).filter(
+            user_friends.c.user_id == current_user.id,
+            user_friends.c.friend_id.in_(user_ids),
+        )
+    }
+
+    return presence.lookup([uid for uid in user_ids if uid in friend_ids])
+
+
 def _are_friends(db: Session, a: int, b: int) -> bool:
     """Return True if users have an approved friendship."""
     return db.query(FriendRequest).filter(
@@ -77,20 +205,130 @@ def _get_or_create_conversation(db: Session, a: int, b: int) -> Conversation:
 
 
 
-def _decode_user_id(token: str) -> int:
-    """Decode JWT and return the user id from the 'sub' claim."""
-    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    return int(payload.get("sub"))
+def _is_participant(convo: Conversation, user_id: int) -> bool:
+    """Check if the user is a participant of the conversation."""
+    return user_id in (convo.user1_id, convo.user2_id)
+
+
+def _load_group_member_ids(group_id: int) -> list[int]:
+    """Member ids of a group, with a borrowed session (cache loader)."""
+    with borrow_db() as db:
+        return [
+            row[0]
+            for row in db.query(GroupMembership.user_id)
+            .join(Group, Group.id == GroupMembership.group_id)
+            .filter(GroupMembership.group_id == group_id, Group.deleted_at.is_(None))
+        ]
 
 
-def _open_db_session() -> Session:
-    """Create a new database session for WebSocket handlers."""
-    return SessionLocal()
+def _is_room_member(group_id: int, user_id: int) -> bool:
+    """
+    Membership check for group rooms, answered from memory.
 
+    Only a cold cache (first socket of the group, or after invalidation)
+    reads the database. Call it from the threadpool.
+    """
+    members = group_members.load(group_id, lambda: _load_group_member_ids(group_id))
+    return user_id in members
 
-def _is_participant(convo: Conversation, user_id: int) -> bool:
-    """Check if the user is a participant of the conversation."""
-    return user_id in (convo.user1_id, convo.user2_id)
+
+def _authorize_chat(username: str, chat_id: int) -> tuple[int, int | None, list[int]] | None:
+    """
+    Resolve the user and check they take part in the chat.
+
+    Runs in the threadpool with a borrowed session.
+    Returns (user id, group id or None, friend ids) or None if access is denied.
+    Friend ids feed the presence tracker.
+    """
+    with borrow_db() as db:
+        user_id = (
+            db.query(User.id)
+            .filter(User.username == username, User.deleted_at.is_(None))
+            .scalar()
+        )
+        if user_id is None:
+            return None
+
+        convo = db.get(Conversation, chat_id)
+        if not convo:
+            return None
+
+        group_id = convo.group_id
+        if group_id is None and not _is_participant(convo, user_id):
+            return None
+        # A direct chat ends when either side blocks the other
+        if group_id is None:
+            other_id = convo.user2_id if convo.user1_id == user_id else convo.user1_id
+            if hidden_set(db, user_id).blocks(other_id):
+                return None
+
+        friend_ids = [
+            row[0]
+            for row in db.query(user_friends.c.friend_id).filter(
+                user_friends.c.user_id == user_id
+            )
+        ]
+
+    if group_id is not None and not _is_room_member(group_id, user_id):
+        return None
+
+    return user_id, group_id, friend_ids
+
+
+def _room_recipients(chat_id: int, group_id: int) -> list[ChatConnection]:
+    """
+    Connected sockets of a group room whose user is still a member.
+
+    Sockets of users that left (or were removed) are closed here, so
+    nobody keeps receiving a room they no longer belong to. Memory only.
+    """
+    recipients = []
+    for conn in list(active_connections.in_chat(chat_id)):
+        if group_members.contains(group_id, conn.user_id) is False:
+            # The handler removes it from the registry when the socket ends
+            conn.close(1008)
+        else:
+            recipients.append(conn)
+    return recipients
+
+
+def _send_to_chat(
+    chat_id: int,
+    group_id: int | None,
+    frame: dict,
+    exclude: ChatConnection,
+    structured_only: bool = False,
+) -> None:
+    """Send a frame to the other sockets of a direct chat or group room."""
+    if group_id is None:
+        active_connections.broadcast(
+            chat_id, frame, exclude=exclude, structured_only=structured_only
+        )
+    else:
+        fan_out(
+            _room_recipients(chat_id, group_id),
+            frame,
+            exclude=exclude,
+            structured_only=structured_only,
+        )
+
+
+def _store_message(chat_id: int, user_id: int, content: str, nonce: str | None) -> tuple[dict, dict, bool] | None:
+    """
+    Save one incoming message with a borrowed session.
+
+    Runs in the threadpool so the event loop never waits on the database.
+    Returns (message frame, ack frame, created); created is False when the
+    nonce was already stored (client retry).
+    Returns None if the chat no longer exists.
+    """
+    with borrow_db() as db:
+        convo = db.get(Conversation, chat_id)
+        if convo is None:
+            return None
+
+        message, created = store_message_once(db, convo, user_id, content, nonce)
+        return message_frame(message, nonce), ack_frame(message, nonce), created
 
 
 @router.websocket("/ws/{chat_id}")
@@ -99,9 +337,21 @@ async def websocket_chat(websocket: WebSocket, chat_id: int):
     WebSocket endpoint for real-time chat.
 
     - Auth: ?token=<JWT>
-    - Authorization: only conversation participants can connect
+    - Authorization: only conversation participants can connect; for group
+      rooms, only group members (checked per message from an in-memory
+      member set that join/leave keep up to date)
+    - Encoding: negotiated at connect (see app.services.chat_protocol);
+      JSON or MessagePack frames, or legacy plain text
     - Persistence: incoming messages are saved to the database
     - Broadcast: messages are sent to other clients connected to the same chat
+    - Ack: structured clients get an ack frame with the stored message id;
+      a retried nonce is acked again but not stored or broadcast twice
+    - Heartbeat: ping/pong frames; silent connections are closed by the
+      registry's reaper task
+    - Presence: new sockets get a snapshot of online friends; changes are
+      pushed to friends in coalesced batches (see app.services.presence)
+    - Typing: "typing" frames are throttled and sent to the other participant
+    - DB: no session is held between messages (see borrow_db)
     """
     token = websocket.query_params.get("token")
     if not token:
@@ -109,42 +359,86 @@ async def websocket_chat(websocket: WebSocket, chat_id: int):
         return
 
     try:
-        user_id = _decode_user_id(token)
+        username = decode_username(token)
     except (JWTError, ValueError, TypeError):
         await websocket.close(code=1008)
         return
 
-    db = _open_db_session()
-    try:
-        convo = db.get(Conversation, chat_id)
-        if not convo or not _is_participant(convo, user_id):
-            await websocket.close(code=1008)
-            return
-
-        await websocket.accept()
-        active_connections.setdefault(chat_id, []).append(websocket)
-
-        try:
-            while True:
-                content = await websocket.receive_text()
-
-                message = Message(
-                    conversation_id=chat_id,
-                    sender_id=user_id,
-                    content=content,
-                )
-                db.add(message)
-                db.commit()
-
-                for conn in active_connections.get(chat_id, []):
-                    if conn is not websocket:
-                        await conn.send_text(f"{user_id}: {content}")
-
-        except WebSocketDisconnect:
-            pass
-        finally:
-            if websocket in active_connections.get(chat_id, []):
-                active_connections[chat_id].remove(websocket)
+    authorized = await run_in_threadpool(_authorize_chat, username, chat_id)
+    if authorized is None:
+        await websocket.close(code=1008)
+        return
+    user_id, group_id, friend_ids = authorized
+
+    codec = negotiate_codec(
+        websocket.scope.get("subprotocols", []),
+        websocket.query_params.get("encoding"),
+    )
+    await websocket.accept(subprotocol=codec.name)
+
+    connection = ChatConnection(websocket, user_id, chat_id, codec)
+    active_connections.add(connection)
 
+    if not presence.is_tracked(user_id):
+        online_friends = presence.connected(user_id, friend_ids)
+    else:
+        online_friends = [f for f in friend_ids if presence.is_online(f)]
+    if connection.structured:
+        connection.enqueue_frame(presence_snapshot_frame(online_friends))
+
+    try:
+        while True:
+            data = await receive_data(websocket)
+            connection.touch(len(data))
+
+            try:
+                frame = parse_incoming(codec, data)
+            except ChatFrameError as exc:
+                if connection.structured:
+                    connection.enqueue_frame(error_frame(str(exc)))
+                continue
+
+            if isinstance(frame, ControlFrame):
+                if frame.type == "ping":
+                    connection.enqueue_frame(pong_frame())
+                elif frame.type == "typing" and presence.allow_typing(chat_id, user_id):
+                    _send_to_chat(
+                        chat_id,
+                        group_id,
+                        typing_frame(chat_id, user_id),
+                        exclude=connection,
+                        structured_only=True,
+                    )
+                continue
+
+            if group_id is not None:
+                allowed = group_members.contains(group_id, user_id)
+                if allowed is None:
+                    # Cache was invalidated; reload once in the threadpool
+                    allowed = await run_in_threadpool(_is_room_member, group_id, user_id)
+                if not allowed:
+                    await websocket.close(code=1008)
+                    break
+
+            stored = await run_in_threadpool(
+                _store_message, chat_id, user_id, frame.content, frame.nonce
+            )
+            if stored is None:
+                # Chat was deleted while we were connected
+                await websocket.close(code=1008)
+                break
+
+            out_frame, ack, created = stored
+
+            if connection.structured:
+                connection.enqueue_frame(ack)
+
+            if created:
+                _send_to_chat(chat_id, group_id, out_frame, exclude=connection)
+
+    except WebSocketDisconnect:
+        pass
     finally:
-        db.close()
+        active_connections.remove(connection)
+        if not active_connections.for_user(user_id):
+            presence.disconnected(user_id)
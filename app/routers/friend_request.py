@@ -8,6 +8,10 @@ from app.models.user import User
 from app.models.friend_request import FriendRequest, RequestStatus
 from app.schemas.friend_request import FriendRequestCreate, FriendRequestUpdate
 from app.core.auth import get_current_user
+from app.services.blocks import check_not_blocked
+from app.services.change_log import FRIEND_REQUEST, friendship_changed, record
+from app.services.counters import PENDING_REQUESTS, USER_FRIENDS, bump
+from app.services.notifications import notify_friend_accepted, notify_friend_request
 
 router = APIRouter(prefix="/friend-request", tags=["Friend Requests"])
 
@@ -22,6 +26,9 @@ def send_friend_request(
     if current_user.id == req.to_user_id:
         raise HTTPException(status_code=400, detail="Cannot send a request to yourself")
 
+    # Blocked either way: 403
+    check_not_blocked(db, current_user.id, req.to_user_id)
+
     # Check if already friends
     if any(friend.id == req.to_user_id for friend in current_user.friends):
         raise HTTPException(status_code=400, detail="Already friends")
@@ -33,8 +40,13 @@ def send_friend_request(
         status=RequestStatus.pending,
     )
     db.add(friend_request)
+    bump(db, PENDING_REQUESTS, req.to_user_id)
+    # The recipient's sync log (needs the id)
+    db.flush()
+    record(db, [req.to_user_id], FRIEND_REQUEST, friend_request.id)
     db.commit()
     db.refresh(friend_request)
+    notify_friend_request(friend_request)
 
     return {"message": "Friend request sent", "request_id": friend_request.id}
 
@@ -76,8 +88,16 @@ def respond_request(
 
         user1.friends.append(user2)
         user2.friends.append(user1)
+        bump(db, USER_FRIENDS, user1.id)
+        bump(db, USER_FRIENDS, user2.id)
+        friendship_changed(db, user1.id, user2.id)
 
     fr.status = res.action
+    # The request is no longer pending, approved or denied
+    bump(db, PENDING_REQUESTS, fr.to_user_id, -1)
+    record(db, [fr.to_user_id], FRIEND_REQUEST, fr.id, deleted=True)
     db.commit()
+    if fr.status == RequestStatus.approved:
+        notify_friend_accepted(fr)
 
     return {"message": f"Friend request {res.action.value}"}
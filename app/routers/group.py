@@ -8,7 +8,7 @@ IMPORTANT:
   the business logic into app.services.group and call it from here.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -20,17 +20,49 @@ from app.schemas.group import (
     GroupCreate,
     GroupUpdate,
     GroupMemberRead,
+    GroupMembersBulkRequest,
+    GroupMembersBulkResponse,
+    GroupDirectoryPage,
     GroupPostCreate,
     GroupPostOut,
 )
 from app.models.user import User
 from app.core.auth import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.posts import PostImageOut
+from app.schemas.reaction import ReactionIn, ReactionState
+from app.schemas.comment import CommentCreate, CommentOut, CommentPage
+from app.services.authors import embed_authors, wants_author
+from app.services.post_images import (
+    check_group_post_for_image,
+    finish_upload,
+    receive_post_image,
+)
+from app.services.change_log import GROUP, record
+from app.services.counters import GROUP_MEMBERS, bump
+from app.services.group_helpers import get_group_post_for_member
+from app.services.reactions import GROUP_POST, embed_reactions, react, unreact
+from app.services.comments import (
+    DEFAULT_PREVIEW_DEPTH,
+    DEFAULT_PREVIEW_REPLIES,
+    MAX_COMMENT_DEPTH,
+    MAX_PREVIEW_REPLIES,
+    add_comment,
+    delete_comment,
+    list_comments,
+    list_replies,
+)
 
 # Service layer for Story 8 and membership logic
 from app.services.group import (
     update_group,
     list_group_members,
+    list_group_directory as svc_list_group_directory,
+    delete_group as svc_delete_group,
     remove_group_member,
+    bulk_add_group_members,
+    bulk_remove_group_members,
+    bulk_promote_group_members,
     join_group as svc_join_group,
     leave_group as svc_leave_group,
     list_group_posts as svc_list_group_posts,
@@ -92,26 +124,41 @@ def create_group(
     )
 
     db.add(membership)
+    bump(db, GROUP_MEMBERS, group.id)
+    record(db, [current_user.id], GROUP, group.id)
     db.commit()
 
     return group
 
 
-"""ST-6.2: The endpoint that lists all groups."""
+"""ST-6.2: The group directory."""
 @router.get(
         "/", 
-        response_model=list[GroupOut],
+        response_model=GroupDirectoryPage,
         status_code=status.HTTP_200_OK)
 def list_groups(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    prefix: str | None = Query(None, min_length=1, max_length=100),
+    q: str | None = Query(None, min_length=1, max_length=200),
     db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
 ):
     """
-    Return all groups.
+    Browse or search groups, one page at a time.
 
-    This is a simple read-only endpoint; keeping it in the router is fine.
+    - ?prefix=hik: groups whose name starts with "hik" (case-insensitive for A-Z)
+    - ?q=hiking club: full-text search in names and descriptions
+    - Each item has member_count and post_count
+    - Next page: ?cursor=<next_cursor> with the same prefix/q
     """
-    groups = db.query(Group).all()
-    return groups
+    return svc_list_group_directory(
+        db=db,
+        limit=limit,
+        cursor=cursor,
+        prefix=prefix,
+        q=q,
+    )
 
 
 """ST-6.3: Bring the detail of a single group."""
@@ -127,7 +174,7 @@ def get_group(
     """
     Return one group by id, or 404 if it does not exist.
     """
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = db.query(Group).filter(Group.id == group_id, Group.deleted_at.is_(None)).first()
 
     if not group:
         raise HTTPException(
@@ -198,6 +245,7 @@ def leave_group_endpoint(
 )
 def list_group_posts_endpoint(
     group_id: int,
+    expand: str | None = Query(None, description="author: embed author summaries"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -206,12 +254,19 @@ def list_group_posts_endpoint(
 
     - Only group members are allowed to see the posts.
     - Membership + 403 logic lives in svc_list_group_posts.
+    - ?expand=author embeds the authors, loaded with one query.
+    - Every post has its reaction_count and has_reacted.
     """
-    return svc_list_group_posts(
+    expand_author = wants_author(expand)
+    posts = svc_list_group_posts(
         db=db,
         group_id=group_id,
         current_user=current_user,
     )
+    embed_reactions(db, current_user.id, posts, GROUP_POST)
+    if expand_author:
+        embed_authors(db, posts)
+    return posts
 
 
 """ST-6.8: Current user creates a new post in this group."""
@@ -244,6 +299,161 @@ def create_group_post_endpoint(
 # User Story 8 (admin ops)
 # =========================
 
+"""Attach an image to your own group post."""
+@router.post(
+    "/{group_id}/posts/{post_id}/images",
+    response_model=PostImageOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_group_post_image_endpoint(
+    group_id: int,
+    post_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Attach an image to your post in this group (raw image body).
+
+    - Members only, and only the author of the post
+    - Same rules as POST /post/{post_id}/images (types, size, OCR)
+    """
+    digest, extension = await receive_post_image(
+        request, lambda: check_group_post_for_image(db, group_id, post_id, current_user)
+    )
+    return await finish_upload(db, digest, extension, current_user, group_post_id=post_id)
+
+
+"""React to a post in this group."""
+@router.put(
+    "/{group_id}/posts/{post_id}/reaction",
+    response_model=ReactionState,
+)
+def react_to_group_post_endpoint(
+    group_id: int,
+    post_id: int,
+    body: ReactionIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    React to a group post, or change your reaction.
+
+    - Members only
+    - Same kinds as PUT /post/{post_id}/reaction
+    """
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    return react(db, current_user.id, post, body.kind)
+
+
+"""Remove your reaction to a post in this group."""
+@router.delete(
+    "/{group_id}/posts/{post_id}/reaction",
+    response_model=ReactionState,
+)
+def remove_group_post_reaction_endpoint(
+    group_id: int,
+    post_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Remove your reaction to a group post (members only)."""
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    return unreact(db, current_user.id, post)
+
+
+"""Comment on a post in this group."""
+@router.post(
+    "/{group_id}/posts/{post_id}/comments",
+    response_model=CommentOut,
+    status_code=status.HTTP_201_CREATED,
+)
+def comment_on_group_post_endpoint(
+    group_id: int,
+    post_id: int,
+    body: CommentCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Comment on a group post, or reply to a comment (members only).
+
+    - Same rules as POST /post/{post_id}/comments
+    """
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    return add_comment(db, current_user.id, post, body.content, body.parent_id)
+
+
+"""Comments of a post in this group."""
+@router.get(
+    "/{group_id}/posts/{post_id}/comments",
+    response_model=CommentPage,
+)
+def list_group_post_comments_endpoint(
+    group_id: int,
+    post_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    replies: int = Query(DEFAULT_PREVIEW_REPLIES, ge=0, le=MAX_PREVIEW_REPLIES),
+    depth: int = Query(DEFAULT_PREVIEW_DEPTH, ge=0, le=MAX_COMMENT_DEPTH),
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Top-level comments with a preview of their threads (members only).
+
+    - Same parameters as GET /post/{post_id}/comments
+    """
+    expand_author = wants_author(expand)
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    page = list_comments(db, post, limit=limit, cursor=cursor, replies=replies, depth=depth)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
+
+
+"""Replies below a comment in this group."""
+@router.get(
+    "/{group_id}/posts/{post_id}/comments/{comment_id}/replies",
+    response_model=CommentPage,
+)
+def list_group_comment_replies_endpoint(
+    group_id: int,
+    post_id: int,
+    comment_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Every reply below a comment, in thread order (members only)."""
+    expand_author = wants_author(expand)
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    page = list_replies(db, post, comment_id, limit=limit, cursor=cursor)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
+
+
+"""Delete your comment in this group."""
+@router.delete(
+    "/{group_id}/posts/{post_id}/comments/{comment_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+def delete_group_post_comment_endpoint(
+    group_id: int,
+    post_id: int,
+    comment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Delete your comment, with every reply below it (members only)."""
+    post = get_group_post_for_member(db, group_id, post_id, current_user.id)
+    delete_comment(db, current_user.id, post, comment_id)
+
+
 @router.put(
     "/{group_id}",
     response_model=GroupOut,
@@ -269,6 +479,31 @@ def update_group_endpoint(
     )
 
 
+@router.delete(
+    "/{group_id}",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+def delete_group_endpoint(
+    group_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Delete a group (owner only).
+
+    - 202 Accepted: the group is gone for users right away; posts,
+      memberships and the chat room are deleted in the background.
+    - Service checks:
+        * group exists (404)
+        * current user is the owner (403)
+    """
+    return svc_delete_group(
+        db=db,
+        group_id=group_id,
+        current_user=current_user,
+    )
+
+
 @router.get(
     "/{group_id}/members",
     response_model=list[GroupMemberRead],
@@ -276,20 +511,27 @@ def update_group_endpoint(
 )
 def list_group_members_endpoint(
     group_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_user_id: int | None = None,
+    admins_only: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
-    List all members of a group.
+    List the members of a group, one page at a time, ordered by user_id.
 
-    - Service returns a list of GroupMemberRead objects.
-    - You can later add extra access rules (only admins, etc.)
-      inside the service function.
+    - Next page: ?after_user_id=<user_id of the last member>
+    - A page shorter than limit is the last one
+    - ?admins_only=true lists only the group admins
+    - Only members can list members (403 otherwise)
     """
     return list_group_members(
         db=db,
         group_id=group_id,
         current_user=current_user,
+        limit=limit,
+        after_user_id=after_user_id,
+        admins_only=admins_only,
     )
 
 
@@ -320,3 +562,76 @@ def remove_members_from_groups(
     )
     # 204 No Content: nothing is returned in the body
     return
+
+
+@router.post(
+    "/{group_id}/members/bulk-add",
+    response_model=GroupMembersBulkResponse,
+    status_code=status.HTTP_200_OK,
+)
+def bulk_add_members_endpoint(
+    group_id: int,
+    body: GroupMembersBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Add up to 200 users to a group at once (admins only).
+
+    - One result per user: "added", "already_member" or "user_not_found"
+    - All users are added in one transaction
+    """
+    return bulk_add_group_members(
+        db=db,
+        group_id=group_id,
+        user_ids=body.user_ids,
+        current_user=current_user,
+    )
+
+
+@router.post(
+    "/{group_id}/members/bulk-remove",
+    response_model=GroupMembersBulkResponse,
+    status_code=status.HTTP_200_OK,
+)
+def bulk_remove_members_endpoint(
+    group_id: int,
+    body: GroupMembersBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Remove up to 200 members from a group at once (admins only).
+
+    - One result per user: "removed" or "not_member"
+    """
+    return bulk_remove_group_members(
+        db=db,
+        group_id=group_id,
+        user_ids=body.user_ids,
+        current_user=current_user,
+    )
+
+
+@router.post(
+    "/{group_id}/members/bulk-promote",
+    response_model=GroupMembersBulkResponse,
+    status_code=status.HTTP_200_OK,
+)
+def bulk_promote_members_endpoint(
+    group_id: int,
+    body: GroupMembersBulkRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Make up to 200 members group admins at once (admins only).
+
+    - One result per user: "promoted", "already_admin" or "not_member"
+    """
+    return bulk_promote_group_members(
+        db=db,
+        group_id=group_id,
+        user_ids=body.user_ids,
+        current_user=current_user,
+    )
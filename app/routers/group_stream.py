@@ -0,0 +1,142 @@
+# app/routers/group_stream.py
+
+"""
+Live group posts over WebSocket and Server-Sent Events.
+
+Both endpoints authenticate with ?token=<JWT> (browsers cannot set
+headers on WebSocket or EventSource requests), check group membership
+once, then hold no database session while the subscription is open.
+Delivery is done by app.services.group_stream.
+"""
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from jose import JWTError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.websocket import borrow_db, decode_username, receive_data
+from app.models.user import User
+from app.services.chat_connections import ChatConnection
+from app.services.chat_protocol import (
+    CODECS,
+    JSON_SUBPROTOCOL,
+    LEGACY_CODEC,
+    ChatFrameError,
+    ControlFrame,
+    negotiate_codec,
+    parse_incoming,
+    pong_frame,
+)
+from app.services import group_stream
+from app.services.group_helpers import get_group_with_role
+
+router = APIRouter(prefix="/groups", tags=["groups"])
+
+
+def _authorize_member(token: str | None, group_id: int) -> int | None:
+    """
+    Resolve the token's user and check they are a member of the group.
+
+    Runs in the threadpool with a borrowed session.
+    Returns the user id, or None if access is denied.
+    """
+    if not token:
+        return None
+    try:
+        username = decode_username(token)
+    except (JWTError, ValueError, TypeError):
+        return None
+
+    with borrow_db() as db:
+        user_id = (
+            db.query(User.id)
+            .filter(User.username == username, User.deleted_at.is_(None))
+            .scalar()
+        )
+        if user_id is None:
+            return None
+        try:
+            access = get_group_with_role(db, group_id, user_id)
+        except HTTPException:
+            return None  # no such group
+        return user_id if access.is_member else None
+
+
+@router.websocket("/{group_id}/stream/ws")
+async def group_stream_ws(websocket: WebSocket, group_id: int):
+    """
+    Receive new posts of a group as they are created.
+
+    - Auth: ?token=<JWT>; members only (closed with 1008 otherwise)
+    - Frames: {"v": 1, "type": "group_post", "id", "group_id", "user_id",
+      "ts", "content"}; JSON unless MessagePack is negotiated
+    - Heartbeat: answer "ping" frames (or send your own); silent sockets
+      are closed like chat sockets
+    """
+    user_id = await run_in_threadpool(
+        _authorize_member, websocket.query_params.get("token"), group_id
+    )
+    if user_id is None:
+        await websocket.close(code=1008)
+        return
+
+    codec = negotiate_codec(
+        websocket.scope.get("subprotocols", []),
+        websocket.query_params.get("encoding"),
+    )
+    # Plain text cannot carry post frames; fall back to JSON
+    if codec is LEGACY_CODEC:
+        await websocket.accept()
+        codec = CODECS[JSON_SUBPROTOCOL]
+    else:
+        await websocket.accept(subprotocol=codec.name)
+
+    connection = ChatConnection(websocket, user_id, group_id, codec)
+    group_stream.subscribe(connection)
+
+    try:
+        while True:
+            data = await receive_data(websocket)
+            connection.touch(len(data))
+            try:
+                frame = parse_incoming(codec, data)
+            except ChatFrameError:
+                continue
+            # Subscriptions are read-only: only ping gets an answer
+            if isinstance(frame, ControlFrame) and frame.type == "ping":
+                connection.enqueue_frame(pong_frame())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        group_stream.unsubscribe(connection)
+
+
+@router.get("/{group_id}/stream")
+async def group_stream_sse(group_id: int, request: Request, token: str | None = None):
+    """
+    Server-Sent Events version of the group stream (EventSource).
+
+    - Auth: ?token=<JWT>; 403 for non-members
+    - Events: "group_post" with the same JSON as the WebSocket frames;
+      the event id is the post id
+    - A ": keepalive" comment is sent when the stream is idle
+    """
+    user_id = await run_in_threadpool(_authorize_member, token, group_id)
+    if user_id is None:
+        raise HTTPException(status_code=403, detail="You must join the group to follow it.")
+
+    subscriber = group_stream.SseSubscriber(user_id, group_id)
+    group_stream.subscribe(subscriber)
+
+    async def stream():
+        try:
+            async for payload in subscriber.events(request.is_disconnected):
+                yield payload
+        finally:
+            group_stream.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
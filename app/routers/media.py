@@ -0,0 +1,69 @@
+# app/routers/media.py
+
+"""
+Stored media files (avatars, post images).
+
+Files are content addressed and never change, so responses carry a
+strong ETag and may be cached for a year; a matching If-None-Match gets
+304 without touching the file.
+"""
+
+from fastapi import APIRouter, HTTPException, Path, Request, Response, status
+from fastapi.responses import FileResponse
+
+from app.services import avatars
+from app.services.avatars import (
+    AVATAR_CACHE_CONTROL,
+    THUMBNAIL_MEDIA_TYPE,
+    THUMBNAIL_SIZES,
+    avatar_etag,
+    thumbnail_path,
+)
+from app.services.post_images import IMAGE_TYPES
+
+
+router = APIRouter(
+    prefix="/media",
+    tags=["media"],
+)
+
+
+@router.get("/avatars/{digest}/{size}")
+def read_avatar(
+    request: Request,
+    digest: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    size: int = Path(...),
+):
+    """One avatar thumbnail (size in pixels: 64, 128 or 256)."""
+    path = thumbnail_path(digest, size)
+    if size not in THUMBNAIL_SIZES or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found.")
+    return _immutable_file(request, path, avatar_etag(digest, size), THUMBNAIL_MEDIA_TYPE)
+
+
+# Extension -> media type of post images
+_IMAGE_MEDIA_TYPES = {ext: media_type for media_type, ext in IMAGE_TYPES.items()}
+
+
+@router.get("/images/{name}")
+def read_post_image(
+    request: Request,
+    name: str = Path(..., pattern="^[0-9a-f]{64}\\.(jpg|png|webp|gif)$"),
+):
+    """An image attached to a post, by <sha256>.<ext>."""
+    path = avatars.MEDIA_ROOT / "images" / name
+    if not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found.")
+    digest, extension = name.split(".")
+    return _immutable_file(request, path, f'"{digest}"', _IMAGE_MEDIA_TYPES[extension])
+
+
+def _immutable_file(request: Request, path, etag: str, media_type: str):
+    """Content-addressed file: strong ETag, cache for a year, 304 on match."""
+    headers = {"ETag": etag, "Cache-Control": AVATAR_CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,68 @@
+# app/routers/notifications.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.db.database import get_db
+from app.models.user import User
+from app.schemas.notification import MarkRead, NotificationPage, UnreadCount
+from app.services.authors import embed_authors, wants_author
+from app.services.notifications import list_notifications, mark_read, unread_count
+
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"],
+)
+
+
+@router.get("", response_model=NotificationPage)
+def read_notifications(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    unread_only: bool = False,
+    expand: str | None = Query(None, description="author: embed the actor of every item"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Your notifications, newest first, with the unread count.
+
+    - Next page: ?cursor=<next_cursor> with the same unread_only
+    - New notifications show up within a second of what caused them
+    """
+    expand_author = wants_author(expand)
+    page = list_notifications(
+        db=db,
+        user_id=current_user.id,
+        limit=limit,
+        cursor=cursor,
+        unread_only=unread_only,
+    )
+    if expand_author:
+        embed_authors(db, page.items, id_attr="actor_id", attr="actor")
+    return page
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+def read_unread_count(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Number of unread notifications (a counter lookup, cheap to poll)"""
+    return UnreadCount(unread_count=unread_count(db, current_user.id))
+
+
+@router.post("/read", response_model=UnreadCount)
+def mark_notifications_read(
+    body: MarkRead,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Mark notifications read: all of them, or those up to up_to_id (the
+    newest one the client has shown). Returns the new unread count.
+    """
+    return UnreadCount(unread_count=mark_read(db, current_user.id, body.up_to_id))
@@ -1,14 +1,54 @@
 # app/routers/posts.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 
 from app.db.database import get_db
 from app.models.posts import Post as PostModel
-from app.schemas.posts import Post as PostSchema, PostCreate
+from app.schemas.posts import Post as PostSchema, PostCreate, PostImageOut
+from app.schemas.reaction import ReactionIn, ReactionState
+from app.schemas.comment import CommentCreate, CommentOut, CommentPage
 from app.core.auth import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.feed import HomeFeedPage
+from app.services.feed import home_feed
 from app.models.user import User
 from app.models.friend_request import FriendRequest, RequestStatus
+from app.services.authors import embed_authors, wants_author
+from app.services.blocks import hidden_set, visible
+from app.services.change_log import post_changed
+from app.services.counters import USER_POSTS, bump
+from app.services.notifications import delete_notifications, notify_mentions
+from app.services.tags import index_post_tags, trending
+from app.services.reactions import (
+    POST,
+    delete_post_reactions,
+    embed_reactions,
+    get_post_or_404,
+    react,
+    unreact,
+)
+from app.services.comments import (
+    DEFAULT_PREVIEW_DEPTH,
+    DEFAULT_PREVIEW_REPLIES,
+    MAX_COMMENT_DEPTH,
+    MAX_PREVIEW_REPLIES,
+    add_comment,
+    delete_comment,
+    delete_post_comments,
+    list_comments,
+    list_replies,
+)
+from app.services.post_images import (
+    check_post_for_image,
+    finish_upload,
+    image_out,
+    list_post_images,
+    receive_post_image,
+)
+from app.models.post_image import PostImage
+from app.models.notification import Notification
+from app.models.tag import PostTag
 
 
 router = APIRouter(
@@ -29,31 +69,46 @@ def create_post(
         user_id=current_user.id,
     )
     db.add(db_post)
+    bump(db, USER_POSTS, current_user.id)
+    tags = index_post_tags(db, db_post)
+    # The author's and friends' sync logs (needs the id)
+    db.flush()
+    post_changed(db, current_user.id, db_post.id)
     db.commit()
     db.refresh(db_post)
+    trending.record(tags)
+    notify_mentions(db_post)
     return db_post
 
 
 @router.get("/me", response_model=list[PostSchema])
 def read_my_posts(
+    expand: str | None = Query(None, description="author: embed author summaries"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get only the logged in user's posts"""
-    return (
+    expand_author = wants_author(expand)
+    posts = (
         db.query(PostModel)
         .filter(PostModel.user_id == current_user.id)
         .order_by(PostModel.created_at.desc())
         .all()
     )
+    embed_reactions(db, current_user.id, posts, POST)
+    if expand_author:
+        embed_authors(db, posts)
+    return posts
 
 
 @router.get("/feed", response_model=list[PostSchema])
 def read_friends_posts(
+    expand: str | None = Query(None, description="author: embed author summaries"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get posts from approved friends only"""
+    expand_author = wants_author(expand)
 
     # Get list of friend's user_ids
     approved_requests = db.query(FriendRequest).filter(
@@ -72,20 +127,59 @@ def read_friends_posts(
     if not friend_ids:
         return []  # user has no friends yet
 
-    return (
+    posts = (
         db.query(PostModel)
         .filter(PostModel.user_id.in_(friend_ids))
+        # Muted friends
+        .filter(visible(PostModel.user_id, hidden_set(db, current_user.id)))
         .order_by(PostModel.created_at.desc())
         .all()
     )
+    embed_reactions(db, current_user.id, posts, POST)
+    if expand_author:
+        embed_authors(db, posts)
+    return posts
+
+
+@router.get("/home", response_model=HomeFeedPage)
+def read_home_feed(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include_groups: bool = False,
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Home feed, newest first: own posts and friends' posts.
+
+    - ?include_groups=true also merges in posts from all your groups
+    - Next page: ?cursor=<next_cursor> with the same include_groups
+    - ?expand=author embeds the author of every item
+    - Every item has its reaction_count and has_reacted
+    """
+    expand_author = wants_author(expand)
+    page = home_feed(
+        db=db,
+        user_id=current_user.id,
+        limit=limit,
+        cursor=cursor,
+        include_groups=include_groups,
+    )
+    embed_reactions(db, current_user.id, page.items)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
 
 
 @router.get("/", response_model=list[PostSchema])
 def read_posts(
+    expand: str | None = Query(None, description="author: embed author summaries"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """Get all posts"""
+    expand_author = wants_author(expand)
     # Show user + friends posts together
     approved_requests = db.query(FriendRequest).filter(
     FriendRequest.status == RequestStatus.approved,
@@ -101,26 +195,177 @@ def read_posts(
     ]
     allowed_ids = friend_ids + [current_user.id]
 
-    return (
+    posts = (
         db.query(PostModel)
         .filter(PostModel.user_id.in_(allowed_ids))
+        # Muted friends
+        .filter(visible(PostModel.user_id, hidden_set(db, current_user.id)))
         .order_by(PostModel.created_at.desc())
         .all()
     )
+    embed_reactions(db, current_user.id, posts, POST)
+    if expand_author:
+        embed_authors(db, posts)
+    return posts
 
 
 @router.get("/{post_id}", response_model=PostSchema)
 def read_post(
     post_id: int,
+    expand: str | None = Query(None, description="author: embed author summaries"),
     db: Session = Depends(get_db),
 ):
     """Get a post by id"""
+    expand_author = wants_author(expand)
     post = db.query(PostModel).filter(PostModel.id == post_id).first()
     if not post:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Post not found")
+    if expand_author:
+        embed_authors(db, [post])
     return post
 
 
+@router.post(
+    "/{post_id}/images",
+    response_model=PostImageOut,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_post_image(
+    post_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Attach an image to your post: the raw image is the request body.
+
+    - Content-Type image/jpeg, png, webp or gif; at most 10 MB; 4 per post
+    - Text in the image is extracted in the background (ocr_status
+      "pending" in the response); 503 + Retry-After when that backlog
+      is full
+    """
+    digest, extension = await receive_post_image(
+        request, lambda: check_post_for_image(db, post_id, current_user)
+    )
+    return await finish_upload(db, digest, extension, current_user, post_id=post_id)
+
+
+@router.get("/{post_id}/images", response_model=list[PostImageOut])
+def read_post_images(
+    post_id: int,
+    db: Session = Depends(get_db),
+):
+    """Images of a post, with their OCR state and text"""
+    return [image_out(image) for image in list_post_images(db, post_id)]
+
+
+@router.put("/{post_id}/reaction", response_model=ReactionState)
+def react_to_post(
+    post_id: int,
+    body: ReactionIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    React to a post, or change your reaction (one per user and post).
+
+    - kind: like, love, haha, wow, sad or angry (400 otherwise)
+    - Returns the post's reaction count and your reaction
+    """
+    post = get_post_or_404(db, post_id)
+    return react(db, current_user.id, post, body.kind)
+
+
+@router.delete("/{post_id}/reaction", response_model=ReactionState)
+def remove_post_reaction(
+    post_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Remove your reaction to a post (no error if you had none)"""
+    post = get_post_or_404(db, post_id)
+    return unreact(db, current_user.id, post)
+
+
+@router.post("/{post_id}/comments", response_model=CommentOut, status_code=status.HTTP_201_CREATED)
+def comment_on_post(
+    post_id: int,
+    body: CommentCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Comment on a post, or reply to a comment (parent_id).
+
+    - Replies nest at most 8 levels deep; a reply to the deepest level
+      is placed next to the comment it answers
+    """
+    post = get_post_or_404(db, post_id)
+    return add_comment(db, current_user.id, post, body.content, body.parent_id)
+
+
+@router.get("/{post_id}/comments", response_model=CommentPage)
+def read_post_comments(
+    post_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    replies: int = Query(DEFAULT_PREVIEW_REPLIES, ge=0, le=MAX_PREVIEW_REPLIES),
+    depth: int = Query(DEFAULT_PREVIEW_DEPTH, ge=0, le=MAX_COMMENT_DEPTH),
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Top-level comments, oldest first, each followed by a preview of its
+    thread: the first `replies` replies of every comment, `depth` levels
+    down. reply_count tells where there is more
+    (GET .../comments/{id}/replies).
+
+    - Next page: ?cursor=<next_cursor> with the same replies/depth
+    """
+    expand_author = wants_author(expand)
+    post = get_post_or_404(db, post_id)
+    page = list_comments(db, post, limit=limit, cursor=cursor, replies=replies, depth=depth)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
+
+
+@router.get("/{post_id}/comments/{comment_id}/replies", response_model=CommentPage)
+def read_comment_replies(
+    post_id: int,
+    comment_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Every reply below a comment, at any depth, in thread order.
+
+    - Next page: ?cursor=<next_cursor>
+    """
+    expand_author = wants_author(expand)
+    post = get_post_or_404(db, post_id)
+    page = list_replies(db, post, comment_id, limit=limit, cursor=cursor)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
+
+
+@router.delete("/{post_id}/comments/{comment_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_post_comment(
+    post_id: int,
+    comment_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Delete your comment, with every reply below it"""
+    post = get_post_or_404(db, post_id)
+    delete_comment(db, current_user.id, post, comment_id)
+
+
 @router.put("/{post_id}", response_model=PostSchema)
 def update_post(
     post_id: int,
@@ -138,8 +383,11 @@ def update_post(
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Not allowed to edit this post")
 
     post.content = updated_post.content
+    added_tags = index_post_tags(db, post)
+    post_changed(db, post.user_id, post.id)
     db.commit()
     db.refresh(post)
+    trending.record(added_tags)
     return post
 
 
@@ -158,7 +406,14 @@ def delete_post(
     if post.user_id != current_user.id:
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Not allowed to delete this post")
 
+    db.query(PostImage).filter(PostImage.post_id == post.id).delete(synchronize_session=False)
+    db.query(PostTag).filter(PostTag.post_id == post.id).delete(synchronize_session=False)
+    delete_notifications(db, Notification.post_id == post.id)
+    delete_post_reactions(db, post.id)
+    delete_post_comments(db, post.id)
+    post_changed(db, post.user_id, post.id, deleted=True)
     db.delete(post)
+    bump(db, USER_POSTS, current_user.id, -1)
     db.commit()
 
 
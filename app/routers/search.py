@@ -0,0 +1,56 @@
+# app/routers/search.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.params import parse_field_list
+from app.db.database import get_db
+from app.models.user import User
+from app.schemas.search import SearchPage
+from app.services.authors import embed_authors, wants_author
+from app.services.search import SEARCH_KINDS, search
+
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"],
+)
+
+
+@router.get("", response_model=SearchPage)
+def search_endpoint(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    kinds: str | None = Query(
+        None,
+        description="Comma separated: post,group_post,message (default: all)",
+    ),
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Search your and your friends' posts, posts of your groups and your
+    conversations, best matches first.
+
+    - The last word also matches as a prefix ("hol" finds "holiday")
+    - Text found in a post's images finds the post
+    - Next page: ?cursor=<next_cursor> with the same q and kinds
+    - ?expand=author embeds the author of every result
+    """
+    expand_author = wants_author(expand)
+    selected = parse_field_list(kinds, SEARCH_KINDS, SEARCH_KINDS)
+    page = search(
+        db=db,
+        user_id=current_user.id,
+        q=q,
+        limit=limit,
+        cursor=cursor,
+        kinds=selected,
+    )
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
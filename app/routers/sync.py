@@ -0,0 +1,39 @@
+# app/routers/sync.py
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.db.database import get_db
+from app.models.user import User
+from app.schemas.sync import SyncPage
+from app.services.reactions import embed_reactions
+from app.services.sync import DEFAULT_SYNC_LIMIT, MAX_SYNC_LIMIT, sync
+
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"],
+)
+
+
+@router.get("", response_model=SyncPage)
+def read_changes(
+    since: str | None = Query(None, description="next_token of your last sync"),
+    limit: int = Query(DEFAULT_SYNC_LIMIT, ge=1, le=MAX_SYNC_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    What changed since your last sync: posts of you and your friends,
+    friendships, incoming friend requests, your groups, and new messages.
+
+    - First call: no ?since; the answer has reset=true and a token. Load
+      /post/feed, /friend-request etc. once, then sync from the token.
+    - Next calls: ?since=<next_token>; call again while has_more is true
+    - reset=true again means the token expired (30 days): reload in full
+    - Changed posts carry their reaction_count and has_reacted
+    """
+    page = sync(db, current_user.id, since=since, limit=limit)
+    embed_reactions(db, current_user.id, [change.post for change in page.changes if change.post])
+    return page
@@ -0,0 +1,82 @@
+# app/routers/tags.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.auth import get_current_user
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.db.database import get_db
+from app.models.user import User
+from app.schemas.tag import TagPage, TrendingTag
+from app.services.authors import embed_authors, wants_author
+from app.services.reactions import embed_reactions
+from app.services.tags import (
+    DEFAULT_TREND_WINDOW,
+    DEFAULT_TRENDING_LIMIT,
+    MAX_TRENDING_LIMIT,
+    TREND_WINDOWS,
+    normalize_tag,
+    tag_posts,
+    trending,
+)
+
+
+router = APIRouter(
+    prefix="/tags",
+    tags=["tags"],
+)
+
+
+@router.get("/trending", response_model=list[TrendingTag])
+def read_trending_tags(
+    window: str = Query(DEFAULT_TREND_WINDOW, description="1h or 24h"),
+    limit: int = Query(DEFAULT_TRENDING_LIMIT, ge=1, le=MAX_TRENDING_LIMIT),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    The most used hashtags of wall posts, recent uses weighing most.
+
+    Served from memory; no database access.
+    """
+    if window not in TREND_WINDOWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"window must be one of {', '.join(TREND_WINDOWS)}.",
+        )
+    return trending.top(window, limit)
+
+
+@router.get("/{tag}", response_model=TagPage)
+def read_tag_posts(
+    tag: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    expand: str | None = Query(None, description="author: embed author summaries"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Posts with a hashtag, newest first: wall posts and posts of your groups.
+
+    - The tag is case-insensitive, with or without "#" (%23 in a URL)
+    - Next page: ?cursor=<next_cursor>
+    - ?expand=author embeds the author of every post
+    """
+    expand_author = wants_author(expand)
+    normalized = normalize_tag(tag)
+    if normalized is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid tag.",
+        )
+    page = tag_posts(
+        db=db,
+        user_id=current_user.id,
+        tag=normalized,
+        limit=limit,
+        cursor=cursor,
+    )
+    embed_reactions(db, current_user.id, page.items)
+    if expand_author:
+        embed_authors(db, page.items, attr="author")
+    return page
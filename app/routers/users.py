@@ -1,13 +1,35 @@
 #app/routers/users.py
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 
 from app.core.auth import get_current_user
-from app.schemas.user import UserRead, UserUpdate
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.core.params import parse_field_list, parse_id_list
+from app.schemas.block import BlockPage
+from app.schemas.user import AvatarOut, UserPublic, UserRead, UserSearchResult, UserUpdate
 from app.models.user import User
 from app.db.database import get_db
+from app.services.avatars import (
+    AVATAR_TYPES,
+    MAX_AVATAR_BYTES,
+    THUMBNAIL_SIZES,
+    avatar_url,
+    store_avatar,
+)
+from app.services.blocks import BLOCK, MUTE, block_user, list_blocks, unblock_user
+from app.services.purge import mark_user_deleted
+from app.services.users import (
+    DEFAULT_SEARCH_LIMIT,
+    DEFAULT_USER_FIELDS,
+    MAX_SEARCH_LIMIT,
+    MAX_USER_IDS,
+    PUBLIC_USER_FIELDS,
+    lookup_users,
+    search_users,
+)
 
 
 router = APIRouter(
@@ -16,6 +38,55 @@ router = APIRouter(
 )
 
 
+@router.get(
+        "",
+        response_model=list[UserPublic],
+        response_model_exclude_unset=True,
+        status_code=status.HTTP_200_OK,
+        )
+def read_users(
+    ids: str = Query(..., description="Comma separated user ids, e.g. 3,7,9"),
+    fields: str | None = Query(
+        None,
+        description="Comma separated columns, e.g. username,avatar_url "
+        "(default: id,username,display_name,avatar_url)",
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Public profiles of many users in one request (e.g. post authors).
+
+    - Up to 200 ids; unknown ids are left out, order follows ids
+    - fields= picks the columns: only those are loaded and returned
+      (id is always included)
+    """
+    user_ids = parse_id_list(ids, MAX_USER_IDS)
+    selected = parse_field_list(fields, PUBLIC_USER_FIELDS, DEFAULT_USER_FIELDS)
+    return lookup_users(db, user_ids, selected)
+
+
+@router.get(
+        "/search",
+        response_model=list[UserSearchResult],
+        status_code=status.HTTP_200_OK,
+        )
+def search_users_endpoint(
+    q: str = Query(..., min_length=1, max_length=100, description="Start of a username or name"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Find users by username or display name, as you type.
+
+    - Exact matches first, then your friends, then other matches
+    - Backed by a username index and the users_fts full-text index
+      (see app.services.users.search_users); no table scan
+    """
+    return search_users(db, current_user.id, q, limit=limit)
+
+
 @router.get(
         "/me", 
         response_model=UserRead,
@@ -51,4 +122,138 @@ def update_current_user(
     db.commit()
     db.refresh(current_user)
 
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+@router.put(
+        "/me/avatar",
+        response_model=AvatarOut,
+        status_code=status.HTTP_200_OK,
+        )
+async def upload_avatar(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Upload a new avatar: the raw image is the request body.
+
+    - Content-Type: image/jpeg, image/png, image/webp or image/gif
+    - At most 5 MB; the body is streamed to disk, never buffered
+    - Thumbnails (64, 128, 256 px) are made in a process pool; the same
+      image uploaded twice is stored once (see app.services.avatars)
+    - Sets avatar_url to the 256 px thumbnail
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in AVATAR_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of {', '.join(AVATAR_TYPES)}.",
+        )
+    # Refuse early if the client announces a body that is too large
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_AVATAR_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Avatar is larger than {MAX_AVATAR_BYTES} bytes.",
+        )
+
+    digest = await store_avatar(request.stream())
+
+    def _save() -> None:
+        current_user.avatar_url = avatar_url(digest)
+        db.add(current_user)
+        db.commit()
+
+    await run_in_threadpool(_save)
+    return AvatarOut(
+        avatar_url=avatar_url(digest),
+        thumbnails={size: avatar_url(digest, size) for size in THUMBNAIL_SIZES},
+    )
+
+
+@router.delete(
+        "/me",
+        status_code=status.HTTP_202_ACCEPTED,
+        )
+def delete_current_user(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Delete the account of the currently authenticated user.
+
+    The account is disabled at once (its tokens stop working); posts,
+    groups, friendships and chats are deleted in the background in
+    small batches (see app.services.purge).
+    """
+    mark_user_deleted(db, current_user)
+    return {"detail": "Account deletion scheduled."}
+
+
+@router.get(
+        "/me/blocks",
+        response_model=BlockPage,
+        status_code=status.HTTP_200_OK,
+        )
+def read_my_blocks(
+    kind: str = Query(BLOCK, pattern="^(block|mute)$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Users you blocked (?kind=block, default) or muted (?kind=mute), by id.
+
+    - Next page: ?cursor=<next_cursor> with the same kind
+    """
+    return list_blocks(db, current_user.id, kind, limit=limit, cursor=cursor)
+
+
+@router.put("/{user_id}/block", status_code=status.HTTP_204_NO_CONTENT)
+def block(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Block a user: neither of you sees the other's posts, messages or
+    search hits, and neither can send a friend request or start a chat.
+
+    Ends your friendship and drops pending requests between you.
+    """
+    block_user(db, current_user.id, user_id, BLOCK)
+
+
+@router.delete("/{user_id}/block", status_code=status.HTTP_204_NO_CONTENT)
+def unblock(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Unblock a user (a friendship ended by the block stays ended)."""
+    unblock_user(db, current_user.id, user_id, BLOCK)
+
+
+@router.put("/{user_id}/mute", status_code=status.HTTP_204_NO_CONTENT)
+def mute(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Mute a user: their posts and search hits are hidden from you only.
+    Nothing else changes (muting a blocked user keeps the block).
+    """
+    block_user(db, current_user.id, user_id, MUTE)
+
+
+@router.delete("/{user_id}/mute", status_code=status.HTTP_204_NO_CONTENT)
+def unmute(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Unmute a user."""
+    unblock_user(db, current_user.id, user_id, MUTE)
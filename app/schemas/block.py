@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BlockOut(BaseModel):
+    """
+    A user you blocked or muted (RESPONSE body).
+
+    - kind: "block" or "mute"
+    """
+    user_id: int
+    kind: str
+    created_at: datetime
+
+
+class BlockPage(BaseModel):
+    """
+    Blocked (or muted) users by id.
+
+    Send next_cursor back as ?cursor=... to get the next page; None on
+    the last page.
+    """
+    items: List[BlockOut]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.user import AuthorSummary
+
+
+class CommentCreate(BaseModel):
+    """
+    Body of POST .../comments.
+
+    - parent_id: the comment to reply to; omit for a top-level comment
+    """
+    content: str
+    parent_id: Optional[int] = None
+
+
+class CommentOut(BaseModel):
+    """
+    One comment (RESPONSE body).
+
+    - depth: 0 for a top-level comment, 1 for a reply, ...
+    - reply_count: direct replies, from a counter; a page may show fewer
+    """
+    id: int
+    post_id: Optional[int] = None
+    group_post_id: Optional[int] = None
+    parent_id: Optional[int] = None
+    user_id: int
+    content: str
+    created_at: datetime
+    depth: int
+    reply_count: int = 0
+    # Only with ?expand=author
+    author: Optional[AuthorSummary] = None
+
+
+class CommentPage(BaseModel):
+    """
+    Comments in thread order: every comment comes right before its
+    replies (use parent_id / depth to indent them).
+
+    Send next_cursor back as ?cursor=... to get the next page; None on
+    the last page. comment_count is the post's total, replies included.
+    """
+    items: List[CommentOut]
+    next_cursor: Optional[str] = None
+    comment_count: int
@@ -1,10 +1,19 @@
+from datetime import datetime
+from typing import List, Optional
+
 from pydantic import BaseModel
 
+from app.schemas.message import MessageRead
+
 
 class ConversationRead(BaseModel):
+    """
+    A chat: either direct (user1_id/user2_id) or a group room (group_id).
+    """
     id: int
-    user1_id: int
-    user2_id: int
+    user1_id: Optional[int] = None
+    user2_id: Optional[int] = None
+    group_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -12,3 +21,38 @@ class ConversationRead(BaseModel):
 
 class ConversationStart(BaseModel):
     receiver_id: int
+
+
+class ConversationInboxItem(BaseModel):
+    """
+    One row of the chat list (GET /chat/conversations).
+
+    - other_user_id: the participant that is not the current user
+    - last_message: newest message in the chat, None if nothing was sent yet
+    - unread_count: messages from the other user after our read pointer
+    """
+    id: int
+    other_user_id: int
+    last_message: Optional[MessageRead] = None
+    unread_count: int
+    last_activity_at: datetime
+
+
+class ConversationInboxPage(BaseModel):
+    """
+    A page of the chat list, newest activity first.
+
+    Send next_cursor back as ?cursor=... to get the next page.
+    next_cursor is None on the last page.
+    """
+    items: List[ConversationInboxItem]
+    next_cursor: Optional[str] = None
+
+
+class ConversationMarkRead(BaseModel):
+    """
+    Move the current user's read pointer forward.
+
+    If message_id is not given, the whole conversation is marked as read.
+    """
+    message_id: Optional[int] = None
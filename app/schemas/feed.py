@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.user import AuthorSummary
+
+
+class FeedItem(BaseModel):
+    """
+    One entry of the home feed (GET /post/home).
+
+    - kind: "post" (a wall post) or "group_post"
+    - group_id: set for group posts only
+    """
+    kind: str
+    id: int
+    user_id: int
+    group_id: Optional[int] = None
+    content: str
+    created_at: datetime
+    # Reactions (all kinds) and whether the current user reacted
+    reaction_count: int = 0
+    has_reacted: bool = False
+    # Only with ?expand=author
+    author: Optional[AuthorSummary] = None
+
+
+class HomeFeedPage(BaseModel):
+    """
+    A page of the home feed, newest first.
+
+    Send next_cursor back as ?cursor=... (with the same include_groups)
+    to get the next page. next_cursor is None on the last page.
+    """
+    items: List[FeedItem]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,8 @@
 from datetime import datetime
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.schemas.user import AuthorSummary
 
 class GroupBase(BaseModel):
     name: str
@@ -18,6 +20,27 @@ class GroupOut(GroupBase):
     class Config:
         from_attributes = True
 
+class GroupDirectoryItem(GroupOut):
+    """
+    One group in the directory (GET /groups/).
+
+    member_count and post_count come from denormalized counters.
+    """
+    member_count: int
+    post_count: int
+
+
+class GroupDirectoryPage(BaseModel):
+    """
+    A page of the group directory.
+
+    Send next_cursor back as ?cursor=... with the same prefix/q to get
+    the next page. next_cursor is None on the last page.
+    """
+    items: List[GroupDirectoryItem]
+    next_cursor: Optional[str] = None
+
+
 class GroupPostBase(BaseModel):
     content: str
 
@@ -31,6 +54,12 @@ class GroupPostOut(GroupPostBase):
     group_id: int
     user_id: int
     created_at: datetime
+    # Only on GET /groups/{id}/posts (app.services.reactions.embed_reactions)
+    reaction_count: Optional[int] = None
+    has_reacted: Optional[bool] = None
+    # Only with ?expand=author; read from author_summary, never from the
+    # lazy GroupPost.author relationship
+    author: Optional[AuthorSummary] = Field(default=None, validation_alias="author_summary")
 
     class Config:
         from_attributes = True
@@ -54,3 +83,30 @@ class GroupMemberRead(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+# Most user ids accepted by one bulk membership request
+MAX_BULK_MEMBERS = 200
+
+
+class GroupMembersBulkRequest(BaseModel):
+    """Body of the bulk add/remove/promote endpoints."""
+    user_ids: List[int] = Field(min_length=1, max_length=MAX_BULK_MEMBERS)
+
+
+class GroupMemberBulkResult(BaseModel):
+    """
+    What happened to one user of a bulk request.
+
+    status is one of:
+    - add:     "added", "already_member", "user_not_found"
+    - remove:  "removed", "not_member"
+    - promote: "promoted", "already_admin", "not_member"
+    """
+    user_id: int
+    status: str
+
+
+class GroupMembersBulkResponse(BaseModel):
+    """Per-user results, in the order of the request (duplicates removed)."""
+    results: List[GroupMemberBulkResult]
@@ -1,6 +1,10 @@
 from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
+from app.schemas.user import AuthorSummary
+
 
 class MessageBase(BaseModel):
     content: str
@@ -26,6 +30,8 @@ class MessageRead(BaseModel):
     sender_id: int
     content: str
     timestamp: datetime
+    # Only with ?expand=author
+    author: Optional[AuthorSummary] = None
 
     class Config:
         from_attributes = True
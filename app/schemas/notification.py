@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.user import AuthorSummary
+
+
+class NotificationOut(BaseModel):
+    """
+    One notification (GET /notifications).
+
+    - kind: "friend_request", "friend_accepted", "group_join" or "mention"
+    - actor_id: the user who caused it
+    - friend_request_id / group_id / post_id: what it is about, by kind
+    """
+    id: int
+    kind: str
+    actor_id: int
+    friend_request_id: Optional[int] = None
+    group_id: Optional[int] = None
+    post_id: Optional[int] = None
+    created_at: datetime
+    read: bool
+    # Only with ?expand=author: the actor
+    actor: Optional[AuthorSummary] = None
+
+
+class NotificationPage(BaseModel):
+    """
+    A page of notifications, newest first, with the unread count.
+
+    Send next_cursor back as ?cursor=... (with the same unread_only) to
+    get the next page. next_cursor is None on the last page.
+    """
+    items: List[NotificationOut]
+    next_cursor: Optional[str] = None
+    unread_count: int
+
+
+class UnreadCount(BaseModel):
+    unread_count: int
+
+
+class MarkRead(BaseModel):
+    """
+    Body of POST /notifications/read.
+
+    - up_to_id: mark notifications with this id or older; all if omitted
+    """
+    up_to_id: Optional[int] = None
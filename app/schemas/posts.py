@@ -1,8 +1,11 @@
 # app/schemas/posts.py
 
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import Optional
+
+from app.schemas.user import AuthorSummary
 
 class PostBase(BaseModel):
     content: str
@@ -14,6 +17,24 @@ class Post(PostBase):
     id: int
     user_id: int
     created_at: datetime
+    # Only on listings (see app.services.reactions.embed_reactions)
+    reaction_count: Optional[int] = None
+    has_reacted: Optional[bool] = None
+    # Only with ?expand=author (see app.services.authors)
+    author: Optional[AuthorSummary] = Field(default=None, validation_alias="author_summary")
 
     class Config:
         from_attributes = True
+
+
+class PostImageOut(BaseModel):
+    """
+    An image attached to a post or group post (RESPONSE body).
+
+    - ocr_status: "pending" until the OCR workers ran, then "done"
+      (ocr_text holds the text found in the image) or "failed"
+    """
+    id: int
+    url: str
+    ocr_status: str
+    ocr_text: Optional[str] = None
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ReactionIn(BaseModel):
+    """
+    Body of PUT .../reaction.
+
+    - kind: "like", "love", "haha", "wow", "sad" or "angry"
+    """
+    kind: str = "like"
+
+
+class ReactionState(BaseModel):
+    """
+    A post's reactions after a change (RESPONSE body).
+
+    - reaction_count: all kinds together
+    - my_reaction: your reaction, None if you have none
+    """
+    reaction_count: int
+    has_reacted: bool
+    my_reaction: Optional[str] = None
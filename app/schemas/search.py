@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.user import AuthorSummary
+
+
+class SearchHit(BaseModel):
+    """
+    One result of GET /search.
+
+    - kind: "post" (a wall post), "group_post" or "message"
+    - user_id: the author (the sender of a message)
+    - group_id: set for group posts and messages of a group room
+    - conversation_id: set for messages only
+    - snippet: the matching text with matched words in [brackets]
+    """
+    kind: str
+    id: int
+    user_id: int
+    group_id: Optional[int] = None
+    conversation_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    snippet: str
+    # Only with ?expand=author
+    author: Optional[AuthorSummary] = None
+
+
+class SearchPage(BaseModel):
+    """
+    A page of search results, best matches first.
+
+    Send next_cursor back as ?cursor=... (with the same q and kinds) to
+    get the next page. next_cursor is None on the last page.
+    """
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
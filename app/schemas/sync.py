@@ -0,0 +1,50 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.feed import FeedItem
+from app.schemas.group import GroupOut
+from app.schemas.message import MessageRead
+
+
+class SyncChange(BaseModel):
+    """
+    One changed entity (GET /sync), in its current state.
+
+    - kind "post": post is the wall post (a FeedItem)
+    - kind "friend": id is the friend's user id
+    - kind "friend_request": an incoming pending request; from_user_id
+      is the sender
+    - kind "group": group is one of your groups
+
+    deleted: the entity is gone for you (deleted, unfriended, answered,
+    left, or hidden by a block); drop it. A "friend" tombstone also means
+    that user's posts are no longer yours to see.
+    """
+    kind: str
+    id: int
+    deleted: bool = False
+    post: Optional[FeedItem] = None
+    group: Optional[GroupOut] = None
+    from_user_id: Optional[int] = None
+
+
+class SyncMessage(MessageRead):
+    """A new message in one of your chats or group rooms."""
+    conversation_id: int
+
+
+class SyncPage(BaseModel):
+    """
+    What changed since the token (GET /sync), oldest first.
+
+    Send next_token back as ?since=... next time. has_more: call again
+    right away with next_token. reset: the token was missing or expired
+    and nothing is listed; load everything once, then sync from
+    next_token.
+    """
+    changes: List[SyncChange] = []
+    messages: List[SyncMessage] = []
+    next_token: str
+    has_more: bool = False
+    reset: bool = False
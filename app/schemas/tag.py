@@ -0,0 +1,27 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.feed import FeedItem
+
+
+class TagPage(BaseModel):
+    """
+    A page of posts with a hashtag (GET /tags/{tag}), newest first.
+
+    Items have the home feed layout (kind "post" or "group_post"). Send
+    next_cursor back as ?cursor=... to get the next page; it is None on
+    the last page.
+    """
+    items: List[FeedItem]
+    next_cursor: Optional[str] = None
+
+
+class TrendingTag(BaseModel):
+    """
+    A trending hashtag (GET /tags/trending).
+
+    - score: decayed number of uses, roughly "posts in the last window"
+    """
+    tag: str
+    score: float
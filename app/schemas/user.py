@@ -77,6 +77,65 @@ class UserRead(UserBase):
         from_attributes = True
 
 
+class UserPublic(BaseModel):
+    """
+    Public profile fields of any user (RESPONSE body).
+
+    Used in:
+    - GET /users?ids=...&fields=...
+
+    Only id is always present; the other fields are included when they
+    were selected with fields= (the endpoint leaves unset fields out).
+    """
+    id: int
+    username: Optional[str] = None
+    display_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    bio: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class UserSearchResult(BaseModel):
+    """
+    One hit of a user search (RESPONSE body).
+
+    Used in:
+    - GET /users/search?q=...
+    """
+    id: int
+    username: str
+    display_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    is_friend: bool = False
+
+
+class AvatarOut(BaseModel):
+    """
+    Stored avatar (RESPONSE body).
+
+    Used in:
+    - PUT /users/me/avatar
+
+    - avatar_url: the new User.avatar_url (default size)
+    - thumbnails: URL per size in pixels
+    """
+    avatar_url: str
+    thumbnails: dict[int, str]
+
+
+class AuthorSummary(BaseModel):
+    """
+    Who wrote a post, group post or message (RESPONSE body, embedded).
+
+    Used in:
+    - ?expand=author on post, group post and chat endpoints
+    """
+    id: int
+    username: str
+    display_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+
+
 class UserUpdate(BaseModel):
     """
     Schema for updating profile information (REQUEST body).
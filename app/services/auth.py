@@ -81,8 +81,8 @@ def authenticate_user(db: Session, username: str, password: str) -> User | None:
     """
     # Try to find a user with the given username
     user = db.query(User).filter(User.username == username).first()
-    if not user:
-        # Username not found
+    if not user or user.deleted_at is not None:
+        # Username not found (or the account is being deleted)
         return None
 
     # Check if the provided password matches the stored hashed password
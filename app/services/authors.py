@@ -0,0 +1,86 @@
+# app/services/authors.py
+
+"""
+?expand=author: embed a small author summary in posts, group posts and
+chat messages, without one lazy load per row.
+
+AuthorLoader is a request-scoped batcher (in the spirit of DataLoader):
+routers first tell it every author id of the response (want), then one
+query loads all of them (load), then each row takes its author from
+memory (get). The loader lives in db.info, so every part of one request
+shares it and an author is never loaded twice.
+"""
+
+from sqlalchemy.orm import Session
+
+from app.core.params import parse_field_list
+from app.schemas.user import AuthorSummary
+from app.services.users import lookup_users
+
+
+# Values accepted in ?expand=
+EXPANSIONS = ("author",)
+
+# User columns of an AuthorSummary
+AUTHOR_FIELDS = ("id", "username", "display_name", "avatar_url")
+
+
+class AuthorLoader:
+    def __init__(self, db: Session):
+        self._db = db
+        self._wanted: set[int] = set()
+        # user id -> summary, None for users that no longer exist
+        self._loaded: dict[int, AuthorSummary | None] = {}
+
+    def want(self, user_ids) -> None:
+        """Remember ids to load with the next load()."""
+        self._wanted.update(uid for uid in user_ids if uid not in self._loaded)
+
+    def load(self) -> None:
+        """Load every wanted id that is not loaded yet, in one query."""
+        missing = sorted(self._wanted - self._loaded.keys())
+        self._wanted.clear()
+        if not missing:
+            return
+        rows = lookup_users(self._db, missing, AUTHOR_FIELDS)
+        found = {row["id"]: AuthorSummary(**row) for row in rows}
+        for user_id in missing:
+            self._loaded[user_id] = found.get(user_id)
+
+    def get(self, user_id: int) -> AuthorSummary | None:
+        if user_id not in self._loaded:
+            self.want([user_id])
+            self.load()
+        return self._loaded[user_id]
+
+
+def author_loader(db: Session) -> AuthorLoader:
+    """The loader of this request (one per session)."""
+    loader = db.info.get("author_loader")
+    if loader is None:
+        loader = db.info["author_loader"] = AuthorLoader(db)
+    return loader
+
+
+def wants_author(expand: str | None) -> bool:
+    """Parse ?expand= (400 for unknown values); True if it asks for author."""
+    return "author" in parse_field_list(expand, EXPANSIONS, ())
+
+
+def embed_authors(db: Session, rows, id_attr: str = "user_id", attr: str = "author_summary"):
+    """
+    Attach author summaries to many rows with one query for all of them.
+
+    - ORM rows (Post, GroupPost): stored in author_summary, which the
+      response schemas read; their own relationships are never touched
+    - Response models (FeedItem, MessageRead): pass attr="author"
+
+    Returns rows.
+    """
+    rows = list(rows)
+    loader = author_loader(db)
+    loader.want(getattr(row, id_attr) for row in rows)
+    loader.load()
+    for row in rows:
+        setattr(row, attr, loader.get(getattr(row, id_attr)))
+    return rows
@@ -0,0 +1,210 @@
+# app/services/avatars.py
+
+"""
+Avatar uploads: streamed to disk, stored by content, resized off the loop.
+
+1. The request body is written to a temp file chunk by chunk (aiofiles)
+   while its sha256 is computed; the upload is never held in memory.
+2. The digest names the avatar: media/avatars/<digest>/<size>.webp.
+   Uploading the same bytes again (another user, the same user twice)
+   finds the stored files and does no work.
+3. Pillow decodes and resizes in a process pool: it is CPU bound and
+   would otherwise block the event loop (or hold the GIL of a thread).
+4. Stored files never change, so they are served with a strong ETag
+   derived from the digest and a one-year immutable Cache-Control.
+
+Files live in MEDIA_ROOT on local disk. With several servers, MEDIA_ROOT
+must be shared storage.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator
+from uuid import uuid4
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps
+
+
+# Root of all stored media (relative to the working directory)
+MEDIA_ROOT = Path("media")
+
+# Largest accepted upload
+MAX_AVATAR_BYTES = 5 * 1024 * 1024
+
+# Content types accepted by PUT /users/me/avatar
+AVATAR_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif")
+
+# Square thumbnails made from every avatar (pixels)
+THUMBNAIL_SIZES = (64, 128, 256)
+
+# Size used for User.avatar_url
+DEFAULT_AVATAR_SIZE = 256
+
+THUMBNAIL_MEDIA_TYPE = "image/webp"
+
+# Processes resizing images
+THUMBNAIL_WORKERS = 2
+
+# Content-addressed files can be cached forever
+AVATAR_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AvatarError(ValueError):
+    """Raised (in the worker process) when an upload is not a usable image."""
+
+
+_pool: Executor | None = None
+
+
+def thumbnail_pool() -> Executor:
+    """The process pool for resizing, started on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+    return _pool
+
+
+def shutdown_thumbnail_pool() -> None:
+    """Stop the worker processes (app shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def avatar_dir(digest: str) -> Path:
+    return MEDIA_ROOT / "avatars" / digest
+
+
+def thumbnail_path(digest: str, size: int) -> Path:
+    return avatar_dir(digest) / f"{size}.webp"
+
+
+def avatar_url(digest: str, size: int = DEFAULT_AVATAR_SIZE) -> str:
+    return f"/media/avatars/{digest}/{size}"
+
+
+def avatar_etag(digest: str, size: int) -> str:
+    """Strong ETag: the bytes behind a digest and size never change."""
+    return f'"{digest}-{size}"'
+
+
+async def receive_upload(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int = MAX_AVATAR_BYTES,
+) -> tuple[str, Path]:
+    """
+    Write an upload to a temp file, hashing it on the way.
+
+    Returns (sha256 hex digest, temp path). Raises 413 as soon as the
+    upload grows past max_bytes, 400 if it is empty; the temp file is
+    removed in both cases.
+    """
+    tmp_dir = MEDIA_ROOT / "tmp"
+    await aiofiles.os.makedirs(tmp_dir, exist_ok=True)
+    tmp = tmp_dir / uuid4().hex
+
+    sha = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(tmp, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+                        detail=f"Avatar is larger than {max_bytes} bytes.",
+                    )
+                sha.update(chunk)
+                await out.write(chunk)
+        if size == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Empty upload.",
+            )
+    except BaseException:
+        await aiofiles.os.unlink(tmp)
+        raise
+
+    return sha.hexdigest(), tmp
+
+
+def make_thumbnails(source: str, target_dir: str, sizes=THUMBNAIL_SIZES) -> None:
+    """
+    Decode source and write one square WebP per size into target_dir.
+
+    Runs in a worker process: arguments are plain strings, errors are
+    reported as AvatarError (picklable).
+    """
+    try:
+        with Image.open(source) as image:
+            image.load()
+            # Phone photos are often stored rotated with an EXIF hint
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA")
+            for size in sizes:
+                thumb = ImageOps.fit(image, (size, size), Image.LANCZOS)
+                thumb.save(os.path.join(target_dir, f"{size}.webp"), "WEBP", quality=85)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as exc:
+        # Pillow reports unreadable or hostile files with all of these
+        raise AvatarError(str(exc) or type(exc).__name__) from None
+
+
+async def store_avatar(chunks: AsyncIterator[bytes]) -> str:
+    """
+    Store an uploaded avatar and its thumbnails; returns its digest.
+
+    1. Stream the upload to a temp file (receive_upload)
+    2. Already stored (same digest)? Drop the temp file, done
+    3. Resize in the process pool, into a private staging directory
+    4. Rename staging to avatars/<digest>: readers never see a half
+       written avatar, and of two concurrent uploads of the same bytes
+       the second rename fails and is simply thrown away
+    """
+    # 1) Body to disk
+    digest, tmp = await receive_upload(chunks)
+
+    # 2) Dedupe by content
+    target = avatar_dir(digest)
+    if await aiofiles.os.path.isdir(target):
+        await aiofiles.os.unlink(tmp)
+        return digest
+
+    # 3) Thumbnails, off the event loop
+    staging = MEDIA_ROOT / "tmp" / f"{digest}.{uuid4().hex}"
+    await aiofiles.os.makedirs(staging)
+    original = staging / "original"
+    await aiofiles.os.rename(tmp, original)
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            thumbnail_pool(), make_thumbnails, str(original), str(staging), THUMBNAIL_SIZES
+        )
+    except AvatarError:
+        await asyncio.to_thread(shutil.rmtree, staging, True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload is not a supported image.",
+        )
+    except BaseException:
+        await asyncio.to_thread(shutil.rmtree, staging, True)
+        raise
+
+    # 4) Publish
+    await aiofiles.os.makedirs(target.parent, exist_ok=True)
+    try:
+        await aiofiles.os.rename(staging, target)
+    except OSError:
+        # The same avatar was published meanwhile
+        await asyncio.to_thread(shutil.rmtree, staging, True)
+
+    return digest
@@ -0,0 +1,327 @@
+# app/services/blocks.py
+
+"""
+Blocking and muting users, and the filter every read applies.
+
+The filter runs on every feed page, search, friend request and chat
+start, so it must not cost a subquery per row. Each user's list is
+loaded once into a HiddenSet: sorted arrays of user ids (8 bytes per
+id, bisect to test one id) plus the same ids as one JSON string. A read
+pushes the whole list into SQL as a single bound parameter:
+
+    user_id NOT IN (SELECT value FROM json_each(:ids))
+
+SQLite builds a temporary index from the parameter once per statement
+and probes it for each row (an anti-join), so a list of 10 000 ids
+costs about the same per row as a list of one. An empty list adds no
+condition at all.
+
+The sets live in BlockCache (like app.services.membership_cache): loaded
+on first use, dropped for both users when either changes the list.
+Loads are versioned, so a load that raced with a change is not kept.
+The cache is per process; entries expire after BLOCK_CACHE_TTL, so a
+change made in another worker is seen after at most that long.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, literal, or_, select, true, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.block import UserBlock
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.user import User, user_friends
+from app.schemas.block import BlockOut, BlockPage
+from app.services.change_log import FRIEND, FRIEND_REQUEST, record
+from app.services.counters import PENDING_REQUESTS, USER_FRIENDS, bump
+
+
+BLOCK, MUTE = "block", "mute"
+BLOCK_KINDS = (BLOCK, MUTE)
+
+# Users whose sets are kept in memory (least recently used go first)
+BLOCK_CACHE_SIZE = 10_000
+
+# Seconds a loaded set is trusted; bounds how stale another worker's
+# change can be
+BLOCK_CACHE_TTL = 60.0
+
+
+def _sorted_ids(ids) -> array:
+    return array("q", sorted(ids))
+
+
+def _json_ids(ids: array) -> str:
+    return "[" + ",".join(map(str, ids)) + "]"
+
+
+def _contains(ids: array, user_id: int) -> bool:
+    i = bisect_left(ids, user_id)
+    return i < len(ids) and ids[i] == user_id
+
+
+@dataclass(frozen=True)
+class HiddenSet:
+    """
+    What one user must not see, as sorted id arrays.
+
+    - hidden: users blocked by or blocking the user, and users they muted
+      (filtered out of feeds and search)
+    - blocked: blocks in either direction only (no friend requests, no
+      chats)
+    - hidden_json / blocked_json: the same as JSON arrays, the SQL
+      parameters of visible()
+    """
+    hidden: array
+    blocked: array
+    hidden_json: str
+    blocked_json: str
+    loaded_at: float
+
+    @classmethod
+    def build(cls, hidden, blocked, loaded_at: float) -> "HiddenSet":
+        hidden, blocked = _sorted_ids(hidden), _sorted_ids(blocked)
+        return cls(
+            hidden=hidden,
+            blocked=blocked,
+            hidden_json=_json_ids(hidden),
+            blocked_json=_json_ids(blocked),
+            loaded_at=loaded_at,
+        )
+
+    def hides(self, user_id: int) -> bool:
+        return _contains(self.hidden, user_id)
+
+    def blocks(self, user_id: int) -> bool:
+        return _contains(self.blocked, user_id)
+
+
+class BlockCache:
+    def __init__(self, size: int = BLOCK_CACHE_SIZE, ttl: float = BLOCK_CACHE_TTL, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # user_id -> HiddenSet, least recently used first
+        self._sets: OrderedDict[int, HiddenSet] = OrderedDict()
+        # user_id -> bumped on every change, loaded or not
+        self._versions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def load(self, user_id: int, loader: Callable[[], tuple]) -> HiddenSet:
+        """
+        Return the user's set, calling loader() on a miss or when the set
+        expired. loader returns (hidden ids, blocked ids) and runs outside
+        the lock (it usually queries the database).
+        """
+        now = self._clock()
+        with self._lock:
+            cached = self._sets.get(user_id)
+            if cached is not None and now - cached.loaded_at < self.ttl:
+                self._sets.move_to_end(user_id)
+                return cached
+            version = self._versions.get(user_id, 0)
+
+        hidden, blocked = loader()
+        loaded = HiddenSet.build(hidden, blocked, now)
+
+        with self._lock:
+            # Keep the result only if nothing changed while we were loading
+            if self._versions.get(user_id, 0) == version:
+                self._sets[user_id] = loaded
+                self._sets.move_to_end(user_id)
+                while len(self._sets) > self.size:
+                    self._sets.popitem(last=False)
+        return loaded
+
+    def invalidate(self, *user_ids: int) -> None:
+        """Forget these users' sets; the next load() reads them again."""
+        with self._lock:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+                self._sets.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            for user_id in self._sets:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._sets.clear()
+
+
+# Shared by every reader (feeds, search, chat) and by block_user / unblock_user
+block_lists = BlockCache()
+
+
+# ---------- reading ----------
+def _load_lists(db: Session, user_id: int) -> tuple[list[int], list[int]]:
+    """(hidden, blocked) ids of one user, in one statement."""
+    rows = db.execute(
+        union_all(
+            select(UserBlock.target_id, UserBlock.kind).where(UserBlock.user_id == user_id),
+            select(UserBlock.user_id, UserBlock.kind).where(
+                UserBlock.target_id == user_id, UserBlock.kind == BLOCK
+            ),
+        )
+    ).all()
+    hidden = {other_id for other_id, _ in rows}
+    blocked = {other_id for other_id, kind in rows if kind == BLOCK}
+    return list(hidden), list(blocked)
+
+
+def hidden_set(db: Session, user_id: int) -> HiddenSet:
+    """The user's HiddenSet, from memory when possible."""
+    return block_lists.load(user_id, lambda: _load_lists(db, user_id))
+
+
+def invalidate_hidden_sets(*user_ids: int) -> None:
+    """Drop cached sets after their rows changed elsewhere (account purge)."""
+    block_lists.invalidate(*user_ids)
+
+
+def visible(column, hidden: HiddenSet, blocked_only: bool = False):
+    """
+    SQL condition: column (a user id) is not hidden (with blocked_only:
+    not blocked either way; muted users stay visible).
+
+    One bound parameter, however long the list; no condition at all for
+    an empty list.
+    """
+    if blocked_only:
+        ids, ids_json = hidden.blocked, hidden.blocked_json
+    else:
+        ids, ids_json = hidden.hidden, hidden.hidden_json
+    if not ids:
+        return true()
+    values = func.json_each(literal(ids_json)).table_valued("value")
+    return column.not_in(select(values.c.value))
+
+
+def check_not_blocked(db: Session, user_id: int, other_id: int) -> None:
+    """403 if either user blocked the other (friend requests, chats)."""
+    if hidden_set(db, user_id).blocks(other_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You cannot interact with this user.",
+        )
+
+
+def list_blocks(
+    db: Session,
+    user_id: int,
+    kind: str = BLOCK,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+) -> BlockPage:
+    """Users the user blocked (or muted), by id; keyset pagination on id."""
+    query = select(UserBlock.target_id, UserBlock.kind, UserBlock.created_at).where(
+        UserBlock.user_id == user_id, UserBlock.kind == kind
+    )
+    if cursor:
+        (after,) = decode_cursor(cursor, 1)
+        # bool is a subclass of int, but never a valid id
+        if type(after) is not int:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+        query = query.where(UserBlock.target_id > after)
+
+    rows = db.execute(query.order_by(UserBlock.target_id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return BlockPage(
+        items=[BlockOut(user_id=row.target_id, kind=row.kind, created_at=row.created_at) for row in rows],
+        next_cursor=encode_cursor(rows[-1].target_id) if has_more else None,
+    )
+
+
+# ---------- writing ----------
+def block_user(db: Session, user_id: int, target_id: int, kind: str = BLOCK) -> None:
+    """
+    Block or mute target_id, and commit.
+
+    Muting a blocked user keeps the block. Blocking also ends the
+    friendship and drops pending friend requests between the two.
+    """
+    # 1) A real, other, live user
+    if kind not in BLOCK_KINDS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Unknown block kind.")
+    if target_id == user_id:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="You cannot block yourself.")
+    target = db.get(User, target_id)
+    if target is None or target.deleted_at is not None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="User not found.")
+
+    # 2) One row per pair; only a block overwrites the kind
+    stmt = insert(UserBlock).values(user_id=user_id, target_id=target_id, kind=kind)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[UserBlock.user_id, UserBlock.target_id],
+            set_={"kind": stmt.excluded.kind},
+            where=stmt.excluded.kind == BLOCK,
+        )
+    )
+
+    # 3) A block ends what the two had
+    if kind == BLOCK:
+        _unfriend(db, user_id, target_id)
+
+    db.commit()
+    block_lists.invalidate(user_id, target_id)
+
+
+def unblock_user(db: Session, user_id: int, target_id: int, kind: str = BLOCK) -> None:
+    """Undo block_user for this kind (unblocking does not unmute), and commit."""
+    if kind not in BLOCK_KINDS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Unknown block kind.")
+    db.execute(
+        delete(UserBlock).where(
+            UserBlock.user_id == user_id,
+            UserBlock.target_id == target_id,
+            UserBlock.kind == kind,
+        )
+    )
+    db.commit()
+    block_lists.invalidate(user_id, target_id)
+
+
+def _unfriend(db: Session, a: int, b: int) -> None:
+    """Remove the friendship and all friend requests between a and b. Does not commit."""
+    # Friendships are stored in both directions
+    removed = db.execute(
+        delete(user_friends).where(
+            or_(
+                and_(user_friends.c.user_id == a, user_friends.c.friend_id == b),
+                and_(user_friends.c.user_id == b, user_friends.c.friend_id == a),
+            )
+        ).returning(user_friends.c.user_id)
+    ).scalars().all()
+    for friend_of in removed:
+        bump(db, USER_FRIENDS, friend_of, -1)
+        # Tombstone in their sync log: the other one is no friend any more
+        record(db, [friend_of], FRIEND, b if friend_of == a else a, deleted=True)
+
+    pending = db.execute(
+        delete(FriendRequest).where(
+            or_(
+                and_(FriendRequest.from_user_id == a, FriendRequest.to_user_id == b),
+                and_(FriendRequest.from_user_id == b, FriendRequest.to_user_id == a),
+            )
+        ).returning(FriendRequest.id, FriendRequest.to_user_id, FriendRequest.status)
+    ).all()
+    for request_id, to_user_id, request_status in pending:
+        if request_status == RequestStatus.pending:
+            bump(db, PENDING_REQUESTS, to_user_id, -1)
+            record(db, [to_user_id], FRIEND_REQUEST, request_id, deleted=True)
@@ -0,0 +1,163 @@
+# app/services/change_log.py
+
+"""
+The per-user change log behind GET /sync (app.services.sync).
+
+Write paths call the record functions before their commit, so a change
+and its log rows commit (or roll back) together, like bump(). A change
+is fanned out once, at write time, to every user who syncs it:
+
+- post: the author and their friends (post_changed)
+- friend: both users of a friendship
+- friend_request: the recipient of the request
+- group: the members of the group (group_changed), or the users who
+  joined or left it
+
+Compaction happens twice:
+
+1. On write: rows are INSERT OR REPLACE on (user_id, kind, entity_id),
+   so an entity edited a hundred times is one row per user. The
+   replacing row gets a new, higher id and is synced again.
+2. In the background: run_compactor() deletes rows older than
+   SYNC_RETENTION (plus COMPACT_SLACK for slow commits). Sync tokens
+   expire after SYNC_RETENTION, and an expired token gets a full reset
+   instead of a delta, so no valid token can reach a deleted row.
+
+The log therefore holds at most one row per entity and user, and only
+for changes of the last SYNC_RETENTION: its size follows the rate of
+changes, not the amount of data.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import delete, insert, literal, select, union_all
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.change_log import ChangeLogEntry
+from app.models.group_membership import GroupMembership
+from app.models.user import user_friends
+
+logger = logging.getLogger(__name__)
+
+
+# Change kinds
+POST = "post"
+FRIEND = "friend"
+FRIEND_REQUEST = "friend_request"
+GROUP = "group"
+CHANGE_KINDS = (POST, FRIEND, FRIEND_REQUEST, GROUP)
+
+# How long a sync token stays valid, and so how long the log keeps rows
+SYNC_RETENTION = timedelta(days=30)
+
+# Extra time rows are kept beyond SYNC_RETENTION: covers the gap between
+# a row's created_at and its commit
+COMPACT_SLACK = timedelta(hours=1)
+
+# Rows deleted per compaction transaction
+COMPACT_BATCH = 1000
+
+# Seconds between two compaction runs
+COMPACT_INTERVAL = 3600.0
+
+_COLUMNS = ["user_id", "kind", "entity_id", "deleted", "created_at"]
+
+
+def _replace():
+    return insert(ChangeLogEntry).prefix_with("OR REPLACE")
+
+
+def _record_for(db: Session, user_ids, kind: str, entity_id: int, deleted: bool) -> None:
+    """One row per user id of a one-column SELECT, in one INSERT ... SELECT."""
+    recipients = user_ids.subquery()
+    db.execute(
+        _replace().from_select(
+            _COLUMNS,
+            select(
+                recipients.c[0],
+                literal(kind),
+                literal(entity_id),
+                literal(deleted),
+                literal(datetime.utcnow()),
+            ),
+        )
+    )
+
+
+# ---------- recording ----------
+def record(db: Session, user_ids: Iterable[int], kind: str, entity_id: int, deleted: bool = False) -> None:
+    """Log a change of one entity for these users, in one statement. Does not commit."""
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "kind": kind, "entity_id": entity_id, "deleted": deleted, "created_at": now}
+        for user_id in dict.fromkeys(user_ids)
+    ]
+    if rows:
+        db.execute(_replace().values(rows))
+
+
+def post_changed(db: Session, author_id: int, post_id: int, deleted: bool = False) -> None:
+    """Log a new, edited or deleted wall post for its author and their friends. Does not commit."""
+    friends = select(user_friends.c.friend_id).where(user_friends.c.user_id == author_id)
+    _record_for(db, union_all(select(literal(author_id)), friends), POST, post_id, deleted)
+
+
+def group_changed(db: Session, group_id: int, deleted: bool = False) -> None:
+    """Log a changed or deleted group for all its members. Does not commit."""
+    members = select(GroupMembership.user_id).where(GroupMembership.group_id == group_id)
+    _record_for(db, members, GROUP, group_id, deleted)
+
+
+def friendship_changed(db: Session, a: int, b: int, deleted: bool = False) -> None:
+    """Log a new or ended friendship in both users' logs. Does not commit."""
+    record(db, [a], FRIEND, b, deleted)
+    record(db, [b], FRIEND, a, deleted)
+
+
+# ---------- compaction ----------
+def compact(db: Session, now: datetime | None = None, batch_size: int = COMPACT_BATCH) -> int:
+    """
+    Delete log rows no valid token can reach, one batch per transaction.
+    Returns the number of rows deleted.
+    """
+    cutoff = (now or datetime.utcnow()) - SYNC_RETENTION - COMPACT_SLACK
+    total = 0
+    while True:
+        ids = (
+            select(ChangeLogEntry.id)
+            .where(ChangeLogEntry.created_at < cutoff)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        deleted = db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.id.in_(ids))).rowcount
+        db.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+async def run_compactor(session_factory, interval: float = COMPACT_INTERVAL) -> None:
+    """
+    Background task: compact() every interval. Started from app
+    lifespan; the work runs in the threadpool.
+    """
+
+    def _run() -> int:
+        db = session_factory()
+        try:
+            return compact(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            removed = await run_in_threadpool(_run)
+            if removed:
+                logger.info("Compacted %s change log rows", removed)
+        except Exception:
+            logger.exception("Change log compaction failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,275 @@
+# app/services/chat.py
+
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.schemas.conversation import ConversationInboxItem, ConversationInboxPage
+from app.schemas.message import MessageRead
+
+
+def save_message(
+    db: Session,
+    convo: Conversation,
+    sender_id: int,
+    content: str,
+    client_nonce: str | None = None,
+) -> Message:
+    """
+    Persist a chat message and keep the conversation's inbox fields in sync.
+
+    In the same transaction we:
+    1. Insert the Message row.
+    2. Point conversation.last_message_id at it and bump last_activity_at.
+    3. Move the sender's read pointer (you have read what you wrote).
+       Group rooms have no per-member read pointers.
+    """
+    message = Message(
+        conversation_id=convo.id,
+        sender_id=sender_id,
+        content=content,
+        timestamp=datetime.utcnow(),
+        client_nonce=client_nonce,
+    )
+    db.add(message)
+    # Flush to get message.id without ending the transaction
+    db.flush()
+
+    convo.last_message_id = message.id
+    convo.last_activity_at = message.timestamp
+    if convo.group_id is None:
+        _set_last_read_id(convo, sender_id, message.id)
+
+    db.commit()
+    return message
+
+
+def find_message_by_nonce(
+    db: Session,
+    convo: Conversation,
+    sender_id: int,
+    client_nonce: str,
+) -> Message | None:
+    """
+    Return the message this sender already stored with client_nonce, if any.
+
+    Used to answer client retries with the original message.
+    """
+    return (
+        db.query(Message)
+        .filter(
+            Message.conversation_id == convo.id,
+            Message.sender_id == sender_id,
+            Message.client_nonce == client_nonce,
+        )
+        .first()
+    )
+
+
+def store_message_once(
+    db: Session,
+    convo: Conversation,
+    sender_id: int,
+    content: str,
+    client_nonce: str | None = None,
+) -> tuple[Message, bool]:
+    """
+    Save a message unless this sender already stored client_nonce.
+
+    Returns (message, created). created is False for a client retry; the
+    caller should ack the original message and not broadcast it again.
+
+    Two sockets (or a reconnect) can race on the same nonce: both miss the
+    lookup and one insert fails on the unique index. The loser rolls back
+    and returns the winner's row.
+    """
+    if client_nonce is not None:
+        existing = find_message_by_nonce(db, convo, sender_id, client_nonce)
+        if existing is not None:
+            return existing, False
+
+    try:
+        return save_message(db, convo, sender_id, content, client_nonce), True
+    except IntegrityError:
+        db.rollback()
+        existing = None
+        if client_nonce is not None:
+            existing = find_message_by_nonce(db, convo, sender_id, client_nonce)
+        if existing is None:
+            # The conflict was not on the nonce; nothing to recover
+            raise
+
+    return existing, False
+
+
+def get_or_create_group_room(db: Session, group_id: int) -> Conversation:
+    """
+    Return the chat room of a group, creating it on first use.
+
+    The caller checks that the group exists and the user is a member.
+    """
+    room = db.query(Conversation).filter(Conversation.group_id == group_id).first()
+    if room:
+        return room
+
+    room = Conversation(group_id=group_id)
+    db.add(room)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another member created it first (unique group_id)
+        db.rollback()
+        return db.query(Conversation).filter(Conversation.group_id == group_id).one()
+
+    db.refresh(room)
+    return room
+
+
+def mark_conversation_read(
+    db: Session,
+    convo: Conversation,
+    user_id: int,
+    message_id: int | None = None,
+) -> None:
+    """
+    Move user_id's read pointer to message_id (or to the newest message).
+
+    The pointer only moves forward, so an old client cannot "unread" a chat.
+    Group rooms have no read pointers; nothing to do.
+    """
+    if convo.last_message_id is None or convo.group_id is not None:
+        return
+
+    target = convo.last_message_id
+    if message_id is not None:
+        # Never point past the newest message of this chat
+        target = min(message_id, convo.last_message_id)
+
+    current = _get_last_read_id(convo, user_id) or 0
+    if target <= current:
+        return
+
+    _set_last_read_id(convo, user_id, target)
+    db.commit()
+
+
+def list_inbox(
+    db: Session,
+    user_id: int,
+    limit: int,
+    cursor: str | None = None,
+) -> ConversationInboxPage:
+    """
+    Return the user's conversations, newest activity first.
+
+    Everything is loaded with ONE statement:
+    - the conversation row
+    - its last message (join on the denormalized last_message_id)
+    - the unread count (correlated count over the
+      (conversation_id, id) index, starting after the read pointer)
+
+    Pagination is keyset based on (last_activity_at, id).
+    """
+
+    # Pick "my" columns depending on which side of the chat the user is on
+    is_user1 = Conversation.user1_id == user_id
+    other_user_id = case((is_user1, Conversation.user2_id), else_=Conversation.user1_id)
+    my_last_read_id = case(
+        (is_user1, Conversation.user1_last_read_id),
+        else_=Conversation.user2_last_read_id,
+    )
+
+    unread_count = (
+        select(func.count(Message.id))
+        .where(
+            Message.conversation_id == Conversation.id,
+            Message.id > func.coalesce(my_last_read_id, 0),
+            Message.sender_id != user_id,
+        )
+        .correlate(Conversation)
+        .scalar_subquery()
+    )
+
+    query = (
+        db.query(
+            Conversation,
+            other_user_id.label("other_user_id"),
+            Message,
+            unread_count.label("unread_count"),
+        )
+        .outerjoin(Message, Message.id == Conversation.last_message_id)
+        .filter(or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id))
+    )
+
+    if cursor:
+        last_activity, last_id = decode_cursor(cursor, 2)
+        try:
+            last_activity = datetime.fromisoformat(last_activity)
+        except (TypeError, ValueError):
+            last_activity = None
+
+        # bool is a subclass of int, but never a valid id
+        if last_activity is None or type(last_id) is not int:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+
+        query = query.filter(
+            or_(
+                Conversation.last_activity_at < last_activity,
+                and_(
+                    Conversation.last_activity_at == last_activity,
+                    Conversation.id < last_id,
+                ),
+            )
+        )
+
+    # Fetch one extra row to know if there is a next page
+    rows = (
+        query.order_by(Conversation.last_activity_at.desc(), Conversation.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        ConversationInboxItem(
+            id=convo.id,
+            other_user_id=other_id,
+            last_message=MessageRead.model_validate(message) if message else None,
+            unread_count=unread,
+            last_activity_at=convo.last_activity_at,
+        )
+        for convo, other_id, message, unread in rows
+    ]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1][0]
+        next_cursor = encode_cursor(last.last_activity_at.isoformat(), last.id)
+
+    return ConversationInboxPage(items=items, next_cursor=next_cursor)
+
+
+def _get_last_read_id(convo: Conversation, user_id: int) -> int | None:
+    """Return the read pointer of user_id in this conversation."""
+    if convo.user1_id == user_id:
+        return convo.user1_last_read_id
+    return convo.user2_last_read_id
+
+
+def _set_last_read_id(convo: Conversation, user_id: int, message_id: int) -> None:
+    """Update the read pointer of user_id in this conversation."""
+    if convo.user1_id == user_id:
+        convo.user1_last_read_id = message_id
+    else:
+        convo.user2_last_read_id = message_id
@@ -0,0 +1,293 @@
+# app/services/chat_connections.py
+
+"""
+In-memory registry of open chat WebSockets.
+
+Design goals (one worker holding tens of thousands of mostly idle sockets):
+- No database session is held by a connection; handlers borrow one only
+  while they read or write (see app.routers.chat).
+- No task per idle connection: outgoing frames go into a small bounded
+  queue and a writer task only runs while that queue has data.
+- One reaper task for the whole registry sends heartbeats and closes
+  structured connections that have been silent for too long. Legacy
+  text clients cannot answer pings, so they are never closed for being
+  idle; dead legacy sockets are found by uvicorn's protocol-level pings
+  (--ws-ping-interval / --ws-ping-timeout).
+- Each connection counts its traffic and queued bytes so the registry
+  can report an estimate of its memory use.
+
+The registry lives in one process. With several workers every worker has
+its own registry and only fans out to its own sockets.
+"""
+
+import asyncio
+import sys
+import time
+from collections import deque
+
+from fastapi import WebSocket
+from starlette.websockets import WebSocketState
+
+from app.services.chat_protocol import LEGACY_CODEC, FrameCodec, PROTOCOL_VERSION
+
+
+# Send a ping frame to a structured client that has been quiet this long
+HEARTBEAT_INTERVAL = 25.0
+
+# Close a structured connection that sent nothing (not even a pong) for this long
+IDLE_TIMEOUT = 75.0
+
+# Maximum frames waiting to be written to one socket. A client that cannot
+# keep up is disconnected instead of growing memory without bound.
+SEND_QUEUE_SIZE = 64
+
+# Close codes
+CLOSE_GOING_AWAY = 1001
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+class ChatConnection:
+    """
+    One open chat socket.
+
+    - codec: frame encoding negotiated at connect
+    - last_seen: monotonic time of the last frame received from the client
+    - bytes_in / bytes_out / frames_dropped: traffic accounting
+    - queued_bytes: size of the frames waiting in the send queue
+    """
+
+    __slots__ = (
+        "websocket",
+        "user_id",
+        "chat_id",
+        "codec",
+        "last_seen",
+        "last_ping",
+        "bytes_in",
+        "bytes_out",
+        "queued_bytes",
+        "_queue",
+        "_writer",
+        "_closer",
+        "_closing",
+    )
+
+    def __init__(self, websocket: WebSocket, user_id: int, chat_id: int, codec: FrameCodec):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.codec = codec
+        self.last_seen = time.monotonic()
+        self.last_ping = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.queued_bytes = 0
+        self._queue: deque[str | bytes] = deque()
+        self._writer: asyncio.Task | None = None
+        # Keep a reference so the task is not garbage collected before it runs
+        self._closer: asyncio.Task | None = None
+        self._closing = False
+
+    @property
+    def structured(self) -> bool:
+        """False for legacy plain text clients (no acks, pings or error frames)."""
+        return self.codec is not LEGACY_CODEC
+
+    def touch(self, size: int) -> None:
+        """Record a frame received from the client."""
+        self.last_seen = time.monotonic()
+        self.bytes_in += size
+
+    def enqueue(self, payload: str | bytes) -> bool:
+        """
+        Queue an already encoded frame for sending.
+
+        Never blocks. Returns False (and closes the socket) if the client is
+        too slow and its queue is full.
+        """
+        if self._closing:
+            return False
+
+        if len(self._queue) >= SEND_QUEUE_SIZE:
+            self.close(CLOSE_TRY_AGAIN_LATER)
+            return False
+
+        self._queue.append(payload)
+        self.queued_bytes += len(payload)
+
+        # Start a writer only when there is something to write
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._drain())
+        return True
+
+    def enqueue_frame(self, frame: dict) -> bool:
+        return self.enqueue(self.codec.encode(frame))
+
+    def close(self, code: int) -> None:
+        """Close the socket in the background; the handler cleans up."""
+        if self._closing:
+            return
+        self._closing = True
+        self._queue.clear()
+        self.queued_bytes = 0
+        self._closer = asyncio.create_task(self._close(code))
+
+    def memory_estimate(self) -> int:
+        """Rough bytes held for this connection by the registry (not the socket buffers)."""
+        return sys.getsizeof(self) + sys.getsizeof(self._queue) + self.queued_bytes
+
+    async def _drain(self) -> None:
+        while self._queue and not self._closing:
+            payload = self._queue.popleft()
+            self.queued_bytes -= len(payload)
+            try:
+                if self.codec.binary:
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+            except Exception:
+                # Socket is gone; the receive loop will see the disconnect
+                self._queue.clear()
+                self.queued_bytes = 0
+                return
+            self.bytes_out += len(payload)
+
+    async def _close(self, code: int) -> None:
+        if self.websocket.application_state == WebSocketState.DISCONNECTED:
+            return
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+class ConnectionRegistry:
+    """
+    All open chat connections of this process, indexed by chat and by user.
+    """
+
+    def __init__(self):
+        self._by_chat: dict[int, set[ChatConnection]] = {}
+        self._by_user: dict[int, set[ChatConnection]] = {}
+
+    def add(self, conn: ChatConnection) -> None:
+        self._by_chat.setdefault(conn.chat_id, set()).add(conn)
+        self._by_user.setdefault(conn.user_id, set()).add(conn)
+
+    def remove(self, conn: ChatConnection) -> None:
+        _discard(self._by_chat, conn.chat_id, conn)
+        _discard(self._by_user, conn.user_id, conn)
+
+    def in_chat(self, chat_id: int) -> set[ChatConnection]:
+        return self._by_chat.get(chat_id, set())
+
+    def for_user(self, user_id: int) -> set[ChatConnection]:
+        return self._by_user.get(user_id, set())
+
+    def __iter__(self):
+        for conns in list(self._by_chat.values()):
+            yield from list(conns)
+
+    def __len__(self) -> int:
+        return sum(len(conns) for conns in self._by_chat.values())
+
+    def broadcast(
+        self,
+        chat_id: int,
+        frame: dict,
+        exclude: ChatConnection | None = None,
+        structured_only: bool = False,
+    ) -> int:
+        """
+        Queue a frame for every connection in a chat except `exclude`.
+
+        The frame is encoded once per codec, not once per connection.
+        Returns how many connections accepted the frame.
+        """
+        return fan_out(self.in_chat(chat_id), frame, exclude, structured_only)
+
+    def reap(self, now: float | None = None) -> int:
+        """
+        One heartbeat pass over all connections.
+
+        Only structured clients take part: legacy clients get no pings and
+        cannot send pongs, so being quiet says nothing about them.
+
+        - idle longer than IDLE_TIMEOUT: close
+        - idle longer than HEARTBEAT_INTERVAL: send a ping
+
+        Returns the number of connections closed.
+        """
+        now = time.monotonic() if now is None else now
+        closed = 0
+        ping = {"v": PROTOCOL_VERSION, "type": "ping"}
+
+        for conn in self:
+            if not conn.structured:
+                continue
+
+            idle = now - conn.last_seen
+            if idle > IDLE_TIMEOUT:
+                conn.close(CLOSE_GOING_AWAY)
+                closed += 1
+            elif idle > HEARTBEAT_INTERVAL and now - conn.last_ping > HEARTBEAT_INTERVAL:
+                conn.last_ping = now
+                conn.enqueue_frame(ping)
+
+        return closed
+
+    async def run_reaper(self, interval: float = HEARTBEAT_INTERVAL / 2) -> None:
+        """Background task: call reap() forever. Started from app lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            self.reap()
+
+    def stats(self) -> dict:
+        """Connection counts and memory accounting for monitoring."""
+        conns = list(self)
+        return {
+            "connections": len(conns),
+            "chats": len(self._by_chat),
+            "users": len(self._by_user),
+            "queued_bytes": sum(c.queued_bytes for c in conns),
+            "bytes_in": sum(c.bytes_in for c in conns),
+            "bytes_out": sum(c.bytes_out for c in conns),
+            "memory_estimate_bytes": (
+                sum(c.memory_estimate() for c in conns)
+                + sys.getsizeof(self._by_chat)
+                + sys.getsizeof(self._by_user)
+            ),
+        }
+
+
+def fan_out(conns, frame: dict, exclude=None, structured_only: bool = False) -> int:
+    """
+    Encode `frame` once per codec and queue it on every connection in `conns`.
+
+    Shared by every push channel so they all get the same bounded queues.
+    structured_only skips legacy text clients; use it for every frame
+    that is not a chat message (legacy clients can only show messages).
+    """
+    encoded: dict[FrameCodec, str | bytes] = {}
+    delivered = 0
+
+    for conn in list(conns):
+        if conn is exclude:
+            continue
+        if structured_only and not conn.structured:
+            continue
+        if conn.codec not in encoded:
+            encoded[conn.codec] = conn.codec.encode(frame)
+        if conn.enqueue(encoded[conn.codec]):
+            delivered += 1
+
+    return delivered
+
+
+def _discard(index: dict, key: int, conn: ChatConnection) -> None:
+    conns = index.get(key)
+    if conns is None:
+        return
+    conns.discard(conn)
+    if not conns:
+        del index[key]
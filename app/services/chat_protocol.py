@@ -0,0 +1,240 @@
+# app/services/chat_protocol.py
+
+"""
+Wire format for the chat WebSocket.
+
+Version 1 frames are small dicts, for example:
+
+    client -> server  {"v": 1, "type": "message", "content": "hi", "nonce": "c-17"}
+    server -> client  {"v": 1, "type": "message", "id": 42, "chat_id": 7,
+                       "sender_id": 3, "ts": 1767225600000, "content": "hi",
+                       "nonce": "c-17"}
+    server -> sender  {"v": 1, "type": "ack", "id": 42, "ts": ..., "nonce": "c-17"}
+    server -> client  {"v": 1, "type": "error", "detail": "..."}
+    either direction  {"v": 1, "type": "ping"} / {"v": 1, "type": "pong"}
+    client -> server  {"v": 1, "type": "typing"}
+    server -> client  {"v": 1, "type": "typing", "chat_id": 7, "user_id": 3}
+    server -> client  {"v": 1, "type": "presence", "user_id": 3, "online": true, "ts": ...}
+
+- id: database id of the message (clients dedupe on it)
+- ts: message timestamp in milliseconds since the epoch (UTC)
+- nonce: optional client chosen id; resending the same nonce after a
+  dropped connection returns the original message instead of a duplicate
+
+Encoding is negotiated at connect time with the WebSocket subprotocol
+header (Sec-WebSocket-Protocol), or with ?encoding=json|msgpack:
+- "chat.v1.json":    JSON in text frames
+- "chat.v1.msgpack": MessagePack in binary frames (needs the msgpack package)
+
+Clients that negotiate nothing get the legacy text format
+"<sender_id>: <content>" so old clients keep working.
+
+Compression (permessage-deflate) is done by the server, not here:
+uvicorn enables it by default (--ws-per-message-deflate). Run
+benchmarks/chat_frames.py to compare frame sizes per encoding.
+"""
+
+import json
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, Field, ValidationError
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON always works
+    msgpack = None
+
+
+PROTOCOL_VERSION = 1
+
+JSON_SUBPROTOCOL = "chat.v1.json"
+MSGPACK_SUBPROTOCOL = "chat.v1.msgpack"
+
+
+class ChatFrameError(ValueError):
+    """Raised when an incoming frame cannot be decoded or validated."""
+
+
+class IncomingMessageFrame(BaseModel):
+    """A chat message sent by a client (protocol version 1)."""
+    v: int = PROTOCOL_VERSION
+    type: str = "message"
+    content: str = Field(min_length=1)
+    nonce: str | None = Field(default=None, max_length=64)
+
+
+class ControlFrame(BaseModel):
+    """
+    Frame without a payload:
+    - "ping" asks for a "pong", "pong" only proves liveness
+    - "typing" says the user is typing in this chat
+    """
+    v: int = PROTOCOL_VERSION
+    type: str
+
+
+# Frame types that carry no data and are never stored
+CONTROL_TYPES = {"ping", "pong", "typing"}
+
+
+class FrameCodec(ABC):
+    """
+    Encode/decode frames for one negotiated encoding.
+
+    - name: subprotocol name sent back to the client (None for legacy)
+    - binary: True if frames go out as binary WebSocket frames
+    """
+
+    name: str | None = None
+    binary: bool = False
+
+    @abstractmethod
+    def encode(self, frame: dict) -> str | bytes:
+        ...
+
+    @abstractmethod
+    def decode(self, data: str | bytes) -> dict:
+        ...
+
+
+class LegacyTextCodec(FrameCodec):
+    """Protocol version 0: plain text in, "<sender_id>: <content>" out."""
+
+    def encode(self, frame: dict) -> str:
+        return f"{frame['sender_id']}: {frame['content']}"
+
+    def decode(self, data: str | bytes) -> dict:
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", errors="replace")
+        return {"v": PROTOCOL_VERSION, "type": "message", "content": data}
+
+
+class JsonCodec(FrameCodec):
+    name = JSON_SUBPROTOCOL
+
+    def encode(self, frame: dict) -> str:
+        return json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
+
+    def decode(self, data: str | bytes) -> dict:
+        try:
+            frame = json.loads(data)
+        except ValueError as exc:
+            raise ChatFrameError("Frame is not valid JSON.") from exc
+        return _ensure_dict(frame)
+
+
+class MsgpackCodec(FrameCodec):
+    name = MSGPACK_SUBPROTOCOL
+    binary = True
+
+    def encode(self, frame: dict) -> bytes:
+        return msgpack.packb(frame, use_bin_type=True)
+
+    def decode(self, data: str | bytes) -> dict:
+        if isinstance(data, str):
+            raise ChatFrameError("MessagePack frames must be binary.")
+        try:
+            frame = msgpack.unpackb(data, raw=False)
+        except Exception as exc:  # msgpack raises several unrelated types
+            raise ChatFrameError("Frame is not valid MessagePack.") from exc
+        return _ensure_dict(frame)
+
+
+LEGACY_CODEC = LegacyTextCodec()
+
+# Supported encodings, in server preference order
+CODECS: dict[str, FrameCodec] = {JSON_SUBPROTOCOL: JsonCodec()}
+if msgpack is not None:
+    CODECS[MSGPACK_SUBPROTOCOL] = MsgpackCodec()
+
+# Short names accepted in ?encoding=...
+_ENCODING_ALIASES = {
+    "json": JSON_SUBPROTOCOL,
+    "msgpack": MSGPACK_SUBPROTOCOL,
+}
+
+
+def negotiate_codec(subprotocols: list[str], encoding: str | None = None) -> FrameCodec:
+    """
+    Pick the codec for a new connection.
+
+    1. The first subprotocol offered by the client that we support.
+    2. Otherwise the ?encoding= query parameter, if supported.
+    3. Otherwise the legacy text format.
+    """
+    for name in subprotocols:
+        if name in CODECS:
+            return CODECS[name]
+
+    if encoding:
+        name = _ENCODING_ALIASES.get(encoding.lower())
+        if name in CODECS:
+            return CODECS[name]
+
+    return LEGACY_CODEC
+
+
+def parse_incoming(codec: FrameCodec, data: str | bytes) -> IncomingMessageFrame | ControlFrame:
+    """Decode and validate a client frame. Raises ChatFrameError."""
+    frame = codec.decode(data)
+
+    if frame.get("v", PROTOCOL_VERSION) != PROTOCOL_VERSION:
+        raise ChatFrameError("Unsupported protocol version.")
+
+    frame_type = frame.get("type", "message")
+    if frame_type in CONTROL_TYPES:
+        return ControlFrame(type=frame_type)
+    if frame_type != "message":
+        raise ChatFrameError("Unsupported frame type.")
+
+    try:
+        return IncomingMessageFrame.model_validate(frame)
+    except ValidationError as exc:
+        raise ChatFrameError("Invalid message frame.") from exc
+
+
+def message_frame(message, nonce: str | None = None) -> dict:
+    """Build the frame that delivers a stored Message to clients."""
+    return {
+        "v": PROTOCOL_VERSION,
+        "type": "message",
+        "id": message.id,
+        "chat_id": message.conversation_id,
+        "sender_id": message.sender_id,
+        "ts": to_epoch_ms(message.timestamp),
+        "content": message.content,
+        "nonce": nonce,
+    }
+
+
+def ack_frame(message, nonce: str | None = None) -> dict:
+    """Build the frame that confirms a stored Message to its sender."""
+    return {
+        "v": PROTOCOL_VERSION,
+        "type": "ack",
+        "id": message.id,
+        "ts": to_epoch_ms(message.timestamp),
+        "nonce": nonce,
+    }
+
+
+def error_frame(detail: str) -> dict:
+    return {"v": PROTOCOL_VERSION, "type": "error", "detail": detail}
+
+
+def pong_frame() -> dict:
+    return {"v": PROTOCOL_VERSION, "type": "pong"}
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """Convert a naive UTC (or aware) datetime to epoch milliseconds."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _ensure_dict(frame) -> dict:
+    if not isinstance(frame, dict):
+        raise ChatFrameError("Frame must be an object.")
+    return frame
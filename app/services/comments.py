@@ -0,0 +1,322 @@
+# app/services/comments.py
+
+"""
+Threaded comments on wall posts and group posts.
+
+Every comment stores its materialized path (app.models.comment): the
+zero-padded ids from the top-level comment down to itself. With the
+(root_id, path) index:
+
+- a thread in reading order is one range scan sorted by path
+- the replies below a comment, at any depth, are the paths between
+  "<path>/" and "<path>0" ("0" sorts right after "/")
+- paging inside a thread is keyset pagination on path
+
+list_comments loads a page of top-level comments together with a
+preview of their replies (the first `replies` per parent, down to
+`depth`) in one statement: ROW_NUMBER() OVER (PARTITION BY parent_id)
+ranks the replies of each parent.
+
+Counts are counters (app.services.counters), bumped in the same
+transaction as the comment: COMMENT_REPLIES per comment (direct
+replies) and POST_COMMENTS / GROUP_POST_COMMENTS per post (everything).
+"""
+
+from collections import Counter as Tally
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session, aliased
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.comment import Comment
+from app.models.counter import Counter
+from app.models.group import GroupPost
+from app.models.posts import Post
+from app.schemas.comment import CommentOut, CommentPage
+from app.services.counters import (
+    COMMENT_REPLIES,
+    GROUP_POST_COMMENTS,
+    POST_COMMENTS,
+    bump,
+    bump_many,
+    counter_column,
+    counter_value,
+)
+
+
+# Digits per path segment: ids up to 10^10 keep sorting as numbers
+PATH_WIDTH = 10
+PATH_SEPARATOR = "/"
+
+# Deepest level (0 = top-level). A reply to a comment at this depth
+# becomes a sibling of that comment instead.
+MAX_COMMENT_DEPTH = 7
+
+# Reply preview of list_comments: replies per parent, levels below top
+DEFAULT_PREVIEW_REPLIES = 3
+MAX_PREVIEW_REPLIES = 10
+DEFAULT_PREVIEW_DEPTH = 2
+
+# Item kinds, as in FeedItem.kind
+POST, GROUP_POST = "post", "group_post"
+_COUNTERS = {POST: POST_COMMENTS, GROUP_POST: GROUP_POST_COMMENTS}
+_COLUMNS = {POST: Comment.post_id, GROUP_POST: Comment.group_post_id}
+
+
+def _item_kind(post: Post | GroupPost) -> str:
+    return GROUP_POST if isinstance(post, GroupPost) else POST
+
+
+def _segment(comment_id: int) -> str:
+    return f"{comment_id:0{PATH_WIDTH}d}"
+
+
+def _subtree_bounds(path: str) -> tuple[str, str]:
+    """(low, high): every path strictly between them is below `path`."""
+    return path + PATH_SEPARATOR, path + chr(ord(PATH_SEPARATOR) + 1)
+
+
+def _get_comment(db: Session, post: Post | GroupPost, comment_id: int) -> Comment:
+    """A comment of this post, or 404."""
+    comment = db.get(Comment, comment_id)
+    if comment is None or getattr(comment, _COLUMNS[_item_kind(post)].key) != post.id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    return comment
+
+
+# ---------- writing ----------
+def add_comment(
+    db: Session,
+    user_id: int,
+    post: Post | GroupPost,
+    content: str,
+    parent_id: int | None = None,
+) -> CommentOut:
+    """Comment on a post, or reply to one of its comments, and commit."""
+    item_kind = _item_kind(post)
+
+    # 1) The parent must be on the same post; below the deepest level
+    #    the reply goes next to its parent
+    parent = _get_comment(db, post, parent_id) if parent_id is not None else None
+    if parent is not None and parent.depth >= MAX_COMMENT_DEPTH:
+        parent = db.get(Comment, parent.parent_id)
+
+    comment = Comment(
+        user_id=user_id,
+        content=content,
+        group_id=getattr(post, "group_id", None),
+        parent_id=parent.id if parent else None,
+        depth=parent.depth + 1 if parent else 0,
+    )
+    setattr(comment, _COLUMNS[item_kind].key, post.id)
+    db.add(comment)
+
+    # 2) Root and path contain the new id
+    db.flush()
+    if parent is None:
+        comment.root_id = comment.id
+        comment.path = _segment(comment.id)
+    else:
+        comment.root_id = parent.root_id
+        comment.path = parent.path + PATH_SEPARATOR + _segment(comment.id)
+
+    # 3) Counters, in the same transaction
+    bump(db, _COUNTERS[item_kind], post.id)
+    if parent is not None:
+        bump(db, COMMENT_REPLIES, parent.id)
+    db.commit()
+    db.refresh(comment)
+    return comment_out(comment, reply_count=0)
+
+
+def delete_comment(db: Session, user_id: int, post: Post | GroupPost, comment_id: int) -> None:
+    """Delete your comment with all replies below it, and commit."""
+    comment = _get_comment(db, post, comment_id)
+    if comment.user_id != user_id:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Not allowed to delete this comment")
+    delete_comments(db, subtree(comment))
+    db.commit()
+
+
+def subtree(comment: Comment):
+    """Condition for a comment and every reply below it."""
+    low, high = _subtree_bounds(comment.path)
+    return (Comment.root_id == comment.root_id) & (
+        (Comment.id == comment.id) | ((Comment.path > low) & (Comment.path < high))
+    )
+
+
+def delete_comments(db: Session, condition, limit: int | None = None) -> int:
+    """
+    Delete comments matching condition (up to limit, deepest first, so a
+    partly deleted thread never loses a comment above its replies).
+
+    Keeps the counters right: the parents' reply counts and the posts'
+    comment counts drop, the deleted comments' own reply counters go.
+    Does not commit; returns the count.
+    """
+    query = (
+        select(Comment.id, Comment.parent_id, Comment.post_id, Comment.group_post_id)
+        .where(condition)
+        .order_by(Comment.depth.desc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+
+    ids = [row.id for row in rows]
+    db.execute(delete(Comment).where(Comment.id.in_(ids)))
+    db.execute(delete(Counter).where(Counter.name == COMMENT_REPLIES, Counter.entity_id.in_(ids)))
+
+    deleted = set(ids)
+    replies = Tally(row.parent_id for row in rows if row.parent_id is not None and row.parent_id not in deleted)
+    bump_many(db, COMMENT_REPLIES, {parent_id: -count for parent_id, count in replies.items()})
+    wall = Tally(row.post_id for row in rows if row.post_id is not None)
+    bump_many(db, POST_COMMENTS, {post_id: -count for post_id, count in wall.items()})
+    group = Tally(row.group_post_id for row in rows if row.group_post_id is not None)
+    bump_many(db, GROUP_POST_COMMENTS, {post_id: -count for post_id, count in group.items()})
+    return len(rows)
+
+
+def delete_post_comments(db: Session, post_id: int) -> None:
+    """Comments and comment counter of a deleted wall post. Does not commit."""
+    delete_comments(db, Comment.post_id == post_id)
+    db.execute(delete(Counter).where(Counter.name == POST_COMMENTS, Counter.entity_id == post_id))
+
+
+# ---------- reading ----------
+def list_comments(
+    db: Session,
+    post: Post | GroupPost,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    replies: int = DEFAULT_PREVIEW_REPLIES,
+    depth: int = DEFAULT_PREVIEW_DEPTH,
+) -> CommentPage:
+    """
+    One page of top-level comments (oldest first), each followed by a
+    preview of its thread: the first `replies` replies of every comment,
+    down to `depth` levels below the top.
+
+    One statement: the page's roots (keyset on id), their threads over
+    ix_comments_root_path with ROW_NUMBER() per parent, and every
+    comment's reply counter.
+    """
+    item_kind = _item_kind(post)
+    after = _decode_id_cursor(cursor) if cursor else None
+
+    # 1) The page's top-level comments, plus one to know if there is more
+    roots = select(Comment.id).where(_COLUMNS[item_kind] == post.id, Comment.parent_id.is_(None))
+    if after is not None:
+        roots = roots.where(Comment.id > after)
+    roots = roots.order_by(Comment.id).limit(limit + 1)
+
+    # 2) Their threads down to `depth`, replies ranked per parent
+    ranked = (
+        select(
+            Comment,
+            func.row_number()
+            .over(partition_by=Comment.parent_id, order_by=Comment.id)
+            .label("rank"),
+        )
+        .where(Comment.root_id.in_(roots), Comment.depth <= depth)
+        .subquery()
+    )
+    comment = aliased(Comment, ranked)
+    rows = db.execute(
+        select(comment, counter_column(COMMENT_REPLIES, ranked.c.id))
+        .where(or_(ranked.c.depth == 0, ranked.c.rank <= replies))
+        .order_by(ranked.c.path)
+    ).all()
+
+    # 3) A reply is shown only if its parent is (thread order: parents first)
+    items: list[CommentOut] = []
+    shown: set[int] = set()
+    for row, reply_count in rows:
+        if row.parent_id is None or row.parent_id in shown:
+            shown.add(row.id)
+            items.append(comment_out(row, reply_count))
+
+    # 4) The extra root and its thread come last
+    root_ids = [item.id for item in items if item.parent_id is None]
+    has_more = len(root_ids) > limit
+    next_cursor = None
+    if has_more:
+        extra = root_ids[limit]
+        cut = next(i for i, item in enumerate(items) if item.id == extra)
+        items = items[:cut]
+        next_cursor = encode_cursor(root_ids[limit - 1])
+
+    return CommentPage(
+        items=items,
+        next_cursor=next_cursor,
+        comment_count=counter_value(db, _COUNTERS[item_kind], post.id),
+    )
+
+
+def list_replies(
+    db: Session,
+    post: Post | GroupPost,
+    comment_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+) -> CommentPage:
+    """
+    Every reply below one comment, at any depth, in thread order.
+
+    One range scan of ix_comments_root_path; keyset pagination on path.
+    """
+    item_kind = _item_kind(post)
+    parent = _get_comment(db, post, comment_id)
+    low, high = _subtree_bounds(parent.path)
+    if cursor:
+        (after,) = decode_cursor(cursor, 1)
+        if type(after) is not str or not low < after < high:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+        low = after
+
+    rows = db.execute(
+        select(Comment, counter_column(COMMENT_REPLIES, Comment.id))
+        .where(Comment.root_id == parent.root_id, Comment.path > low, Comment.path < high)
+        .order_by(Comment.path)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return CommentPage(
+        items=[comment_out(row, reply_count) for row, reply_count in rows],
+        next_cursor=encode_cursor(rows[-1][0].path) if has_more else None,
+        comment_count=counter_value(db, _COUNTERS[item_kind], post.id),
+    )
+
+
+def _decode_id_cursor(cursor: str) -> int:
+    (after,) = decode_cursor(cursor, 1)
+    # bool is a subclass of int, but never a valid id
+    if type(after) is not int:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+    return after
+
+
+def comment_out(row: Comment, reply_count: int) -> CommentOut:
+    return CommentOut(
+        id=row.id,
+        post_id=row.post_id,
+        group_post_id=row.group_post_id,
+        parent_id=row.parent_id,
+        user_id=row.user_id,
+        content=row.content,
+        created_at=row.created_at,
+        depth=row.depth,
+        reply_count=reply_count,
+    )
@@ -0,0 +1,298 @@
+# app/services/counters.py
+
+"""
+Denormalized counters (app.models.counter.Counter).
+
+Write paths call bump() before their commit, so a counter changes in the
+same transaction as the rows it counts: if the transaction rolls back,
+so does the count. Read paths use counter_column() or counter_value()
+instead of COUNT(*).
+
+Hot counters (posts of a busy group, members of a large group) are
+sharded: each bump goes to a random one of SHARDS[name] rows, so
+concurrent writers rarely update the same row. Reads sum the shards.
+On SQLite the whole database has a single writer, so sharding only
+starts to pay off on a server database with row locks; the layout is
+the same either way.
+
+reconcile() recomputes counters from the source tables and repairs
+drift (rows written before counters existed, manual SQL, bugs).
+The app runs it at startup and then every RECONCILE_INTERVAL. Counters
+written behind (register_write_behind) are expected to lag the rows by
+their deltas still in memory, and are repaired to exactly that.
+"""
+
+import asyncio
+import json
+import logging
+import random
+from typing import Callable
+
+from sqlalchemy import Integer, cast, delete, func, insert as sql_insert, literal, select, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.comment import Comment
+from app.models.counter import Counter
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.notification import Notification
+from app.models.posts import Post
+from app.models.reaction import Reaction
+from app.models.user import user_friends
+
+logger = logging.getLogger(__name__)
+
+
+# Counter names
+GROUP_MEMBERS = "group_members"      # per group
+GROUP_POSTS = "group_posts"          # per group
+USER_POSTS = "user_posts"            # per user (wall posts)
+USER_FRIENDS = "user_friends"        # per user
+PENDING_REQUESTS = "pending_requests"  # per user: incoming friend requests
+UNREAD_NOTIFICATIONS = "unread_notifications"  # per user
+POST_REACTIONS = "post_reactions"    # per wall post (written behind)
+GROUP_POST_REACTIONS = "group_post_reactions"  # per group post (written behind)
+POST_COMMENTS = "post_comments"      # per wall post: all comments and replies
+GROUP_POST_COMMENTS = "group_post_comments"  # per group post: the same
+COMMENT_REPLIES = "comment_replies"  # per comment: direct replies
+
+# Shard rows per counter; names not listed use one row
+SHARDS = {
+    GROUP_MEMBERS: 4,
+    GROUP_POSTS: 8,
+}
+
+# Seconds between two reconcile runs
+RECONCILE_INTERVAL = 3600.0
+
+# Entities repaired per DELETE/INSERT statement (and read per query by
+# counter_values)
+RECONCILE_CHUNK = 500
+
+
+# Counter name -> unwritten(name): {entity_id: delta} buffered in memory
+# and not in the counters table yet
+_WRITE_BEHIND: dict[str, Callable[[str], dict[int, int]]] = {}
+
+
+def register_write_behind(names, unwritten: Callable[[str], dict[int, int]]) -> None:
+    """
+    Declare counters whose deltas are buffered and written later (see
+    app.services.reactions). reconcile() then repairs them to the truth
+    minus unwritten(name), so the next write of those deltas neither
+    double-counts nor gets lost.
+    """
+    for name in names:
+        _WRITE_BEHIND[name] = unwritten
+
+
+def bump(db: Session, name: str, entity_id: int, delta: int = 1) -> None:
+    """
+    Add delta to a counter, creating its shard row on first use (upsert).
+
+    Does not commit; the caller's transaction does.
+    """
+    shard = random.randrange(SHARDS.get(name, 1))
+    stmt = insert(Counter).values(name=name, entity_id=entity_id, shard=shard, value=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Counter.name, Counter.entity_id, Counter.shard],
+        set_={"value": Counter.value + stmt.excluded.value},
+    )
+    db.execute(stmt)
+
+
+def bump_many(db: Session, name: str, deltas: dict[int, int]) -> None:
+    """
+    bump() for many entities of one counter: {entity_id: delta}, sent as
+    one executemany of the same upsert. Does not commit.
+    """
+    if not deltas:
+        return
+    shards = SHARDS.get(name, 1)
+    stmt = insert(Counter)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Counter.name, Counter.entity_id, Counter.shard],
+        set_={"value": Counter.value + stmt.excluded.value},
+    )
+    db.execute(
+        stmt,
+        [
+            {"name": name, "entity_id": entity_id, "shard": random.randrange(shards), "value": delta}
+            for entity_id, delta in deltas.items()
+        ],
+    )
+
+
+def counter_value(db: Session, name: str, entity_id: int) -> int:
+    """Current value of one counter (0 if it was never bumped)."""
+    value = db.execute(
+        select(func.sum(Counter.value)).where(
+            Counter.name == name, Counter.entity_id == entity_id
+        )
+    ).scalar()
+    return value or 0
+
+
+def counter_values(db: Session, name: str, entity_ids) -> dict[int, int]:
+    """
+    counter_value() for many entities: {entity_id: value}, 0 if never
+    bumped. One query per RECONCILE_CHUNK ids.
+    """
+    entity_ids = list(entity_ids)
+    values = dict.fromkeys(entity_ids, 0)
+    for start in range(0, len(entity_ids), RECONCILE_CHUNK):
+        chunk = entity_ids[start:start + RECONCILE_CHUNK]
+        values.update(
+            db.execute(
+                select(Counter.entity_id, func.sum(Counter.value))
+                .where(Counter.name == name, Counter.entity_id.in_(chunk))
+                .group_by(Counter.entity_id)
+            ).all()
+        )
+    return values
+
+
+def counter_column(name: str, entity_id_column):
+    """
+    Correlated scalar subquery with the counter of each row's entity,
+    for use in a select list, e.g. counter_column(GROUP_POSTS, Group.id).
+    """
+    return (
+        select(func.coalesce(func.sum(Counter.value), 0))
+        .where(Counter.name == name, Counter.entity_id == entity_id_column)
+        .scalar_subquery()
+    )
+
+
+def _true_counts():
+    """(entity_id, COUNT(*)) statement per counter name, from the source tables."""
+    return {
+        GROUP_MEMBERS: select(GroupMembership.group_id, func.count()).group_by(
+            GroupMembership.group_id
+        ),
+        GROUP_POSTS: select(GroupPost.group_id, func.count()).group_by(GroupPost.group_id),
+        USER_POSTS: select(Post.user_id, func.count()).group_by(Post.user_id),
+        USER_FRIENDS: select(user_friends.c.user_id, func.count()).group_by(
+            user_friends.c.user_id
+        ),
+        PENDING_REQUESTS: select(FriendRequest.to_user_id, func.count())
+        .where(FriendRequest.status == RequestStatus.pending)
+        .group_by(FriendRequest.to_user_id),
+        UNREAD_NOTIFICATIONS: select(Notification.user_id, func.count())
+        .where(Notification.read_at.is_(None))
+        .group_by(Notification.user_id),
+        POST_REACTIONS: select(Reaction.post_id, func.count())
+        .where(Reaction.post_id.is_not(None))
+        .group_by(Reaction.post_id),
+        GROUP_POST_REACTIONS: select(Reaction.group_post_id, func.count())
+        .where(Reaction.group_post_id.is_not(None))
+        .group_by(Reaction.group_post_id),
+        POST_COMMENTS: select(Comment.post_id, func.count())
+        .where(Comment.post_id.is_not(None))
+        .group_by(Comment.post_id),
+        GROUP_POST_COMMENTS: select(Comment.group_post_id, func.count())
+        .where(Comment.group_post_id.is_not(None))
+        .group_by(Comment.group_post_id),
+        COMMENT_REPLIES: select(Comment.parent_id, func.count())
+        .where(Comment.parent_id.is_not(None))
+        .group_by(Comment.parent_id),
+    }
+
+
+def _drift(db: Session, name: str, true_stmt) -> list[tuple[int, int]]:
+    """
+    (entity_id, expected value) of every entity whose stored counter is
+    wrong, compared in SQL: only those rows come back.
+
+    One GROUP BY over three streams of (entity_id, expected, stored):
+    the true counts, the counter shards, and for write-behind counters
+    the deltas still in memory (one JSON parameter, read with json_each),
+    which the table is expected to lack.
+    """
+    truth = true_stmt.subquery()
+    parts = [
+        select(truth.c[0].label("entity_id"), truth.c[1].label("expected"), literal(0).label("stored")),
+        select(Counter.entity_id, literal(0), Counter.value).where(Counter.name == name),
+    ]
+    unwritten = _WRITE_BEHIND[name](name) if name in _WRITE_BEHIND else {}
+    if unwritten:
+        deltas = func.json_each(json.dumps(unwritten)).table_valued("key", "value")
+        parts.append(select(cast(deltas.c.key, Integer), -deltas.c.value, literal(0)))
+
+    rows = union_all(*parts).subquery()
+    expected = func.sum(rows.c.expected)
+    return db.execute(
+        select(rows.c.entity_id, expected)
+        .group_by(rows.c.entity_id)
+        .having(expected != func.sum(rows.c.stored))
+    ).all()
+
+
+def reconcile(db: Session, names=None) -> dict[str, int]:
+    """
+    Recompute counters from the source tables and fix the ones that drifted.
+
+    The comparison runs in SQL (_drift), so memory follows the number of
+    drifted counters, not of counted entities. A drifted counter is
+    collapsed into a single shard 0 row with the true value; each chunk
+    of RECONCILE_CHUNK repairs commits on its own.
+    Returns {counter name: number of repaired entities}.
+
+    A write that commits while this runs can be counted twice or not at
+    all; the next run repairs it.
+    """
+    repaired = {}
+
+    for name, true_stmt in _true_counts().items():
+        if names is not None and name not in names:
+            continue
+
+        wrong = _drift(db, name, true_stmt)
+        # Chunked: SQLite limits the number of bound parameters
+        for start in range(0, len(wrong), RECONCILE_CHUNK):
+            chunk = wrong[start:start + RECONCILE_CHUNK]
+            db.execute(
+                delete(Counter).where(
+                    Counter.name == name,
+                    Counter.entity_id.in_([entity_id for entity_id, _ in chunk]),
+                )
+            )
+            fixed = [
+                {"name": name, "entity_id": entity_id, "shard": 0, "value": value}
+                for entity_id, value in chunk
+                if value
+            ]
+            if fixed:
+                db.execute(sql_insert(Counter), fixed)
+            db.commit()
+
+        repaired[name] = len(wrong)
+
+    db.commit()
+    return repaired
+
+
+async def run_reconciler(session_factory, interval: float = RECONCILE_INTERVAL) -> None:
+    """
+    Background task: reconcile() at startup and then every interval.
+    Started from app lifespan; the work runs in the threadpool.
+    """
+
+    def _run() -> dict[str, int]:
+        db = session_factory()
+        try:
+            return reconcile(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            repaired = await run_in_threadpool(_run)
+            if any(repaired.values()):
+                logger.warning("Repaired drifted counters: %s", repaired)
+        except Exception:
+            logger.exception("Counter reconcile failed")
+        await asyncio.sleep(interval)
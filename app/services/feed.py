@@ -0,0 +1,313 @@
+# app/services/feed.py
+
+"""
+The home feed: the user's and their friends' posts, optionally merged
+with posts from every group they are a member of.
+
+Group posts reach a feed in one of two ways, decided per post when it
+is created (deliver_group_post):
+
+- push: in a group with at most PUSH_MAX_MEMBERS members the post is
+  copied into every member's timeline (timeline_entries) with one
+  INSERT ... SELECT. Reading is then one index range per user.
+- pull: posts of larger groups are not copied (a post would cost one row
+  per member). home_feed reads the newest of them from each of the
+  user's groups at read time, over the ix_group_posts_feed_pull index.
+
+GroupPost.fanned_out records which way a post went, so a group that grows
+or shrinks past the limit never shows a post twice or loses one.
+
+A pushed post only reaches the members of its day, so a new member gets
+the group's newest JOIN_BACKFILL pushed posts copied into their timeline
+on join (backfill_timeline); pulled posts are read per membership anyway.
+
+home_feed reads each source as an already sorted stream of keys, merges
+them with heapq.merge (k-way merge, newest first), and loads only the
+rows of the final page.
+
+Users the reader blocked or muted, or who blocked them, are left out in
+every source's SQL (app.services.blocks.visible), so pages stay full.
+"""
+
+import heapq
+from collections import defaultdict
+from datetime import datetime
+from itertools import islice
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, and_, exists, insert, literal, or_, select, true
+from sqlalchemy.orm import Session, aliased
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.timeline import TimelineEntry
+from app.models.user import user_friends
+from app.schemas.feed import FeedItem, HomeFeedPage
+from app.services.blocks import HiddenSet, hidden_set, visible
+from app.services.counters import GROUP_MEMBERS, counter_value
+
+
+# Groups up to this size push new posts into members' timelines
+PUSH_MAX_MEMBERS = 500
+
+# Newest pushed posts of a group copied into a new member's timeline
+JOIN_BACKFILL = 50
+
+# Sort order of the two kinds at the same created_at (part of the cursor)
+POST, GROUP_POST = 0, 1
+_KIND_NAMES = {POST: "post", GROUP_POST: "group_post"}
+
+
+def deliver_group_post(db: Session, post: GroupPost) -> None:
+    """
+    Push a new group post into its members' timelines if the group is
+    small, otherwise leave it to be pulled. Does not commit.
+    """
+    if counter_value(db, GROUP_MEMBERS, post.group_id) > PUSH_MAX_MEMBERS:
+        post.fanned_out = False
+        return
+
+    post.fanned_out = True
+    # Needs the post id and created_at
+    db.flush()
+    db.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "group_post_id", "group_id", "created_at"],
+            select(
+                GroupMembership.user_id,
+                literal(post.id),
+                literal(post.group_id),
+                literal(post.created_at, DateTime),
+            ).where(GroupMembership.group_id == post.group_id),
+        )
+    )
+
+
+def backfill_timeline(db: Session, group_id: int, user_ids) -> None:
+    """
+    Copy the group's newest JOIN_BACKFILL pushed posts into the timelines
+    of these new members, in one INSERT ... SELECT. Posts already there
+    (a member who left and came back) are skipped. Does not commit.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    # Newest first over ix_group_posts_feed_pull
+    newest = (
+        select(GroupPost.id, GroupPost.created_at)
+        .where(GroupPost.group_id == group_id, GroupPost.fanned_out.is_(True))
+        .order_by(GroupPost.created_at.desc(), GroupPost.id.desc())
+        .limit(JOIN_BACKFILL)
+        .subquery()
+    )
+    # The memberships must be in the database for the SELECT to see them
+    db.flush()
+    db.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "group_post_id", "group_id", "created_at"],
+            select(GroupMembership.user_id, newest.c.id, literal(group_id), newest.c.created_at)
+            .join(newest, true())
+            .where(
+                GroupMembership.group_id == group_id,
+                GroupMembership.user_id.in_(user_ids),
+                ~exists().where(
+                    TimelineEntry.user_id == GroupMembership.user_id,
+                    TimelineEntry.group_post_id == newest.c.id,
+                ),
+            ),
+        )
+    )
+
+
+def home_feed(
+    db: Session,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    include_groups: bool = False,
+) -> HomeFeedPage:
+    """
+    One page of the home feed, newest first.
+
+    Keyset pagination on (created_at, kind, id): wall posts and group
+    posts have separate id sequences, kind keeps the order total.
+    """
+
+    # 1) Where the previous page stopped, and whose posts to leave out
+    before = _decode_feed_cursor(cursor) if cursor else None
+    hidden = hidden_set(db, user_id)
+
+    # 2) Every source returns at most limit + 1 keys, newest first
+    size = limit + 1
+    streams = [_wall_keys(db, user_id, hidden, before, size)]
+    if include_groups:
+        streams.append(_pushed_keys(db, user_id, hidden, before, size))
+        streams.extend(_pulled_keys(db, user_id, hidden, before, size))
+
+    # 3) k-way merge of the sorted streams; stop after one extra key
+    keys = list(islice(heapq.merge(*streams, reverse=True), size))
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    # 4) Load only the rows of this page (at most one query per kind)
+    items = _load_items(db, keys)
+
+    next_cursor = None
+    if has_more:
+        created_at, kind, last_id = keys[-1]
+        next_cursor = encode_cursor(created_at.isoformat(), kind, last_id)
+
+    return HomeFeedPage(items=items, next_cursor=next_cursor)
+
+
+def _decode_feed_cursor(cursor: str) -> tuple[datetime, int, int]:
+    created_at, kind, last_id = decode_cursor(cursor, 3)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        created_at = None
+
+    # bool is a subclass of int, but never a valid kind or id
+    if created_at is None or kind not in _KIND_NAMES or type(kind) is not int or type(last_id) is not int:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+    return created_at, kind, last_id
+
+
+def _older_than(created_col, id_col, kind: int, before):
+    """SQL for "(created_at, kind, id) < before" with kind fixed per source."""
+    if before is None:
+        return true()
+    created_at, before_kind, before_id = before
+    if kind < before_kind:
+        return created_col <= created_at
+    if kind > before_kind:
+        return created_col < created_at
+    # The extra "<=" lets SQLite seek the index instead of filtering the OR
+    return and_(
+        created_col <= created_at,
+        or_(created_col < created_at, and_(created_col == created_at, id_col < before_id)),
+    )
+
+
+def _wall_keys(db: Session, user_id: int, hidden: HiddenSet, before, size: int) -> list[tuple]:
+    """
+    The user's own posts and their friends' posts. Hidden users are taken
+    out of the friend list (one probe per friend, not per post).
+    """
+    friend_ids = select(user_friends.c.friend_id).where(
+        user_friends.c.user_id == user_id,
+        visible(user_friends.c.friend_id, hidden),
+    )
+    rows = db.execute(
+        select(Post.created_at, Post.id)
+        .where(
+            or_(Post.user_id == user_id, Post.user_id.in_(friend_ids)),
+            _older_than(Post.created_at, Post.id, POST, before),
+        )
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(size)
+    ).all()
+    return [(created_at, POST, post_id) for created_at, post_id in rows]
+
+
+def _pushed_keys(db: Session, user_id: int, hidden: HiddenSet, before, size: int) -> list[tuple]:
+    """
+    Posts pushed into the user's timeline. Joining the membership drops
+    entries of groups the user left; deleted groups are skipped too.
+    Entries do not copy the author: with hidden users the posts are
+    joined by primary key to filter them.
+    """
+    query = select(TimelineEntry.created_at, TimelineEntry.group_post_id)
+    if hidden.hidden:
+        query = query.join(GroupPost, GroupPost.id == TimelineEntry.group_post_id).where(
+            visible(GroupPost.user_id, hidden)
+        )
+    rows = db.execute(
+        query
+        .join(
+            GroupMembership,
+            and_(
+                GroupMembership.group_id == TimelineEntry.group_id,
+                GroupMembership.user_id == user_id,
+            ),
+        )
+        .join(Group, Group.id == TimelineEntry.group_id)
+        .where(
+            TimelineEntry.user_id == user_id,
+            Group.deleted_at.is_(None),
+            _older_than(TimelineEntry.created_at, TimelineEntry.group_post_id, GROUP_POST, before),
+        )
+        .order_by(TimelineEntry.created_at.desc(), TimelineEntry.group_post_id.desc())
+        .limit(size)
+    ).all()
+    return [(created_at, GROUP_POST, post_id) for created_at, post_id in rows]
+
+
+def _pulled_keys(db: Session, user_id: int, hidden: HiddenSet, before, size: int) -> list[list[tuple]]:
+    """
+    The newest posts that were not pushed, from each of the user's groups:
+    one sorted stream per group.
+
+    One statement of a fixed shape, whatever the number of groups: for
+    every membership row a correlated subquery takes the group's newest
+    ids (a LIMIT-ed range on ix_group_posts_feed_pull), and the posts are
+    then looked up by primary key.
+    """
+    recent = aliased(GroupPost)
+    newest_ids = (
+        select(recent.id)
+        .where(
+            recent.group_id == GroupMembership.group_id,
+            recent.fanned_out.is_(False),
+            visible(recent.user_id, hidden),
+            _older_than(recent.created_at, recent.id, GROUP_POST, before),
+        )
+        .order_by(recent.created_at.desc(), recent.id.desc())
+        .limit(size)
+        .correlate(GroupMembership)
+    )
+    rows = db.execute(
+        select(GroupPost.group_id, GroupPost.created_at, GroupPost.id)
+        .select_from(GroupMembership)
+        .join(Group, Group.id == GroupMembership.group_id)
+        .join(GroupPost, GroupPost.id.in_(newest_ids))
+        .where(GroupMembership.user_id == user_id, Group.deleted_at.is_(None))
+    ).all()
+
+    streams = defaultdict(list)
+    for row in rows:
+        streams[row.group_id].append((row.created_at, GROUP_POST, row.id))
+    return [sorted(stream, reverse=True) for stream in streams.values()]
+
+
+def _load_items(db: Session, keys: list[tuple]) -> list[FeedItem]:
+    post_ids = [key_id for _, kind, key_id in keys if kind == POST]
+    group_post_ids = [key_id for _, kind, key_id in keys if kind == GROUP_POST]
+
+    rows = {}
+    if post_ids:
+        for post in db.query(Post).filter(Post.id.in_(post_ids)):
+            rows[POST, post.id] = post
+    if group_post_ids:
+        for post in db.query(GroupPost).filter(GroupPost.id.in_(group_post_ids)):
+            rows[GROUP_POST, post.id] = post
+
+    items = []
+    for _, kind, key_id in keys:
+        row = rows[kind, key_id]
+        items.append(
+            FeedItem(
+                kind=_KIND_NAMES[kind],
+                id=row.id,
+                user_id=row.user_id,
+                group_id=getattr(row, "group_id", None),
+                content=row.content,
+                created_at=row.created_at,
+            )
+        )
+    return items
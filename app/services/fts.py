@@ -0,0 +1,55 @@
+# app/services/fts.py
+
+"""
+Helpers for SQLite FTS5 searches (groups, users, GET /search).
+"""
+
+from fastapi import HTTPException, status
+
+# SQLite's built-in lower() folds A-Z only
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+_MAX_CODE_POINT = 0x10FFFF
+_SURROGATES = range(0xD800, 0xE000)
+
+
+def fts_prefix_query(text: str) -> str | None:
+    """
+    Turn user input into a safe FTS5 query: every word is quoted (so
+    operators and punctuation are plain text) and the last word matches
+    as a prefix, for search-as-you-type. None if there are no words.
+    """
+    words = [w.replace('"', '""') for w in text.split()]
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def ascii_lower(text: str) -> str:
+    """
+    Lowercase text the way SQLite's lower() does (ASCII letters only), so
+    it compares with a lower(column) index key: "Étu" stays "Étu".
+    """
+    return text.translate(_ASCII_LOWER)
+
+
+def prefix_bounds(prefix: str) -> tuple[str, str]:
+    """
+    (low, high) such that every string starting with prefix sorts in
+    [low, high): lets an index answer a prefix filter as a range scan.
+    Trailing U+10FFFF have no successor and are dropped; 400 if nothing
+    is left to increment.
+    """
+    head = prefix.rstrip(chr(_MAX_CODE_POINT))
+    if not head:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid prefix.",
+        )
+    successor = ord(head[-1]) + 1
+    if successor in _SURROGATES:
+        # Not storable text; the next code point that is
+        successor = _SURROGATES.stop
+    return prefix, head[:-1] + chr(successor)
@@ -1,16 +1,36 @@
 # app/services/group.py
 
 from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, false, func, literal, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import Session
 from typing import List
 from sqlalchemy.exc import IntegrityError
 
-from app.models.group import Group, GroupPost 
+from app.models.group import Group, GroupPost, groups_fts
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 from app.models.user import User
-from app.schemas.group import GroupMemberRead, GroupUpdate, GroupPostCreate    
+from app.schemas.group import (
+    GroupDirectoryItem,
+    GroupDirectoryPage,
+    GroupMemberBulkResult,
+    GroupMemberRead,
+    GroupMembersBulkResponse,
+    GroupUpdate,
+    GroupPostCreate,
+)
 from app.models.group_membership import GroupMembership
 
-from app.services.group_helpers import get_group_or_404, is_member, is_user_admin_in_group
+from app.services.group_helpers import forget_group_access, get_group_with_role
+from app.services.membership_cache import group_members
+from app.services.change_log import GROUP, group_changed, record
+from app.services.counters import GROUP_MEMBERS, GROUP_POSTS, bump, counter_column
+from app.services.purge import mark_group_deleted
+from app.services.feed import backfill_timeline, deliver_group_post
+from app.services.fts import ascii_lower, fts_prefix_query, prefix_bounds
+from app.services.group_stream import drop_subscribers, publish_group_post
+from app.services.notifications import notify_group_join
+from app.services.tags import index_post_tags
 
 
 
@@ -47,6 +67,94 @@ from app.services.group_helpers import get_group_or_404, is_member, is_user_admi
 #     return db_group
 
 
+def list_group_directory(
+    db: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    prefix: str | None = None,
+    q: str | None = None,
+) -> GroupDirectoryPage:
+    """
+    One page of the group directory with member and post counts.
+
+    - Default: all groups by name (case-insensitive), keyset on
+      (lower(name), id) over the ix_groups_name_lower index
+    - prefix: only names starting with prefix, as a range scan on the
+      same index (no LIKE, no full scan)
+    - q: full-text search over name and description (groups_fts),
+      best matches first, keyset on (rank, id)
+
+    Counts come from the counters table, never from COUNT(*).
+    """
+
+    if prefix and q:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either prefix or q, not both.",
+        )
+
+    member_count = counter_column(GROUP_MEMBERS, Group.id)
+    post_count = counter_column(GROUP_POSTS, Group.id)
+
+    if q:
+        match = fts_prefix_query(q)
+        if match is None:
+            return GroupDirectoryPage(items=[])
+        sort_key = groups_fts.c.rank
+        query = (
+            db.query(Group, member_count, post_count, sort_key)
+            .join(groups_fts, groups_fts.c.rowid == Group.id)
+            .filter(groups_fts.c.groups_fts.op("MATCH")(match))
+        )
+    else:
+        sort_key = func.lower(Group.name)
+        query = db.query(Group, member_count, post_count, sort_key)
+        if prefix:
+            low, high = prefix_bounds(ascii_lower(prefix))
+            query = query.filter(sort_key >= low, sort_key < high)
+
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, 2)
+        valid_key = isinstance(last_key, (int, float)) if q else isinstance(last_key, str)
+        if not valid_key or isinstance(last_key, bool) or type(last_id) is not int:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+        query = query.filter(
+            or_(sort_key > last_key, and_(sort_key == last_key, Group.id > last_id))
+        )
+
+    # Groups marked for deletion are gone for users already
+    query = query.filter(Group.deleted_at.is_(None))
+
+    # Fetch one extra row to know if there is a next page
+    rows = query.order_by(sort_key, Group.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = [
+        GroupDirectoryItem(
+            id=group.id,
+            name=group.name,
+            description=group.description,
+            owner_id=group.owner_id,
+            created_at=group.created_at,
+            member_count=members,
+            post_count=posts,
+        )
+        for group, members, posts, _ in rows
+    ]
+
+    next_cursor = None
+    if has_more:
+        last_group, _, _, last_key = rows[-1]
+        next_cursor = encode_cursor(last_key, last_group.id)
+
+    return GroupDirectoryPage(items=items, next_cursor=next_cursor)
+
+
 def join_group(
         db: Session, 
         group_id: int, 
@@ -60,20 +168,11 @@ def join_group(
     - Otherwise, create a new membership row and commit.
     """
 
-    # 1) Ensure the group exists (404 if not)
-    get_group_or_404(db, group_id)
+    # 1) + 2) Ensure the group exists (404 if not) and check if the user
+    #    is already a member, with one query
+    access = get_group_with_role(db, group_id, current_user.id)
 
-    # 2) Check if the user is already a member of this group
-    existing = (
-        db.query(GroupMembership)
-        .filter(
-            GroupMembership.group_id == group_id,
-            GroupMembership.user_id == current_user.id,
-        )
-        .first()
-    )
-
-    if existing:
+    if access.is_member:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="You are already a member of this group.",
@@ -87,14 +186,26 @@ def join_group(
     )
 
     db.add(membership)
+    # Same transaction: a failed insert also undoes the count (and the
+    # row in the user's sync log, and the backfilled timeline)
+    bump(db, GROUP_MEMBERS, group_id)
+    record(db, [current_user.id], GROUP, group_id)
 
     try:
+        # Flushes the membership: a duplicate fails here, not at commit
+        backfill_timeline(db, group_id, [current_user.id])
         db.commit()
     except IntegrityError:
         # In case of a race condition or duplicate insert, ensure DB is clean
         db.rollback()
         return {"detail": "You are already a member of this group."}
 
+    # Keep cached memberships (this request, group chat rooms) in sync
+    forget_group_access(db, group_id)
+    group_members.add(group_id, current_user.id)
+    # The group's admins hear about it (batched, see app.services.notifications)
+    notify_group_join(group_id, current_user.id)
+
     return {"detail": "Joined the group successfully."}
 
 
@@ -102,12 +213,8 @@ def join_group(
 
 def leave_group(db: Session, group_id: int, current_user: User) -> dict:
 
-    get_group_or_404(db, group_id)
-
-    membership = db.query(GroupMembership).filter(
-        GroupMembership.group_id == group_id,
-        GroupMembership.user_id == current_user.id,
-    ).first()
+    # Group (404) and the caller's membership row in one query
+    membership = get_group_with_role(db, group_id, current_user.id).membership
     if not membership:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -116,7 +223,12 @@ def leave_group(db: Session, group_id: int, current_user: User) -> dict:
 
 
     db.delete(membership)
+    bump(db, GROUP_MEMBERS, group_id, -1)
+    record(db, [current_user.id], GROUP, group_id, deleted=True)
     db.commit()
+    forget_group_access(db, group_id)
+    group_members.discard(group_id, current_user.id)
+    drop_subscribers(group_id, [current_user.id])
     return {"detail": "Left the group successfully."}
 
 
@@ -129,9 +241,7 @@ def list_group_posts(
         current_user: User
         ) -> List[GroupPost]:
 
-    get_group_or_404(db, group_id)
-
-    if not is_member(db, group_id, current_user.id):
+    if not get_group_with_role(db, group_id, current_user.id).is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You must join the group to view posts.",
@@ -154,9 +264,7 @@ def create_group_post(
         current_user: User
         ) -> GroupPost:
 
-    get_group_or_404(db, group_id)
-
-    if not is_member(db, group_id, current_user.id):
+    if not get_group_with_role(db, group_id, current_user.id).is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You must join the group to create a post.",
@@ -170,8 +278,15 @@ def create_group_post(
         user_id=current_user.id,
     )
     db.add(post)
+    bump(db, GROUP_POSTS, group_id)
+    # Into members' home timelines now (small group) or at read time
+    deliver_group_post(db, post)
+    # Hashtags (group posts are not counted as trending)
+    index_post_tags(db, post)
     db.commit()
     db.refresh(post)
+    # Live subscribers (websocket / SSE) get it right away
+    publish_group_post(post)
     return post
 
 
@@ -188,16 +303,12 @@ def update_group(
     Update a group's name/description if the current user is an admin.
     """
 
-    # 2) Load the group from the database
-    db_group = get_group_or_404(db, group_id)
+    # 1) + 2) Load the group and check if current_user is admin in it,
+    #    with one query
+    access = get_group_with_role(db, group_id, current_user.id)
+    db_group = access.group
 
-    # 1) Check if current_user is admin in this group
-    is_admin = is_user_admin_in_group(
-        db=db,
-        group_id=group_id,
-        current_user=current_user,
-    )
-    if not is_admin:
+    if not access.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only group admins can update this group.",
@@ -212,27 +323,66 @@ def update_group(
     if group_in.description is not None:
         db_group.description = group_in.description
 
-    # 4) Save changes and return the updated group
+    # 4) Save changes (and tell every member's sync log) and return the
+    #    updated group
+    group_changed(db, group_id)
     db.commit()
     db.refresh(db_group)
 
     return db_group
 
+def delete_group(
+    db: Session,
+    group_id: int,
+    current_user: User,
+) -> dict:
+    """
+    Delete a group. Only the owner can do this.
+
+    The group is marked and disappears at once (404 everywhere); its
+    posts, memberships and chat room are removed in the background in
+    small batches (see app.services.purge).
+    """
+
+    # 1) Load the group (404 if missing or already being deleted)
+    group = get_group_with_role(db, group_id, current_user.id).group
+
+    # 2) Only the owner may delete it
+    if group.owner_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the group owner can delete this group.",
+    )
+
+    # 3) Mark it; the purge worker does the rest
+    mark_group_deleted(db, group)
+    forget_group_access(db, group_id)
+    drop_subscribers(group_id)
+    return {"detail": "Group deletion scheduled."}
+
+
 def list_group_members(
     db: Session,
     group_id: int,
     current_user: User,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after_user_id: int | None = None,
+    admins_only: bool = False,
 ) -> list[GroupMemberRead]:
     """
-    Return all members of a group as GroupMemberRead objects.
-    """
+    Return one page of a group's members, ordered by user_id.
+
+    - Column projection: rows of (user_id, username, is_admin, created_at),
+      no ORM objects and no lazy loading of users
+    - Keyset pagination: pass the last user_id of a page as after_user_id
+    - admins_only: only members with is_admin set
 
-    # 1) Check if the group exists
-    get_group_or_404(db, group_id)
+    Both filters are served by the (group_id, user_id) and
+    (group_id, is_admin, user_id) indexes of group_memberships.
+    """
 
-    # (Optional) Here you could check if current_user is a member
-    # or admin before listing members, if you want stricter rules.
-    if not is_member(db, group_id, current_user.id):
+    # 1) Check if the group exists and current_user is a member (one query)
+    if not get_group_with_role(db, group_id, current_user.id).is_member:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You must join the group to view members.",
@@ -241,27 +391,27 @@ def list_group_members(
 
 
 
-    # 2) Get all memberships for this group, including user info
-    memberships = (
-        db.query(GroupMembership)
+    # 2) Select only the columns of GroupMemberRead
+    query = (
+        db.query(
+            GroupMembership.user_id,
+            User.username,
+            GroupMembership.is_admin,
+            GroupMembership.created_at,
+        )
+        .join(User, User.id == GroupMembership.user_id)
         .filter(GroupMembership.group_id == group_id)
-        .join(GroupMembership.user)
-        .all()
     )
 
-    # 3) Map memberships to GroupMemberRead objects
-    members_read = []
+    if admins_only:
+        query = query.filter(GroupMembership.is_admin.is_(True))
 
-    for m in memberships:
-     member = GroupMemberRead(
-        user_id=m.user_id,
-        username=m.user.username,
-        is_admin=m.is_admin,
-        created_at=m.created_at,
-    )
-     members_read.append(member)
+    if after_user_id is not None:
+        query = query.filter(GroupMembership.user_id > after_user_id)
 
-    return members_read
+    # 3) Rows have the GroupMemberRead fields as attributes; the router's
+    #    response_model turns them into JSON without building ORM objects
+    return query.order_by(GroupMembership.user_id).limit(limit).all()
 
 
 
@@ -278,12 +428,9 @@ def remove_group_member(
     Only group admins are allowed to do this.
     """
 
-    # 1) Check that the group exists
-    get_group_or_404(db, group_id)
-
-    # 2) Check that the current user is an admin in this group
-    is_admin = is_user_admin_in_group(db=db, group_id=group_id, current_user=current_user)
-    if not is_admin:
+    # 1) + 2) Check that the group exists and the current user is an admin
+    #    in it, with one query
+    if not get_group_with_role(db, group_id, current_user.id).is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only group admins can perform this action.",
@@ -310,7 +457,169 @@ def remove_group_member(
 
     # 4) Delete the membership and commit
     db.delete(membership_to_remove)
+    bump(db, GROUP_MEMBERS, group_id, -1)
+    record(db, [user_id], GROUP, group_id, deleted=True)
     db.commit()
+    forget_group_access(db, group_id)
+    group_members.discard(group_id, user_id)
+    drop_subscribers(group_id, [user_id])
     return
-    
 
+
+# ===========================
+# Bulk membership administration
+# ===========================
+# One admin check per request and one set-based statement per batch,
+# instead of one remove_group_member() call (and check) per user.
+# Results come back in request order, one entry per distinct user id.
+
+def bulk_add_group_members(
+    db: Session,
+    group_id: int,
+    user_ids: list[int],
+    current_user: User,
+) -> GroupMembersBulkResponse:
+    """Add many users to a group as regular members (admins only)."""
+
+    # 1) Group exists and current user is an admin in it (one query)
+    _require_group_admin(db, group_id, current_user)
+    user_ids = list(dict.fromkeys(user_ids))
+
+    # 2) One INSERT ... SELECT for every active user that is not a member
+    #    yet; the unique (group_id, user_id) index skips existing members
+    stmt = insert(GroupMembership).from_select(
+        ["group_id", "user_id", "is_admin"],
+        select(literal(group_id), User.id, false()).where(
+            User.id.in_(user_ids),
+            User.deleted_at.is_(None),
+        ),
+    )
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=[GroupMembership.group_id, GroupMembership.user_id]
+    ).returning(GroupMembership.user_id)
+    added = set(db.execute(stmt).scalars())
+
+    # 3) Only if some were skipped: which of them are members already
+    members = _existing_members(db, group_id, [u for u in user_ids if u not in added])
+
+    # 4) Count, rows, sync log and timelines in the same transaction
+    if added:
+        bump(db, GROUP_MEMBERS, group_id, len(added))
+        record(db, added, GROUP, group_id)
+        backfill_timeline(db, group_id, added)
+    db.commit()
+
+    # 5) Keep cached memberships (this request, group chat rooms) in sync
+    forget_group_access(db, group_id)
+    group_members.add_many(group_id, added)
+
+    return _bulk_results(
+        user_ids,
+        lambda u: "added" if u in added else "already_member" if u in members else "user_not_found",
+    )
+
+
+def bulk_remove_group_members(
+    db: Session,
+    group_id: int,
+    user_ids: list[int],
+    current_user: User,
+) -> GroupMembersBulkResponse:
+    """Remove many members from a group (admins only)."""
+
+    # 1) Group exists and current user is an admin in it (one query)
+    _require_group_admin(db, group_id, current_user)
+    user_ids = list(dict.fromkeys(user_ids))
+
+    # 2) One DELETE for the whole batch; RETURNING says who was a member
+    removed = set(
+        db.execute(
+            delete(GroupMembership)
+            .where(
+                GroupMembership.group_id == group_id,
+                GroupMembership.user_id.in_(user_ids),
+            )
+            .returning(GroupMembership.user_id)
+        ).scalars()
+    )
+
+    # 3) Count, rows and sync log in the same transaction
+    if removed:
+        bump(db, GROUP_MEMBERS, group_id, -len(removed))
+        record(db, removed, GROUP, group_id, deleted=True)
+    db.commit()
+
+    # 4) Keep cached memberships in sync; removed users' room sockets and
+    #    group streams close
+    forget_group_access(db, group_id)
+    group_members.discard_many(group_id, removed)
+    drop_subscribers(group_id, removed)
+
+    return _bulk_results(user_ids, lambda u: "removed" if u in removed else "not_member")
+
+
+def bulk_promote_group_members(
+    db: Session,
+    group_id: int,
+    user_ids: list[int],
+    current_user: User,
+) -> GroupMembersBulkResponse:
+    """Make many members admins of a group (admins only)."""
+
+    # 1) Group exists and current user is an admin in it (one query)
+    _require_group_admin(db, group_id, current_user)
+    user_ids = list(dict.fromkeys(user_ids))
+
+    # 2) One UPDATE for every listed member that is not an admin yet
+    promoted = set(
+        db.execute(
+            update(GroupMembership)
+            .where(
+                GroupMembership.group_id == group_id,
+                GroupMembership.user_id.in_(user_ids),
+                GroupMembership.is_admin.is_not(True),
+            )
+            .values(is_admin=True)
+            .returning(GroupMembership.user_id)
+        ).scalars()
+    )
+
+    # 3) Only if some were skipped: which of them are members (= admins)
+    members = _existing_members(db, group_id, [u for u in user_ids if u not in promoted])
+    db.commit()
+
+    # 4) Cached roles of this request are stale now (member sets are not)
+    forget_group_access(db, group_id)
+
+    return _bulk_results(
+        user_ids,
+        lambda u: "promoted" if u in promoted else "already_admin" if u in members else "not_member",
+    )
+
+
+def _require_group_admin(db: Session, group_id: int, current_user: User) -> None:
+    if not get_group_with_role(db, group_id, current_user.id).is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only group admins can perform this action.",
+    )
+
+
+def _existing_members(db: Session, group_id: int, user_ids: list[int]) -> set[int]:
+    """Which of user_ids are members of the group (no query for an empty list)."""
+    if not user_ids:
+        return set()
+    return set(
+        db.execute(
+            select(GroupMembership.user_id).where(
+                GroupMembership.group_id == group_id,
+                GroupMembership.user_id.in_(user_ids),
+            )
+        ).scalars()
+    )
+
+
+def _bulk_results(user_ids: list[int], status_of) -> GroupMembersBulkResponse:
+    return GroupMembersBulkResponse(
+        results=[GroupMemberBulkResult(user_id=u, status=status_of(u)) for u in user_ids]
+    )
@@ -1,7 +1,10 @@
 #app/services/group_helpers.py
+from dataclasses import dataclass
+
+from sqlalchemy import and_
 from sqlalchemy.orm import Session
 
-from app.models.group import Group
+from app.models.group import Group, GroupPost
 from app.models.user import User
 from app.models.group_membership import GroupMembership
 from fastapi import HTTPException, status
@@ -14,7 +17,7 @@ def get_group_or_404(
         group_id: int
         ) -> Group:
 
-    group = db.query(Group).filter(Group.id == group_id).first()
+    group = db.query(Group).filter(Group.id == group_id, Group.deleted_at.is_(None)).first()
     if not group:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -54,3 +57,90 @@ def is_user_admin_in_group(
         return True
 
     return False
+
+
+@dataclass
+class GroupAccess:
+    """
+    A group plus the caller's membership row (None if not a member).
+    """
+    group: Group
+    membership: GroupMembership | None
+
+    @property
+    def is_member(self) -> bool:
+        return self.membership is not None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.membership is not None and bool(self.membership.is_admin)
+
+
+# Key of the per-request cache in Session.info
+_ACCESS_CACHE_KEY = "group_access"
+
+
+def get_group_with_role(db: Session, group_id: int, user_id: int) -> GroupAccess:
+    """
+    Load the group and user_id's membership with ONE query, or raise 404
+    (also for groups marked for deletion).
+
+    Replaces get_group_or_404 + is_member / is_user_admin_in_group
+    (two round trips) in the group services.
+
+    The result is cached in db.info, so it lives as long as the request's
+    session. Functions that change memberships must call
+    forget_group_access() after their commit.
+    """
+    cache = db.info.setdefault(_ACCESS_CACHE_KEY, {})
+    key = (group_id, user_id)
+    if key in cache:
+        return cache[key]
+
+    # LEFT JOIN: the group row is returned even if the user is not a member
+    row = (
+        db.query(Group, GroupMembership)
+        .outerjoin(
+            GroupMembership,
+            and_(
+                GroupMembership.group_id == Group.id,
+                GroupMembership.user_id == user_id,
+            ),
+        )
+        .filter(Group.id == group_id, Group.deleted_at.is_(None))
+        .first()
+    )
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found.",
+        )
+
+    access = GroupAccess(group=row[0], membership=row[1])
+    cache[key] = access
+    return access
+
+
+def forget_group_access(db: Session, group_id: int) -> None:
+    """Drop cached get_group_with_role results of this group (after a membership change)."""
+    cache = db.info.get(_ACCESS_CACHE_KEY)
+    if not cache:
+        return
+    for key in [key for key in cache if key[0] == group_id]:
+        del cache[key]
+
+
+def get_group_post_for_member(db: Session, group_id: int, post_id: int, user_id: int) -> GroupPost:
+    """
+    A post of this group, for members only: 403 for others, 404 if the
+    post is not in this group.
+    """
+    if not get_group_with_role(db, group_id, user_id).is_member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You must join the group to view posts.",
+        )
+    post = db.get(GroupPost, post_id)
+    if post is None or post.group_id != group_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Post not found")
+    return post
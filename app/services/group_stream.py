@@ -0,0 +1,184 @@
+# app/services/group_stream.py
+
+"""
+Live group posts: new GroupPost rows are pushed to subscribed members
+instead of members polling GET /groups/{id}/posts.
+
+Two ways to subscribe (see app.routers.group_stream):
+- WebSocket  /groups/{id}/stream/ws?token=<JWT>
+- SSE        GET /groups/{id}/stream?token=<JWT>  (text/event-stream)
+
+Membership is checked once, when the client subscribes. Subscribers of a
+group that leave it, are removed or whose group is deleted are closed
+by drop_subscribers().
+
+Delivery reuses the chat machinery: subscribers live in a
+ConnectionRegistry keyed by group id, and fan_out() encodes a frame once
+per codec and puts it on every subscriber's bounded queue. A subscriber
+that cannot keep up is closed, never buffered without limit.
+
+Posts are created in sync endpoints (threadpool), while the queues belong
+to the event loop, so publish_group_post() hands the fan-out to the loop
+with call_soon_threadsafe().
+
+Like the chat registry, subscriptions live in one process.
+"""
+
+import asyncio
+import json
+
+from app.services.chat_connections import (
+    CLOSE_TRY_AGAIN_LATER,
+    HEARTBEAT_INTERVAL,
+    SEND_QUEUE_SIZE,
+    ConnectionRegistry,
+)
+from app.services.chat_protocol import PROTOCOL_VERSION, ChatFrameError, FrameCodec, to_epoch_ms
+
+
+# Close code for subscribers that are no longer members
+CLOSE_POLICY_VIOLATION = 1008
+
+# All subscribers of this worker; ChatConnection.chat_id holds the group id
+group_streams = ConnectionRegistry()
+
+# Event loop that owns the subscriber queues (set on the first subscribe)
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+class SseCodec(FrameCodec):
+    """Frames as Server-Sent Events: "event: <type>", "id: <id>", "data: <json>"."""
+
+    def encode(self, frame: dict) -> str:
+        data = json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
+        lines = [f"event: {frame['type']}"]
+        if frame.get("id") is not None:
+            lines.append(f"id: {frame['id']}")
+        lines.append(f"data: {data}")
+        return "\n".join(lines) + "\n\n"
+
+    def decode(self, data: str | bytes) -> dict:
+        # EventSource is one-way: nothing ever comes back on the stream
+        raise ChatFrameError("SSE streams carry no client frames.")
+
+
+SSE_CODEC = SseCodec()
+
+# Sent on an idle SSE stream so proxies keep it open (a comment line)
+SSE_KEEPALIVE = ": keepalive\n\n"
+
+
+class SseSubscriber:
+    """
+    One Server-Sent Events client, shaped like a ChatConnection so the
+    registry and fan_out() can treat both alike.
+
+    SSE clients cannot answer pings, so structured is False and the
+    registry's reaper leaves them alone; the stream itself sends a
+    keepalive comment when idle and notices disconnects then.
+    """
+
+    __slots__ = ("user_id", "chat_id", "codec", "_queue", "_closing")
+
+    structured = False
+
+    def __init__(self, user_id: int, group_id: int):
+        self.user_id = user_id
+        self.chat_id = group_id
+        self.codec = SSE_CODEC
+        # None is the "stop" marker
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self._closing = False
+
+    def enqueue(self, payload: str) -> bool:
+        """Never blocks; a full queue closes the stream (client too slow)."""
+        if self._closing:
+            return False
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.close(CLOSE_TRY_AGAIN_LATER)
+            return False
+        return True
+
+    def enqueue_frame(self, frame: dict) -> bool:
+        return self.enqueue(self.codec.encode(frame))
+
+    def close(self, code: int) -> None:
+        if self._closing:
+            return
+        self._closing = True
+        # Drop what is queued and wake up the stream
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def events(self, is_disconnected, keepalive: float = HEARTBEAT_INTERVAL):
+        """
+        Yield encoded events until the subscriber is closed or the client
+        goes away. is_disconnected: the request's is_disconnected().
+        """
+        while True:
+            try:
+                payload = await asyncio.wait_for(self._queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                payload = SSE_KEEPALIVE
+            if payload is None:
+                return
+            yield payload
+
+
+def subscribe(conn) -> None:
+    """Register a subscriber. Call from the event loop."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    group_streams.add(conn)
+
+
+def unsubscribe(conn) -> None:
+    group_streams.remove(conn)
+
+
+def group_post_frame(post) -> dict:
+    return {
+        "v": PROTOCOL_VERSION,
+        "type": "group_post",
+        "id": post.id,
+        "group_id": post.group_id,
+        "user_id": post.user_id,
+        "ts": to_epoch_ms(post.created_at),
+        "content": post.content,
+    }
+
+
+def publish_group_post(post) -> None:
+    """
+    Push a committed post to the group's subscribers.
+
+    Safe to call from any thread; returns at once. Nothing happens if
+    this worker has no subscribers for the group.
+    """
+    loop = _loop
+    if loop is None or loop.is_closed() or not group_streams.in_chat(post.group_id):
+        return
+    frame = group_post_frame(post)
+    loop.call_soon_threadsafe(group_streams.broadcast, post.group_id, frame)
+
+
+def drop_subscribers(group_id: int, user_ids=None) -> None:
+    """
+    Close the subscriptions of user_ids in a group (all of them if None),
+    e.g. after they left or the group was deleted. Safe from any thread.
+    """
+    loop = _loop
+    if loop is None or loop.is_closed() or not group_streams.in_chat(group_id):
+        return
+    loop.call_soon_threadsafe(_close_subscribers, group_id, None if user_ids is None else set(user_ids))
+
+
+def _close_subscribers(group_id: int, user_ids: set[int] | None) -> None:
+    for conn in list(group_streams.in_chat(group_id)):
+        if user_ids is None or conn.user_id in user_ids:
+            conn.close(CLOSE_POLICY_VIOLATION)
@@ -0,0 +1,125 @@
+# app/services/membership_cache.py
+
+"""
+In-memory member sets of groups, for hot paths like group chat rooms.
+
+A group's member ids are loaded once (on first use) and then kept in sync
+by the group services: join_group / leave_group / remove_group_member call
+add() / discard() after their commit. Chat sockets can then check
+membership per message without a database round trip.
+
+Changes mutate a loaded group's set in place under the lock (a join is
+O(1), not a copy of the group); load() hands out a frozen copy.
+
+Loads run in worker threads while joins/leaves commit in others, so a
+change to a group that is being loaded is stamped with a clock value: a
+load that started before it is thrown away instead of overwriting newer
+data. Stamps are kept only while a load of the group is in flight, so
+they do not pile up for every group ever changed or invalidated.
+
+Like the chat registry, the cache is per process. With several workers a
+change made in another worker is only seen after that group is reloaded.
+"""
+
+import threading
+from typing import Callable, Iterable
+
+
+class MembershipCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # group_id -> member user ids (only for loaded groups)
+        self._members: dict[int, set[int]] = {}
+        # Ticks on every change
+        self._clock = 0
+        # group_id -> load() calls in flight
+        self._loading: dict[int, int] = {}
+        # group_id -> clock of its last change, only while it is loading
+        self._versions: dict[int, int] = {}
+
+    def is_loaded(self, group_id: int) -> bool:
+        return group_id in self._members
+
+    def contains(self, group_id: int, user_id: int) -> bool | None:
+        """
+        True/False from memory, or None if the group is not loaded yet
+        (the caller should load() it first).
+        """
+        members = self._members.get(group_id)
+        if members is None:
+            return None
+        return user_id in members
+
+    def load(self, group_id: int, loader: Callable[[], Iterable[int]]) -> frozenset[int]:
+        """
+        Return the group's member ids, calling loader() on a miss.
+
+        loader runs outside the lock (it usually queries the database).
+        """
+        with self._lock:
+            members = self._members.get(group_id)
+            if members is not None:
+                return frozenset(members)
+            started = self._clock
+            self._loading[group_id] = self._loading.get(group_id, 0) + 1
+
+        loaded = None
+        try:
+            loaded = frozenset(loader())
+        finally:
+            with self._lock:
+                # Keep the result only if nothing changed while we were
+                # loading (and no other load got there first)
+                if (
+                    loaded is not None
+                    and group_id not in self._members
+                    and self._versions.get(group_id, started) <= started
+                ):
+                    self._members[group_id] = set(loaded)
+                self._loaded(group_id)
+        return loaded
+
+    def add(self, group_id: int, user_id: int) -> None:
+        self.add_many(group_id, (user_id,))
+
+    def discard(self, group_id: int, user_id: int) -> None:
+        self.discard_many(group_id, (user_id,))
+
+    def add_many(self, group_id: int, user_ids: Iterable[int]) -> None:
+        """add() for a whole batch, under one lock."""
+        with self._lock:
+            self._changed(group_id)
+            members = self._members.get(group_id)
+            if members is not None:
+                members.update(user_ids)
+
+    def discard_many(self, group_id: int, user_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._changed(group_id)
+            members = self._members.get(group_id)
+            if members is not None:
+                members.difference_update(user_ids)
+
+    def invalidate(self, group_id: int) -> None:
+        """Forget the group; the next load() reads it again."""
+        with self._lock:
+            self._changed(group_id)
+            self._members.pop(group_id, None)
+
+    def _changed(self, group_id: int) -> None:
+        self._clock += 1
+        # Only a load in flight can be outdated by the change
+        if group_id in self._loading:
+            self._versions[group_id] = self._clock
+
+    def _loaded(self, group_id: int) -> None:
+        left = self._loading[group_id] - 1
+        if left:
+            self._loading[group_id] = left
+        else:
+            del self._loading[group_id]
+            self._versions.pop(group_id, None)
+
+
+# Shared by the group services (writers) and the chat router (readers)
+group_members = MembershipCache()
@@ -0,0 +1,360 @@
+# app/services/notifications.py
+
+"""
+Notifications: friend requests, approvals, group joins and @mentions.
+
+Write paths only emit an event after their commit (a list append, no
+database work). The dispatcher task turns events into rows in batches:
+
+1. Every NOTIFY_INTERVAL it drains up to NOTIFY_BATCH pending events.
+2. Recipients that need a lookup are resolved for the whole batch at
+   once: the admins of all joined groups in one query, all mentioned
+   usernames in one query.
+3. All rows are written with one INSERT, and the unread counters of all
+   recipients are bumped with one more statement, in the same
+   transaction.
+
+So a request pays nothing for its notifications, and a burst of events
+costs a few statements per batch instead of a few per event.
+
+The unread count is the UNREAD_NOTIFICATIONS counter (app.services.
+counters): reading it is one primary key lookup, and marking read
+lowers it in the same transaction as the UPDATE.
+
+Pending events live in process memory. They are flushed when the app
+shuts down; a crash loses at most NOTIFY_INTERVAL worth of them.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+from collections import Counter as Tally
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.friend_request import FriendRequest
+from app.models.group_membership import GroupMembership
+from app.models.notification import Notification
+from app.models.posts import Post
+from app.models.user import User
+from app.schemas.notification import NotificationOut, NotificationPage
+from app.services.counters import UNREAD_NOTIFICATIONS, bump, bump_many, counter_value
+
+logger = logging.getLogger(__name__)
+
+
+# Kinds
+FRIEND_REQUEST = "friend_request"    # to the receiver of a request
+FRIEND_ACCEPTED = "friend_accepted"  # to the sender, when it is approved
+GROUP_JOIN = "group_join"            # to the group's admins
+MENTION = "mention"                  # to every @username in a post
+
+# Seconds between two dispatcher runs
+NOTIFY_INTERVAL = 0.5
+
+# Events turned into rows per transaction
+NOTIFY_BATCH = 500
+
+# Pending events kept in memory; more are dropped (and logged)
+NOTIFY_MAX_PENDING = 50_000
+
+# Mentions notified per post (the first ones in the text)
+MAX_MENTIONS_PER_POST = 10
+
+# "@name": not inside a word or an e-mail address
+_MENTION_RE = re.compile(r"(?<![\w@.])@(\w{1,50})")
+
+
+def extract_mentions(text: str) -> list[str]:
+    """Distinct lowercased @usernames of a text, in order of appearance."""
+    names: list[str] = []
+    for match in _MENTION_RE.finditer(text):
+        name = match.group(1).lower()
+        if name not in names:
+            names.append(name)
+            if len(names) == MAX_MENTIONS_PER_POST:
+                break
+    return names
+
+
+class NotificationDispatcher:
+    def __init__(self, max_pending: int = NOTIFY_MAX_PENDING):
+        # Emitted from request threads, drained by the dispatcher task
+        self._lock = threading.Lock()
+        self._pending: list[dict] = []
+        self.max_pending = max_pending
+
+    def emit(self, event: dict) -> bool:
+        """Queue one event; never blocks on the database. False if dropped."""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                logger.warning("Notification backlog full, dropping %s", event["kind"])
+                return False
+            self._pending.append(event)
+            return True
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self, db: Session, batch_size: int = NOTIFY_BATCH) -> int:
+        """
+        Write one batch of pending events and commit.
+
+        Returns the number of notifications written. Events of a failed
+        batch are put back in front of the queue.
+        """
+        with self._lock:
+            events = self._pending[:batch_size]
+            del self._pending[:batch_size]
+        if not events:
+            return 0
+
+        try:
+            rows = _resolve(db, events)
+            if rows:
+                # Core insert: one executemany, whatever keys are None
+                db.execute(insert(Notification.__table__), rows)
+                bump_many(db, UNREAD_NOTIFICATIONS, Tally(row["user_id"] for row in rows))
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._pending[:0] = events
+            raise
+        return len(rows)
+
+    async def run(self, session_factory, interval: float = NOTIFY_INTERVAL) -> None:
+        """
+        Background task (app lifespan): flush pending events every
+        interval until the queue is empty; flush the rest on shutdown.
+        """
+
+        def _flush_all() -> int:
+            written = 0
+            db = session_factory()
+            try:
+                while self._pending:
+                    written += self.flush(db)
+            finally:
+                db.close()
+            return written
+
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if not self.pending():
+                    continue
+                try:
+                    await run_in_threadpool(_flush_all)
+                except Exception:
+                    logger.exception("Notification batch failed")
+        finally:
+            # Shutdown: do not lose what was already emitted (blocking is
+            # fine here, the app is stopping)
+            try:
+                _flush_all()
+            except Exception:
+                logger.exception("Final notification flush failed")
+
+
+def _resolve(db: Session, events: list[dict]) -> list[dict]:
+    """Turn events into notification rows, one query per kind of lookup."""
+    rows: list[dict] = []
+    joins = [e for e in events if e["kind"] == GROUP_JOIN]
+    mentions = [e for e in events if e["kind"] == MENTION]
+
+    for event in events:
+        if "user_id" in event:
+            rows.append(_row(event, event["user_id"]))
+
+    # Admins of every joined group, in one query
+    if joins:
+        admins: dict[int, list[int]] = {}
+        result = db.execute(
+            select(GroupMembership.group_id, GroupMembership.user_id).where(
+                GroupMembership.group_id.in_({e["group_id"] for e in joins}),
+                GroupMembership.is_admin.is_(True),
+            )
+        )
+        for group_id, user_id in result:
+            admins.setdefault(group_id, []).append(user_id)
+        for event in joins:
+            for admin_id in admins.get(event["group_id"], ()):
+                if admin_id != event["actor_id"]:
+                    rows.append(_row(event, admin_id))
+
+    # Every mentioned username, in one query (ix_users_username_lower)
+    if mentions:
+        names = {name for e in mentions for name in e["names"]}
+        lower_name = func.lower(User.username)
+        found = dict(
+            db.execute(
+                select(lower_name, User.id).where(lower_name.in_(names), User.deleted_at.is_(None))
+            ).all()
+        )
+        for event in mentions:
+            for name in event["names"]:
+                user_id = found.get(name)
+                if user_id is not None and user_id != event["actor_id"]:
+                    rows.append(_row(event, user_id))
+
+    return rows
+
+
+def _row(event: dict, user_id: int) -> dict:
+    return {
+        "user_id": user_id,
+        "kind": event["kind"],
+        "actor_id": event["actor_id"],
+        "friend_request_id": event.get("friend_request_id"),
+        "group_id": event.get("group_id"),
+        "post_id": event.get("post_id"),
+        "created_at": event["created_at"],
+    }
+
+
+# ---------- events, called by the write paths after their commit ----------
+def notify_friend_request(request: FriendRequest) -> None:
+    dispatcher.emit({
+        "kind": FRIEND_REQUEST,
+        "user_id": request.to_user_id,
+        "actor_id": request.from_user_id,
+        "friend_request_id": request.id,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def notify_friend_accepted(request: FriendRequest) -> None:
+    dispatcher.emit({
+        "kind": FRIEND_ACCEPTED,
+        "user_id": request.from_user_id,
+        "actor_id": request.to_user_id,
+        "friend_request_id": request.id,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def notify_group_join(group_id: int, user_id: int) -> None:
+    dispatcher.emit({
+        "kind": GROUP_JOIN,
+        "actor_id": user_id,
+        "group_id": group_id,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def notify_mentions(post: Post) -> None:
+    """Emit a mention event if the post mentions anybody."""
+    names = extract_mentions(post.content)
+    if names:
+        dispatcher.emit({
+            "kind": MENTION,
+            "actor_id": post.user_id,
+            "post_id": post.id,
+            "names": names,
+            "created_at": datetime.utcnow(),
+        })
+
+
+# ---------- reading and marking read ----------
+def list_notifications(
+    db: Session,
+    user_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    unread_only: bool = False,
+) -> NotificationPage:
+    """
+    One page of the user's notifications, newest first.
+
+    Keyset pagination on id over ix_notifications_user_id_id.
+    """
+    query = select(Notification).where(Notification.user_id == user_id)
+    if cursor:
+        (before_id,) = decode_cursor(cursor, 1)
+        # bool is a subclass of int, but never a valid id
+        if type(before_id) is not int:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+        query = query.where(Notification.id < before_id)
+    if unread_only:
+        query = query.where(Notification.read_at.is_(None))
+
+    # Fetch one extra row to know if there is a next page
+    rows = db.execute(query.order_by(Notification.id.desc()).limit(limit + 1)).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1].id) if has_more else None
+    return NotificationPage(
+        items=[notification_out(row) for row in rows],
+        next_cursor=next_cursor,
+        unread_count=unread_count(db, user_id),
+    )
+
+
+def notification_out(row: Notification) -> NotificationOut:
+    return NotificationOut(
+        id=row.id,
+        kind=row.kind,
+        actor_id=row.actor_id,
+        friend_request_id=row.friend_request_id,
+        group_id=row.group_id,
+        post_id=row.post_id,
+        created_at=row.created_at,
+        read=row.read_at is not None,
+    )
+
+
+def unread_count(db: Session, user_id: int) -> int:
+    """O(1): the unread counter, never COUNT(*)."""
+    return counter_value(db, UNREAD_NOTIFICATIONS, user_id)
+
+
+def mark_read(db: Session, user_id: int, up_to_id: int | None = None) -> int:
+    """
+    Mark the user's notifications read (all, or those with id <= up_to_id)
+    and commit. Returns the new unread count.
+    """
+    stmt = (
+        update(Notification)
+        .where(Notification.user_id == user_id, Notification.read_at.is_(None))
+        .values(read_at=datetime.utcnow())
+    )
+    if up_to_id is not None:
+        stmt = stmt.where(Notification.id <= up_to_id)
+    marked = db.execute(stmt).rowcount
+    if marked:
+        bump(db, UNREAD_NOTIFICATIONS, user_id, -marked)
+    db.commit()
+    return unread_count(db, user_id)
+
+
+def delete_notifications(db: Session, condition, limit: int | None = None) -> int:
+    """
+    Delete notifications matching condition (up to limit), keeping the
+    recipients' unread counters right. Does not commit; returns the count.
+    """
+    query = select(Notification.id, Notification.user_id, Notification.read_at).where(condition)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+
+    db.execute(delete(Notification).where(Notification.id.in_([row.id for row in rows])))
+    unread = Tally(row.user_id for row in rows if row.read_at is None)
+    bump_many(db, UNREAD_NOTIFICATIONS, {user_id: -count for user_id, count in unread.items()})
+    return len(rows)
+
+
+# Shared by the write paths (emit) and the app lifespan (run)
+dispatcher = NotificationDispatcher()
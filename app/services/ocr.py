@@ -0,0 +1,257 @@
+# app/services/ocr.py
+
+"""
+Background OCR of post images.
+
+Uploads never wait for OCR. The upload stores the image with
+ocr_status="pending" and submits its id to the OcrQueue; worker tasks
+take ids from the queue and run the engine in a bounded thread pool
+(tesseract is a subprocess, so threads are enough).
+
+- Backpressure: the queue holds at most OCR_QUEUE_SIZE ids. When it is
+  full, uploads are refused with 503 + Retry-After before their body is
+  read (see OcrQueue.require_room).
+- Retry: a failed or timed out run increments ocr_attempts and sets
+  ocr_retry_at (exponential backoff); after OCR_MAX_ATTEMPTS the image
+  is marked "failed".
+- Durability: the database is the source of truth. The sweeper
+  re-submits pending images whose retry time has come, including work
+  left over from before a restart or submissions that found no room.
+
+The engine is pluggable: TesseractEngine by default, tests use a
+stand-in tesseract executable or their own engine.
+"""
+
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.post_image import PostImage
+
+logger = logging.getLogger(__name__)
+
+
+# Image ids waiting for a worker; more uploads get 503
+OCR_QUEUE_SIZE = 100
+
+# Concurrent OCR runs (worker tasks and threads)
+OCR_WORKERS = 2
+
+# Seconds one OCR run may take
+OCR_TIMEOUT = 60.0
+
+# Tries per image before it is marked failed
+OCR_MAX_ATTEMPTS = 3
+
+# Seconds before the first retry; doubles with every attempt
+OCR_RETRY_BACKOFF = 30.0
+
+# Seconds between two sweeps for pending images
+OCR_SWEEP_INTERVAL = 10.0
+
+# Retry-After sent with 503 when the queue is full
+OCR_RETRY_AFTER = 30
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class OcrEngine(ABC):
+    """Turns an image file into text. Runs in a worker thread."""
+
+    @abstractmethod
+    def extract(self, path: str) -> str:
+        ...
+
+
+class TesseractEngine(OcrEngine):
+    """The tesseract command line tool, through pytesseract."""
+
+    def __init__(self, lang: str | None = None, timeout: float = OCR_TIMEOUT):
+        self.lang = lang
+        self.timeout = timeout
+
+    def extract(self, path: str) -> str:
+        import pytesseract
+
+        # A path (not a PIL image) is handed to tesseract as is
+        return pytesseract.image_to_string(path, lang=self.lang, timeout=self.timeout).strip()
+
+
+class OcrQueue:
+    def __init__(self, engine: OcrEngine | None = None, maxsize: int = OCR_QUEUE_SIZE):
+        self.engine = engine or TesseractEngine()
+        self._queue: asyncio.Queue[int] = asyncio.Queue(maxsize=maxsize)
+        # ids in the queue or being processed (the sweeper skips them)
+        self._queued: set[int] = set()
+
+    def has_room(self) -> bool:
+        return not self._queue.full()
+
+    def require_room(self) -> None:
+        """Raise 503 (with Retry-After) if no more work can be accepted."""
+        if not self.has_room():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is busy, try again later.",
+                headers={"Retry-After": str(OCR_RETRY_AFTER)},
+            )
+
+    def submit(self, image_id: int) -> bool:
+        """
+        Queue an image for OCR. Returns False if the queue is full; the
+        image stays pending and the sweeper submits it later.
+        """
+        if image_id in self._queued:
+            return True
+        try:
+            self._queue.put_nowait(image_id)
+        except asyncio.QueueFull:
+            return False
+        self._queued.add(image_id)
+        return True
+
+    async def run(
+        self,
+        session_factory,
+        path_of,
+        workers: int = OCR_WORKERS,
+        sweep_interval: float = OCR_SWEEP_INTERVAL,
+    ) -> None:
+        """
+        Background task (app lifespan): worker tasks plus the sweeper.
+
+        path_of(image) returns the file path of a PostImage.
+        """
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+        tasks = [
+            asyncio.create_task(self._worker(session_factory, path_of, executor))
+            for _ in range(workers)
+        ]
+        try:
+            while True:
+                try:
+                    await self.sweep(session_factory)
+                except Exception:
+                    logger.exception("OCR sweep failed")
+                await asyncio.sleep(sweep_interval)
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _worker(self, session_factory, path_of, executor) -> None:
+        while True:
+            image_id = await self._queue.get()
+            try:
+                await self.process(session_factory, image_id, path_of, executor)
+            except Exception:
+                logger.exception("OCR of image %s failed", image_id)
+            finally:
+                self._queued.discard(image_id)
+                self._queue.task_done()
+
+    async def process(self, session_factory, image_id: int, path_of, executor=None) -> str | None:
+        """
+        OCR one image and store the result. Returns its new ocr_status
+        (None if the image is gone or no longer pending).
+        """
+        # 1) Still pending? (it may have been deleted or done meanwhile)
+        path = await run_in_threadpool(_pending_path, session_factory, image_id, path_of)
+        if path is None:
+            return None
+
+        # 2) Run the engine in the bounded pool, with a time limit
+        loop = asyncio.get_running_loop()
+        try:
+            text = await asyncio.wait_for(
+                loop.run_in_executor(executor, self.engine.extract, path),
+                timeout=OCR_TIMEOUT,
+            )
+        except Exception as exc:
+            logger.warning("OCR of image %s failed: %r", image_id, exc)
+            return await run_in_threadpool(_record_failure, session_factory, image_id)
+
+        # 3) Store the text
+        return await run_in_threadpool(_record_text, session_factory, image_id, text)
+
+    async def sweep(self, session_factory) -> int:
+        """Submit pending images that are due; returns how many were queued."""
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return 0
+        ids = await run_in_threadpool(_due_ids, session_factory, room, set(self._queued))
+        # Back on the event loop: asyncio.Queue is not thread safe
+        return sum(1 for image_id in ids if self.submit(image_id))
+
+
+def _due_ids(session_factory, limit: int, skip: set[int]) -> list[int]:
+    db: Session = session_factory()
+    try:
+        query = select(PostImage.id).where(
+            PostImage.ocr_status == PENDING,
+            or_(PostImage.ocr_retry_at.is_(None), PostImage.ocr_retry_at <= datetime.utcnow()),
+        )
+        if skip:
+            query = query.where(PostImage.id.not_in(skip))
+        return db.execute(query.order_by(PostImage.id).limit(limit)).scalars().all()
+    finally:
+        db.close()
+
+
+def _pending_path(session_factory, image_id: int, path_of) -> str | None:
+    db: Session = session_factory()
+    try:
+        image = db.get(PostImage, image_id)
+        if image is None or image.ocr_status != PENDING:
+            return None
+        return str(path_of(image))
+    finally:
+        db.close()
+
+
+def _record_text(session_factory, image_id: int, text: str) -> str | None:
+    db: Session = session_factory()
+    try:
+        image = db.get(PostImage, image_id)
+        if image is None:
+            return None
+        image.ocr_text = text
+        image.ocr_status = DONE
+        image.ocr_attempts += 1
+        image.ocr_retry_at = None
+        db.commit()
+        return DONE
+    finally:
+        db.close()
+
+
+def _record_failure(session_factory, image_id: int) -> str | None:
+    db: Session = session_factory()
+    try:
+        image = db.get(PostImage, image_id)
+        if image is None:
+            return None
+        image.ocr_attempts += 1
+        if image.ocr_attempts >= OCR_MAX_ATTEMPTS:
+            image.ocr_status = FAILED
+            image.ocr_retry_at = None
+        else:
+            delay = OCR_RETRY_BACKOFF * 2 ** (image.ocr_attempts - 1)
+            image.ocr_retry_at = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+        return image.ocr_status
+    finally:
+        db.close()
+
+
+# Shared by the upload endpoints (submit) and the app lifespan (run)
+ocr_queue = OcrQueue()
@@ -0,0 +1,212 @@
+# app/services/post_images.py
+
+"""
+Image attachments of wall posts and group posts.
+
+Uploads reuse the avatar pipeline's streaming receiver (no buffering,
+sha256 on the way): files are stored once per content as
+media/images/<sha256>.<ext>. Text in the image is extracted later by the
+OCR workers (app.services.ocr); the upload only submits the job.
+"""
+
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+import aiofiles.os
+from fastapi import HTTPException, Request, status
+from PIL import Image
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.group import GroupPost
+from app.models.post_image import PostImage
+from app.models.posts import Post
+from app.models.user import User
+from app.schemas.posts import PostImageOut
+from app.services import avatars
+from app.services.group_helpers import get_group_with_role
+from app.services.ocr import ocr_queue
+
+
+# Largest accepted image
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Accepted content types -> file extension
+IMAGE_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+}
+
+# Images per post
+MAX_IMAGES_PER_POST = 4
+
+
+def image_path(image: PostImage) -> Path:
+    return avatars.MEDIA_ROOT / "images" / f"{image.digest}.{image.extension}"
+
+
+def image_url(image: PostImage) -> str:
+    return f"/media/images/{image.digest}.{image.extension}"
+
+
+def image_out(image: PostImage) -> PostImageOut:
+    return PostImageOut(
+        id=image.id,
+        url=image_url(image),
+        ocr_status=image.ocr_status,
+        ocr_text=image.ocr_text,
+    )
+
+
+def _is_image(path: Path) -> bool:
+    """Cheap header check (no full decode); runs in a worker thread."""
+    try:
+        with Image.open(path) as image:
+            image.verify()
+        return True
+    except Exception:
+        return False
+
+
+async def store_image(chunks: AsyncIterator[bytes], extension: str) -> str:
+    """
+    Stream an upload to media/images/<sha256>.<ext>; returns the digest.
+
+    The same bytes uploaded again are stored once. Raises 400 if the
+    file is not an image, 413 if it is too large.
+    """
+    digest, tmp = await avatars.receive_upload(chunks, max_bytes=MAX_IMAGE_BYTES)
+
+    if not await asyncio.to_thread(_is_image, tmp):
+        await aiofiles.os.unlink(tmp)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload is not a supported image.",
+        )
+
+    target = avatars.MEDIA_ROOT / "images" / f"{digest}.{extension}"
+    await aiofiles.os.makedirs(target.parent, exist_ok=True)
+    # Same content already stored: replacing it changes nothing
+    await aiofiles.os.replace(tmp, target)
+    return digest
+
+
+async def receive_post_image(request: Request, check: Callable[[], object]) -> tuple[str, str]:
+    """
+    Validate and store the image in the request body, for an upload
+    endpoint. Returns (digest, extension).
+
+    1. Content-Type must be an image type (415)
+    2. Backpressure: 503 + Retry-After if the OCR queue is full
+    3. check() (permissions, image count) runs before the body is read
+    4. 413 early if Content-Length is too large
+    5. Stream the body to disk (store_image)
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    extension = IMAGE_TYPES.get(content_type)
+    if extension is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of {', '.join(IMAGE_TYPES)}.",
+        )
+
+    ocr_queue.require_room()
+    await run_in_threadpool(check)
+
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > MAX_IMAGE_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"Image is larger than {MAX_IMAGE_BYTES} bytes.",
+        )
+
+    digest = await store_image(request.stream(), extension)
+    return digest, extension
+
+
+def check_post_for_image(db: Session, post_id: int, current_user: User) -> Post:
+    """
+    Can the current user add an image to this wall post? Checked before
+    the upload is read.
+
+    - 404 if the post does not exist, 403 if it is not theirs
+    - 400 if it already has MAX_IMAGES_PER_POST images
+    """
+    post = db.get(Post, post_id)
+    if post is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Post not found")
+    if post.user_id != current_user.id:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Not allowed to edit this post")
+    _check_image_count(db, PostImage.post_id == post_id)
+    return post
+
+
+def check_group_post_for_image(
+    db: Session,
+    group_id: int,
+    post_id: int,
+    current_user: User,
+) -> GroupPost:
+    """The same for a group post: the caller must be a member and its author."""
+    if not get_group_with_role(db, group_id, current_user.id).is_member:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You must join the group to edit a post.",
+        )
+    post = db.get(GroupPost, post_id)
+    if post is None or post.group_id != group_id:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Post not found")
+    if post.user_id != current_user.id:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Not allowed to edit this post")
+    _check_image_count(db, PostImage.group_post_id == post_id)
+    return post
+
+
+def add_post_image(
+    db: Session,
+    digest: str,
+    extension: str,
+    current_user: User,
+    post_id: int | None = None,
+    group_post_id: int | None = None,
+) -> PostImage:
+    """Insert the attachment (ocr_status "pending") and commit."""
+    image = PostImage(
+        digest=digest,
+        extension=extension,
+        uploader_id=current_user.id,
+        post_id=post_id,
+        group_post_id=group_post_id,
+    )
+    db.add(image)
+    db.commit()
+    db.refresh(image)
+    return image
+
+
+async def finish_upload(db: Session, digest: str, extension: str, current_user: User, **parent) -> PostImageOut:
+    """Insert the attachment, then hand it to the OCR workers."""
+    image = await run_in_threadpool(add_post_image, db, digest, extension, current_user, **parent)
+    # A full queue is fine here: the row is pending, the sweeper submits it
+    ocr_queue.submit(image.id)
+    return image_out(image)
+
+
+def list_post_images(db: Session, post_id: int) -> list[PostImage]:
+    return (
+        db.query(PostImage)
+        .filter(PostImage.post_id == post_id)
+        .order_by(PostImage.id)
+        .all()
+    )
+
+
+def _check_image_count(db: Session, same_post) -> None:
+    if db.query(PostImage).filter(same_post).count() >= MAX_IMAGES_PER_POST:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A post can have at most {MAX_IMAGES_PER_POST} images.",
+        )
@@ -0,0 +1,168 @@
+# app/services/presence.py
+
+"""
+Online/offline presence and typing indicators for chat users.
+
+Built on the chat ConnectionRegistry: a user is online while they have at
+least one open chat socket in this worker.
+
+Fan-out rules:
+- Presence changes go only to the user's friends that have an open socket
+  ("watchers"), never to everybody.
+- Changes are coalesced: the flusher task publishes at most one frame per
+  user per PRESENCE_WINDOW, and a user that disconnects and reconnects
+  inside one window produces no frame at all.
+- Typing frames are throttled to one per (chat, user) per TYPING_WINDOW,
+  no matter how often the client sends them.
+
+Like the registry, this state lives in one process.
+"""
+
+import asyncio
+import time
+
+from app.services.chat_connections import ConnectionRegistry, fan_out
+from app.services.chat_protocol import PROTOCOL_VERSION
+
+
+# How often pending presence changes are published
+PRESENCE_WINDOW = 1.0
+
+# Minimum time between two typing frames of the same user in the same chat
+TYPING_WINDOW = 3.0
+
+
+class PresenceTracker:
+    def __init__(self, registry: ConnectionRegistry):
+        self._registry = registry
+        # connected user -> friend ids (loaded once, on their first socket)
+        self._friends: dict[int, frozenset[int]] = {}
+        # user -> connected friends interested in that user's presence
+        self._watchers: dict[int, set[int]] = {}
+        # user -> latest state since the last flush (True = online)
+        self._pending: dict[int, bool] = {}
+        # users whose "online" state was published and not yet withdrawn
+        self._published: set[int] = set()
+        # user -> wall clock time (epoch ms) they were last online
+        self._last_seen: dict[int, int] = {}
+        # (chat_id, user_id) -> monotonic time of the last typing frame sent
+        self._typing_sent: dict[tuple[int, int], float] = {}
+
+    def is_tracked(self, user_id: int) -> bool:
+        """True if the user already has a socket and their friends are loaded."""
+        return user_id in self._friends
+
+    def connected(self, user_id: int, friend_ids) -> list[int]:
+        """
+        Register the user's first socket.
+
+        Returns the friends that are online right now, so the new socket
+        can be sent a snapshot.
+        """
+        friends = frozenset(friend_ids)
+        self._friends[user_id] = friends
+        for friend_id in friends:
+            self._watchers.setdefault(friend_id, set()).add(user_id)
+
+        self._pending[user_id] = True
+        return sorted(f for f in friends if self.is_online(f))
+
+    def disconnected(self, user_id: int) -> None:
+        """Register that the user's last socket closed."""
+        for friend_id in self._friends.pop(user_id, frozenset()):
+            watchers = self._watchers.get(friend_id)
+            if watchers is not None:
+                watchers.discard(user_id)
+                if not watchers:
+                    del self._watchers[friend_id]
+
+        self._pending[user_id] = False
+        self._last_seen[user_id] = _now_ms()
+
+    def is_online(self, user_id: int) -> bool:
+        return bool(self._registry.for_user(user_id))
+
+    def lookup(self, user_ids) -> list[dict]:
+        """Presence of many users from memory; no database access."""
+        now = _now_ms()
+        result = []
+        for user_id in user_ids:
+            online = self.is_online(user_id)
+            result.append(
+                {
+                    "user_id": user_id,
+                    "online": online,
+                    "last_seen": now if online else self._last_seen.get(user_id),
+                }
+            )
+        return result
+
+    def allow_typing(self, chat_id: int, user_id: int, now: float | None = None) -> bool:
+        """Throttle typing frames: True at most once per TYPING_WINDOW."""
+        now = time.monotonic() if now is None else now
+        key = (chat_id, user_id)
+        last = self._typing_sent.get(key)
+        if last is not None and now - last < TYPING_WINDOW:
+            return False
+        self._typing_sent[key] = now
+        return True
+
+    def flush(self, now: float | None = None) -> int:
+        """
+        Publish coalesced presence changes to watchers.
+
+        Returns the number of frames queued.
+        """
+        pending, self._pending = self._pending, {}
+        sent = 0
+
+        for user_id, online in pending.items():
+            # Only real state changes leave the process
+            if online == (user_id in self._published):
+                continue
+            if online:
+                self._published.add(user_id)
+            else:
+                self._published.discard(user_id)
+
+            frame = {
+                "v": PROTOCOL_VERSION,
+                "type": "presence",
+                "user_id": user_id,
+                "online": online,
+                "ts": _now_ms(),
+            }
+            for watcher_id in self._watchers.get(user_id, ()):
+                sent += fan_out(
+                    self._registry.for_user(watcher_id),
+                    frame,
+                    structured_only=True,
+                )
+
+        self._prune_typing(now)
+        return sent
+
+    async def run_flusher(self, interval: float = PRESENCE_WINDOW) -> None:
+        """Background task: flush() forever. Started from app lifespan."""
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+    def _prune_typing(self, now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        expired = [k for k, t in self._typing_sent.items() if now - t >= TYPING_WINDOW]
+        for key in expired:
+            del self._typing_sent[key]
+
+
+def presence_snapshot_frame(online_friend_ids: list[int]) -> dict:
+    """Sent once to a new socket: which friends are online right now."""
+    return {"v": PROTOCOL_VERSION, "type": "presence_snapshot", "online": online_friend_ids}
+
+
+def typing_frame(chat_id: int, user_id: int) -> dict:
+    return {"v": PROTOCOL_VERSION, "type": "typing", "chat_id": chat_id, "user_id": user_id}
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
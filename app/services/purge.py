@@ -0,0 +1,424 @@
+# app/services/purge.py
+
+"""
+Deleting big groups and accounts without one huge transaction.
+
+1. The request marks the parent (deleted_at) and returns 202 at once.
+   A marked group answers 404 everywhere; a marked user can no longer
+   authenticate. Their content disappears as the worker gets to it.
+2. The purge worker (run_purger, started from app lifespan) removes the
+   children in batches of PURGE_BATCH rows, one short transaction per
+   batch, then deletes the parent row.
+
+Every batch is a set-based DELETE ... WHERE id IN (SELECT id ... LIMIT n)
+over an indexed column, so memory and time per batch stay the same no
+matter how many children there are. The marker lives in the database:
+after a restart the worker simply continues with the marked rows.
+
+Counters of other entities (friends of a deleted user, groups they were
+a member of, ...) are bumped in the same transaction as each batch.
+In-memory caches (member sets, block lists) are updated only after the
+batch commits, so a reload in between cannot cache the old rows again.
+"""
+
+import asyncio
+import logging
+from collections import Counter as Tally
+from datetime import datetime
+from functools import partial
+
+from sqlalchemy import and_, delete, exists, func, or_, select, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.block import UserBlock
+from app.models.change_log import ChangeLogEntry
+from app.models.comment import Comment
+from app.models.conversation import Conversation
+from app.models.counter import Counter
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.notification import Notification
+from app.models.post_image import PostImage
+from app.models.posts import Post
+from app.models.reaction import Reaction
+from app.models.tag import PostTag
+from app.models.timeline import TimelineEntry
+from app.models.user import User, user_friends
+from app.services.counters import (
+    GROUP_MEMBERS,
+    GROUP_POST_COMMENTS,
+    GROUP_POST_REACTIONS,
+    GROUP_POSTS,
+    PENDING_REQUESTS,
+    POST_COMMENTS,
+    POST_REACTIONS,
+    UNREAD_NOTIFICATIONS,
+    USER_FRIENDS,
+    USER_POSTS,
+    bump,
+)
+from app.services.blocks import invalidate_hidden_sets
+from app.services.change_log import FRIEND, FRIEND_REQUEST, POST, group_changed, record
+from app.services.comments import delete_comments, subtree
+from app.services.membership_cache import group_members
+from app.services.notifications import delete_notifications
+from app.services.reactions import delete_reactions
+
+logger = logging.getLogger(__name__)
+
+
+# Child rows deleted per transaction
+PURGE_BATCH = 500
+
+# Seconds between two checks for new work when idle
+PURGE_POLL_INTERVAL = 5.0
+
+
+def mark_group_deleted(db: Session, group: Group) -> None:
+    """Hide the group now; the purge worker removes it later."""
+    group.deleted_at = datetime.utcnow()
+    # Members sync a tombstone (while the memberships still exist)
+    group_changed(db, group.id, deleted=True)
+    db.commit()
+    # Chat room sockets re-check membership and find no group
+    group_members.invalidate(group.id)
+
+
+def mark_user_deleted(db: Session, user: User) -> None:
+    """Disable the account now; the purge worker removes it later."""
+    user.deleted_at = datetime.utcnow()
+    user.is_active = False
+    db.commit()
+
+
+def purge_step(db: Session, batch_size: int = PURGE_BATCH) -> bool:
+    """
+    Do one batch of purge work and commit it.
+
+    Groups go first, because purging a user first marks their groups.
+    Returns False when there is nothing left to purge.
+    """
+    # Cache updates of the batch, run once it is committed
+    after_commit = []
+
+    group_id = db.execute(
+        select(Group.id).where(Group.deleted_at.is_not(None)).order_by(Group.deleted_at).limit(1)
+    ).scalar()
+    if group_id is not None:
+        _purge_group_batch(db, group_id, batch_size, after_commit)
+    else:
+        user_id = db.execute(
+            select(User.id).where(User.deleted_at.is_not(None)).order_by(User.deleted_at).limit(1)
+        ).scalar()
+        if user_id is None:
+            return False
+        _purge_user_batch(db, user_id, batch_size, after_commit)
+
+    db.commit()
+    for update_cache in after_commit:
+        update_cache()
+    return True
+
+
+async def run_purger(session_factory, interval: float = PURGE_POLL_INTERVAL) -> None:
+    """
+    Background task: run purge_step() until nothing is marked, then poll.
+
+    Each batch runs in the threadpool with its own session, and the
+    event loop gets control back between batches.
+    """
+
+    def _step() -> bool:
+        db = session_factory()
+        try:
+            return purge_step(db)
+        finally:
+            db.close()
+
+    while True:
+        try:
+            while await run_in_threadpool(_step):
+                await asyncio.sleep(0)
+        except Exception:
+            logger.exception("Purge batch failed")
+        await asyncio.sleep(interval)
+
+
+def _delete_batch(db: Session, model, condition, batch_size: int) -> int:
+    """DELETE up to batch_size rows of model matching condition; returns the row count."""
+    ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+    return db.execute(delete(model).where(model.id.in_(ids))).rowcount
+
+
+def _delete_counter_batch(db: Session, name: str, entity_ids, batch_size: int) -> int:
+    """DELETE the counter rows of up to batch_size of these entities; returns the row count."""
+    ids = (
+        select(Counter.entity_id)
+        .where(Counter.name == name, Counter.entity_id.in_(entity_ids))
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    return db.execute(
+        delete(Counter).where(Counter.name == name, Counter.entity_id.in_(ids))
+    ).rowcount
+
+
+def _purge_group_batch(db: Session, group_id: int, batch_size: int, after_commit: list) -> None:
+    """
+    One batch of a group purge: chat room, timelines, images, tags,
+    notifications, reactions, comments, posts, memberships, then the group.
+    """
+    room_id = db.execute(
+        select(Conversation.id).where(Conversation.group_id == group_id)
+    ).scalar()
+    if room_id is not None:
+        if _delete_batch(db, Message, Message.conversation_id == room_id, batch_size):
+            return
+        db.execute(delete(Conversation).where(Conversation.id == room_id))
+        return
+
+    if _delete_batch(db, TimelineEntry, TimelineEntry.group_id == group_id, batch_size):
+        return
+    group_posts = select(GroupPost.id).where(GroupPost.group_id == group_id)
+    if _delete_batch(db, PostImage, PostImage.group_post_id.in_(group_posts), batch_size):
+        return
+    if _delete_batch(db, PostTag, PostTag.group_id == group_id, batch_size):
+        return
+    if delete_notifications(db, Notification.group_id == group_id, batch_size):
+        return
+    if _delete_batch(db, Reaction, Reaction.group_id == group_id, batch_size):
+        return
+    if _delete_counter_batch(db, GROUP_POST_REACTIONS, group_posts, batch_size):
+        return
+    if delete_comments(db, Comment.group_id == group_id, batch_size):
+        return
+    if _delete_counter_batch(db, GROUP_POST_COMMENTS, group_posts, batch_size):
+        return
+    if _delete_batch(db, GroupPost, GroupPost.group_id == group_id, batch_size):
+        return
+    if _delete_batch(db, GroupMembership, GroupMembership.group_id == group_id, batch_size):
+        return
+
+    db.execute(
+        delete(Counter).where(
+            Counter.name.in_([GROUP_MEMBERS, GROUP_POSTS]),
+            Counter.entity_id == group_id,
+        )
+    )
+    db.execute(delete(Group).where(Group.id == group_id))
+    after_commit.append(partial(group_members.invalidate, group_id))
+    logger.info("Purged group %s", group_id)
+
+
+def _purge_user_batch(db: Session, user_id: int, batch_size: int, after_commit: list) -> None:
+    """
+    One batch of an account purge. Each step returns as soon as it did
+    some work; the next call continues where it stopped.
+    """
+    # Their groups go with them (purged first, see purge_step)
+    marked = db.execute(
+        update(Group)
+        .where(Group.owner_id == user_id, Group.deleted_at.is_(None))
+        .values(deleted_at=datetime.utcnow())
+        .returning(Group.id)
+    ).scalars().all()
+    if marked:
+        for group_id in marked:
+            group_changed(db, group_id, deleted=True)
+        return
+
+    # Their sync log, and their posts in friends' logs (friends get a
+    # friend tombstone below, which drops the posts on the client)
+    if _delete_batch(db, ChangeLogEntry, ChangeLogEntry.user_id == user_id, batch_size):
+        return
+    their_posts = select(Post.id).where(Post.user_id == user_id)
+    if _delete_batch(
+        db,
+        ChangeLogEntry,
+        and_(ChangeLogEntry.kind == POST, ChangeLogEntry.entity_id.in_(their_posts)),
+        batch_size,
+    ):
+        return
+
+    # Images of their posts and group posts (image files are shared by content and stay)
+    if _delete_batch(db, PostImage, PostImage.uploader_id == user_id, batch_size):
+        return
+    # Hashtags of their posts and group posts
+    if _delete_batch(db, PostTag, PostTag.user_id == user_id, batch_size):
+        return
+    # Notifications to them, and those they caused (others' unread counts drop)
+    if delete_notifications(
+        db, or_(Notification.user_id == user_id, Notification.actor_id == user_id), batch_size
+    ):
+        return
+    # Their reactions (other posts' counts drop), then reactions to and
+    # counters of their own posts
+    if delete_reactions(db, Reaction.user_id == user_id, batch_size):
+        return
+    their_group_posts = select(GroupPost.id).where(GroupPost.user_id == user_id)
+    if _delete_batch(
+        db,
+        Reaction,
+        or_(Reaction.post_id.in_(their_posts), Reaction.group_post_id.in_(their_group_posts)),
+        batch_size,
+    ):
+        return
+    if _delete_counter_batch(db, POST_REACTIONS, their_posts, batch_size):
+        return
+    if _delete_counter_batch(db, GROUP_POST_REACTIONS, their_group_posts, batch_size):
+        return
+    # Their comments with the replies below them (others' threads lose
+    # them), then comments on their posts and those posts' counters
+    comment = db.execute(
+        select(Comment).where(Comment.user_id == user_id).order_by(Comment.depth).limit(1)
+    ).scalar()
+    if comment is not None:
+        delete_comments(db, subtree(comment), batch_size)
+        return
+    if delete_comments(
+        db,
+        or_(Comment.post_id.in_(their_posts), Comment.group_post_id.in_(their_group_posts)),
+        batch_size,
+    ):
+        return
+    if _delete_counter_batch(db, POST_COMMENTS, their_posts, batch_size):
+        return
+    if _delete_counter_batch(db, GROUP_POST_COMMENTS, their_group_posts, batch_size):
+        return
+    if _delete_batch(db, Post, Post.user_id == user_id, batch_size):
+        return
+
+    # Their home timeline, and their group posts in other members' timelines
+    if _delete_batch(db, TimelineEntry, TimelineEntry.user_id == user_id, batch_size):
+        return
+    if _delete_batch(db, TimelineEntry, TimelineEntry.group_post_id.in_(their_group_posts), batch_size):
+        return
+
+    # Posts and memberships in other groups: keep those groups' counters right
+    rows = db.execute(
+        select(GroupPost.id, GroupPost.group_id).where(GroupPost.user_id == user_id).limit(batch_size)
+    ).all()
+    if rows:
+        db.execute(delete(GroupPost).where(GroupPost.id.in_([r.id for r in rows])))
+        for group_id, count in Tally(r.group_id for r in rows).items():
+            bump(db, GROUP_POSTS, group_id, -count)
+        return
+
+    rows = db.execute(
+        select(GroupMembership.id, GroupMembership.group_id)
+        .where(GroupMembership.user_id == user_id)
+        .limit(batch_size)
+    ).all()
+    if rows:
+        db.execute(delete(GroupMembership).where(GroupMembership.id.in_([r.id for r in rows])))
+        for row in rows:
+            bump(db, GROUP_MEMBERS, row.group_id, -1)
+            after_commit.append(partial(group_members.discard, row.group_id, user_id))
+        return
+
+    # Friendships are stored in both directions
+    friend_ids = db.execute(
+        select(user_friends.c.user_id).where(user_friends.c.friend_id == user_id).limit(batch_size)
+    ).scalars().all()
+    if friend_ids:
+        db.execute(
+            delete(user_friends).where(
+                user_friends.c.friend_id == user_id,
+                user_friends.c.user_id.in_(friend_ids),
+            )
+        )
+        db.execute(
+            delete(user_friends).where(
+                user_friends.c.user_id == user_id,
+                user_friends.c.friend_id.in_(friend_ids),
+            )
+        )
+        for friend_id in friend_ids:
+            bump(db, USER_FRIENDS, friend_id, -1)
+        record(db, friend_ids, FRIEND, user_id, deleted=True)
+        return
+
+    # One-sided rows, if any
+    one_sided = (
+        select(user_friends.c.friend_id)
+        .where(user_friends.c.user_id == user_id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    if db.execute(
+        delete(user_friends).where(
+            user_friends.c.user_id == user_id,
+            user_friends.c.friend_id.in_(one_sided),
+        )
+    ).rowcount:
+        return
+
+    rows = db.execute(
+        select(FriendRequest.id, FriendRequest.to_user_id, FriendRequest.status)
+        .where(or_(FriendRequest.from_user_id == user_id, FriendRequest.to_user_id == user_id))
+        .limit(batch_size)
+    ).all()
+    if rows:
+        db.execute(delete(FriendRequest).where(FriendRequest.id.in_([r.id for r in rows])))
+        for row in rows:
+            if row.status == RequestStatus.pending and row.to_user_id != user_id:
+                bump(db, PENDING_REQUESTS, row.to_user_id, -1)
+                record(db, [row.to_user_id], FRIEND_REQUEST, row.id, deleted=True)
+        return
+
+    # Blocks and mutes both ways; the other users' cached lists go too
+    rows = db.execute(
+        select(UserBlock.user_id, UserBlock.target_id)
+        .where(or_(UserBlock.user_id == user_id, UserBlock.target_id == user_id))
+        .limit(batch_size)
+    ).all()
+    if rows:
+        theirs = [row.target_id for row in rows if row.user_id == user_id]
+        others = [row.user_id for row in rows if row.user_id != user_id]
+        db.execute(delete(UserBlock).where(UserBlock.user_id == user_id, UserBlock.target_id.in_(theirs)))
+        db.execute(delete(UserBlock).where(UserBlock.target_id == user_id, UserBlock.user_id.in_(others)))
+        after_commit.append(partial(invalidate_hidden_sets, user_id, *theirs, *others))
+        return
+
+    # Direct chats: all messages of both sides, then the chat
+    convo_id = db.execute(
+        select(Conversation.id)
+        .where(or_(Conversation.user1_id == user_id, Conversation.user2_id == user_id))
+        .limit(1)
+    ).scalar()
+    if convo_id is not None:
+        if not _delete_batch(db, Message, Message.conversation_id == convo_id, batch_size):
+            db.execute(delete(Conversation).where(Conversation.id == convo_id))
+        return
+
+    # Messages they sent in group rooms
+    if _delete_batch(db, Message, Message.sender_id == user_id, batch_size):
+        return
+
+    # Rooms whose last message is gone point at the newest remaining one
+    newest = (
+        select(func.max(Message.id))
+        .where(Message.conversation_id == Conversation.id)
+        .scalar_subquery()
+    )
+    db.execute(
+        update(Conversation)
+        .where(
+            Conversation.group_id.is_not(None),
+            Conversation.last_message_id.is_not(None),
+            ~exists().where(Message.id == Conversation.last_message_id),
+        )
+        .values(last_message_id=newest)
+    )
+
+    db.execute(
+        delete(Counter).where(
+            Counter.name.in_([USER_POSTS, USER_FRIENDS, PENDING_REQUESTS, UNREAD_NOTIFICATIONS]),
+            Counter.entity_id == user_id,
+        )
+    )
+    db.execute(delete(User).where(User.id == user_id))
+    logger.info("Purged user %s", user_id)
@@ -0,0 +1,353 @@
+# app/services/reactions.py
+
+"""
+Reactions ("like", "love", ...) on wall posts and group posts.
+
+Who reacted how is a row per (user, post) in reactions, written and
+committed by the request itself. How many reactions a post has is a
+counter (POST_REACTIONS / GROUP_POST_REACTIONS in app.services.counters),
+but unlike the other counters it is written behind:
+
+1. A request that adds or removes a reaction only adds +1/-1 to an
+   in-memory delta for the post (ReactionCounts.add), after its commit.
+2. The flusher task (app lifespan) writes all deltas every
+   REACTION_FLUSH_INTERVAL with one upsert per counter name and one
+   commit, however many reactions arrived in between.
+3. Readers add the deltas that are not written yet to the stored value,
+   so counts are exact within this process.
+
+A post taking thousands of reactions per second therefore costs one
+counter write per interval instead of one per reaction, and reactions
+never queue behind each other on the counter row.
+
+Deltas live in process memory: a crash loses at most one interval of
+them, and the counter reconciler repairs the counts from the rows. The
+reconciler leaves room for the deltas not written yet (the counters are
+registered with register_write_behind), so it never counts them twice.
+With several workers, each one sees the others' reactions after their
+next flush.
+"""
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.counter import Counter
+from app.models.group import GroupPost
+from app.models.posts import Post
+from app.models.reaction import Reaction
+from app.schemas.reaction import ReactionState
+from app.services.counters import (
+    GROUP_POST_REACTIONS,
+    POST_REACTIONS,
+    RECONCILE_CHUNK,
+    bump_many,
+    counter_value,
+    counter_values,
+    register_write_behind,
+)
+
+logger = logging.getLogger(__name__)
+
+
+REACTION_KINDS = ("like", "love", "haha", "wow", "sad", "angry")
+
+# Seconds between two counter flushes
+REACTION_FLUSH_INTERVAL = 1.0
+
+# Item kinds, as in FeedItem.kind
+POST, GROUP_POST = "post", "group_post"
+_COUNTERS = {POST: POST_REACTIONS, GROUP_POST: GROUP_POST_REACTIONS}
+_COLUMNS = {POST: Reaction.post_id, GROUP_POST: Reaction.group_post_id}
+
+
+class ReactionCounts:
+    def __init__(self):
+        # Changed from request threads, written by the flusher task
+        self._lock = threading.Lock()
+        # (counter name, entity id) -> delta not written yet
+        self._pending: dict[tuple[str, int], int] = {}
+        # The batch being written: still counted until its commit is done
+        self._flushing: dict[tuple[str, int], int] = {}
+
+    def add(self, name: str, entity_id: int, delta: int) -> None:
+        key = (name, entity_id)
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + delta
+
+    def discard(self, name: str, entity_id: int) -> None:
+        """Forget the delta of a deleted post."""
+        with self._lock:
+            self._pending.pop((name, entity_id), None)
+
+    def pending(self) -> int:
+        """Number of counters with a delta not written yet."""
+        return len(self._pending)
+
+    def unflushed(self, name: str, entity_ids) -> dict[int, int]:
+        """{entity_id: delta} not in the counters table yet (0 for most ids)."""
+        with self._lock:
+            return {
+                entity_id: self._pending.get((name, entity_id), 0)
+                + self._flushing.get((name, entity_id), 0)
+                for entity_id in entity_ids
+            }
+
+    def unwritten(self, name: str) -> dict[int, int]:
+        """Every non-zero delta of one counter name not in the counters table yet."""
+        with self._lock:
+            deltas: dict[int, int] = defaultdict(int)
+            for source in (self._pending, self._flushing):
+                for (key_name, entity_id), delta in source.items():
+                    if key_name == name:
+                        deltas[entity_id] += delta
+        return {entity_id: delta for entity_id, delta in deltas.items() if delta}
+
+    def flush(self, db: Session) -> int:
+        """
+        Write every pending delta and commit: one upsert statement per
+        counter name. Returns the number of counters written; the deltas
+        of a failed flush are kept for the next one.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._flushing = batch
+        if not batch:
+            return 0
+
+        try:
+            by_name: dict[str, dict[int, int]] = defaultdict(dict)
+            for (name, entity_id), delta in batch.items():
+                if delta:
+                    by_name[name][entity_id] = delta
+            for name, deltas in by_name.items():
+                bump_many(db, name, deltas)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for key, delta in batch.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                self._flushing = {}
+            raise
+
+        with self._lock:
+            self._flushing = {}
+        return len(batch)
+
+    async def run(self, session_factory, interval: float = REACTION_FLUSH_INTERVAL) -> None:
+        """
+        Background task (app lifespan): flush every interval; flush the
+        rest on shutdown.
+        """
+
+        def _flush() -> int:
+            db = session_factory()
+            try:
+                return self.flush(db)
+            finally:
+                db.close()
+
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if not self.pending():
+                    continue
+                try:
+                    await run_in_threadpool(_flush)
+                except Exception:
+                    logger.exception("Reaction counter flush failed")
+        finally:
+            # Shutdown: blocking is fine here, the app is stopping
+            try:
+                _flush()
+            except Exception:
+                logger.exception("Final reaction counter flush failed")
+
+
+# ---------- finding the post ----------
+def get_post_or_404(db: Session, post_id: int) -> Post:
+    post = db.get(Post, post_id)
+    if post is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Post not found")
+    return post
+
+
+# ---------- reacting ----------
+def _item_kind(post: Post | GroupPost) -> str:
+    return GROUP_POST if isinstance(post, GroupPost) else POST
+
+
+def react(db: Session, user_id: int, post: Post | GroupPost, kind: str) -> ReactionState:
+    """
+    Add the user's reaction to a post, or change its kind, and commit.
+    Reacting twice with the same kind changes nothing.
+    """
+    if kind not in REACTION_KINDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"kind must be one of {', '.join(REACTION_KINDS)}.",
+        )
+    item_kind = _item_kind(post)
+    column = _COLUMNS[item_kind]
+
+    # 1) Insert; an existing reaction (unique index) makes this a no-op
+    added = db.execute(
+        insert(Reaction)
+        .values({
+            Reaction.user_id: user_id,
+            column: post.id,
+            Reaction.group_id: getattr(post, "group_id", None),
+            Reaction.kind: kind,
+            Reaction.created_at: datetime.utcnow(),
+        })
+        .on_conflict_do_nothing()
+    ).rowcount
+
+    # 2) ... in which case only the kind changes
+    if not added:
+        db.execute(
+            update(Reaction)
+            .where(Reaction.user_id == user_id, column == post.id)
+            .values(kind=kind)
+        )
+    db.commit()
+
+    # 3) The count is written behind
+    if added:
+        reaction_counts.add(_COUNTERS[item_kind], post.id, 1)
+    return ReactionState(
+        reaction_count=reaction_count(db, item_kind, post.id),
+        has_reacted=True,
+        my_reaction=kind,
+    )
+
+
+def unreact(db: Session, user_id: int, post: Post | GroupPost) -> ReactionState:
+    """Remove the user's reaction to a post (if any) and commit."""
+    item_kind = _item_kind(post)
+    removed = db.execute(
+        delete(Reaction).where(Reaction.user_id == user_id, _COLUMNS[item_kind] == post.id)
+    ).rowcount
+    db.commit()
+
+    if removed:
+        reaction_counts.add(_COUNTERS[item_kind], post.id, -removed)
+    return ReactionState(
+        reaction_count=reaction_count(db, item_kind, post.id),
+        has_reacted=False,
+    )
+
+
+# ---------- reading ----------
+def reaction_count(db: Session, item_kind: str, post_id: int) -> int:
+    """Stored counter plus the delta not written yet."""
+    name = _COUNTERS[item_kind]
+    return counter_value(db, name, post_id) + reaction_counts.unflushed(name, [post_id])[post_id]
+
+
+def reaction_counts_of(db: Session, item_kind: str, post_ids) -> dict[int, int]:
+    """reaction_count() for many posts of one kind: one counter query."""
+    name = _COUNTERS[item_kind]
+    post_ids = list(post_ids)
+    stored = counter_values(db, name, post_ids)
+    unflushed = reaction_counts.unflushed(name, post_ids)
+    return {post_id: stored[post_id] + unflushed[post_id] for post_id in post_ids}
+
+
+def reacted_ids(db: Session, user_id: int, item_kind: str, post_ids) -> set[int]:
+    """
+    Which of these posts the user reacted to: one lookup on the
+    (user_id, post) unique index per RECONCILE_CHUNK ids.
+    """
+    column = _COLUMNS[item_kind]
+    post_ids = list(post_ids)
+    found: set[int] = set()
+    for start in range(0, len(post_ids), RECONCILE_CHUNK):
+        chunk = post_ids[start:start + RECONCILE_CHUNK]
+        found.update(
+            db.execute(
+                select(column).where(Reaction.user_id == user_id, column.in_(chunk))
+            ).scalars()
+        )
+    return found
+
+
+def embed_reactions(db: Session, user_id: int, rows, item_kind: str | None = None):
+    """
+    Set reaction_count and has_reacted on every row of a listing: two
+    queries per item kind, however many rows.
+
+    - ORM rows (Post, GroupPost): pass item_kind ("post", "group_post")
+    - FeedItem: item_kind=None reads each item's own kind
+
+    Returns rows.
+    """
+    rows = list(rows)
+    ids_by_kind: dict[str, list[int]] = defaultdict(list)
+    for row in rows:
+        ids_by_kind[item_kind or row.kind].append(row.id)
+
+    counts, reacted = {}, {}
+    for kind, ids in ids_by_kind.items():
+        counts[kind] = reaction_counts_of(db, kind, ids)
+        reacted[kind] = reacted_ids(db, user_id, kind, ids)
+
+    for row in rows:
+        kind = item_kind or row.kind
+        row.reaction_count = counts[kind][row.id]
+        row.has_reacted = row.id in reacted[kind]
+    return rows
+
+
+# ---------- deleting ----------
+def delete_post_reactions(db: Session, post_id: int) -> None:
+    """Reactions and counter of a deleted wall post. Does not commit."""
+    db.execute(delete(Reaction).where(Reaction.post_id == post_id))
+    db.execute(
+        delete(Counter).where(Counter.name == POST_REACTIONS, Counter.entity_id == post_id)
+    )
+    reaction_counts.discard(POST_REACTIONS, post_id)
+
+
+def delete_reactions(db: Session, condition, limit: int | None = None) -> int:
+    """
+    Delete reactions matching condition (up to limit), lowering the
+    stored counts of the posts they were on. Does not commit; returns the
+    count.
+    """
+    query = select(Reaction.id, Reaction.post_id, Reaction.group_post_id).where(condition)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.execute(query).all()
+    if not rows:
+        return 0
+
+    db.execute(delete(Reaction).where(Reaction.id.in_([row.id for row in rows])))
+    deltas: dict[str, dict[int, int]] = {POST_REACTIONS: {}, GROUP_POST_REACTIONS: {}}
+    for row in rows:
+        if row.post_id is not None:
+            key, post_id = POST_REACTIONS, row.post_id
+        else:
+            key, post_id = GROUP_POST_REACTIONS, row.group_post_id
+        deltas[key][post_id] = deltas[key].get(post_id, 0) - 1
+    for name, post_deltas in deltas.items():
+        bump_many(db, name, post_deltas)
+    return len(rows)
+
+
+# Shared by the write paths (add) and the app lifespan (run)
+reaction_counts = ReactionCounts()
+
+# The reconciler asks the instance in use at the time (tests swap it)
+register_write_behind(
+    (POST_REACTIONS, GROUP_POST_REACTIONS), lambda name: reaction_counts.unwritten(name)
+)
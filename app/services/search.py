@@ -0,0 +1,305 @@
+# app/services/search.py
+
+"""
+GET /search: full-text search over everything a user can read.
+
+- wall posts of the user and their friends (posts_fts)
+- posts of groups they are a member of (group_posts_fts)
+- messages of their direct chats and group rooms (messages_fts)
+- text found in images of those posts (post_images_fts, filled by OCR);
+  a match is reported as the post the image belongs to
+
+The FTS5 indexes are kept in sync by triggers (app.db.fts), so writing
+posts and messages needs no extra code.
+
+Everything runs as one statement: one SELECT per source joins the FTS
+matches to their rows and applies the visibility rules (friendship,
+group membership, chat participation) right there, so rows the user
+may not see never leave the database. The sources are combined with
+UNION ALL, a post found twice (text and image) is kept once with its
+best rank, and the page is cut with keyset pagination on
+(rank, kind, id). Snippets are made afterwards, for the rows of the
+page only. Hits by users the searcher blocked or muted, or who blocked
+them, are dropped in the same statement (app.services.blocks).
+
+rank is the bm25 score of the source index (lower is better). Scores of
+different indexes are close enough to merge, not exactly comparable.
+"""
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, literal, null, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.conversation import Conversation
+from app.models.group import Group, GroupPost, group_posts_fts
+from app.models.group_membership import GroupMembership
+from app.models.message import Message, messages_fts
+from app.models.post_image import PostImage, post_images_fts
+from app.models.posts import Post, posts_fts
+from app.models.user import user_friends
+from app.schemas.search import SearchHit, SearchPage
+from app.services.blocks import hidden_set, visible
+from app.services.fts import fts_prefix_query
+
+
+# Sort order of the kinds at the same rank (part of the cursor)
+POST, GROUP_POST, MESSAGE = 0, 1, 2
+_KINDS = {"post": POST, "group_post": GROUP_POST, "message": MESSAGE}
+_KIND_NAMES = {kind: name for name, kind in _KINDS.items()}
+
+SEARCH_KINDS = tuple(_KINDS)
+
+# Marks around matched words in SearchHit.snippet, and its length in words
+SNIPPET_START, SNIPPET_END = "[", "]"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_WORDS = 12
+
+
+def _snippet(index):
+    return func.snippet(
+        index.c[index.name], 0, SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_WORDS
+    )
+
+
+def _matches(index, match: str):
+    return index.c[index.name].op("MATCH")(match)
+
+
+# Indexes a hit can come from; a hit remembers (source, source_id) so the
+# snippet is made later for the rows of the page only
+_INDEXES = (posts_fts, post_images_fts, group_posts_fts, messages_fts)
+
+
+def _source(index) -> tuple:
+    return (
+        literal(_INDEXES.index(index)).label("source"),
+        index.c.rowid.label("source_id"),
+    )
+
+
+def _snippets(db: Session, match: str, rows) -> dict:
+    """(source, source_id) -> snippet, one small query per index on the page."""
+    wanted: dict[int, list[int]] = {}
+    for row in rows:
+        wanted.setdefault(row.source, []).append(row.source_id)
+
+    snippets = {}
+    for source, rowids in wanted.items():
+        index = _INDEXES[source]
+        result = db.execute(
+            select(index.c.rowid, _snippet(index)).where(
+                _matches(index, match), index.c.rowid.in_(rowids)
+            )
+        )
+        for rowid, snippet in result:
+            snippets[source, rowid] = snippet
+    return snippets
+
+
+def _post_sources(user_id: int, match: str) -> list:
+    """Wall posts of the user and their friends: by text and by image text."""
+    visible = or_(
+        Post.user_id == user_id,
+        Post.user_id.in_(
+            select(user_friends.c.friend_id).where(user_friends.c.user_id == user_id)
+        ),
+    )
+    columns = (
+        literal(POST).label("kind"),
+        Post.id.label("id"),
+        Post.user_id.label("user_id"),
+        null().label("group_id"),
+        null().label("conversation_id"),
+        Post.created_at.label("created_at"),
+    )
+    by_text = (
+        select(*columns, posts_fts.c.rank.label("rank"), *_source(posts_fts))
+        .join(posts_fts, posts_fts.c.rowid == Post.id)
+        .where(_matches(posts_fts, match), visible)
+    )
+    by_image = (
+        select(
+            *columns,
+            post_images_fts.c.rank.label("rank"),
+            *_source(post_images_fts),
+        )
+        .select_from(post_images_fts)
+        .join(PostImage, PostImage.id == post_images_fts.c.rowid)
+        .join(Post, Post.id == PostImage.post_id)
+        .where(_matches(post_images_fts, match), visible)
+    )
+    return [by_text, by_image]
+
+
+def _group_post_sources(my_groups, match: str) -> list:
+    """Posts of the user's groups: by text and by image text."""
+    visible = GroupPost.group_id.in_(my_groups)
+    columns = (
+        literal(GROUP_POST).label("kind"),
+        GroupPost.id.label("id"),
+        GroupPost.user_id.label("user_id"),
+        GroupPost.group_id.label("group_id"),
+        null().label("conversation_id"),
+        GroupPost.created_at.label("created_at"),
+    )
+    by_text = (
+        select(
+            *columns,
+            group_posts_fts.c.rank.label("rank"),
+            *_source(group_posts_fts),
+        )
+        .join(group_posts_fts, group_posts_fts.c.rowid == GroupPost.id)
+        .where(_matches(group_posts_fts, match), visible)
+    )
+    by_image = (
+        select(
+            *columns,
+            post_images_fts.c.rank.label("rank"),
+            *_source(post_images_fts),
+        )
+        .select_from(post_images_fts)
+        .join(PostImage, PostImage.id == post_images_fts.c.rowid)
+        .join(GroupPost, GroupPost.id == PostImage.group_post_id)
+        .where(_matches(post_images_fts, match), visible)
+    )
+    return [by_text, by_image]
+
+
+def _message_sources(user_id: int, my_groups, match: str) -> list:
+    """Messages of the user's direct chats and of their groups' rooms."""
+    return [
+        select(
+            literal(MESSAGE).label("kind"),
+            Message.id.label("id"),
+            Message.sender_id.label("user_id"),
+            Conversation.group_id.label("group_id"),
+            Message.conversation_id.label("conversation_id"),
+            Message.timestamp.label("created_at"),
+            messages_fts.c.rank.label("rank"),
+            *_source(messages_fts),
+        )
+        .select_from(messages_fts)
+        .join(Message, Message.id == messages_fts.c.rowid)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(
+            _matches(messages_fts, match),
+            or_(
+                Conversation.user1_id == user_id,
+                Conversation.user2_id == user_id,
+                Conversation.group_id.in_(my_groups),
+            ),
+        )
+    ]
+
+
+def search(
+    db: Session,
+    user_id: int,
+    q: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    kinds=SEARCH_KINDS,
+) -> SearchPage:
+    """
+    One page of search results, best matches first.
+
+    - q: words to find; the last one also matches as a prefix
+    - kinds: which of "post", "group_post", "message" to search
+    - Next page: ?cursor=<next_cursor> with the same q and kinds
+    """
+    match = fts_prefix_query(q)
+    if match is None or not kinds:
+        return SearchPage(items=[])
+
+    # 1) Groups the user may read (member of, not being deleted)
+    my_groups = (
+        select(GroupMembership.group_id)
+        .join(Group, Group.id == GroupMembership.group_id)
+        .where(GroupMembership.user_id == user_id, Group.deleted_at.is_(None))
+    )
+
+    # 2) One SELECT per source, visibility included
+    sources = []
+    if "post" in kinds:
+        sources += _post_sources(user_id, match)
+    if "group_post" in kinds:
+        sources += _group_post_sources(my_groups, match)
+    if "message" in kinds:
+        sources += _message_sources(user_id, my_groups, match)
+    found = union_all(*sources).subquery("found")
+
+    # 3) A post matched by its text and an image counts once, with its
+    #    best rank. SQLite takes the other (bare) columns from the row
+    #    with the MIN, so source is the index of the best match. Authors
+    #    the user does not want to see are left out here.
+    hits = (
+        select(
+            found.c.kind,
+            found.c.id,
+            found.c.user_id,
+            found.c.group_id,
+            found.c.conversation_id,
+            found.c.created_at,
+            func.min(found.c.rank).label("rank"),
+            found.c.source,
+            found.c.source_id,
+        )
+        .where(visible(found.c.user_id, hidden_set(db, user_id)))
+        .group_by(found.c.kind, found.c.id)
+        .subquery("hits")
+    )
+
+    # 4) Keyset page on (rank, kind, id)
+    query = select(hits)
+    if cursor:
+        last_rank, last_kind, last_id = decode_cursor(cursor, 3)
+        if (
+            not isinstance(last_rank, (int, float))
+            or isinstance(last_rank, bool)
+            or type(last_kind) is not int
+            or last_kind not in _KIND_NAMES
+            or type(last_id) is not int
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor.",
+            )
+        query = query.where(
+            or_(
+                hits.c.rank > last_rank,
+                and_(hits.c.rank == last_rank, hits.c.kind > last_kind),
+                and_(hits.c.rank == last_rank, hits.c.kind == last_kind, hits.c.id > last_id),
+            )
+        )
+
+    # Fetch one extra row to know if there is a next page
+    rows = db.execute(
+        query.order_by(hits.c.rank, hits.c.kind, hits.c.id).limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # 5) Snippets for this page only (snippet() reads the matched text)
+    snippets = _snippets(db, match, rows)
+
+    items = [
+        SearchHit(
+            kind=_KIND_NAMES[row.kind],
+            id=row.id,
+            user_id=row.user_id,
+            group_id=row.group_id,
+            conversation_id=row.conversation_id,
+            created_at=row.created_at,
+            snippet=snippets.get((row.source, row.source_id), ""),
+        )
+        for row in rows
+    ]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.rank, last.kind, last.id)
+
+    return SearchPage(items=items, next_cursor=next_cursor)
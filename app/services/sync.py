@@ -0,0 +1,265 @@
+# app/services/sync.py
+
+"""
+Delta sync for clients (GET /sync): what changed since the last token.
+
+A token holds two watermarks and the time it was issued:
+
+- the last change_log id the client has seen (posts, friends, friend
+  requests, groups; see app.services.change_log)
+- the last message id the client has seen
+
+Messages are not copied into the log: the messages table already is an
+append-only log with increasing ids. New messages are "id > watermark"
+in the user's direct chats and the rooms of their groups, read over
+ix_messages_conversation_id_id; chats whose last_message_id is not newer
+are skipped before any message is touched.
+
+A sync reads the user's log rows after the watermark (a range on
+ix_change_log_user_id_id), then the current state of what they name,
+one query per kind. A row whose entity is gone, or no longer visible to
+the user (unfriended author, block, left group), comes out as a
+tombstone. The cost is a handful of statements plus the number of
+changes, whatever the size of the user's feed, friend list or groups.
+
+A missing token, or one older than SYNC_RETENTION (its rows may be
+compacted away), gets reset=True and a token for "now": the client
+loads its data in full once, then syncs from that token.
+"""
+
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.change_log import ChangeLogEntry
+from app.models.conversation import Conversation
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.posts import Post
+from app.models.user import user_friends
+from app.schemas.feed import FeedItem
+from app.schemas.group import GroupOut
+from app.schemas.sync import SyncChange, SyncMessage, SyncPage
+from app.services.blocks import hidden_set, visible
+from app.services.change_log import FRIEND, FRIEND_REQUEST, GROUP, POST, SYNC_RETENTION
+
+
+# Changes (and, separately, messages) per response
+DEFAULT_SYNC_LIMIT = 200
+MAX_SYNC_LIMIT = 1000
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _token(change_id: int, message_id: int, now: datetime) -> str:
+    issued_at = int((now - _EPOCH).total_seconds())
+    return encode_cursor(change_id, message_id, issued_at)
+
+
+def _read_token(token: str, now: datetime) -> tuple[int, int] | None:
+    """(change id, message id) of a token, or None if it expired. 400 if malformed."""
+    values = decode_cursor(token, 3)
+    # bool is a subclass of int, but never a valid id
+    if any(type(value) is not int for value in values):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+    change_id, message_id, issued_at = values
+    if _EPOCH + timedelta(seconds=issued_at) < now - SYNC_RETENTION:
+        return None
+    return change_id, message_id
+
+
+def sync(
+    db: Session,
+    user_id: int,
+    since: str | None = None,
+    limit: int = DEFAULT_SYNC_LIMIT,
+    now: datetime | None = None,
+) -> SyncPage:
+    """
+    Changes and messages after the token `since`, oldest first, at most
+    `limit` of each.
+    """
+    now = now or datetime.utcnow()
+
+    # 1) No token, or an expired one: start over from the newest ids
+    position = _read_token(since, now) if since else None
+    if position is None:
+        latest = db.execute(
+            select(
+                select(func.max(ChangeLogEntry.id)).scalar_subquery(),
+                select(func.max(Message.id)).scalar_subquery(),
+            )
+        ).one()
+        return SyncPage(reset=True, next_token=_token(latest[0] or 0, latest[1] or 0, now))
+    change_id, message_id = position
+
+    # 2) The user's log after the watermark; one more row tells if there is more
+    rows = db.execute(
+        select(ChangeLogEntry.id, ChangeLogEntry.kind, ChangeLogEntry.entity_id, ChangeLogEntry.deleted)
+        .where(ChangeLogEntry.user_id == user_id, ChangeLogEntry.id > change_id)
+        .order_by(ChangeLogEntry.id)
+        .limit(limit + 1)
+    ).all()
+    more_changes = len(rows) > limit
+    rows = rows[:limit]
+
+    # 3) Current state of what changed, one query per kind
+    changes = _resolve(db, user_id, rows)
+
+    # 4) New messages, in the order they were sent
+    messages = _new_messages(db, user_id, message_id, limit + 1)
+    more_messages = len(messages) > limit
+    messages = messages[:limit]
+
+    next_token = _token(
+        rows[-1].id if rows else change_id,
+        messages[-1].id if messages else message_id,
+        now,
+    )
+    return SyncPage(
+        changes=changes,
+        messages=messages,
+        next_token=next_token,
+        has_more=more_changes or more_messages,
+    )
+
+
+def _resolve(db: Session, user_id: int, rows) -> list[SyncChange]:
+    """One SyncChange per log row; upserts whose entity is gone become tombstones."""
+    wanted: dict[str, list[int]] = {POST: [], FRIEND: [], FRIEND_REQUEST: [], GROUP: []}
+    for row in rows:
+        if not row.deleted and row.kind in wanted:
+            wanted[row.kind].append(row.entity_id)
+
+    posts = _posts(db, user_id, wanted[POST])
+    friends = _friends(db, user_id, wanted[FRIEND])
+    requests = _requests(db, user_id, wanted[FRIEND_REQUEST])
+    groups = _groups(db, user_id, wanted[GROUP])
+
+    changes = []
+    for row in rows:
+        change = SyncChange(kind=row.kind, id=row.entity_id, deleted=True)
+        if not row.deleted:
+            if row.kind == POST and row.entity_id in posts:
+                change = SyncChange(kind=POST, id=row.entity_id, post=posts[row.entity_id])
+            elif row.kind == FRIEND and row.entity_id in friends:
+                change = SyncChange(kind=FRIEND, id=row.entity_id)
+            elif row.kind == FRIEND_REQUEST and row.entity_id in requests:
+                change = SyncChange(
+                    kind=FRIEND_REQUEST, id=row.entity_id, from_user_id=requests[row.entity_id]
+                )
+            elif row.kind == GROUP and row.entity_id in groups:
+                change = SyncChange(kind=GROUP, id=row.entity_id, group=groups[row.entity_id])
+        changes.append(change)
+    return changes
+
+
+def _posts(db: Session, user_id: int, ids: list[int]) -> dict[int, FeedItem]:
+    """Posts of these ids the user may see: their own and friends', none hidden."""
+    if not ids:
+        return {}
+    friends = select(user_friends.c.friend_id).where(user_friends.c.user_id == user_id)
+    rows = db.execute(
+        select(Post.id, Post.user_id, Post.content, Post.created_at).where(
+            Post.id.in_(ids),
+            or_(Post.user_id == user_id, Post.user_id.in_(friends)),
+            visible(Post.user_id, hidden_set(db, user_id)),
+        )
+    ).all()
+    return {
+        row.id: FeedItem(kind=POST, id=row.id, user_id=row.user_id, content=row.content, created_at=row.created_at)
+        for row in rows
+    }
+
+
+def _friends(db: Session, user_id: int, ids: list[int]) -> set[int]:
+    """Which of these users are still the user's friends."""
+    if not ids:
+        return set()
+    return set(
+        db.execute(
+            select(user_friends.c.friend_id).where(
+                user_friends.c.user_id == user_id, user_friends.c.friend_id.in_(ids)
+            )
+        ).scalars()
+    )
+
+
+def _requests(db: Session, user_id: int, ids: list[int]) -> dict[int, int]:
+    """Request id -> sender, for those of these ids still pending to the user."""
+    if not ids:
+        return {}
+    rows = db.execute(
+        select(FriendRequest.id, FriendRequest.from_user_id).where(
+            FriendRequest.id.in_(ids),
+            FriendRequest.to_user_id == user_id,
+            FriendRequest.status == RequestStatus.pending,
+        )
+    ).all()
+    return {row.id: row.from_user_id for row in rows}
+
+
+def _groups(db: Session, user_id: int, ids: list[int]) -> dict[int, GroupOut]:
+    """Groups of these ids that exist and have the user as a member."""
+    if not ids:
+        return {}
+    groups = db.execute(
+        select(Group)
+        .join(GroupMembership, GroupMembership.group_id == Group.id)
+        .where(
+            Group.id.in_(ids),
+            Group.deleted_at.is_(None),
+            GroupMembership.user_id == user_id,
+        )
+    ).scalars()
+    return {group.id: GroupOut.model_validate(group) for group in groups}
+
+
+def _new_messages(db: Session, user_id: int, after_id: int, limit: int) -> list[SyncMessage]:
+    """
+    Messages after after_id in the user's chats and group rooms, by id.
+
+    Not filtered by blocks, like the chats themselves: a blocked direct
+    chat gets no new messages, and group rooms are shared by all members.
+    """
+    rooms = (
+        select(GroupMembership.group_id)
+        .join(Group, Group.id == GroupMembership.group_id)
+        .where(GroupMembership.user_id == user_id, Group.deleted_at.is_(None))
+    )
+    # Only chats with something new
+    chats = select(Conversation.id).where(
+        or_(
+            Conversation.user1_id == user_id,
+            Conversation.user2_id == user_id,
+            Conversation.group_id.in_(rooms),
+        ),
+        Conversation.last_message_id > after_id,
+    )
+    rows = db.execute(
+        select(Message.id, Message.conversation_id, Message.sender_id, Message.content, Message.timestamp)
+        .where(
+            Message.conversation_id.in_(chats),
+            Message.id > after_id,
+        )
+        .order_by(Message.id)
+        .limit(limit)
+    ).all()
+    return [
+        SyncMessage(
+            id=row.id,
+            conversation_id=row.conversation_id,
+            sender_id=row.sender_id,
+            content=row.content,
+            timestamp=row.timestamp,
+        )
+        for row in rows
+    ]
@@ -0,0 +1,397 @@
+# app/services/tags.py
+
+"""
+Hashtags: an inverted index of posts by tag, and trending tags.
+
+Index
+- create_post, update_post and create_group_post call index_post_tags()
+  before their commit. It parses the text (extract_tags) and rewrites the
+  post's post_tags rows in the same transaction, so the index never
+  disagrees with the text.
+- GET /tags/{tag} reads one range of ix_post_tags_tag_created, newest
+  first, with keyset pagination on (created_at, id). Posts of users the
+  reader blocked or muted (app.services.blocks) are left out in the SQL.
+
+Trending
+- Every tag of a new wall post (or a tag added by an edit) is counted in
+  memory, once per window, with an exponentially decaying counter: a use
+  t seconds ago weighs exp(-t / window). A score is roughly "uses in the
+  last window", without storing the uses.
+- Forward decay: counters are stored relative to a landmark time, as
+  exp((t - landmark) / window). A use is then a single addition, and all
+  stored values shrink by the same factor as time passes, so the ranking
+  is read straight from them and reading trends never touches posts.
+- The checkpointer writes the counters to tag_trends every
+  TREND_CHECKPOINT_INTERVAL (moving the landmark forward and dropping
+  tags that decayed away) and loads them back at startup.
+
+Group posts are indexed but not counted as trending: they are only
+visible to members. Like the presence tracker, trending counters live in
+one process; with several workers each one counts its own posts.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.tag import PostTag, TagTrend
+from app.schemas.feed import FeedItem
+from app.schemas.tag import TagPage, TrendingTag
+from app.services.blocks import hidden_set, visible
+
+logger = logging.getLogger(__name__)
+
+
+# Longest tag kept; longer words after "#" are not tags
+MAX_TAG_LENGTH = 64
+
+# Tags indexed per post (the first ones in the text)
+MAX_TAGS_PER_POST = 10
+
+# "#word": not inside a word, a URL fragment or an HTML entity, and not
+# only digits ("#1" is not a tag)
+_TAG_RE = re.compile(r"(?<![\w/&#])#(\w*[^\W\d_]\w*)")
+
+# Trending windows: name -> seconds (the decay time constant)
+TREND_WINDOWS = {"1h": 3600.0, "24h": 86400.0}
+DEFAULT_TREND_WINDOW = "1h"
+
+# Seconds between two checkpoints to tag_trends
+TREND_CHECKPOINT_INTERVAL = 60.0
+
+# Tags whose score fell below this are dropped at a checkpoint
+TREND_MIN_SCORE = 0.05
+
+# Tags kept per window at a checkpoint (bounds memory)
+TREND_KEEP = 10_000
+
+# Largest (now - landmark) / window before record() rebases by itself
+TREND_MAX_EXPONENT = 50.0
+
+DEFAULT_TRENDING_LIMIT = 10
+MAX_TRENDING_LIMIT = 50
+
+
+def normalize_tag(raw: str) -> str | None:
+    """The stored form of a tag ("#Python" -> "python"), None if invalid."""
+    match = _TAG_RE.fullmatch("#" + raw.removeprefix("#"))
+    if match is None or len(match.group(1)) > MAX_TAG_LENGTH:
+        return None
+    return match.group(1).casefold()
+
+
+def extract_tags(text: str) -> list[str]:
+    """Distinct normalized hashtags of a text, in order of appearance."""
+    tags: list[str] = []
+    for match in _TAG_RE.finditer(text):
+        tag = match.group(1)
+        if len(tag) > MAX_TAG_LENGTH:
+            continue
+        tag = tag.casefold()
+        if tag not in tags:
+            tags.append(tag)
+            if len(tags) == MAX_TAGS_PER_POST:
+                break
+    return tags
+
+
+def index_post_tags(db: Session, post: Post | GroupPost) -> list[str]:
+    """
+    Rewrite the post_tags rows of a wall post or group post from its
+    content. Does not commit.
+
+    Returns the tags the post did not have before (for trending).
+    """
+    # Needs the post id and created_at
+    db.flush()
+
+    if isinstance(post, GroupPost):
+        key = {"group_post_id": post.id}
+        same_post = PostTag.group_post_id == post.id
+        group_id = post.group_id
+    else:
+        key = {"post_id": post.id}
+        same_post = PostTag.post_id == post.id
+        group_id = None
+
+    tags = extract_tags(post.content)
+    old = set(db.execute(select(PostTag.tag).where(same_post)).scalars())
+    added = [tag for tag in tags if tag not in old]
+    removed = old - set(tags)
+
+    if removed:
+        db.execute(delete(PostTag).where(same_post, PostTag.tag.in_(removed)))
+    if added:
+        db.execute(
+            insert(PostTag),
+            [
+                {
+                    "tag": tag,
+                    "group_id": group_id,
+                    "user_id": post.user_id,
+                    "created_at": post.created_at,
+                    **key,
+                }
+                for tag in added
+            ],
+        )
+    return added
+
+
+def tag_posts(
+    db: Session,
+    user_id: int,
+    tag: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+) -> TagPage:
+    """
+    One page of posts with a tag, newest first: all wall posts, and posts
+    of groups the user is a member of.
+
+    Keyset pagination on (created_at, id) of the index rows.
+    """
+    # 1) Where the previous page stopped
+    query = select(PostTag.id, PostTag.post_id, PostTag.group_post_id, PostTag.created_at)
+    if cursor:
+        before_at, before_id = _decode_tag_cursor(cursor)
+        # The extra "<=" lets SQLite seek the index instead of filtering the OR
+        query = query.where(
+            PostTag.created_at <= before_at,
+            or_(
+                PostTag.created_at < before_at,
+                and_(PostTag.created_at == before_at, PostTag.id < before_id),
+            ),
+        )
+
+    # 2) Visibility inside the query: group posts only from the user's groups
+    my_groups = (
+        select(GroupMembership.group_id)
+        .join(Group, Group.id == GroupMembership.group_id)
+        .where(GroupMembership.user_id == user_id, Group.deleted_at.is_(None))
+    )
+    # 3) Index rows do not copy the author: with hidden users the posts
+    #    are joined by primary key to filter them
+    hidden = hidden_set(db, user_id)
+    if hidden.hidden:
+        query = (
+            query.outerjoin(Post, Post.id == PostTag.post_id)
+            .outerjoin(GroupPost, GroupPost.id == PostTag.group_post_id)
+            .where(visible(func.coalesce(Post.user_id, GroupPost.user_id), hidden))
+        )
+    rows = db.execute(
+        query.where(
+            PostTag.tag == tag,
+            or_(PostTag.group_id.is_(None), PostTag.group_id.in_(my_groups)),
+        )
+        .order_by(PostTag.created_at.desc(), PostTag.id.desc())
+        .limit(limit + 1)
+    ).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # 4) Load only the posts of this page (at most one query per kind)
+    items = _load_items(db, rows)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
+
+    return TagPage(items=items, next_cursor=next_cursor)
+
+
+def _decode_tag_cursor(cursor: str) -> tuple[datetime, int]:
+    created_at, last_id = decode_cursor(cursor, 2)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        created_at = None
+
+    # bool is a subclass of int, but never a valid id
+    if created_at is None or type(last_id) is not int:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor.",
+        )
+    return created_at, last_id
+
+
+def _load_items(db: Session, rows) -> list[FeedItem]:
+    post_ids = [row.post_id for row in rows if row.post_id is not None]
+    group_post_ids = [row.group_post_id for row in rows if row.group_post_id is not None]
+
+    posts = {}
+    if post_ids:
+        posts.update((("post", p.id), p) for p in db.query(Post).filter(Post.id.in_(post_ids)))
+    if group_post_ids:
+        posts.update(
+            (("group_post", p.id), p)
+            for p in db.query(GroupPost).filter(GroupPost.id.in_(group_post_ids))
+        )
+
+    items = []
+    for row in rows:
+        if row.post_id is not None:
+            kind, post_id = "post", row.post_id
+        else:
+            kind, post_id = "group_post", row.group_post_id
+        post = posts[kind, post_id]
+        items.append(
+            FeedItem(
+                kind=kind,
+                id=post.id,
+                user_id=post.user_id,
+                group_id=getattr(post, "group_id", None),
+                content=post.content,
+                created_at=post.created_at,
+            )
+        )
+    return items
+
+
+class TrendingTags:
+    """Decayed per-window tag counters (forward decay, see module docstring)."""
+
+    def __init__(self, windows: dict[str, float] = TREND_WINDOWS, now: float | None = None):
+        self._lock = threading.Lock()
+        self.windows = dict(windows)
+        self._landmark = time.time() if now is None else now
+        # window -> tag -> exp((t - landmark) / window) summed over uses
+        self._weights: dict[str, dict[str, float]] = {name: {} for name in self.windows}
+
+    def record(self, tags, now: float | None = None) -> None:
+        """Count one use of each tag at time now."""
+        if not tags:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            # Without checkpoints the exponents would grow until exp() overflows
+            if (now - self._landmark) / min(self.windows.values()) > TREND_MAX_EXPONENT:
+                self._rebase(now)
+            for name, seconds in self.windows.items():
+                weight = math.exp((now - self._landmark) / seconds)
+                weights = self._weights[name]
+                for tag in tags:
+                    weights[tag] = weights.get(tag, 0.0) + weight
+
+    def top(self, window: str, limit: int, now: float | None = None) -> list[TrendingTag]:
+        """The limit highest scoring tags of a window; memory only."""
+        now = time.time() if now is None else now
+        with self._lock:
+            weights = self._weights[window]
+            best = heapq.nlargest(limit, weights.items(), key=lambda item: item[1])
+            scale = math.exp(-(now - self._landmark) / self.windows[window])
+        return [TrendingTag(tag=tag, score=round(weight * scale, 3)) for tag, weight in best]
+
+    def rebase(self, now: float | None = None) -> dict[str, dict[str, float]]:
+        """
+        Move the landmark to now: turn the weights into current scores,
+        drop decayed and surplus tags. Keeps the exponents small.
+
+        Returns a copy of the current scores {window: {tag: score}}.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            return {name: dict(scores) for name, scores in self._weights.items()}
+
+    def load(self, rows, now: float | None = None) -> None:
+        """Add checkpointed (window, tag, score, at) rows, decayed to now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._rebase(now)
+            for window, tag, score, at in rows:
+                seconds = self.windows.get(window)
+                if seconds is None:
+                    continue
+                weights = self._weights[window]
+                weights[tag] = weights.get(tag, 0.0) + score * math.exp((at - now) / seconds)
+
+    def _rebase(self, now: float) -> None:
+        # Caller holds the lock
+        for name, seconds in self.windows.items():
+            scale = math.exp(-(now - self._landmark) / seconds)
+            scores = {
+                tag: weight * scale
+                for tag, weight in self._weights[name].items()
+                if weight * scale >= TREND_MIN_SCORE
+            }
+            if len(scores) > TREND_KEEP:
+                scores = dict(heapq.nlargest(TREND_KEEP, scores.items(), key=lambda item: item[1]))
+            self._weights[name] = scores
+        self._landmark = now
+
+    def checkpoint(self, db: Session, now: float | None = None) -> int:
+        """Replace tag_trends with the current scores; returns the row count."""
+        now = time.time() if now is None else now
+        snapshot = self.rebase(now)
+        rows = [
+            {"window": window, "tag": tag, "score": score, "at": now}
+            for window, scores in snapshot.items()
+            for tag, score in scores.items()
+        ]
+        db.execute(delete(TagTrend))
+        if rows:
+            db.execute(insert(TagTrend), rows)
+        db.commit()
+        return len(rows)
+
+    async def run_checkpointer(
+        self,
+        session_factory,
+        interval: float = TREND_CHECKPOINT_INTERVAL,
+    ) -> None:
+        """
+        Background task (app lifespan): load the last checkpoint, then
+        write one every interval. A crash loses at most interval seconds
+        of counts.
+        """
+
+        def _load() -> None:
+            db = session_factory()
+            try:
+                rows = db.execute(
+                    select(TagTrend.window, TagTrend.tag, TagTrend.score, TagTrend.at)
+                ).all()
+                self.load(rows)
+            finally:
+                db.close()
+
+        def _checkpoint() -> int:
+            db = session_factory()
+            try:
+                return self.checkpoint(db)
+            finally:
+                db.close()
+
+        try:
+            await run_in_threadpool(_load)
+        except Exception:
+            logger.exception("Loading trending tags failed")
+
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await run_in_threadpool(_checkpoint)
+            except Exception:
+                logger.exception("Trending tags checkpoint failed")
+
+
+# Shared by the post endpoints (record), GET /tags/trending and the app lifespan
+trending = TrendingTags()
@@ -0,0 +1,159 @@
+# app/services/users.py
+
+"""
+Bulk user lookups for rendering author names, avatars, etc., and user
+search.
+
+Only public profile columns can be selected (PUBLIC_USER_FIELDS); email,
+password hash and account flags never leave through here. Queries select
+just the requested columns, by primary key, in one statement.
+"""
+
+from sqlalchemy import case, exists, func, or_, select, union
+from sqlalchemy.orm import Session
+
+from app.models.user import User, user_friends, users_fts
+from app.services.blocks import hidden_set, visible
+from app.services.fts import ascii_lower, fts_prefix_query, prefix_bounds
+
+
+# Columns a client may ask for, in response order
+PUBLIC_USER_FIELDS = ("id", "username", "display_name", "avatar_url", "bio", "created_at")
+
+# Columns returned when the client does not choose
+DEFAULT_USER_FIELDS = ("id", "username", "display_name", "avatar_url")
+
+# Maximum ids per lookup
+MAX_USER_IDS = 200
+
+# Search results per request (default / maximum)
+DEFAULT_SEARCH_LIMIT = 10
+MAX_SEARCH_LIMIT = 50
+
+# Candidates taken from each index before ranking. Bounds the work of a
+# search no matter how many users match a short prefix.
+SEARCH_POOL = 200
+
+
+def lookup_users(db: Session, user_ids: list[int], fields=DEFAULT_USER_FIELDS) -> list[dict]:
+    """
+    Return the requested columns of many users, in the order of user_ids.
+
+    - One SELECT of only those columns (plus id) by primary key; no ORM
+      objects are built
+    - Every item has id (so clients can match them), whatever fields says
+    - Unknown and deleted users are left out
+    """
+    if not user_ids:
+        return []
+
+    columns = ["id"] + [f for f in fields if f != "id"]
+    rows = db.execute(
+        select(*(getattr(User, f) for f in columns)).where(
+            User.id.in_(user_ids),
+            User.deleted_at.is_(None),
+        )
+    ).mappings()
+
+    by_id = {row["id"]: dict(row) for row in rows}
+    return [by_id[user_id] for user_id in user_ids if user_id in by_id]
+
+
+def search_users(db: Session, viewer_id: int, q: str, limit: int = DEFAULT_SEARCH_LIMIT) -> list[dict]:
+    """
+    Users whose username or display name matches q, for search-as-you-type.
+
+    One statement:
+    1. Candidates, at most SEARCH_POOL from each source:
+       - usernames starting with q: range scan on ix_users_username_lower,
+         shortest first (so an exact username is always found)
+       - the viewer's friends whose username or display name starts with q
+         (friend lists are small, checked row by row)
+       - display names with a word starting with q: users_fts MATCH
+    2. Rank the candidates: exact username/display name, then friends,
+       then username prefixes before display-name words, shorter
+       usernames first
+    3. Deleted users are left out, and users blocked either way
+       (app.services.blocks); muted users can still be found
+
+    Returns dicts with id, username, display_name, avatar_url, is_friend.
+    """
+    match = fts_prefix_query(q)
+    if match is None:
+        return []
+    # Folded like the lower() of the index, or "Ém" misses "Émile"
+    text = ascii_lower(" ".join(q.split()))
+    low, high = prefix_bounds(text)
+    like = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    name = func.lower(User.username)
+    display = func.lower(User.display_name)
+
+    # 1) Candidates (LIMIT inside each source needs a subquery in SQLite)
+    by_username = (
+        select(User.id.label("id"))
+        .where(name >= low, name < high)
+        .order_by(name)
+        .limit(SEARCH_POOL)
+        .subquery()
+    )
+    by_friendship = (
+        select(User.id.label("id"))
+        .join(user_friends, user_friends.c.friend_id == User.id)
+        .where(
+            user_friends.c.user_id == viewer_id,
+            or_(
+                name.like(f"{like}%", escape="\\"),
+                display.like(f"{like}%", escape="\\"),
+                display.like(f"% {like}%", escape="\\"),
+            ),
+        )
+        .limit(SEARCH_POOL)
+        .subquery()
+    )
+    by_words = (
+        select(users_fts.c.rowid.label("id"))
+        .where(users_fts.c.users_fts.op("MATCH")(match))
+        .limit(SEARCH_POOL)
+        .subquery()
+    )
+    candidates = union(
+        select(by_username.c.id),
+        select(by_friendship.c.id),
+        select(by_words.c.id),
+    ).subquery()
+
+    # 2) Rank
+    is_friend = exists().where(
+        user_friends.c.user_id == viewer_id,
+        user_friends.c.friend_id == User.id,
+    )
+    exact = or_(name == text, display == text)
+    username_prefix = (name >= low) & (name < high)
+
+    rows = db.execute(
+        select(
+            User.id,
+            User.username,
+            User.display_name,
+            User.avatar_url,
+            is_friend.label("is_friend"),
+        )
+        # IN, not a join: SQLite then reads users by primary key per
+        # candidate instead of walking ix_users_deleted_at
+        .where(User.id.in_(select(candidates.c.id)))
+        # 3) Accounts being deleted are gone for everybody, blocked ones
+        #    for the two users
+        .where(User.deleted_at.is_(None))
+        .where(visible(User.id, hidden_set(db, viewer_id), blocked_only=True))
+        .order_by(
+            case((exact, 0), else_=1),
+            case((is_friend, 0), else_=1),
+            case((username_prefix, 0), else_=1),
+            func.length(User.username),
+            User.id,
+        )
+        .limit(limit)
+    ).mappings()
+
+    return [{**row, "is_friend": bool(row["is_friend"])} for row in rows]
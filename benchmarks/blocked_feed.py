@@ -0,0 +1,140 @@
+# benchmarks/blocked_feed.py
+
+"""
+Time the home feed of a user who blocked 10 000 users.
+
+The user has FRIENDS friends with POSTS_PER_FRIEND posts each; every
+tenth friend is muted, and BLOCKED other users are blocked (they have
+posts of their own, but are not friends, so they only cost the filter).
+Compares the filter pushed into the wall query three ways:
+
+- none: no blocks (the floor)
+- per row: NOT EXISTS (SELECT ... FROM user_blocks ...) for both
+  directions, evaluated for every candidate post
+- new: home_feed with the cached HiddenSet as one json_each() parameter
+  (anti-join on the friend list, see app.services.blocks), cold (list
+  loaded) and warm (from memory); also loads the page's rows
+
+Uses a throwaway SQLite file in a temp directory. Run from project root:
+
+    python -m benchmarks.blocked_feed
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, create_engine, event, exists, insert, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import conversation, friend_request, message  # noqa: F401
+from app.models.block import UserBlock
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import blocks, feed
+from app.services.blocks import BLOCK, MUTE
+
+FRIENDS = 500
+POSTS_PER_FRIEND = 40
+BLOCKED = 10_000
+PAGE = 20
+ROUNDS = 20
+ME = 1
+
+
+def build(db) -> None:
+    start = datetime(2026, 1, 1)
+    friends = range(2, FRIENDS + 2)
+    blocked = range(FRIENDS + 2, FRIENDS + BLOCKED + 2)
+    db.execute(
+        insert(User),
+        [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, FRIENDS + BLOCKED + 2)
+        ],
+    )
+    db.execute(
+        insert(user_friends),
+        [{"user_id": ME, "friend_id": f} for f in friends] + [{"user_id": f, "friend_id": ME} for f in friends],
+    )
+    db.execute(
+        insert(UserBlock),
+        [{"user_id": ME, "target_id": u, "kind": BLOCK} for u in blocked]
+        + [{"user_id": ME, "target_id": f, "kind": MUTE} for f in friends if f % 10 == 0],
+    )
+    db.execute(
+        insert(Post),
+        [
+            {"content": f"post {f}/{i}", "user_id": f,
+             "created_at": start + timedelta(minutes=i * FRIENDS + f)}
+            for f in (*friends, *blocked[:FRIENDS])
+            for i in range(POSTS_PER_FRIEND)
+        ],
+    )
+    db.commit()
+
+
+def per_row_feed(db):
+    """The wall with a correlated NOT EXISTS per candidate post."""
+    friend_ids = select(user_friends.c.friend_id).where(user_friends.c.user_id == ME)
+    hidden = exists().where(
+        or_(
+            and_(UserBlock.user_id == ME, UserBlock.target_id == Post.user_id),
+            and_(UserBlock.user_id == Post.user_id, UserBlock.target_id == ME, UserBlock.kind == BLOCK),
+        )
+    )
+    return db.execute(
+        select(Post.created_at, Post.id)
+        .where(or_(Post.user_id == ME, Post.user_id.in_(friend_ids)), ~hidden)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(PAGE + 1)
+    ).all()
+
+
+def timed(label, statements, fn):
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        rows = fn()
+    elapsed = (time.perf_counter() - start) * 1000 / ROUNDS
+    print(f"{label:<34}{len(rows):>9}{len(statements) // ROUNDS:>12}{elapsed:>12.2f}")
+    return rows
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        db = Session()
+        build(db)
+        db.close()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+        print(f"{FRIENDS} friends ({FRIENDS // 10} muted), {BLOCKED} blocked users, page of {PAGE}")
+        print(f"{'feed (mean of %d)' % ROUNDS:<34}{'rows':>9}{'statements':>12}{'ms':>12}")
+
+        db = Session()
+        timed("none: no filter", statements, lambda: feed._wall_keys(
+            db, ME, blocks.HiddenSet.build((), (), 0.0), None, PAGE + 1))
+        per_row = timed("per row: NOT EXISTS", statements, lambda: per_row_feed(db))
+
+        def cold():
+            blocks.block_lists.clear()
+            return feed.home_feed(db, ME, limit=PAGE).items
+
+        page = timed("new: cold (list loaded)", statements, cold)
+        timed("new: warm (from memory)", statements, lambda: feed.home_feed(db, ME, limit=PAGE).items)
+        assert [item.id for item in page] == [row.id for row in per_row[:PAGE]]
+        assert not any(item.user_id % 10 == 0 for item in page)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/chat_frames.py
+
+"""
+Compare chat frame sizes per encoding, with and without compression.
+
+permessage-deflate compresses every WebSocket frame with raw DEFLATE and,
+by default, keeps the compression context between frames ("context
+takeover"). We simulate that with one zlib compressobj per stream, which is
+what uvicorn's websockets backend does when --ws-per-message-deflate is on
+(the default).
+
+Run from project root:
+
+    python -m benchmarks.chat_frames
+"""
+
+import random
+import string
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.services.chat_protocol import CODECS, LEGACY_CODEC, message_frame
+
+FRAMES = 1000
+
+
+def sample_messages(count: int):
+    rng = random.Random(42)
+    words = ["hello", "see", "you", "tomorrow", "ok", "lol", "meeting", "at", "the", "cafe"]
+    for i in range(count):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(2, 20)))
+        nonce = "".join(rng.choice(string.ascii_lowercase) for _ in range(12))
+        message = SimpleNamespace(
+            id=100_000 + i,
+            conversation_id=7,
+            sender_id=rng.choice([3, 4]),
+            timestamp=datetime(2026, 1, 1, 12, 0, i % 60),
+            content=text,
+        )
+        yield message, nonce
+
+
+def deflated_size(payloads) -> int:
+    """Total size after per-frame DEFLATE with context takeover."""
+    compressor = zlib.compressobj(wbits=-15)
+    total = 0
+    for payload in payloads:
+        if isinstance(payload, str):
+            payload = payload.encode()
+        chunk = compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        # permessage-deflate strips the trailing 00 00 ff ff of each frame
+        total += len(chunk) - 4
+    return total
+
+
+def main():
+    messages = list(sample_messages(FRAMES))
+    codecs = {"legacy-text": LEGACY_CODEC, **CODECS}
+
+    print(f"{FRAMES} message frames")
+    print(f"{'encoding':<18}{'raw bytes':>12}{'deflate bytes':>16}{'ratio':>8}")
+    for name, codec in codecs.items():
+        payloads = [codec.encode(message_frame(m, nonce)) for m, nonce in messages]
+        raw = sum(len(p.encode() if isinstance(p, str) else p) for p in payloads)
+        packed = deflated_size(payloads)
+        print(f"{name:<18}{raw:>12}{packed:>16}{packed / raw:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/group_directory.py
+
+"""
+Time the group directory with 500k groups.
+
+Compares the old GET /groups/ (every group as an ORM object) with pages
+of list_group_directory: browsing, a deep page reached by cursor,
+name-prefix search and full-text search. Counts come from the counters
+table.
+
+Uses a throwaway SQLite file in a temp directory; building takes a
+while because the FTS triggers index every insert. Run from project root:
+
+    python -m benchmarks.group_directory
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import conversation, friend_request, group_membership, message, posts  # noqa: F401
+from app.models.counter import Counter
+from app.models.group import Group
+from app.models.user import User
+from app.services.counters import GROUP_MEMBERS, GROUP_POSTS
+from app.services.group import list_group_directory
+
+GROUPS = 500_000
+BATCH = 50_000
+PAGE = 20
+
+WORDS = [
+    "hiking", "chess", "books", "python", "garden", "jazz", "running", "film",
+    "cooking", "photo", "travel", "climbing", "guitar", "coffee", "design", "yoga",
+]
+
+
+def build(db):
+    rng = random.Random(42)
+    db.execute(insert(User), [{"id": 1, "username": "owner", "email": "o@example.com", "password_hash": "x"}])
+    for start in range(0, GROUPS, BATCH):
+        rows, counts = [], []
+        for i in range(start, start + BATCH):
+            a, b = rng.sample(WORDS, 2)
+            rows.append(
+                {
+                    "id": i + 1,
+                    "name": f"{a.title()} {b} {i}",
+                    "description": f"a group about {a} and {b}",
+                    "owner_id": 1,
+                }
+            )
+            counts.append({"name": GROUP_MEMBERS, "entity_id": i + 1, "value": rng.randint(1, 5000)})
+            counts.append({"name": GROUP_POSTS, "entity_id": i + 1, "value": rng.randint(0, 900)})
+        db.execute(insert(Group), rows)
+        db.execute(insert(Counter), counts)
+    db.commit()
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    rows = len(result.items) if hasattr(result, "items") else len(result)
+    print(f"{label:<34}{rows:>9}{elapsed:>12.1f}")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        start = time.perf_counter()
+        db = Session()
+        build(db)
+        db.close()
+        print(f"built {GROUPS} groups in {time.perf_counter() - start:.1f} s")
+        print(f"{'listing':<34}{'rows':>9}{'ms':>12}")
+
+        db = Session()
+        timed("old: all groups (ORM)", lambda: db.query(Group).all())
+        db.close()
+
+        db = Session()
+        page = timed("new: first page", lambda: list_group_directory(db, limit=PAGE))
+        for _ in range(50):
+            page = list_group_directory(db, limit=PAGE, cursor=page.next_cursor)
+        timed("new: page 52 via cursor", lambda: list_group_directory(db, limit=PAGE, cursor=page.next_cursor))
+        timed("new: prefix 'jazz g'", lambda: list_group_directory(db, limit=PAGE, prefix="jazz g"))
+        timed("new: prefix 'yoga coffee 4999'", lambda: list_group_directory(db, limit=PAGE, prefix="yoga coffee 4999"))
+        timed("new: search 'climbing guitar'", lambda: list_group_directory(db, limit=PAGE, q="climbing guitar"))
+        timed("new: search 'photo'", lambda: list_group_directory(db, limit=PAGE, q="photo"))
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
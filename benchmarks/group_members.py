@@ -0,0 +1,126 @@
+# benchmarks/group_members.py
+
+"""
+Time group member listing for a group with 100k members.
+
+Compares the old listing (load every GroupMembership, then read
+m.user.username, which lazy-loads each user) with the projected, keyset
+paginated list_group_members.
+
+Uses a throwaway SQLite file in a temp directory. Run from project root:
+
+    python -m benchmarks.group_members
+"""
+
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import conversation, friend_request, message, posts  # noqa: F401
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.user import User
+from app.services.group import list_group_members
+
+MEMBERS = 100_000
+ADMINS_EVERY = 1_000
+PAGE = 100
+
+
+def build(db) -> int:
+    db.execute(
+        insert(User),
+        [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, MEMBERS + 1)
+        ],
+    )
+    group = Group(name="huge", owner_id=1)
+    db.add(group)
+    db.flush()
+    db.execute(
+        insert(GroupMembership),
+        [
+            {"group_id": group.id, "user_id": i, "is_admin": i % ADMINS_EVERY == 1}
+            for i in range(1, MEMBERS + 1)
+        ],
+    )
+    db.commit()
+    return group.id
+
+
+def old_listing(db, group_id):
+    """The listing before projection: ORM rows plus one lazy load per user."""
+    memberships = (
+        db.query(GroupMembership)
+        .filter(GroupMembership.group_id == group_id)
+        .join(GroupMembership.user)
+        .all()
+    )
+    return [(m.user_id, m.user.username, m.is_admin, m.created_at) for m in memberships]
+
+
+def timed(label, statements, fn):
+    statements.clear()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<34}{len(rows):>9}{len(statements):>12}{elapsed:>12.1f}")
+    return rows
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        db = Session()
+        group_id = build(db)
+        db.close()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+        me = SimpleNamespace(id=1)
+
+        print(f"group with {MEMBERS} members")
+        print(f"{'listing':<34}{'rows':>9}{'statements':>12}{'ms':>12}")
+
+        db = Session()
+        timed("old: all members, ORM + lazy", statements, lambda: old_listing(db, group_id))
+        db.close()
+
+        db = Session()
+        timed("new: first page", statements, lambda: list_group_members(db, group_id, me, limit=PAGE))
+        timed(
+            "new: page after user 99_000",
+            statements,
+            lambda: list_group_members(db, group_id, me, limit=PAGE, after_user_id=99_000),
+        )
+        timed(
+            "new: admins only",
+            statements,
+            lambda: list_group_members(db, group_id, me, limit=PAGE, admins_only=True),
+        )
+
+        def walk():
+            rows, after = [], None
+            while True:
+                page = list_group_members(db, group_id, me, limit=PAGE, after_user_id=after)
+                rows.extend(page)
+                if len(page) < PAGE:
+                    return rows
+                after = page[-1].user_id
+
+        timed(f"new: all members, pages of {PAGE}", statements, walk)
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/home_feed.py
+
+"""
+Time the home feed of a user who is a member of 200 groups.
+
+150 small groups push their posts into members' timelines, 50 large
+groups are pulled at read time (see app.services.feed). Every group has
+POSTS_PER_GROUP posts. Compares:
+
+- old: one /groups/{id}/posts call (list_group_posts) per group, then
+  sort everything in Python
+- new: home_feed(include_groups=True), first page and a deep page
+
+Uses a throwaway SQLite file in a temp directory. Run from project root:
+
+    python -m benchmarks.home_feed
+"""
+
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import conversation, friend_request, message  # noqa: F401
+from app.models.counter import Counter
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.timeline import TimelineEntry
+from app.models.user import User
+from app.services.counters import GROUP_MEMBERS
+from app.services.feed import PUSH_MAX_MEMBERS, home_feed
+from app.services.group import list_group_posts
+
+SMALL_GROUPS = 150
+SMALL_MEMBERS = 10
+LARGE_GROUPS = 50
+POSTS_PER_GROUP = 200
+PAGE = 20
+ME = 1
+
+
+def build(db) -> None:
+    random.seed(1)
+    start = datetime(2026, 1, 1)
+    db.execute(
+        insert(User),
+        [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, SMALL_MEMBERS + 1)
+        ],
+    )
+
+    groups = SMALL_GROUPS + LARGE_GROUPS
+    db.execute(insert(Group), [{"id": g, "name": f"group{g}", "owner_id": ME} for g in range(1, groups + 1)])
+
+    memberships, counters = [], []
+    for g in range(1, groups + 1):
+        small = g <= SMALL_GROUPS
+        members = range(1, SMALL_MEMBERS + 1) if small else [ME]
+        memberships += [{"group_id": g, "user_id": u} for u in members]
+        # Large groups only need the count (and "me" as a member)
+        size = SMALL_MEMBERS if small else PUSH_MAX_MEMBERS * 10
+        counters.append({"name": GROUP_MEMBERS, "entity_id": g, "shard": 0, "value": size})
+    db.execute(insert(GroupMembership), memberships)
+    db.execute(insert(Counter), counters)
+
+    posts, entries = [], []
+    post_id = 0
+    for g in range(1, groups + 1):
+        small = g <= SMALL_GROUPS
+        for _ in range(POSTS_PER_GROUP):
+            post_id += 1
+            created_at = start + timedelta(seconds=random.randrange(90 * 24 * 3600))
+            posts.append(
+                {"id": post_id, "content": f"post {post_id}", "group_id": g, "user_id": ME,
+                 "created_at": created_at, "fanned_out": small}
+            )
+            if small:
+                entries += [
+                    {"user_id": u, "group_post_id": post_id, "group_id": g, "created_at": created_at}
+                    for u in range(1, SMALL_MEMBERS + 1)
+                ]
+    db.execute(insert(GroupPost), posts)
+    db.execute(insert(TimelineEntry), entries)
+    db.execute(
+        insert(Post),
+        [{"content": f"wall {i}", "user_id": ME, "created_at": start + timedelta(hours=i)} for i in range(500)],
+    )
+    db.commit()
+
+
+def old_feed(db):
+    """Before: every group's full post list, merged in Python."""
+    me = SimpleNamespace(id=ME)
+    group_ids = [g for (g,) in db.query(GroupMembership.group_id).filter(GroupMembership.user_id == ME)]
+    posts = []
+    for group_id in group_ids:
+        posts.extend(list_group_posts(db, group_id, me))
+        db.info.pop("group_access", None)
+    posts.sort(key=lambda p: p.created_at, reverse=True)
+    return posts[:PAGE]
+
+
+def timed(label, statements, fn):
+    statements.clear()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"{label:<34}{len(rows):>9}{len(statements):>12}{elapsed:>12.1f}")
+    return rows
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        db = Session()
+        build(db)
+        db.close()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+        print(
+            f"user in {SMALL_GROUPS} pushed + {LARGE_GROUPS} pulled groups, "
+            f"{POSTS_PER_GROUP} posts each"
+        )
+        print(f"{'feed':<34}{'rows':>9}{'statements':>12}{'ms':>12}")
+
+        db = Session()
+        old = timed("old: list_group_posts per group", statements, lambda: old_feed(db))
+        db.close()
+
+        db = Session()
+        page = timed(
+            "new: first page",
+            statements,
+            lambda: home_feed(db, ME, limit=PAGE, include_groups=True).items,
+        )
+        assert [p.id for p in page if p.kind == "group_post"][:5] == [p.id for p in old][:5]
+
+        cursor = None
+        for _ in range(50):
+            cursor = home_feed(db, ME, limit=PAGE, cursor=cursor, include_groups=True).next_cursor
+        timed(
+            "new: page 51 via cursor",
+            statements,
+            lambda: home_feed(db, ME, limit=PAGE, cursor=cursor, include_groups=True).items,
+        )
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+# benchmarks/sync.py
+
+"""
+Time what a client downloads on app open: everything, or the delta.
+
+The user has FRIENDS friends with POSTS_PER_FRIEND posts each and is a
+member of GROUPS groups. Since the client's last sync, CHANGED friends
+wrote a post each and one post was edited EDITS times. Compares:
+
+- full: what the client reloads today (friends' and own posts as in
+  GET /post/, incoming friend requests, the user's groups)
+- sync: GET /sync from the last token (app.services.sync); the log
+  holds one row per changed post, however often it was edited
+
+Uses a throwaway SQLite file in a temp directory. Run from project root:
+
+    python -m benchmarks.sync
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, insert, or_, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import block, conversation, message  # noqa: F401
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import change_log, sync
+
+FRIENDS = 500
+POSTS_PER_FRIEND = 40
+GROUPS = 50
+CHANGED = 20
+EDITS = 10
+ROUNDS = 20
+ME = 1
+
+
+def build(db) -> None:
+    start = datetime(2026, 1, 1)
+    friends = range(2, FRIENDS + 2)
+    db.execute(
+        insert(User),
+        [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x"}
+            for i in range(1, FRIENDS + 2)
+        ],
+    )
+    db.execute(
+        insert(user_friends),
+        [{"user_id": ME, "friend_id": f} for f in friends] + [{"user_id": f, "friend_id": ME} for f in friends],
+    )
+    db.execute(
+        insert(Post),
+        [
+            {"content": f"post {f}/{i}", "user_id": f, "created_at": start + timedelta(minutes=i * FRIENDS + f)}
+            for f in friends
+            for i in range(POSTS_PER_FRIEND)
+        ],
+    )
+    db.execute(insert(Group), [{"id": g, "name": f"group {g}", "owner_id": ME} for g in range(1, GROUPS + 1)])
+    db.execute(insert(GroupMembership), [{"group_id": g, "user_id": ME} for g in range(1, GROUPS + 1)])
+    db.commit()
+
+
+def change(db) -> None:
+    """CHANGED new posts by friends, and one of them edited EDITS times."""
+    posts = []
+    for f in range(2, CHANGED + 2):
+        post = Post(content=f"new from {f}", user_id=f)
+        db.add(post)
+        db.flush()
+        change_log.post_changed(db, f, post.id)
+        posts.append(post)
+    for i in range(EDITS):
+        posts[0].content = f"edit {i}"
+        change_log.post_changed(db, posts[0].user_id, posts[0].id)
+    db.commit()
+
+
+def full_reload(db):
+    friends = select(user_friends.c.friend_id).where(user_friends.c.user_id == ME)
+    posts = db.execute(
+        select(Post.id, Post.user_id, Post.content, Post.created_at)
+        .where(or_(Post.user_id == ME, Post.user_id.in_(friends)))
+        .order_by(Post.created_at.desc())
+    ).all()
+    requests = db.execute(
+        select(FriendRequest).where(FriendRequest.to_user_id == ME, FriendRequest.status == RequestStatus.pending)
+    ).all()
+    groups = db.execute(
+        select(Group).join(GroupMembership, GroupMembership.group_id == Group.id).where(GroupMembership.user_id == ME)
+    ).all()
+    return posts + requests + groups
+
+
+def timed(label, statements, fn):
+    statements.clear()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        rows = fn()
+    elapsed = (time.perf_counter() - start) * 1000 / ROUNDS
+    print(f"{label:<34}{len(rows):>9}{len(statements) // ROUNDS:>12}{elapsed:>12.2f}")
+    return rows
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        db = Session()
+        build(db)
+        token = sync.sync(db, ME).next_token
+        change(db)
+        db.close()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+        print(
+            f"{FRIENDS} friends x {POSTS_PER_FRIEND} posts, {GROUPS} groups; "
+            f"{CHANGED} new posts since the token, one edited {EDITS} times"
+        )
+        print(f"{'app open (mean of %d)' % ROUNDS:<34}{'rows':>9}{'statements':>12}{'ms':>12}")
+
+        db = Session()
+        timed("full: posts, requests, groups", statements, lambda: full_reload(db))
+        changes = timed("sync: since the token", statements, lambda: sync.sync(db, ME, token).changes)
+        assert len(changes) == CHANGED
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/user_search.py
+
+"""
+Time GET /users/search with 5M users.
+
+Compares the naive LIKE '%q%' over users (a full table scan) with
+search_users: short and long prefixes, a display-name word, an exact
+username and a query that only matches friends. The searching user has
+500 friends.
+
+Uses a throwaway SQLite file in a temp directory; building takes several
+minutes because the FTS triggers index every insert. Run from project
+root (USERS=500000 for a quicker run):
+
+    python -m benchmarks.user_search
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert, or_
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base
+from app.models import conversation, friend_request, group, group_membership, message, posts  # noqa: F401
+from app.models.user import User, user_friends
+from app.services.users import search_users
+
+USERS = int(os.environ.get("USERS", 5_000_000))
+BATCH = 100_000
+FRIENDS = 500
+ME = 1
+
+FIRST = ["alice", "bob", "carol", "dave", "erin", "frank", "grace", "heidi", "ivan", "judy",
+         "mallory", "niaj", "olivia", "peggy", "rupert", "sybil", "trent", "victor", "walter", "zoe"]
+LAST = ["smith", "jones", "taylor", "brown", "wilson", "evans", "thomas", "roberts", "walker", "wright"]
+
+
+def build(db):
+    rng = random.Random(7)
+    for start in range(0, USERS, BATCH):
+        rows = []
+        for i in range(start + 1, min(start + BATCH, USERS) + 1):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            rows.append(
+                {
+                    "id": i,
+                    "username": f"{first}{i}",
+                    "email": f"u{i}@example.com",
+                    "password_hash": "x",
+                    "display_name": f"{first.title()} {last.title()}",
+                }
+            )
+        db.execute(insert(User), rows)
+    friend_ids = rng.sample(range(2, USERS + 1), FRIENDS)
+    db.execute(
+        insert(user_friends),
+        [{"user_id": ME, "friend_id": f} for f in friend_ids]
+        + [{"user_id": f, "friend_id": ME} for f in friend_ids],
+    )
+    db.commit()
+    return friend_ids
+
+
+def timed(label, fn, repeat=5):
+    fn()  # warm the page cache
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+    print(f"{label:<40}{len(result):>7}{elapsed:>12.2f}")
+    return result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        start = time.perf_counter()
+        db = Session()
+        friend_ids = build(db)
+        friend = db.get(User, friend_ids[0])
+        friend_name = friend.display_name.split()[1].lower()[:4]
+        some_user = db.get(User, USERS // 2).username
+        db.close()
+        print(f"built {USERS} users in {time.perf_counter() - start:.1f} s")
+        print(f"{'search':<40}{'rows':>7}{'ms':>12}")
+
+        db = Session()
+
+        def naive(q):
+            pattern = f"%{q}%"
+            return (
+                db.query(User.id)
+                .filter(or_(User.username.like(pattern), User.display_name.like(pattern)))
+                .limit(10)
+                .all()
+            )
+
+        timed("old: LIKE '%zz%' (no hit, full scan)", lambda: naive("zz"), repeat=1)
+        timed("old: LIKE '%alice%'", lambda: naive("alice"), repeat=1)
+        timed("new: 'a'", lambda: search_users(db, ME, "a"))
+        timed("new: 'al'", lambda: search_users(db, ME, "al"))
+        timed("new: 'alice'", lambda: search_users(db, ME, "alice"))
+        timed("new: 'alice 12'", lambda: search_users(db, ME, "alice 12"))
+        timed("new: 'smith' (display name)", lambda: search_users(db, ME, "smith"))
+        timed(f"new: '{friend_name}' (friends first)", lambda: search_users(db, ME, friend_name))
+        timed(f"new: exact '{some_user}'", lambda: search_users(db, ME, some_user))
+        timed("new: 'zz' (no hit)", lambda: search_users(db, ME, "zz"))
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# tests/conftest.py
+
+"""
+Shared fixtures.
+
+Most tests mock the Session. Services whose value is in the SQL itself
+(single-query loaders, keyset pagination, counters) are tested against
+a real in-memory SQLite database provided by the sqlite_db fixture.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.database import Base
+from app.services import blocks
+
+# Import all models so Base.metadata knows every table
+from app.models import (  # noqa: F401
+    block,
+    change_log,
+    comment,
+    conversation,
+    counter,
+    friend_request,
+    group,
+    group_membership,
+    message,
+    notification,
+    post_image,
+    posts,
+    reaction,
+    tag,
+    timeline,
+    user,
+)
+
+
+@pytest.fixture(autouse=True)
+def block_lists(monkeypatch):
+    """
+    A private block cache per test: every test starts from fresh ids, so
+    lists cached by an earlier test must not leak in.
+    """
+    fresh = blocks.BlockCache()
+    monkeypatch.setattr(blocks, "block_lists", fresh)
+    return fresh
+
+
+@pytest.fixture
+def sqlite_sessionmaker():
+    """Session factory bound to a fresh in-memory SQLite database."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+
+    yield sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    engine.dispose()
+
+
+@pytest.fixture
+def sqlite_db(sqlite_sessionmaker):
+    """Session on a fresh in-memory SQLite database with all tables created."""
+    db = sqlite_sessionmaker()
+    try:
+        yield db
+    finally:
+        db.close()
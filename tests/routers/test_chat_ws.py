@@ -0,0 +1,238 @@
+"""
+tests/routers/test_chat_ws.py
+
+End-to-end tests of the chat WebSocket:
+- Real in-memory SQLite database (the handler opens sessions itself,
+  so we patch open_db_session instead of overriding get_db)
+- Real JWT tokens, since the handler decodes them directly
+- The handler borrows a session per unit of work, so the tests can
+  change the database between frames
+
+TestClient runs every WebSocket on its own event loop, so frames sent
+from one client's handler to another client's socket are not testable
+here. These tests use one client each; fan-out is covered by the
+registry tests.
+
+Every receive has a timeout so a missing frame fails instead of hanging.
+"""
+
+import asyncio
+import json
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.core import websocket
+from app.core.security import create_access_token
+from app.models.conversation import Conversation
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.user import User
+from app.services.chat_connections import ChatConnection
+from app.services.chat_protocol import CODECS, JSON_SUBPROTOCOL
+from app.services.membership_cache import MembershipCache
+from tests.services.test_chat_connections import FakeWebSocket, settle
+
+RECEIVE_TIMEOUT = 5
+
+JSON = CODECS[JSON_SUBPROTOCOL]
+
+
+@pytest.fixture
+def chat_router(sqlite_sessionmaker, monkeypatch):
+    from app.routers import chat as chat_router
+
+    monkeypatch.setattr(websocket, "open_db_session", sqlite_sessionmaker)
+    registry = chat_router.ConnectionRegistry()
+    monkeypatch.setattr(chat_router, "active_connections", registry)
+    monkeypatch.setattr(chat_router, "presence", chat_router.PresenceTracker(registry))
+    monkeypatch.setattr(chat_router, "group_members", MembershipCache())
+    return chat_router
+
+
+@pytest.fixture
+def client(chat_router):
+    app = FastAPI()
+    app.include_router(chat_router.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def chat(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    alice = User(username="alice", email="alice@example.com", password_hash="x")
+    bob = User(username="bob", email="bob@example.com", password_hash="x")
+    mallory = User(username="mallory", email="mallory@example.com", password_hash="x")
+    db.add_all([alice, bob, mallory])
+    db.flush()
+    convo = Conversation(user1_id=alice.id, user2_id=bob.id)
+    db.add(convo)
+    db.commit()
+    ids = {"chat": convo.id, "alice": alice.id, "bob": bob.id}
+    db.close()
+    return ids
+
+
+@pytest.fixture
+def room(sqlite_sessionmaker, chat):
+    """Group room of a group with alice and bob as members (not mallory)."""
+    db = sqlite_sessionmaker()
+    group = Group(name="hikers", owner_id=chat["alice"])
+    db.add(group)
+    db.flush()
+    db.add_all(
+        [
+            GroupMembership(group_id=group.id, user_id=chat["alice"], is_admin=True),
+            GroupMembership(group_id=group.id, user_id=chat["bob"]),
+        ]
+    )
+    convo = Conversation(group_id=group.id)
+    db.add(convo)
+    db.commit()
+    ids = {"chat": convo.id, "group": group.id}
+    db.close()
+    return ids
+
+
+def url(chat_id, username):
+    return f"/chat/ws/{chat_id}?token={create_access_token({'sub': username})}"
+
+
+def receive(ws) -> dict:
+    """ws.receive() with a timeout (TestClient has none)."""
+    async def _receive():
+        with anyio.fail_after(RECEIVE_TIMEOUT):
+            return await ws._send_rx.receive()
+
+    return ws.portal.call(_receive)
+
+
+def receive_json(ws):
+    message = receive(ws)
+    assert message["type"] == "websocket.send", message
+    return json.loads(message["text"])
+
+
+def test_structured_client_gets_acks_and_retries_are_deduped(client, chat, sqlite_sessionmaker):
+    with client.websocket_connect(url(chat["chat"], "alice"), subprotocols=[JSON_SUBPROTOCOL]) as alice:
+        assert alice.accepted_subprotocol == JSON_SUBPROTOCOL
+        assert receive_json(alice) == {"v": 1, "type": "presence_snapshot", "online": []}
+
+        alice.send_json({"v": 1, "type": "message", "content": "hi bob", "nonce": "n1"})
+        ack = receive_json(alice)
+        assert ack["type"] == "ack"
+        assert ack["nonce"] == "n1"
+
+        # Retry with the same nonce: acked with the same id, not stored twice
+        alice.send_json({"v": 1, "type": "message", "content": "hi bob", "nonce": "n1"})
+        assert receive_json(alice)["id"] == ack["id"]
+
+        alice.send_text("not json")
+        assert receive_json(alice)["type"] == "error"
+
+    db = sqlite_sessionmaker()
+    messages = db.query(Message).all()
+    assert [(m.id, m.sender_id, m.content) for m in messages] == [(ack["id"], chat["alice"], "hi bob")]
+    db.close()
+
+
+def test_legacy_client_messages_are_stored(client, chat, sqlite_sessionmaker):
+    with client.websocket_connect(url(chat["chat"], "bob")) as bob:
+        assert bob.accepted_subprotocol is None
+        bob.send_text("hello")
+
+    db = sqlite_sessionmaker()
+    assert db.query(Message.content).scalar() == "hello"
+    db.close()
+
+
+@pytest.mark.parametrize("username", ["mallory", "nobody"])
+def test_non_participants_are_rejected(client, chat, username):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect(url(chat["chat"], username)):
+            pass
+
+    assert exc.value.code == 1008
+
+
+def test_ping_gets_pong_and_connection_is_released_on_disconnect(client, chat, chat_router):
+    with client.websocket_connect(url(chat["chat"], "alice"), subprotocols=[JSON_SUBPROTOCOL]) as alice:
+        receive_json(alice)  # presence snapshot
+        assert chat_router.presence.is_online(chat["alice"])
+        alice.send_json({"v": 1, "type": "ping"})
+        assert receive_json(alice) == {"v": 1, "type": "pong"}
+        assert len(chat_router.active_connections) == 1
+
+    assert len(chat_router.active_connections) == 0
+    assert not chat_router.presence.is_tracked(chat["alice"])
+
+
+def test_chat_deleted_after_connect_closes_socket(client, chat, sqlite_sessionmaker):
+    with client.websocket_connect(url(chat["chat"], "alice"), subprotocols=[JSON_SUBPROTOCOL]) as alice:
+        receive_json(alice)  # presence snapshot
+        db = sqlite_sessionmaker()
+        db.query(Conversation).delete()
+        db.commit()
+        db.close()
+
+        alice.send_json({"v": 1, "type": "message", "content": "anyone?"})
+        message = receive(alice)
+
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 1008
+
+
+def test_group_room_members_can_chat_and_outsiders_cannot(client, room, sqlite_sessionmaker):
+    with client.websocket_connect(url(room["chat"], "bob"), subprotocols=[JSON_SUBPROTOCOL]) as bob:
+        receive_json(bob)  # presence snapshot
+        bob.send_json({"v": 1, "type": "message", "content": "hi group"})
+        assert receive_json(bob)["type"] == "ack"
+
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect(url(room["chat"], "mallory")):
+            pass
+    assert exc.value.code == 1008
+
+    db = sqlite_sessionmaker()
+    assert db.query(Message.content).scalar() == "hi group"
+    db.close()
+
+
+def test_member_removed_while_connected_is_disconnected(client, chat, room, chat_router):
+    with client.websocket_connect(url(room["chat"], "bob"), subprotocols=[JSON_SUBPROTOCOL]) as bob:
+        receive_json(bob)  # presence snapshot
+
+        # What leave_group / remove_group_member do after their commit
+        chat_router.group_members.discard(room["group"], chat["bob"])
+
+        bob.send_json({"v": 1, "type": "message", "content": "still here?"})
+        message = receive(bob)
+
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 1008
+
+
+
+def test_room_fan_out_skips_and_closes_former_members(chat_router):
+    async def scenario():
+        registry = chat_router.active_connections
+        chat_router.group_members.load(9, lambda: [1, 2])
+        sender = ChatConnection(FakeWebSocket(), 1, 40, JSON)
+        member = ChatConnection(FakeWebSocket(), 2, 40, JSON)
+        former = ChatConnection(FakeWebSocket(), 3, 40, JSON)
+        for conn in (sender, member, former):
+            registry.add(conn)
+
+        frame = {"v": 1, "type": "message", "sender_id": 1, "content": "hi"}
+        chat_router._send_to_chat(40, 9, frame, exclude=sender)
+        await settle()
+
+        assert member.websocket.sent == [JSON.encode(frame)]
+        assert former.websocket.sent == []
+        assert former.websocket.closed_with == 1008
+
+    asyncio.run(scenario())
@@ -5,6 +5,7 @@ Router unit test for app.routers.group:
 - Overrides get_db and get_current_user
 - Uses a fake in memory DB
 - Patches Group and GroupMembership models used inside router
+- Patches the directory service (its SQL is tested in the service tests)
 """
 
 from types import SimpleNamespace
@@ -23,10 +24,14 @@ class DummyColumn:
     def __eq__(self, other):
         return (self.name, "==", other)
 
+    def is_(self, other):
+        return (self.name, "is", other)
+
 
 class FakeGroup:
     id = DummyColumn("id")
     name = DummyColumn("name")
+    deleted_at = DummyColumn("deleted_at")
 
     def __init__(self, name: str, description: str | None, owner_id: int):
         self.id = None
@@ -92,6 +97,10 @@ class FakeSession:
     def refresh(self, obj):
         return None
 
+    def execute(self, stmt):
+        # Counter upserts; counters are covered by the service tests
+        return None
+
 
 @pytest.fixture
 def db():
@@ -110,6 +119,14 @@ def client(db, current_user, monkeypatch):
     monkeypatch.setattr(group_router, "Group", FakeGroup)
     monkeypatch.setattr(group_router, "GroupMembership", FakeMembership)
 
+    def fake_directory(db, limit, cursor, prefix, q):
+        items = [
+            dict(vars(g), member_count=1, post_count=0) for g in db.store["groups"]
+        ]
+        return {"items": items[:limit], "next_cursor": None}
+
+    monkeypatch.setattr(group_router, "svc_list_group_directory", fake_directory)
+
     app = FastAPI()
     app.include_router(group_router.router)
 
@@ -131,9 +148,30 @@ def test_group_flow(client):
 
     list_resp = client.get("/groups/")
     assert list_resp.status_code == 200
-    groups = list_resp.json()
-    assert any(g["id"] == group_id for g in groups)
+    groups = list_resp.json()["items"]
+    assert any(g["id"] == group_id and g["member_count"] == 1 for g in groups)
 
     detail_resp = client.get(f"/groups/{group_id}")
     assert detail_resp.status_code == 200
     assert detail_resp.json()["id"] == group_id
+
+
+def test_bulk_members_validates_body_and_delegates(client, monkeypatch):
+    from app.routers import group as group_router
+
+    calls = []
+
+    def fake_bulk_add(db, group_id, user_ids, current_user):
+        calls.append((group_id, user_ids))
+        return {"results": [{"user_id": u, "status": "added"} for u in user_ids]}
+
+    monkeypatch.setattr(group_router, "bulk_add_group_members", fake_bulk_add)
+
+    assert client.post("/groups/1/members/bulk-add", json={"user_ids": []}).status_code == 422
+    too_many = {"user_ids": list(range(201))}
+    assert client.post("/groups/1/members/bulk-add", json=too_many).status_code == 422
+
+    resp = client.post("/groups/1/members/bulk-add", json={"user_ids": [7, 8]})
+    assert resp.status_code == 200
+    assert resp.json()["results"][1] == {"user_id": 8, "status": "added"}
+    assert calls == [(1, [7, 8])]
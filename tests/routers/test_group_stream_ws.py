@@ -0,0 +1,99 @@
+"""
+tests/routers/test_group_stream_ws.py
+
+Group post subscriptions over a real WebSocket:
+- Real in-memory SQLite database (patched open_db_session, like the
+  chat tests)
+- Posts are published from the test thread, as a sync endpoint would
+  from the threadpool
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from app.core import websocket
+from app.core.security import create_access_token
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.user import User
+from app.services import group_stream
+from app.services.chat_connections import ConnectionRegistry
+from tests.routers.test_chat_ws import receive, receive_json
+
+
+@pytest.fixture
+def client(sqlite_sessionmaker, monkeypatch):
+    from app.routers import group_stream as stream_router
+
+    monkeypatch.setattr(websocket, "open_db_session", sqlite_sessionmaker)
+    monkeypatch.setattr(group_stream, "group_streams", ConnectionRegistry())
+    app = FastAPI()
+    app.include_router(stream_router.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def group(sqlite_sessionmaker):
+    """A group with alice as its only member; mallory is an outsider."""
+    db = sqlite_sessionmaker()
+    alice = User(username="alice", email="alice@example.com", password_hash="x")
+    mallory = User(username="mallory", email="mallory@example.com", password_hash="x")
+    db.add_all([alice, mallory])
+    db.flush()
+    group = Group(name="hikers", owner_id=alice.id)
+    db.add(group)
+    db.flush()
+    db.add(GroupMembership(group_id=group.id, user_id=alice.id, is_admin=True))
+    db.commit()
+    ids = {"group": group.id, "alice": alice.id}
+    db.close()
+    return ids
+
+
+def token(username):
+    return create_access_token({"sub": username})
+
+
+def test_member_receives_new_posts_and_pings(client, group):
+    path = f"/groups/{group['group']}/stream/ws?token={token('alice')}"
+    with client.websocket_connect(path) as ws:
+        ws.send_json({"v": 1, "type": "ping"})
+        assert receive_json(ws) == {"v": 1, "type": "pong"}
+
+        post = SimpleNamespace(
+            id=1, group_id=group["group"], user_id=group["alice"],
+            content="summit at noon", created_at=datetime(2026, 1, 1),
+        )
+        group_stream.publish_group_post(post)
+
+        frame = receive_json(ws)
+        assert frame["type"] == "group_post"
+        assert frame["content"] == "summit at noon"
+
+        group_stream.drop_subscribers(group["group"], [group["alice"]])
+        message = receive(ws)
+
+    assert message["type"] == "websocket.close"
+    assert message["code"] == 1008
+    assert len(group_stream.group_streams) == 0
+
+
+@pytest.mark.parametrize("username", ["mallory", "nobody"])
+def test_non_members_cannot_subscribe(client, group, username):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect(f"/groups/{group['group']}/stream/ws?token={token(username)}"):
+            pass
+    assert exc.value.code == 1008
+
+    resp = client.get(f"/groups/{group['group']}/stream", params={"token": token(username)})
+    assert resp.status_code == 403
+
+
+def test_sse_requires_a_token(client, group):
+    assert client.get(f"/groups/{group['group']}/stream").status_code == 403
+    assert client.get("/groups/999/stream", params={"token": token("alice")}).status_code == 403
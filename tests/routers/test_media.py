@@ -0,0 +1,94 @@
+# tests/routers/test_media.py
+
+"""
+Router tests for app.routers.media and PUT /users/me/avatar.
+
+Media files go to a temp MEDIA_ROOT; resizing runs in a thread pool.
+"""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.routers import media as media_router
+from app.routers import users as users_router
+from app.services import avatars
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+
+    def add(self, obj):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.fixture
+def user():
+    return SimpleNamespace(id=1, avatar_url=None)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, user):
+    monkeypatch.setattr(avatars, "MEDIA_ROOT", tmp_path)
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(avatars, "_pool", pool)
+
+    app = FastAPI()
+    app.include_router(users_router.router)
+    app.include_router(media_router.router)
+    db = FakeSession()
+    app.dependency_overrides[users_router.get_db] = lambda: db
+    app.dependency_overrides[users_router.get_current_user] = lambda: user
+    yield TestClient(app)
+    pool.shutdown()
+
+
+def png_bytes() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (80, 120), (10, 120, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_upload_sets_avatar_url_and_serves_cacheable_thumbnails(client, user):
+    res = client.put("/users/me/avatar", content=png_bytes(), headers={"Content-Type": "image/png"})
+
+    assert res.status_code == 200
+    body = res.json()
+    assert user.avatar_url == body["avatar_url"] == body["thumbnails"]["256"]
+
+    thumb = client.get(body["thumbnails"]["64"])
+    assert thumb.status_code == 200
+    assert thumb.headers["content-type"] == "image/webp"
+    assert thumb.headers["cache-control"] == avatars.AVATAR_CACHE_CONTROL
+    etag = thumb.headers["etag"]
+    assert not etag.startswith("W/")
+
+    cached = client.get(body["thumbnails"]["64"], headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+@pytest.mark.parametrize(
+    "headers, status",
+    [
+        ({"Content-Type": "text/plain"}, 415),
+        ({"Content-Type": "image/png", "Content-Length": str(avatars.MAX_AVATAR_BYTES + 1)}, 413),
+    ],
+)
+def test_upload_rejects_bad_type_and_size(client, headers, status):
+    res = client.put("/users/me/avatar", content=b"x", headers=headers)
+    assert res.status_code == status
+
+
+@pytest.mark.parametrize("path", ["/media/avatars/abc/64", f"/media/avatars/{'0' * 64}/64", f"/media/avatars/{'0' * 64}/99"])
+def test_unknown_avatar_is_404_or_422(client, path):
+    assert client.get(path).status_code in (404, 422)
@@ -190,3 +190,62 @@ def test_put_me_updates_avatar_only(client, db, current_user):
     assert db.add_calls == [current_user]
     assert db.commits == 1
     assert db.refresh_calls == [current_user]
+
+
+def test_get_users_passes_ids_and_fields_and_drops_unset(client, monkeypatch):
+    """
+    GET /users?ids=...&fields=... should parse both lists, call the
+    lookup service, and return only the selected fields.
+    """
+    from app.routers import users as users_router
+
+    calls = []
+
+    def fake_lookup(db, user_ids, fields):
+        calls.append((user_ids, fields))
+        return [{"id": uid, "username": f"u{uid}"} for uid in user_ids]
+
+    monkeypatch.setattr(users_router, "lookup_users", fake_lookup)
+
+    res = client.get("/users", params={"ids": "3,1,3", "fields": "username"})
+
+    assert res.status_code == 200
+    assert res.json() == [{"id": 3, "username": "u3"}, {"id": 1, "username": "u1"}]
+    assert calls == [([3, 1], ["username"])]
+
+
+@pytest.mark.parametrize("params", [{"ids": "1", "fields": "email"}, {"ids": "x"}])
+def test_get_users_rejects_private_fields_and_bad_ids(client, params):
+    """
+    Only public profile columns can be selected; ids must be integers.
+    """
+    res = client.get("/users", params=params)
+    assert res.status_code == 400
+
+
+def test_search_users_passes_query_and_limit(client, current_user, monkeypatch):
+    """
+    GET /users/search?q=...&limit=... should call the search service
+    for the current user and return its hits.
+    """
+    from app.routers import users as users_router
+
+    calls = []
+
+    def fake_search(db, viewer_id, q, limit):
+        calls.append((viewer_id, q, limit))
+        return [{"id": 7, "username": "alice", "display_name": None, "avatar_url": None, "is_friend": True}]
+
+    monkeypatch.setattr(users_router, "search_users", fake_search)
+
+    res = client.get("/users/search", params={"q": "ali", "limit": 5})
+
+    assert res.status_code == 200
+    assert res.json()[0]["is_friend"] is True
+    assert calls == [(current_user.id, "ali", 5)]
+
+
+@pytest.mark.parametrize("params", [{}, {"q": ""}, {"q": "a", "limit": 51}])
+def test_search_users_validates_params(client, params):
+    res = client.get("/users/search", params=params)
+    assert res.status_code == 422
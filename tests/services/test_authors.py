@@ -0,0 +1,90 @@
+# tests/services/test_authors.py
+
+"""
+Module: app.services.authors
+
+Runs against in-memory SQLite (sqlite_db fixture): the point of the loader
+is how many queries it sends.
+"""
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.group import Group, GroupPost
+from app.models.posts import Post
+from app.models.user import User
+from app.schemas.group import GroupPostOut
+from app.schemas.posts import Post as PostSchema
+from app.services.authors import author_loader, embed_authors, wants_author
+
+
+@pytest.fixture
+def posts(sqlite_db):
+    sqlite_db.add_all(
+        User(id=i, username=f"u{i}", email=f"u{i}@example.com", password_hash="x")
+        for i in range(1, 11)
+    )
+    sqlite_db.add_all(Post(content=f"post {n}", user_id=n % 10 + 1) for n in range(50))
+    sqlite_db.commit()
+    return sqlite_db.query(Post).all()
+
+
+def count_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_embed_authors_loads_all_authors_with_one_query(sqlite_db, posts):
+    statements = count_statements(sqlite_db)
+
+    embed_authors(sqlite_db, posts)
+
+    assert len(statements) == 1
+    out = [PostSchema.model_validate(p) for p in posts]
+    assert all(o.author.id == o.user_id for o in out)
+    assert out[0].author.username == f"u{posts[0].user_id}"
+
+
+def test_loader_is_shared_within_the_session(sqlite_db, posts):
+    embed_authors(sqlite_db, posts[:10])
+    statements = count_statements(sqlite_db)
+
+    # Same authors again (another part of the same response): no query
+    embed_authors(sqlite_db, posts[10:])
+    assert statements == []
+    assert author_loader(sqlite_db) is sqlite_db.info["author_loader"]
+
+
+def test_group_posts_do_not_touch_the_author_relationship(sqlite_db, posts):
+    sqlite_db.add(Group(id=1, name="g", owner_id=1))
+    sqlite_db.add_all(GroupPost(group_id=1, user_id=uid, content="hi") for uid in (1, 2, 3))
+    sqlite_db.commit()
+    rows = sqlite_db.query(GroupPost).all()
+    statements = count_statements(sqlite_db)
+
+    embed_authors(sqlite_db, rows)
+    out = [GroupPostOut.model_validate(r).author.username for r in rows]
+
+    assert out == ["u1", "u2", "u3"]
+    assert len(statements) == 1
+
+
+def test_missing_authors_and_unexpanded_rows_give_none(sqlite_db, posts):
+    sqlite_db.get(User, 1).deleted_at = sqlite_db.get(Post, 1).created_at
+    sqlite_db.commit()
+
+    embed_authors(sqlite_db, [p for p in posts if p.user_id == 1][:1])
+    deleted = [p for p in posts if p.user_id == 1][0]
+
+    assert PostSchema.model_validate(deleted).author is None
+    assert PostSchema.model_validate(sqlite_db.get(Post, 2)).author is None
+
+
+def test_wants_author():
+    assert wants_author(None) is False
+    assert wants_author("author") is True
+    with pytest.raises(HTTPException) as exc:
+        wants_author("owner")
+    assert exc.value.status_code == 400
@@ -0,0 +1,122 @@
+# tests/services/test_avatars.py
+
+"""
+Module: app.services.avatars
+
+Files go to a temp MEDIA_ROOT. Most tests resize in a thread pool (to
+count calls); one test uses the real process pool.
+"""
+
+import asyncio
+import hashlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from app.services import avatars
+
+
+def png_bytes(width=300, height=200, color=(200, 30, 30)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+async def chunked(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def media(tmp_path, monkeypatch):
+    monkeypatch.setattr(avatars, "MEDIA_ROOT", tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    calls = []
+    real = avatars.make_thumbnails
+
+    def counting(*args):
+        calls.append(args)
+        return real(*args)
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(avatars, "make_thumbnails", counting)
+    monkeypatch.setattr(avatars, "_pool", pool)
+    yield calls
+    pool.shutdown()
+
+
+def test_upload_is_stored_by_digest_with_all_thumbnails(media, thread_pool):
+    data = png_bytes()
+
+    digest = run(avatars.store_avatar(chunked(data)))
+
+    assert digest == hashlib.sha256(data).hexdigest()
+    for size in avatars.THUMBNAIL_SIZES:
+        with Image.open(avatars.thumbnail_path(digest, size)) as thumb:
+            assert thumb.size == (size, size)
+            assert thumb.format == "WEBP"
+    # Nothing left behind in the temp area
+    assert list((media / "tmp").iterdir()) == []
+
+
+def test_same_bytes_are_resized_once(media, thread_pool):
+    data = png_bytes()
+
+    first = run(avatars.store_avatar(chunked(data)))
+    second = run(avatars.store_avatar(chunked(data, size=7)))
+
+    assert first == second
+    assert len(thread_pool) == 1
+    assert len(list((media / "avatars").iterdir())) == 1
+
+
+def test_not_an_image_is_rejected_and_cleaned_up(media, thread_pool):
+    with pytest.raises(HTTPException) as exc:
+        run(avatars.store_avatar(chunked(b"definitely not a png")))
+
+    assert exc.value.status_code == 400
+    assert list((media / "tmp").iterdir()) == []
+    assert not (media / "avatars").exists()
+
+
+def test_too_large_upload_stops_early(media, monkeypatch):
+    received = []
+
+    async def endless():
+        while True:
+            received.append(1)
+            yield b"x" * 1000
+
+    with pytest.raises(HTTPException) as exc:
+        run(avatars.receive_upload(endless(), max_bytes=5000))
+
+    assert exc.value.status_code == 413
+    assert len(received) == 6
+    assert list((media / "tmp").iterdir()) == []
+
+
+def test_empty_upload_is_rejected(media):
+    with pytest.raises(HTTPException) as exc:
+        run(avatars.receive_upload(chunked(b"")))
+    assert exc.value.status_code == 400
+
+
+def test_thumbnails_are_made_in_the_process_pool(media, monkeypatch):
+    monkeypatch.setattr(avatars, "_pool", None)
+    try:
+        digest = run(avatars.store_avatar(chunked(png_bytes(64, 64))))
+    finally:
+        avatars.shutdown_thumbnail_pool()
+
+    assert avatars.thumbnail_path(digest, 256).is_file()
@@ -0,0 +1,271 @@
+# tests/services/test_blocks.py
+
+"""
+Module: app.services.blocks
+
+The cache is tested on its own; the filter runs against in-memory
+SQLite (sqlite_db fixture), through the feed, search and tag readers
+that apply it. Every test gets a fresh cache (block_lists in conftest).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert
+
+from app.models.block import UserBlock
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import blocks, feed, search, tags, users
+from app.services.blocks import BLOCK, MUTE, BlockCache
+from app.services.counters import (
+    GROUP_MEMBERS,
+    PENDING_REQUESTS,
+    USER_FRIENDS,
+    bump,
+    counter_value,
+    reconcile,
+)
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def world(sqlite_db, monkeypatch):
+    """
+    me (1) is friends with friend (2) and pal (3); stranger (4) is not.
+    All four are in "club" (10), small enough to push its posts.
+    """
+    monkeypatch.setattr(feed, "PUSH_MAX_MEMBERS", 4)
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "me"), (2, "friend"), (3, "pal"), (4, "stranger"))
+    )
+    sqlite_db.execute(
+        user_friends.insert(),
+        [{"user_id": a, "friend_id": b} for a, b in ((1, 2), (2, 1), (1, 3), (3, 1))],
+    )
+    for user_id in (1, 2, 3):
+        bump(sqlite_db, USER_FRIENDS, user_id, 2 if user_id == 1 else 1)
+    sqlite_db.add(Group(id=10, name="club", owner_id=1))
+    for user_id in (1, 2, 3, 4):
+        sqlite_db.add(GroupMembership(group_id=10, user_id=user_id))
+        bump(sqlite_db, GROUP_MEMBERS, 10)
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def posts_by_everyone(db, text="lunch #food"):
+    """One wall post and one group post by each user."""
+    for user_id in (1, 2, 3, 4):
+        db.add(Post(content=f"{text} {user_id}", user_id=user_id, created_at=T0 + timedelta(minutes=user_id)))
+        post = GroupPost(content=f"club {text} {user_id}", group_id=10, user_id=user_id,
+                         created_at=T0 + timedelta(minutes=user_id))
+        db.add(post)
+        feed.deliver_group_post(db, post)
+        tags.index_post_tags(db, post)
+    db.commit()
+
+
+def authors(items):
+    return sorted({item.user_id for item in items})
+
+
+# ---------- cache ----------
+def test_cache_loads_once_and_answers_from_memory():
+    cache = BlockCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [5, 3], [3]
+
+    first = cache.load(1, loader)
+    again = cache.load(1, loader)
+
+    assert again is first
+    assert len(calls) == 1
+    assert list(first.hidden) == [3, 5]
+    assert first.hidden_json == "[3,5]"
+    assert (first.hides(5), first.blocks(5), first.blocks(3), first.hides(4)) == (True, False, True, False)
+
+
+def test_load_racing_with_a_change_is_not_cached():
+    cache = BlockCache()
+
+    def stale_loader():
+        # A block commits while the load is still reading the database
+        cache.invalidate(1)
+        return [], []
+
+    assert not cache.load(1, stale_loader).hidden
+    assert cache.load(1, lambda: ([2], [2])).blocks(2)
+
+
+def test_entries_expire_and_the_oldest_go_first():
+    now = [0.0]
+    cache = BlockCache(size=2, ttl=10.0, clock=lambda: now[0])
+    for user_id in (1, 2):
+        cache.load(user_id, lambda: ([], []))
+    cache.load(1, lambda: ([], []))
+    cache.load(3, lambda: ([], []))
+
+    # 2 was used least recently
+    assert len(cache) == 2
+    assert cache.load(2, lambda: ([9], [])).hides(9)
+
+    now[0] = 11.0
+    assert cache.load(1, lambda: ([8], [])).hides(8)
+
+
+# ---------- block_user / unblock_user ----------
+def test_block_ends_the_friendship_and_pending_requests(world):
+    world.add(FriendRequest(from_user_id=4, to_user_id=1, status=RequestStatus.pending))
+    bump(world, PENDING_REQUESTS, 1)
+    world.commit()
+
+    blocks.block_user(world, 1, 2)
+    blocks.block_user(world, 1, 4)
+
+    assert world.query(user_friends).filter_by(user_id=2).count() == 0
+    assert world.query(FriendRequest).count() == 0
+    assert counter_value(world, USER_FRIENDS, 1) == 1
+    assert counter_value(world, PENDING_REQUESTS, 1) == 0
+    assert not any(reconcile(world, names=[USER_FRIENDS, PENDING_REQUESTS]).values())
+
+
+def test_block_and_mute_kinds(world):
+    blocks.block_user(world, 1, 3, MUTE)
+    # A mute keeps the friendship
+    assert world.query(user_friends).filter_by(user_id=3).count() == 1
+
+    blocks.block_user(world, 1, 3, BLOCK)
+    blocks.block_user(world, 1, 3, MUTE)
+    assert world.get(UserBlock, (1, 3)).kind == BLOCK
+
+    # Unmuting does not unblock
+    blocks.unblock_user(world, 1, 3, MUTE)
+    assert blocks.hidden_set(world, 1).blocks(3)
+    blocks.unblock_user(world, 1, 3, BLOCK)
+    assert not blocks.hidden_set(world, 1).hides(3)
+
+
+@pytest.mark.parametrize("target_id, code", [(1, 400), (99, 404)])
+def test_block_needs_another_user(world, target_id, code):
+    with pytest.raises(HTTPException) as exc:
+        blocks.block_user(world, 1, target_id)
+    assert exc.value.status_code == code
+
+
+def test_block_is_seen_by_both_users(world):
+    # Cached before the block
+    assert not blocks.hidden_set(world, 4).hides(1)
+
+    blocks.block_user(world, 1, 4)
+
+    for a, b in ((1, 4), (4, 1)):
+        assert blocks.hidden_set(world, a).hides(b)
+        with pytest.raises(HTTPException) as exc:
+            blocks.check_not_blocked(world, a, b)
+        assert exc.value.status_code == 403
+
+
+def test_mute_is_one_way(world):
+    blocks.block_user(world, 1, 4, MUTE)
+
+    assert blocks.hidden_set(world, 1).hides(4)
+    assert not blocks.hidden_set(world, 4).hides(1)
+    blocks.check_not_blocked(world, 1, 4)
+
+
+def test_list_blocks_pages_by_id(world):
+    for target_id in (4, 2, 3):
+        blocks.block_user(world, 1, target_id)
+    blocks.unblock_user(world, 1, 3)
+    blocks.block_user(world, 1, 3, MUTE)
+
+    first = blocks.list_blocks(world, 1, BLOCK, limit=1)
+    second = blocks.list_blocks(world, 1, BLOCK, limit=1, cursor=first.next_cursor)
+
+    assert [item.user_id for item in first.items + second.items] == [2, 4]
+    assert second.next_cursor is None
+    assert [item.user_id for item in blocks.list_blocks(world, 1, MUTE).items] == [3]
+
+
+# ---------- the filter ----------
+def test_home_feed_leaves_out_blocked_and_muted_users(world):
+    posts_by_everyone(world)
+    blocks.block_user(world, 4, 1)
+    blocks.block_user(world, 1, 3, MUTE)
+
+    # Blocked by stranger (every source), muted pal (wall and groups)
+    assert authors(feed.home_feed(world, 1, include_groups=True).items) == [1, 2]
+    # The block hides both ways, the mute only for the muter
+    assert authors(feed.home_feed(world, 4, include_groups=True).items) == [2, 3, 4]
+
+
+def test_pulled_group_posts_are_filtered(world, monkeypatch):
+    monkeypatch.setattr(feed, "PUSH_MAX_MEMBERS", 1)
+    posts_by_everyone(world)
+    blocks.block_user(world, 1, 4, MUTE)
+
+    page = feed.home_feed(world, 1, include_groups=True)
+
+    assert {item.user_id for item in page.items if item.kind == "group_post"} == {1, 2, 3}
+
+
+def test_search_and_tags_leave_out_hidden_users(world):
+    posts_by_everyone(world)
+    blocks.block_user(world, 1, 2)
+    blocks.block_user(world, 1, 3, MUTE)
+
+    assert authors(search.search(world, 1, "lunch").items) == [1, 4]
+    assert authors(tags.tag_posts(world, 1, "food").items) == [1, 4]
+    assert authors(search.search(world, 2, "lunch").items) == [2, 3, 4]
+
+
+def test_user_search_hides_blocked_but_not_muted_users(world):
+    blocks.block_user(world, 2, 1)
+    blocks.block_user(world, 1, 3, MUTE)
+
+    found = [row["username"] for row in users.search_users(world, 1, "friend")]
+    found += [row["username"] for row in users.search_users(world, 1, "pal")]
+
+    assert found == ["pal"]
+
+
+def test_feed_with_10k_blocked_ids_is_one_parameter(world):
+    """10 000 blocked users cost one bound value, not 10 000."""
+    world.execute(
+        insert(User),
+        [{"id": i, "username": f"u{i}", "email": f"u{i}@example.com", "password_hash": "x"}
+         for i in range(100, 10_100)],
+    )
+    world.execute(insert(UserBlock), [{"user_id": 1, "target_id": i, "kind": BLOCK} for i in range(100, 10_100)])
+    world.execute(
+        insert(Post),
+        [{"content": f"p{i}", "user_id": user_id, "created_at": T0 + timedelta(minutes=i)}
+         for i, user_id in enumerate((2, 3, 100, 5000, 10_099) * 10)],
+    )
+    world.commit()
+    blocks.block_user(world, 1, 3, MUTE)
+    hidden = blocks.hidden_set(world, 1)
+    assert len(hidden.hidden) == 10_001
+
+    parameters = []
+    listener = lambda conn, cursor, statement, params, *args: parameters.append(params)
+    event.listen(world.get_bind(), "before_cursor_execute", listener)
+    try:
+        page = feed.home_feed(world, 1, limit=20, include_groups=True)
+    finally:
+        event.remove(world.get_bind(), "before_cursor_execute", listener)
+
+    assert authors(page.items) == [2]
+    assert len(page.items) == 10
+    # The list goes to the wall, pushed and pulled sources as one JSON value
+    assert [hidden.hidden_json in params for params in parameters] == [True, True, True, False]
+    assert max(len(params) for params in parameters) <= len(page.items)
@@ -0,0 +1,146 @@
+# tests/services/test_chat_connections.py
+
+"""
+Module: app.services.chat_connections
+
+Registry tests with a fake WebSocket that records what was sent.
+No pytest-asyncio in this project: each test runs its own event loop.
+"""
+
+import asyncio
+
+from starlette.websockets import WebSocketState
+
+from app.services import chat_connections as cc
+from app.services.chat_protocol import CODECS, JSON_SUBPROTOCOL, LEGACY_CODEC
+
+
+JSON = CODECS[JSON_SUBPROTOCOL]
+
+
+class FakeWebSocket:
+    def __init__(self, block: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.application_state = WebSocketState.CONNECTED
+        # When block is True, sends never complete (a stuck client)
+        self._block = asyncio.Event() if block else None
+
+    async def send_text(self, data):
+        if self._block is not None:
+            await self._block.wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        await self.send_text(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+        self.application_state = WebSocketState.DISCONNECTED
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def settle():
+    """Let writer tasks run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_broadcast_encodes_once_per_codec_and_skips_sender():
+    async def scenario():
+        registry = cc.ConnectionRegistry()
+        sender = cc.ChatConnection(FakeWebSocket(), 1, 7, JSON)
+        json_peer = cc.ChatConnection(FakeWebSocket(), 2, 7, JSON)
+        legacy_peer = cc.ChatConnection(FakeWebSocket(), 2, 7, LEGACY_CODEC)
+        other_chat = cc.ChatConnection(FakeWebSocket(), 3, 8, JSON)
+        for conn in (sender, json_peer, legacy_peer, other_chat):
+            registry.add(conn)
+
+        frame = {"v": 1, "type": "message", "sender_id": 1, "content": "hi"}
+        delivered = registry.broadcast(7, frame, exclude=sender)
+        await settle()
+
+        assert delivered == 2
+        assert sender.websocket.sent == []
+        assert other_chat.websocket.sent == []
+        assert legacy_peer.websocket.sent == ["1: hi"]
+        assert json_peer.websocket.sent == [JSON.encode(frame)]
+        assert json_peer.bytes_out == len(JSON.encode(frame))
+
+    run(scenario())
+
+
+def test_slow_client_is_disconnected_when_queue_is_full(monkeypatch):
+    monkeypatch.setattr(cc, "SEND_QUEUE_SIZE", 2)
+
+    async def scenario():
+        conn = cc.ChatConnection(FakeWebSocket(block=True), 1, 7, JSON)
+
+        assert conn.enqueue("a") is True
+        await settle()  # writer picks "a" and blocks on send
+        assert conn.enqueue("b") is True
+        assert conn.enqueue("c") is True
+        assert conn.enqueue("d") is False
+        await settle()
+
+        assert conn.websocket.closed_with == cc.CLOSE_TRY_AGAIN_LATER
+        assert conn.queued_bytes == 0
+
+    run(scenario())
+
+
+def test_reap_pings_quiet_clients_and_closes_idle_ones():
+    async def scenario():
+        registry = cc.ConnectionRegistry()
+        quiet = cc.ChatConnection(FakeWebSocket(), 1, 7, JSON)
+        legacy = cc.ChatConnection(FakeWebSocket(), 2, 7, LEGACY_CODEC)
+        idle = cc.ChatConnection(FakeWebSocket(), 3, 7, JSON)
+        idle_legacy = cc.ChatConnection(FakeWebSocket(), 4, 7, LEGACY_CODEC)
+        for conn in (quiet, legacy, idle, idle_legacy):
+            registry.add(conn)
+
+        now = quiet.last_seen
+        idle.last_seen = idle_legacy.last_seen = now - cc.IDLE_TIMEOUT - 1
+        quiet.last_seen = legacy.last_seen = now - cc.HEARTBEAT_INTERVAL - 1
+
+        closed = registry.reap(now=now)
+        await settle()
+
+        assert closed == 1
+        assert idle.websocket.closed_with == cc.CLOSE_GOING_AWAY
+        assert quiet.websocket.sent == ['{"v":1,"type":"ping"}']
+        # Legacy clients cannot parse pings or answer them: never pinged or reaped
+        assert legacy.websocket.sent == []
+        assert idle_legacy.websocket.closed_with is None
+
+        # No second ping until another interval has passed
+        registry.reap(now=now + 1)
+        await settle()
+        assert len(quiet.websocket.sent) == 1
+
+    run(scenario())
+
+
+def test_remove_and_stats():
+    registry = cc.ConnectionRegistry()
+    a = cc.ChatConnection(FakeWebSocket(), 1, 7, JSON)
+    b = cc.ChatConnection(FakeWebSocket(), 1, 8, JSON)
+    registry.add(a)
+    registry.add(b)
+    a.touch(10)
+
+    stats = registry.stats()
+    assert stats["connections"] == 2
+    assert stats["chats"] == 2
+    assert stats["users"] == 1
+    assert stats["bytes_in"] == 10
+    assert stats["memory_estimate_bytes"] > 0
+
+    registry.remove(a)
+    registry.remove(b)
+    assert len(registry) == 0
+    assert registry.for_user(1) == set()
+    assert registry.stats()["chats"] == 0
@@ -0,0 +1,103 @@
+# tests/services/test_chat_protocol.py
+
+"""
+Module: app.services.chat_protocol
+
+Pure unit tests: codec negotiation, encoding round trips and frame validation.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import chat_protocol as protocol
+
+
+@pytest.fixture
+def message():
+    return SimpleNamespace(
+        id=42,
+        conversation_id=7,
+        sender_id=3,
+        timestamp=datetime(2026, 1, 1, 0, 0, 0),
+        content="hi",
+    )
+
+
+def test_negotiate_prefers_client_subprotocol_order():
+    codec = protocol.negotiate_codec(["unknown", protocol.MSGPACK_SUBPROTOCOL, protocol.JSON_SUBPROTOCOL])
+
+    assert codec.name == protocol.MSGPACK_SUBPROTOCOL
+    assert codec.binary is True
+
+
+def test_negotiate_falls_back_to_query_param_then_legacy():
+    assert protocol.negotiate_codec([], "json").name == protocol.JSON_SUBPROTOCOL
+    assert protocol.negotiate_codec([], "xml") is protocol.LEGACY_CODEC
+    assert protocol.negotiate_codec([]) is protocol.LEGACY_CODEC
+
+
+@pytest.mark.parametrize("name", list(protocol.CODECS))
+def test_codecs_round_trip_message_frames(name, message):
+    codec = protocol.CODECS[name]
+    frame = protocol.message_frame(message, nonce="c-1")
+
+    decoded = codec.decode(codec.encode(frame))
+
+    assert decoded == frame
+    assert decoded["ts"] == 1767225600000
+
+
+def test_legacy_codec_keeps_old_text_format(message):
+    frame = protocol.message_frame(message)
+
+    assert protocol.LEGACY_CODEC.encode(frame) == "3: hi"
+    parsed = protocol.parse_incoming(protocol.LEGACY_CODEC, "plain text")
+    assert parsed.content == "plain text"
+    assert parsed.nonce is None
+
+
+def test_codecs_must_encode_and_decode():
+    class EncodeOnly(protocol.FrameCodec):
+        def encode(self, frame):
+            return ""
+
+    with pytest.raises(TypeError):
+        EncodeOnly()
+
+
+def test_parse_incoming_reads_nonce():
+    codec = protocol.CODECS[protocol.JSON_SUBPROTOCOL]
+
+    frame = protocol.parse_incoming(codec, '{"v":1,"type":"message","content":"yo","nonce":"abc"}')
+
+    assert frame.content == "yo"
+    assert frame.nonce == "abc"
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        "not json",
+        "[1, 2]",
+        '{"v": 2, "content": "hi"}',
+        '{"type": "shout", "content": "hi"}',
+        '{"content": ""}',
+        '{"content": "hi", "nonce": "' + "x" * 65 + '"}',
+    ],
+)
+def test_parse_incoming_rejects_invalid_frames(data):
+    codec = protocol.CODECS[protocol.JSON_SUBPROTOCOL]
+
+    with pytest.raises(protocol.ChatFrameError):
+        protocol.parse_incoming(codec, data)
+
+
+def test_parse_incoming_returns_control_frames():
+    codec = protocol.CODECS[protocol.JSON_SUBPROTOCOL]
+
+    frame = protocol.parse_incoming(codec, '{"v":1,"type":"ping"}')
+
+    assert isinstance(frame, protocol.ControlFrame)
+    assert frame.type == "ping"
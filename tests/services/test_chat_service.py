@@ -0,0 +1,222 @@
+# tests/services/test_chat_service.py
+
+"""
+Module: app.services.chat
+
+Inbox tests run against an in-memory SQLite database (sqlite_db fixture),
+because the point of list_inbox is the single SQL statement it builds.
+"""
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.core.pagination import encode_cursor
+from app.models.conversation import Conversation
+from app.models.group import Group
+from app.models.message import Message
+from app.models.user import User
+from app.services import chat as chat_service
+from app.services.authors import embed_authors
+
+
+def make_user(db, name):
+    user = User(username=name, email=f"{name}@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_convo(db, a, b):
+    convo = Conversation(user1_id=a.id, user2_id=b.id)
+    db.add(convo)
+    db.commit()
+    return convo
+
+
+@pytest.fixture
+def users(sqlite_db):
+    return [make_user(sqlite_db, name) for name in ("alice", "bob", "carol", "dave")]
+
+
+def test_save_message_updates_inbox_fields(sqlite_db, users):
+    alice, bob = users[:2]
+    convo = make_convo(sqlite_db, alice, bob)
+
+    message = chat_service.save_message(sqlite_db, convo, alice.id, "hi")
+
+    assert convo.last_message_id == message.id
+    assert convo.last_activity_at == message.timestamp
+    # The sender has read their own message
+    assert convo.user1_last_read_id == message.id
+    assert convo.user2_last_read_id is None
+
+
+def test_list_inbox_returns_last_message_and_unread_counts(sqlite_db, users):
+    alice, bob, carol, _ = users
+    with_bob = make_convo(sqlite_db, alice, bob)
+    with_carol = make_convo(sqlite_db, carol, alice)
+
+    chat_service.save_message(sqlite_db, with_bob, bob.id, "one")
+    chat_service.save_message(sqlite_db, with_bob, bob.id, "two")
+    chat_service.save_message(sqlite_db, with_carol, alice.id, "hey carol")
+    chat_service.save_message(sqlite_db, with_carol, carol.id, "hey alice")
+
+    page = chat_service.list_inbox(sqlite_db, alice.id, limit=10)
+
+    # Newest activity first
+    assert [item.id for item in page.items] == [with_carol.id, with_bob.id]
+    assert page.next_cursor is None
+
+    carol_item, bob_item = page.items
+    assert carol_item.other_user_id == carol.id
+    assert carol_item.last_message.content == "hey alice"
+    assert carol_item.unread_count == 1
+
+    assert bob_item.other_user_id == bob.id
+    assert bob_item.last_message.content == "two"
+    assert bob_item.unread_count == 2
+
+
+def test_list_inbox_uses_a_single_query(sqlite_db, users):
+    alice = users[0]
+    for other in users[1:]:
+        convo = make_convo(sqlite_db, alice, other)
+        chat_service.save_message(sqlite_db, convo, other.id, "ping")
+
+    alice_id = alice.id
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    engine = sqlite_db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        page = chat_service.list_inbox(sqlite_db, alice_id, limit=10)
+        assert [item.unread_count for item in page.items] == [1, 1, 1]
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+
+
+def test_list_inbox_paginates_by_last_activity(sqlite_db, users):
+    alice = users[0]
+    convos = [make_convo(sqlite_db, alice, other) for other in users[1:]]
+    for convo in convos:
+        chat_service.save_message(sqlite_db, convo, alice.id, "hello")
+
+    first = chat_service.list_inbox(sqlite_db, alice.id, limit=2)
+    assert [item.id for item in first.items] == [convos[2].id, convos[1].id]
+    assert first.next_cursor is not None
+
+    second = chat_service.list_inbox(sqlite_db, alice.id, limit=2, cursor=first.next_cursor)
+    assert [item.id for item in second.items] == [convos[0].id]
+    assert second.next_cursor is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not-a-cursor",
+        encode_cursor("yesterday", 1),
+        encode_cursor("2026-01-01T00:00:00", [1]),
+        encode_cursor("2026-01-01T00:00:00", "1"),
+        encode_cursor("2026-01-01T00:00:00", True),
+    ],
+)
+def test_list_inbox_rejects_bad_cursor(sqlite_db, users, cursor):
+    with pytest.raises(HTTPException) as exc:
+        chat_service.list_inbox(sqlite_db, users[0].id, limit=10, cursor=cursor)
+
+    assert exc.value.status_code == 400
+
+
+def test_mark_conversation_read_only_moves_forward(sqlite_db, users):
+    alice, bob = users[:2]
+    convo = make_convo(sqlite_db, alice, bob)
+    first = chat_service.save_message(sqlite_db, convo, bob.id, "one")
+    second = chat_service.save_message(sqlite_db, convo, bob.id, "two")
+
+    chat_service.mark_conversation_read(sqlite_db, convo, alice.id)
+    assert convo.user1_last_read_id == second.id
+
+    chat_service.mark_conversation_read(sqlite_db, convo, alice.id, first.id)
+    assert convo.user1_last_read_id == second.id
+
+    page = chat_service.list_inbox(sqlite_db, alice.id, limit=10)
+    assert page.items[0].unread_count == 0
+
+
+def test_store_message_once_dedupes_retried_nonce(sqlite_db, users):
+    alice, bob = users[:2]
+    convo = make_convo(sqlite_db, alice, bob)
+
+    first, created = chat_service.store_message_once(sqlite_db, convo, alice.id, "hi", "n1")
+    again, created_again = chat_service.store_message_once(sqlite_db, convo, alice.id, "hi", "n1")
+
+    assert created is True
+    assert created_again is False
+    assert again.id == first.id
+
+
+def test_store_message_once_recovers_from_nonce_race(sqlite_db, users, monkeypatch):
+    alice, bob = users[:2]
+    convo = make_convo(sqlite_db, alice, bob)
+    original, _ = chat_service.store_message_once(sqlite_db, convo, alice.id, "hi", "n1")
+
+    # Simulate the race: our lookup runs before the other insert commits
+    real_find = chat_service.find_message_by_nonce
+    calls = []
+
+    def racing_find(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else real_find(*args)
+
+    monkeypatch.setattr(chat_service, "find_message_by_nonce", racing_find)
+
+    message, created = chat_service.store_message_once(sqlite_db, convo, alice.id, "hi", "n1")
+
+    assert created is False
+    assert message.id == original.id
+    assert sqlite_db.query(Message).count() == 1
+
+
+def test_group_room_is_created_once_and_has_no_read_pointers(sqlite_db, users):
+    alice = users[0]
+    group = Group(name="hikers", owner_id=alice.id)
+    sqlite_db.add(group)
+    sqlite_db.commit()
+
+    room = chat_service.get_or_create_group_room(sqlite_db, group.id)
+    assert chat_service.get_or_create_group_room(sqlite_db, group.id).id == room.id
+    assert (room.user1_id, room.user2_id) == (None, None)
+
+    message = chat_service.save_message(sqlite_db, room, alice.id, "hi all")
+
+    assert room.last_message_id == message.id
+    assert room.user1_last_read_id is None
+    assert room.user2_last_read_id is None
+
+
+def test_inbox_last_messages_get_authors_in_one_query(sqlite_db, users):
+    alice = users[0]
+    for other in users[1:]:
+        convo = make_convo(sqlite_db, alice, other)
+        chat_service.save_message(sqlite_db, convo, other.id, "ping")
+    page = chat_service.list_inbox(sqlite_db, alice.id, limit=10)
+
+    statements = []
+    count = lambda *args: statements.append(args[2])
+    engine = sqlite_db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        embed_authors(
+            sqlite_db, [item.last_message for item in page.items], id_attr="sender_id", attr="author"
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert len(statements) == 1
+    assert [item.last_message.author.username for item in page.items] == ["dave", "carol", "bob"]
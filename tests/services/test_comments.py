@@ -0,0 +1,211 @@
+# tests/services/test_comments.py
+
+"""
+Module: app.services.comments
+
+Runs against in-memory SQLite (sqlite_db fixture): the point is the
+path ranges and the windowed preview query.
+"""
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.core.pagination import encode_cursor
+from app.models.comment import Comment
+from app.models.group import Group, GroupPost
+from app.models.posts import Post
+from app.models.user import User
+from app.services import comments
+from app.services.counters import (
+    COMMENT_REPLIES,
+    GROUP_POST_COMMENTS,
+    POST_COMMENTS,
+    counter_value,
+    reconcile,
+)
+
+
+@pytest.fixture
+def world(sqlite_db):
+    """alice (1) and bob (2); wall post 100 by bob, group post 200 in group 10."""
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "alice"), (2, "bob"))
+    )
+    sqlite_db.add(Group(id=10, name="club", owner_id=1))
+    sqlite_db.add(Post(id=100, content="wall", user_id=2))
+    sqlite_db.add(GroupPost(id=200, content="club", group_id=10, user_id=1))
+    sqlite_db.commit()
+    return sqlite_db
+
+
+@pytest.fixture
+def thread(world):
+    """
+    On post 100:
+        a
+        +- a1
+        |  +- a1x
+        +- a2
+        +- a3
+        +- a4
+        b
+        c
+    Returns {content: id}.
+    """
+    post = world.get(Post, 100)
+    ids = {}
+
+    def add(content, parent=None, user_id=1):
+        ids[content] = comments.add_comment(world, user_id, post, content, ids.get(parent)).id
+
+    add("a")
+    add("a1", "a", user_id=2)
+    add("a1x", "a1")
+    add("b")
+    for name in ("a2", "a3", "a4"):
+        add(name, "a")
+    add("c", user_id=2)
+    return ids
+
+
+def count_statements(db):
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", listener)
+
+
+def contents(page):
+    return [item.content for item in page.items]
+
+
+# ---------- add_comment ----------
+def test_paths_and_counters(world, thread):
+    a1x = world.get(Comment, thread["a1x"])
+
+    assert a1x.path == "/".join(f"{thread[name]:010d}" for name in ("a", "a1", "a1x"))
+    assert (a1x.root_id, a1x.depth) == (thread["a"], 2)
+    assert counter_value(world, POST_COMMENTS, 100) == 8
+    assert counter_value(world, COMMENT_REPLIES, thread["a"]) == 4
+    assert not any(reconcile(world, names=[POST_COMMENTS, COMMENT_REPLIES]).values())
+
+
+def test_replies_stop_at_the_deepest_level(world, monkeypatch):
+    monkeypatch.setattr(comments, "MAX_COMMENT_DEPTH", 1)
+    post = world.get(Post, 100)
+    top = comments.add_comment(world, 1, post, "top")
+    reply = comments.add_comment(world, 1, post, "reply", top.id)
+
+    deeper = comments.add_comment(world, 1, post, "deeper", reply.id)
+
+    assert (deeper.parent_id, deeper.depth) == (top.id, 1)
+
+
+def test_parent_must_be_on_the_same_post(world):
+    other = comments.add_comment(world, 1, world.get(GroupPost, 200), "elsewhere")
+
+    with pytest.raises(HTTPException) as exc:
+        comments.add_comment(world, 1, world.get(Post, 100), "reply", other.id)
+    assert exc.value.status_code == 404
+    assert counter_value(world, GROUP_POST_COMMENTS, 200) == 1
+
+
+# ---------- list_comments ----------
+def test_preview_in_one_statement(world, thread):
+    post = world.get(Post, 100)
+    statements, stop = count_statements(world)
+    try:
+        page = comments.list_comments(world, post, replies=2, depth=1)
+    finally:
+        stop()
+
+    # First two replies per parent, one level down, in thread order
+    assert contents(page) == ["a", "a1", "a2", "b", "c"]
+    assert [item.reply_count for item in page.items] == [4, 1, 0, 0, 0]
+    assert page.comment_count == 8
+    # The thread, then the post's comment counter
+    assert len(statements) == 2
+
+
+def test_preview_never_shows_a_reply_without_its_parent(world, thread):
+    page = comments.list_comments(world, world.get(Post, 100), replies=1, depth=2)
+    assert contents(page) == ["a", "a1", "a1x", "b", "c"]
+
+    post = world.get(Post, 100)
+    comments.add_comment(world, 1, post, "a2x", thread["a2"])
+    page = comments.list_comments(world, post, replies=1, depth=2)
+    assert "a2x" not in contents(page)
+
+
+def test_top_level_pages(world, thread):
+    post = world.get(Post, 100)
+
+    first = comments.list_comments(world, post, limit=2, replies=0)
+    second = comments.list_comments(world, post, limit=2, replies=0, cursor=first.next_cursor)
+
+    assert contents(first) == ["a", "b"]
+    assert contents(second) == ["c"]
+    assert second.next_cursor is None
+
+
+def test_page_ends_with_a_whole_thread(world, thread):
+    page = comments.list_comments(world, world.get(Post, 100), limit=1, replies=10, depth=5)
+    assert contents(page) == ["a", "a1", "a1x", "a2", "a3", "a4"]
+    assert page.next_cursor is not None
+
+
+# ---------- list_replies ----------
+def test_replies_page_through_the_subtree(world, thread):
+    post = world.get(Post, 100)
+
+    seen, cursor = [], None
+    while True:
+        page = comments.list_replies(world, post, thread["a"], limit=2, cursor=cursor)
+        seen += contents(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == ["a1", "a1x", "a2", "a3", "a4"]
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor(1), encode_cursor("9999999999"), "x"])
+def test_invalid_replies_cursor(world, thread, cursor):
+    with pytest.raises(HTTPException) as exc:
+        comments.list_replies(world, world.get(Post, 100), thread["a"], cursor=cursor)
+    assert exc.value.status_code == 400
+
+
+# ---------- deleting ----------
+def test_delete_comment_takes_its_replies(world, thread):
+    post = world.get(Post, 100)
+
+    with pytest.raises(HTTPException) as exc:
+        comments.delete_comment(world, 1, post, thread["a1"])
+    assert exc.value.status_code == 403
+
+    comments.delete_comment(world, 2, post, thread["a1"])
+
+    assert contents(comments.list_comments(world, post, replies=10, depth=5)) == [
+        "a", "a2", "a3", "a4", "b", "c",
+    ]
+    assert counter_value(world, POST_COMMENTS, 100) == 6
+    assert counter_value(world, COMMENT_REPLIES, thread["a"]) == 3
+    assert not any(reconcile(world, names=[POST_COMMENTS, COMMENT_REPLIES]).values())
+
+
+def test_delete_comments_in_batches_keeps_counters(world, thread):
+    condition = comments.subtree(world.get(Comment, thread["a"]))
+
+    assert comments.delete_comments(world, condition, limit=3) == 3
+    world.commit()
+    # Deepest first: the top of the thread is still there
+    assert world.get(Comment, thread["a"]) is not None
+    assert not any(reconcile(world, names=[POST_COMMENTS, COMMENT_REPLIES]).values())
+
+    while comments.delete_comments(world, condition, limit=3):
+        world.commit()
+    assert counter_value(world, POST_COMMENTS, 100) == 2
@@ -0,0 +1,106 @@
+# tests/services/test_counters.py
+
+"""
+Module: app.services.counters
+
+Counters are SQL upserts, so they run against in-memory SQLite.
+"""
+
+from app.models.counter import Counter
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.posts import Post
+from app.models.user import User
+from app.services import counters
+
+
+def test_bump_creates_and_increments(sqlite_db):
+    counters.bump(sqlite_db, counters.GROUP_POSTS, 7)
+    counters.bump(sqlite_db, counters.GROUP_POSTS, 7, 2)
+    counters.bump(sqlite_db, counters.GROUP_POSTS, 8)
+    sqlite_db.commit()
+
+    assert counters.counter_value(sqlite_db, counters.GROUP_POSTS, 7) == 3
+    assert counters.counter_value(sqlite_db, counters.GROUP_POSTS, 8) == 1
+    assert counters.counter_value(sqlite_db, counters.GROUP_MEMBERS, 7) == 0
+
+
+def test_bump_many_upserts_every_entity(sqlite_db):
+    counters.bump(sqlite_db, counters.USER_POSTS, 1)
+    counters.bump_many(sqlite_db, counters.USER_POSTS, {1: 2, 2: 5, 3: -1})
+    counters.bump_many(sqlite_db, counters.USER_POSTS, {})
+    sqlite_db.commit()
+
+    values = [counters.counter_value(sqlite_db, counters.USER_POSTS, i) for i in (1, 2, 3)]
+    assert values == [3, 5, -1]
+
+
+def test_bump_is_undone_by_rollback(sqlite_db):
+    counters.bump(sqlite_db, counters.GROUP_MEMBERS, 1)
+    sqlite_db.commit()
+
+    counters.bump(sqlite_db, counters.GROUP_MEMBERS, 1)
+    sqlite_db.rollback()
+
+    assert counters.counter_value(sqlite_db, counters.GROUP_MEMBERS, 1) == 1
+
+
+def test_sharded_counter_sums_its_shards(sqlite_db, monkeypatch):
+    monkeypatch.setitem(counters.SHARDS, counters.GROUP_POSTS, 4)
+    for _ in range(40):
+        counters.bump(sqlite_db, counters.GROUP_POSTS, 7)
+    sqlite_db.commit()
+
+    shards = sqlite_db.query(Counter).filter(Counter.entity_id == 7).count()
+    assert 1 < shards <= 4
+    assert counters.counter_value(sqlite_db, counters.GROUP_POSTS, 7) == 40
+
+
+def test_counter_values_sums_shards_of_many_entities(sqlite_db, monkeypatch):
+    monkeypatch.setattr(counters, "RECONCILE_CHUNK", 2)
+    monkeypatch.setitem(counters.SHARDS, counters.GROUP_POSTS, 4)
+    for group_id in (1, 2, 3):
+        for _ in range(10 * group_id):
+            counters.bump(sqlite_db, counters.GROUP_POSTS, group_id)
+    sqlite_db.commit()
+
+    assert counters.counter_values(sqlite_db, counters.GROUP_POSTS, [1, 2, 3, 4]) == {1: 10, 2: 20, 3: 30, 4: 0}
+
+
+def test_reconcile_repairs_drift(sqlite_db):
+    alice = User(username="alice", email="alice@example.com", password_hash="x")
+    bob = User(username="bob", email="bob@example.com", password_hash="x")
+    sqlite_db.add_all([alice, bob])
+    sqlite_db.flush()
+    # Two posts written without counters, one stale counter for bob
+    sqlite_db.add_all([Post(content="a", user_id=alice.id), Post(content="b", user_id=alice.id)])
+    counters.bump(sqlite_db, counters.USER_POSTS, bob.id, 5)
+    sqlite_db.add(FriendRequest(from_user_id=bob.id, to_user_id=alice.id, status=RequestStatus.pending))
+    sqlite_db.commit()
+
+    repaired = counters.reconcile(sqlite_db)
+
+    assert repaired[counters.USER_POSTS] == 2
+    assert repaired[counters.PENDING_REQUESTS] == 1
+    assert counters.counter_value(sqlite_db, counters.USER_POSTS, alice.id) == 2
+    assert counters.counter_value(sqlite_db, counters.USER_POSTS, bob.id) == 0
+    assert counters.counter_value(sqlite_db, counters.PENDING_REQUESTS, alice.id) == 1
+
+    # Nothing left to repair
+    assert not any(counters.reconcile(sqlite_db).values())
+
+
+def test_reconcile_compares_in_sql_and_reads_only_drift(sqlite_db, monkeypatch):
+    monkeypatch.setitem(counters.SHARDS, counters.USER_POSTS, 4)
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in range(20)]
+    sqlite_db.add_all(users)
+    sqlite_db.flush()
+    for user in users:
+        sqlite_db.add(Post(content="p", user_id=user.id))
+        counters.bump(sqlite_db, counters.USER_POSTS, user.id)
+    # One user's count drifted
+    counters.bump(sqlite_db, counters.USER_POSTS, users[3].id, 2)
+    sqlite_db.commit()
+
+    drift = counters._drift(sqlite_db, counters.USER_POSTS, counters._true_counts()[counters.USER_POSTS])
+
+    assert drift == [(users[3].id, 1)]
@@ -0,0 +1,172 @@
+# tests/services/test_feed.py
+
+"""
+Module: app.services.feed
+
+Runs against in-memory SQLite (sqlite_db fixture).
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.core.pagination import encode_cursor
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.timeline import TimelineEntry
+from app.models.user import User, user_friends
+from app.services import feed
+from app.services.blocks import hidden_set
+from app.services.counters import GROUP_MEMBERS, bump
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def world(sqlite_db, monkeypatch):
+    """
+    me (1) is friends with friend (2); stranger (3) is not.
+    "small" (me, friend) pushes posts, "large" (me, stranger, friend) is
+    over the (patched) push limit and is pulled.
+    """
+    monkeypatch.setattr(feed, "PUSH_MAX_MEMBERS", 2)
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "me"), (2, "friend"), (3, "stranger"))
+    )
+    sqlite_db.execute(
+        user_friends.insert(),
+        [{"user_id": 1, "friend_id": 2}, {"user_id": 2, "friend_id": 1}],
+    )
+    small = Group(id=10, name="small", owner_id=1)
+    large = Group(id=20, name="large", owner_id=3)
+    sqlite_db.add_all([small, large])
+    for group, members in ((small, (1, 2)), (large, (1, 2, 3))):
+        for user_id in members:
+            sqlite_db.add(GroupMembership(group_id=group.id, user_id=user_id))
+            bump(sqlite_db, GROUP_MEMBERS, group.id)
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def group_post(db, group_id, user_id, minute):
+    post = GroupPost(content=f"g{group_id}@{minute}", group_id=group_id, user_id=user_id,
+                     created_at=T0 + timedelta(minutes=minute))
+    db.add(post)
+    feed.deliver_group_post(db, post)
+    db.commit()
+    return post
+
+
+def wall_post(db, user_id, minute):
+    post = Post(content=f"u{user_id}@{minute}", user_id=user_id, created_at=T0 + timedelta(minutes=minute))
+    db.add(post)
+    db.commit()
+    return post
+
+
+def test_small_groups_push_and_large_groups_do_not(world):
+    pushed = group_post(world, 10, 2, 1)
+    pulled = group_post(world, 20, 3, 2)
+
+    assert pushed.fanned_out is True
+    assert pulled.fanned_out is False
+    assert sorted(e.user_id for e in world.query(TimelineEntry)) == [1, 2]
+
+
+def test_home_feed_merges_every_source_newest_first(world):
+    wall_post(world, 1, 1)
+    wall_post(world, 2, 3)
+    wall_post(world, 3, 4)  # stranger: not in my feed
+    group_post(world, 10, 2, 2)
+    group_post(world, 20, 3, 5)
+    group_post(world, 20, 3, 3)  # same minute as a wall post
+
+    page = feed.home_feed(world, 1, limit=10, include_groups=True)
+
+    assert [item.content for item in page.items] == ["g20@5", "g20@3", "u2@3", "g10@2", "u1@1"]
+    assert page.items[0].kind == "group_post" and page.items[0].group_id == 20
+    assert page.next_cursor is None
+
+    walls = feed.home_feed(world, 1, limit=10)
+    assert [item.content for item in walls.items] == ["u2@3", "u1@1"]
+
+
+def test_home_feed_cursor_walks_all_items_once(world):
+    for minute in range(6):
+        wall_post(world, 2, minute)
+        group_post(world, 10, 2, minute)
+        group_post(world, 20, 3, minute)
+
+    seen, cursor = [], None
+    while True:
+        page = feed.home_feed(world, 1, limit=4, cursor=cursor, include_groups=True)
+        seen.extend((item.kind, item.id) for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen) == 18
+    assert len(set(seen)) == 18
+
+
+def test_left_groups_drop_out_of_the_feed(world):
+    group_post(world, 10, 2, 1)
+    group_post(world, 20, 3, 2)
+    world.query(GroupMembership).filter_by(user_id=1).delete()
+    world.commit()
+
+    assert feed.home_feed(world, 1, include_groups=True).items == []
+
+
+def test_new_members_get_the_newest_pushed_posts(world, monkeypatch):
+    monkeypatch.setattr(feed, "JOIN_BACKFILL", 2)
+    for minute in range(3):
+        group_post(world, 10, 2, minute)
+    group_post(world, 20, 3, 3)  # pulled: not copied
+
+    world.add(GroupMembership(group_id=10, user_id=3))
+    feed.backfill_timeline(world, 10, [3])
+    # A member who comes back keeps one entry per post
+    feed.backfill_timeline(world, 10, [3])
+    world.commit()
+
+    page = feed.home_feed(world, 3, include_groups=True)
+    assert [item.content for item in page.items] == ["g20@3", "g10@2", "g10@1"]
+    assert world.query(TimelineEntry).filter_by(user_id=3).count() == 2
+
+
+def test_statement_count_does_not_grow_with_groups(world):
+    world.add_all(Group(id=100 + i, name=f"g{i}", owner_id=1) for i in range(50))
+    world.add_all(GroupMembership(group_id=100 + i, user_id=1) for i in range(50))
+    world.commit()
+    for i in range(50):
+        group_post(world, 100 + i, 1, i)
+    # The block list is read once, then served from memory
+    hidden_set(world, 1)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(world.get_bind(), "before_cursor_execute", listener)
+    try:
+        page = feed.home_feed(world, 1, limit=5, include_groups=True)
+    finally:
+        event.remove(world.get_bind(), "before_cursor_execute", listener)
+
+    assert [item.group_id for item in page.items] == [149, 148, 147, 146, 145]
+    # wall, pushed, pulled (all groups at once), page rows
+    assert len(statements) == 4
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    ["junk", encode_cursor("2026-01-01T00:00:00", 7, 1), encode_cursor("2026-01-01T00:00:00", 1, True)],
+)
+def test_home_feed_rejects_bad_cursor(world, cursor):
+    with pytest.raises(HTTPException) as exc:
+        feed.home_feed(world, 1, cursor=cursor, include_groups=True)
+
+    assert exc.value.status_code == 400
@@ -5,6 +5,9 @@ Module: app.services.group_helpers
 
 Unit tests (no real DB).
 We mock the SQLAlchemy Session using MagicMock.
+
+get_group_with_role is about the single query it runs, so it is tested
+against the in-memory SQLite database (sqlite_db fixture).
 """
 
 from types import SimpleNamespace
@@ -12,12 +15,17 @@ from unittest.mock import MagicMock
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from app.models.group import Group
+from app.models.group import Group, GroupPost
 from app.models.group_membership import GroupMembership
+from app.models.user import User
 from app.services.group_helpers import (
+    forget_group_access,
     get_group_or_404,
+    get_group_post_for_member,
+    get_group_with_role,
     is_member,
     is_user_admin_in_group,
 )
@@ -94,3 +102,81 @@ def test_is_user_admin_in_group_returns_true_when_admin(db, current_user):
 
     assert is_user_admin_in_group(db=db, group_id=1, current_user=current_user) is True
     db.query.assert_called_once_with(GroupMembership)
+
+
+# ---------- tests: get_group_with_role (SQLite) ----------
+@pytest.fixture
+def group_with_members(sqlite_db):
+    users = [
+        User(username=name, email=f"{name}@example.com", password_hash="x")
+        for name in ("owner", "member", "outsider")
+    ]
+    sqlite_db.add_all(users)
+    sqlite_db.flush()
+    group = Group(name="readers", owner_id=users[0].id)
+    sqlite_db.add(group)
+    sqlite_db.flush()
+    sqlite_db.add_all(
+        [
+            GroupMembership(group_id=group.id, user_id=users[0].id, is_admin=True),
+            GroupMembership(group_id=group.id, user_id=users[1].id, is_admin=False),
+        ]
+    )
+    sqlite_db.commit()
+    return group.id, [u.id for u in users]
+
+
+def count_statements(db):
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_get_group_with_role_returns_role_in_one_query(sqlite_db, group_with_members):
+    group_id, (owner_id, member_id, outsider_id) = group_with_members
+    statements = count_statements(sqlite_db)
+
+    owner = get_group_with_role(sqlite_db, group_id, owner_id)
+    member = get_group_with_role(sqlite_db, group_id, member_id)
+    outsider = get_group_with_role(sqlite_db, group_id, outsider_id)
+
+    assert (owner.is_member, owner.is_admin) == (True, True)
+    assert (member.is_member, member.is_admin) == (True, False)
+    assert (outsider.is_member, outsider.is_admin) == (False, False)
+    assert outsider.group.id == group_id
+    assert len(statements) == 3
+
+
+def test_get_group_with_role_is_cached_per_session(sqlite_db, group_with_members):
+    group_id, (_, member_id, _) = group_with_members
+    first = get_group_with_role(sqlite_db, group_id, member_id)
+    statements = count_statements(sqlite_db)
+
+    assert get_group_with_role(sqlite_db, group_id, member_id) is first
+    assert statements == []
+
+    forget_group_access(sqlite_db, group_id)
+    assert get_group_with_role(sqlite_db, group_id, member_id) is not first
+    assert len(statements) == 1
+
+
+def test_get_group_with_role_raises_not_found(sqlite_db):
+    with pytest.raises(HTTPException) as exc:
+        get_group_with_role(sqlite_db, 404, 1)
+
+    assert exc.value.status_code == 404
+
+
+def test_get_group_post_for_member(sqlite_db, group_with_members):
+    group_id, (owner_id, member_id, outsider_id) = group_with_members
+    post = GroupPost(content="hi", group_id=group_id, user_id=owner_id)
+    sqlite_db.add(post)
+    sqlite_db.commit()
+
+    assert get_group_post_for_member(sqlite_db, group_id, post.id, member_id).id == post.id
+    with pytest.raises(HTTPException) as exc:
+        get_group_post_for_member(sqlite_db, group_id, post.id, outsider_id)
+    assert exc.value.status_code == 403
+    with pytest.raises(HTTPException) as exc:
+        get_group_post_for_member(sqlite_db, group_id, post.id + 1, member_id)
+    assert exc.value.status_code == 404
@@ -7,6 +7,9 @@ Unit tests for group service functions.
 We mock the SQLAlchemy Session and patch helper functions.
 We also patch SQLAlchemy models (GroupMembership, GroupPost) with fake classes
 to avoid SQLAlchemy mapper configuration during unit tests.
+
+Member listing is about the SQL it builds (projection, keyset pagination),
+so it runs against the in-memory SQLite database (sqlite_db fixture).
 """
 
 from datetime import datetime
@@ -15,11 +18,18 @@ from unittest.mock import MagicMock
 
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.schemas.group import GroupUpdate, GroupPostCreate
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.user import User
+from app.schemas.group import GroupMemberRead, GroupUpdate, GroupPostCreate
 from app.services import group as group_service
+from app.services.counters import GROUP_MEMBERS, counter_value
+from app.services.membership_cache import MembershipCache
+from app.services.group_helpers import GroupAccess
 
 
 class DummyColumn:
@@ -49,6 +59,16 @@ class FakeGroupPost:
         self.created_at = None
 
 
+def patch_access(monkeypatch, group=None, member=False, admin=False):
+    """Make get_group_with_role return a group with the given role."""
+    membership = SimpleNamespace(is_admin=admin) if (member or admin) else None
+    access = GroupAccess(group=group or object(), membership=membership)
+    monkeypatch.setattr(
+        group_service, "get_group_with_role", lambda db, group_id, user_id: access
+    )
+    return access
+
+
 @pytest.fixture
 def db() -> Session:
     return MagicMock(spec=Session)
@@ -66,9 +86,7 @@ def group_id():
 
 # ---------- join_group ----------
 def test_join_group_raises_conflict_when_already_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-
-    db.query.return_value.filter.return_value.first.return_value = SimpleNamespace()
+    patch_access(monkeypatch, member=True)
 
     with pytest.raises(HTTPException) as exc:
         group_service.join_group(db=db, group_id=group_id, current_user=current_user)
@@ -80,11 +98,9 @@ def test_join_group_raises_conflict_when_already_member(db, current_user, group_
 
 
 def test_join_group_creates_membership_when_not_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
+    patch_access(monkeypatch, member=False)
     monkeypatch.setattr(group_service, "GroupMembership", FakeMembership)
 
-    db.query.return_value.filter.return_value.first.return_value = None
-
     result = group_service.join_group(db=db, group_id=group_id, current_user=current_user)
 
     assert result == {"detail": "Joined the group successfully."}
@@ -100,10 +116,8 @@ def test_join_group_creates_membership_when_not_member(db, current_user, group_i
 
 
 def test_join_group_integrity_error_is_idempotent(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
+    patch_access(monkeypatch, member=False)
     monkeypatch.setattr(group_service, "GroupMembership", FakeMembership)
-
-    db.query.return_value.filter.return_value.first.return_value = None
     db.commit.side_effect = IntegrityError("stmt", {}, Exception("orig"))
 
     result = group_service.join_group(db=db, group_id=group_id, current_user=current_user)
@@ -114,9 +128,7 @@ def test_join_group_integrity_error_is_idempotent(db, current_user, group_id, mo
 
 # ---------- leave_group ----------
 def test_leave_group_raises_when_not_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-
-    db.query.return_value.filter.return_value.first.return_value = None
+    patch_access(monkeypatch, member=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.leave_group(db=db, group_id=group_id, current_user=current_user)
@@ -126,10 +138,7 @@ def test_leave_group_raises_when_not_member(db, current_user, group_id, monkeypa
 
 
 def test_leave_group_deletes_membership(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-
-    membership = SimpleNamespace(id=1)
-    db.query.return_value.filter.return_value.first.return_value = membership
+    membership = patch_access(monkeypatch, member=True).membership
 
     result = group_service.leave_group(db=db, group_id=group_id, current_user=current_user)
 
@@ -140,8 +149,7 @@ def test_leave_group_deletes_membership(db, current_user, group_id, monkeypatch)
 
 # ---------- list_group_posts ----------
 def test_list_group_posts_forbidden_when_not_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: False)
+    patch_access(monkeypatch, member=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.list_group_posts(db=db, group_id=group_id, current_user=current_user)
@@ -151,8 +159,7 @@ def test_list_group_posts_forbidden_when_not_member(db, current_user, group_id,
 
 
 def test_list_group_posts_returns_posts_when_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: True)
+    patch_access(monkeypatch, member=True)
 
     fake_posts = [SimpleNamespace(id=1), SimpleNamespace(id=2)]
     db.query.return_value.filter.return_value.order_by.return_value.all.return_value = fake_posts
@@ -164,8 +171,7 @@ def test_list_group_posts_returns_posts_when_member(db, current_user, group_id,
 
 # ---------- create_group_post ----------
 def test_create_group_post_forbidden_when_not_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: False)
+    patch_access(monkeypatch, member=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.create_group_post(
@@ -180,9 +186,12 @@ def test_create_group_post_forbidden_when_not_member(db, current_user, group_id,
 
 
 def test_create_group_post_creates_post_when_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: True)
+    patch_access(monkeypatch, member=True)
     monkeypatch.setattr(group_service, "GroupPost", FakeGroupPost)
+    delivered = []
+    monkeypatch.setattr(group_service, "deliver_group_post", lambda db, post: delivered.append(post))
+    indexed = []
+    monkeypatch.setattr(group_service, "index_post_tags", lambda db, post: indexed.append(post))
 
     post_in = GroupPostCreate(content="hello")
 
@@ -201,14 +210,15 @@ def test_create_group_post_creates_post_when_member(db, current_user, group_id,
     db.add.assert_called_once()
     db.commit.assert_called_once()
     db.refresh.assert_called_once_with(result)
+    assert delivered == [result]
+    assert indexed == [result]
 
 
 # ---------- update_group ----------
 def test_update_group_forbidden_when_not_admin(db, current_user, group_id, monkeypatch):
     fake_group = SimpleNamespace(id=group_id, name="Old", description="Old desc")
 
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: fake_group)
-    monkeypatch.setattr(group_service, "is_user_admin_in_group", lambda db, group_id, current_user: False)
+    patch_access(monkeypatch, group=fake_group, admin=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.update_group(
@@ -225,8 +235,7 @@ def test_update_group_forbidden_when_not_admin(db, current_user, group_id, monke
 def test_update_group_updates_fields_when_admin(db, current_user, group_id, monkeypatch):
     fake_group = SimpleNamespace(id=group_id, name="Old", description="Old desc")
 
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: fake_group)
-    monkeypatch.setattr(group_service, "is_user_admin_in_group", lambda db, group_id, current_user: True)
+    patch_access(monkeypatch, group=fake_group, admin=True)
 
     updated = group_service.update_group(
         db=db,
@@ -243,8 +252,7 @@ def test_update_group_updates_fields_when_admin(db, current_user, group_id, monk
 
 # ---------- list_group_members ----------
 def test_list_group_members_forbidden_when_not_member(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: False)
+    patch_access(monkeypatch, member=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.list_group_members(db=db, group_id=group_id, current_user=current_user)
@@ -253,41 +261,65 @@ def test_list_group_members_forbidden_when_not_member(db, current_user, group_id
     assert exc.value.detail == "You must join the group to view members."
 
 
-def test_list_group_members_maps_to_schema(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_member", lambda db, group_id, user_id: True)
-
-    dt = datetime(2025, 1, 1, 12, 0, 0)
-    memberships = [
-        SimpleNamespace(
-            user_id=1,
-            user=SimpleNamespace(username="u1"),
-            is_admin=True,
-            created_at=dt,
-        ),
-        SimpleNamespace(
-            user_id=2,
-            user=SimpleNamespace(username="u2"),
-            is_admin=False,
-            created_at=dt,
-        ),
+@pytest.fixture
+def big_group(sqlite_db):
+    """A group with five members; users 1 and 4 are admins."""
+    users = [
+        User(username=f"u{i}", email=f"u{i}@example.com", password_hash="x")
+        for i in range(1, 6)
     ]
+    sqlite_db.add_all(users)
+    sqlite_db.flush()
+    group = Group(name="big", owner_id=users[0].id)
+    sqlite_db.add(group)
+    sqlite_db.flush()
+    sqlite_db.add_all(
+        GroupMembership(group_id=group.id, user_id=u.id, is_admin=u.id in (1, 4))
+        for u in users
+    )
+    sqlite_db.commit()
+    return group.id
+
+
+def test_list_group_members_pages_by_user_id(sqlite_db, big_group):
+    me = SimpleNamespace(id=1)
+
+    first = group_service.list_group_members(sqlite_db, big_group, me, limit=2)
+    second = group_service.list_group_members(
+        sqlite_db, big_group, me, limit=2, after_user_id=first[-1].user_id
+    )
+
+    assert [(m.user_id, m.username, m.is_admin) for m in first] == [(1, "u1", True), (2, "u2", False)]
+    assert [m.user_id for m in second] == [3, 4]
+    assert GroupMemberRead.model_validate(first[0]).username == "u1"
+
+
+def test_list_group_members_admins_only(sqlite_db, big_group):
+    admins = group_service.list_group_members(
+        sqlite_db, big_group, SimpleNamespace(id=2), admins_only=True
+    )
 
-    db.query.return_value.filter.return_value.join.return_value.all.return_value = memberships
+    assert [m.user_id for m in admins] == [1, 4]
 
-    result = group_service.list_group_members(db=db, group_id=group_id, current_user=current_user)
 
-    assert len(result) == 2
-    assert result[0].username == "u1"
-    assert result[0].is_admin is True
-    assert result[1].username == "u2"
-    assert result[1].is_admin is False
+def test_list_group_members_runs_no_per_row_queries(sqlite_db, big_group):
+    me = SimpleNamespace(id=1)
+    group_service.list_group_members(sqlite_db, big_group, me, limit=1)  # warm the role cache
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        members = group_service.list_group_members(sqlite_db, big_group, me, limit=50)
+        assert [m.username for m in members] == ["u1", "u2", "u3", "u4", "u5"]
+    finally:
+        event.remove(sqlite_db.get_bind(), "before_cursor_execute", listener)
+
+    assert len(statements) == 1
 
 
 # ---------- remove_group_member ----------
 def test_remove_group_member_requires_admin(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_user_admin_in_group", lambda db, group_id, current_user: False)
+    patch_access(monkeypatch, admin=False)
 
     with pytest.raises(HTTPException) as exc:
         group_service.remove_group_member(
@@ -302,8 +334,7 @@ def test_remove_group_member_requires_admin(db, current_user, group_id, monkeypa
 
 
 def test_remove_group_member_raises_when_target_missing(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_user_admin_in_group", lambda db, group_id, current_user: True)
+    patch_access(monkeypatch, admin=True)
 
     db.query.return_value.filter.return_value.first.return_value = None
 
@@ -320,8 +351,7 @@ def test_remove_group_member_raises_when_target_missing(db, current_user, group_
 
 
 def test_remove_group_member_deletes_when_found(db, current_user, group_id, monkeypatch):
-    monkeypatch.setattr(group_service, "get_group_or_404", lambda db, group_id: object())
-    monkeypatch.setattr(group_service, "is_user_admin_in_group", lambda db, group_id, current_user: True)
+    patch_access(monkeypatch, admin=True)
 
     membership = SimpleNamespace(id=1)
     db.query.return_value.filter.return_value.first.return_value = membership
@@ -335,3 +365,171 @@ def test_remove_group_member_deletes_when_found(db, current_user, group_id, monk
 
     db.delete.assert_called_once_with(membership)
     db.commit.assert_called_once()
+
+
+# ---------- bulk membership (SQLite) ----------
+@pytest.fixture
+def cache(monkeypatch, big_group, sqlite_db):
+    """A fresh member cache with big_group already loaded."""
+    cache = MembershipCache()
+    monkeypatch.setattr(group_service, "group_members", cache)
+    cache.load(big_group, lambda: [1, 2, 3, 4, 5])
+    return cache
+
+
+def add_users(db, *ids):
+    db.add_all(User(id=i, username=f"u{i}", email=f"u{i}@example.com", password_hash="x") for i in ids)
+    db.commit()
+
+
+def statuses(response):
+    return [(r.user_id, r.status) for r in response.results]
+
+
+def test_bulk_add_reports_each_user_and_updates_count_and_cache(sqlite_db, big_group, cache):
+    add_users(sqlite_db, 6, 7)
+
+    response = group_service.bulk_add_group_members(
+        sqlite_db, big_group, [6, 2, 6, 99, 7], SimpleNamespace(id=1)
+    )
+
+    assert statuses(response) == [
+        (6, "added"),
+        (2, "already_member"),
+        (99, "user_not_found"),
+        (7, "added"),
+    ]
+    assert counter_value(sqlite_db, GROUP_MEMBERS, big_group) == 2
+    assert cache.contains(big_group, 7) is True
+    assert sqlite_db.query(GroupMembership).filter_by(group_id=big_group).count() == 7
+
+
+def test_bulk_remove_and_promote(sqlite_db, big_group, cache):
+    admin = SimpleNamespace(id=1)
+
+    promoted = group_service.bulk_promote_group_members(sqlite_db, big_group, [2, 4, 42], admin)
+    removed = group_service.bulk_remove_group_members(sqlite_db, big_group, [3, 5, 42], admin)
+
+    assert statuses(promoted) == [(2, "promoted"), (4, "already_admin"), (42, "not_member")]
+    assert statuses(removed) == [(3, "removed"), (5, "removed"), (42, "not_member")]
+    assert counter_value(sqlite_db, GROUP_MEMBERS, big_group) == -2
+    assert cache.contains(big_group, 3) is False
+    admins = group_service.list_group_members(sqlite_db, big_group, admin, admins_only=True)
+    assert [m.user_id for m in admins] == [1, 2, 4]
+
+
+def test_bulk_add_statement_count_does_not_grow_with_the_batch(sqlite_db, big_group, cache):
+    add_users(sqlite_db, *range(6, 106))
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        response = group_service.bulk_add_group_members(
+            sqlite_db, big_group, list(range(6, 106)), SimpleNamespace(id=1)
+        )
+    finally:
+        event.remove(sqlite_db.get_bind(), "before_cursor_execute", listener)
+
+    assert {r.status for r in response.results} == {"added"}
+    # Admin check, INSERT ... SELECT, counter upsert, sync log rows,
+    # timeline backfill
+    assert len(statements) == 5
+
+
+@pytest.mark.parametrize(
+    "bulk",
+    [
+        group_service.bulk_add_group_members,
+        group_service.bulk_remove_group_members,
+        group_service.bulk_promote_group_members,
+    ],
+)
+def test_bulk_operations_require_admin(sqlite_db, big_group, cache, bulk):
+    with pytest.raises(HTTPException) as exc:
+        bulk(sqlite_db, big_group, [3], SimpleNamespace(id=2))
+
+    assert exc.value.status_code == 403
+    assert cache.contains(big_group, 3) is True
+
+
+# ---------- list_group_directory (SQLite) ----------
+@pytest.fixture
+def directory(sqlite_db):
+    owner = User(username="owner", email="owner@example.com", password_hash="x")
+    sqlite_db.add(owner)
+    sqlite_db.flush()
+    names = [
+        ("Hiking Club", "weekend walks in the hills"),
+        ("hikers anonymous", None),
+        ("Chess", "openings and endgames"),
+        ("Book Club", "one novel a month"),
+    ]
+    groups = [Group(name=n, description=d, owner_id=owner.id) for n, d in names]
+    sqlite_db.add_all(groups)
+    sqlite_db.commit()
+    return owner, groups
+
+
+def test_directory_pages_by_name_with_counts(sqlite_db, directory):
+    owner, groups = directory
+    chess = groups[2]
+    group_service.join_group(sqlite_db, chess.id, SimpleNamespace(id=owner.id))
+    group_service.create_group_post(
+        sqlite_db, chess.id, GroupPostCreate(content="e4"), SimpleNamespace(id=owner.id)
+    )
+
+    first = group_service.list_group_directory(sqlite_db, limit=2)
+    second = group_service.list_group_directory(sqlite_db, limit=2, cursor=first.next_cursor)
+
+    assert [g.name for g in first.items] == ["Book Club", "Chess"]
+    assert (first.items[1].member_count, first.items[1].post_count) == (1, 1)
+    assert [g.name for g in second.items] == ["hikers anonymous", "Hiking Club"]
+    assert second.next_cursor is None
+
+
+def test_directory_prefix_is_case_insensitive_range(sqlite_db, directory):
+    page = group_service.list_group_directory(sqlite_db, prefix="HIK")
+
+    assert [g.name for g in page.items] == ["hikers anonymous", "Hiking Club"]
+
+
+def test_directory_prefix_folds_like_sqlite_lower(sqlite_db, directory):
+    owner, _ = directory
+    sqlite_db.add(Group(name="Étude club", owner_id=owner.id))
+    sqlite_db.commit()
+
+    accented = group_service.list_group_directory(sqlite_db, prefix="Étu")
+    # No successor for the last code point: the bound moves to "i"
+    last_code_point = group_service.list_group_directory(sqlite_db, prefix="h\U0010ffff")
+    with pytest.raises(HTTPException) as exc:
+        group_service.list_group_directory(sqlite_db, prefix="\U0010ffff")
+
+    assert [g.name for g in accented.items] == ["Étude club"]
+    assert last_code_point.items == []
+    assert exc.value.status_code == 400
+
+
+def test_directory_full_text_search(sqlite_db, directory):
+    by_description = group_service.list_group_directory(sqlite_db, q="novel")
+    as_you_type = group_service.list_group_directory(sqlite_db, q="hik")
+    # FTS operators and punctuation are plain text, never a syntax error
+    syntax = group_service.list_group_directory(sqlite_db, q='chess OR (')
+
+    assert [g.name for g in by_description.items] == ["Book Club"]
+    assert {g.name for g in as_you_type.items} == {"Hiking Club", "hikers anonymous"}
+    assert syntax.items == []
+
+
+def test_directory_search_paginates(sqlite_db, directory):
+    first = group_service.list_group_directory(sqlite_db, q="hik", limit=1)
+    second = group_service.list_group_directory(sqlite_db, q="hik", limit=1, cursor=first.next_cursor)
+
+    assert second.next_cursor is None
+    assert {first.items[0].name, second.items[0].name} == {"Hiking Club", "hikers anonymous"}
+
+
+def test_directory_rejects_bad_cursor(sqlite_db, directory):
+    with pytest.raises(HTTPException) as exc:
+        group_service.list_group_directory(sqlite_db, cursor="garbage")
+
+    assert exc.value.status_code == 400
@@ -0,0 +1,110 @@
+# tests/services/test_group_stream.py
+
+"""
+Module: app.services.group_stream
+
+No pytest-asyncio in this project: each test runs its own event loop.
+"""
+
+import json
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import group_stream as gs
+from app.services.chat_connections import ChatConnection, ConnectionRegistry
+from app.services.chat_protocol import CODECS, JSON_SUBPROTOCOL
+from tests.services.test_chat_connections import FakeWebSocket, run, settle
+
+JSON = CODECS[JSON_SUBPROTOCOL]
+
+POST = SimpleNamespace(id=5, group_id=9, user_id=2, content="new!", created_at=datetime(2026, 1, 1))
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(gs, "group_streams", ConnectionRegistry())
+    monkeypatch.setattr(gs, "_loop", None)
+
+
+def test_sse_codec_writes_event_id_and_data():
+    frame = gs.group_post_frame(POST)
+
+    event = gs.SSE_CODEC.encode(frame)
+
+    lines = event.split("\n")
+    assert lines[:2] == ["event: group_post", "id: 5"]
+    assert json.loads(lines[2].removeprefix("data: "))["content"] == "new!"
+    assert event.endswith("\n\n")
+
+
+def test_publish_from_a_worker_thread_reaches_every_subscriber():
+    async def scenario():
+        ws_member = ChatConnection(FakeWebSocket(), 1, 9, JSON)
+        sse_member = gs.SseSubscriber(2, 9)
+        other_group = ChatConnection(FakeWebSocket(), 3, 10, JSON)
+        for conn in (ws_member, sse_member, other_group):
+            gs.subscribe(conn)
+
+        # Sync endpoints run in the threadpool
+        worker = threading.Thread(target=gs.publish_group_post, args=(POST,))
+        worker.start()
+        worker.join()
+        await settle()
+
+        frame = gs.group_post_frame(POST)
+        assert ws_member.websocket.sent == [JSON.encode(frame)]
+        assert other_group.websocket.sent == []
+        events = sse_member.events(lambda: False)
+        assert await anext(events) == gs.SSE_CODEC.encode(frame)
+
+    run(scenario())
+
+
+def test_publish_without_subscribers_does_nothing():
+    gs.publish_group_post(POST)  # no loop, no subscribers: no error
+
+
+def test_slow_sse_subscriber_is_closed(monkeypatch):
+    monkeypatch.setattr(gs, "SEND_QUEUE_SIZE", 2)
+
+    async def scenario():
+        sub = gs.SseSubscriber(1, 9)
+        assert sub.enqueue("a") and sub.enqueue("b")
+        assert sub.enqueue("c") is False
+        # Queued events are dropped, the stream ends
+        assert [e async for e in sub.events(lambda: False)] == []
+
+    run(scenario())
+
+
+def test_idle_sse_stream_sends_keepalive_until_client_leaves():
+    async def scenario():
+        sub = gs.SseSubscriber(1, 9)
+        gone = iter([False, True])
+
+        async def is_disconnected():
+            return next(gone)
+
+        events = [e async for e in sub.events(is_disconnected, keepalive=0.01)]
+        assert events == [gs.SSE_KEEPALIVE]
+
+    run(scenario())
+
+
+def test_drop_subscribers_closes_only_listed_users():
+    async def scenario():
+        stays = ChatConnection(FakeWebSocket(), 1, 9, JSON)
+        leaves = ChatConnection(FakeWebSocket(), 2, 9, JSON)
+        gs.subscribe(stays)
+        gs.subscribe(leaves)
+
+        gs.drop_subscribers(9, [2])
+        await settle()
+
+        assert leaves.websocket.closed_with == 1008
+        assert stays.websocket.closed_with is None
+
+    run(scenario())
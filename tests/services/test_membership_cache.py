@@ -0,0 +1,79 @@
+# tests/services/test_membership_cache.py
+
+"""
+Module: app.services.membership_cache
+"""
+
+from app.services.membership_cache import MembershipCache
+
+
+def test_load_calls_loader_once_and_then_answers_from_memory():
+    cache = MembershipCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return [1, 2]
+
+    assert cache.contains(5, 1) is None
+    assert cache.load(5, loader) == {1, 2}
+    assert cache.load(5, loader) == {1, 2}
+    assert len(calls) == 1
+    assert cache.contains(5, 2) is True
+    assert cache.contains(5, 3) is False
+
+
+def test_join_and_leave_update_a_loaded_group():
+    cache = MembershipCache()
+    cache.load(5, lambda: [1])
+
+    cache.add(5, 2)
+    cache.discard(5, 1)
+
+    assert cache.contains(5, 2) is True
+    assert cache.contains(5, 1) is False
+
+
+def test_load_racing_with_a_change_is_not_cached():
+    cache = MembershipCache()
+
+    def stale_loader():
+        # A join commits while the load is still reading the database
+        cache.add(5, 2)
+        return [1]
+
+    assert cache.load(5, stale_loader) == {1}
+    assert cache.is_loaded(5) is False
+    assert cache.load(5, lambda: [1, 2]) == {1, 2}
+
+
+def test_invalidate_forces_a_reload():
+    cache = MembershipCache()
+    cache.load(5, lambda: [1])
+
+    cache.invalidate(5)
+
+    assert cache.contains(5, 1) is None
+    assert cache.load(5, lambda: [3]) == {3}
+
+
+def test_changes_update_in_place_and_loads_hand_out_copies():
+    cache = MembershipCache()
+    members = cache.load(5, lambda: [1])
+
+    cache.add_many(5, [2, 3])
+    cache.discard_many(5, [1])
+
+    assert members == {1}
+    assert cache.load(5, lambda: []) == {2, 3}
+
+
+def test_no_version_is_kept_once_no_load_is_in_flight():
+    cache = MembershipCache()
+    cache.load(5, lambda: [1])
+
+    cache.add(6, 1)
+    cache.invalidate(5)
+    cache.load(7, lambda: cache.invalidate(7) or [1])
+
+    assert cache._versions == {} and cache._loading == {}
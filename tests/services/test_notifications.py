@@ -0,0 +1,211 @@
+# tests/services/test_notifications.py
+
+"""
+Module: app.services.notifications
+
+The dispatcher and the listing run against in-memory SQLite (sqlite_db
+fixture); events are emitted into a private NotificationDispatcher.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.core.pagination import encode_cursor
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.notification import Notification
+from app.models.user import User
+from app.services import notifications
+from app.services.counters import UNREAD_NOTIFICATIONS, bump, counter_value, reconcile
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    fresh = notifications.NotificationDispatcher()
+    monkeypatch.setattr(notifications, "dispatcher", fresh)
+    return fresh
+
+
+@pytest.fixture
+def world(sqlite_db):
+    """alice (1) owns "club" (10) with admin bob (2); carol (3) is not in it."""
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "alice"), (2, "Bob"), (3, "carol"))
+    )
+    sqlite_db.add(Group(id=10, name="club", owner_id=1))
+    sqlite_db.add_all([
+        GroupMembership(group_id=10, user_id=1, is_admin=True),
+        GroupMembership(group_id=10, user_id=2, is_admin=True),
+    ])
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def count_statements(db):
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", listener)
+
+
+def inbox(db, user_id):
+    return [(n.kind, n.actor_id) for n in notifications.list_notifications(db, user_id).items]
+
+
+# ---------- extract_mentions ----------
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("hi @Bob and @bob, @carol!", ["bob", "carol"]),
+        ("mail me: alice@example.com", []),
+        ("@@double (@inside)", ["inside"]),
+    ],
+)
+def test_extract_mentions(text, expected):
+    assert notifications.extract_mentions(text) == expected
+
+
+# ---------- dispatcher ----------
+def test_events_become_rows_only_when_flushed(world, dispatcher):
+    request = SimpleNamespace(id=5, from_user_id=1, to_user_id=3)
+    notifications.notify_friend_request(request)
+    notifications.notify_friend_accepted(request)
+
+    assert world.query(Notification).count() == 0
+    assert dispatcher.flush(world) == 2
+
+    assert inbox(world, 3) == [("friend_request", 1)]
+    assert inbox(world, 1) == [("friend_accepted", 3)]
+    assert notifications.unread_count(world, 3) == 1
+
+
+def test_group_join_and_mentions_are_resolved_per_batch(world, dispatcher):
+    notifications.notify_group_join(10, 3)
+    notifications.notify_group_join(10, 2)
+    notifications.notify_mentions(SimpleNamespace(id=7, user_id=3, content="@BOB @alice @nobody @carol"))
+    notifications.notify_mentions(SimpleNamespace(id=8, user_id=1, content="thanks @carol"))
+
+    statements, stop = count_statements(world)
+    try:
+        written = dispatcher.flush(world)
+    finally:
+        stop()
+
+    # carol joined: both admins; bob joined: alice only (not himself).
+    # Mentions: case-insensitive, unknown names and self-mentions skipped.
+    assert written == 6
+    assert inbox(world, 1) == [("mention", 3), ("group_join", 2), ("group_join", 3)]
+    assert inbox(world, 2) == [("mention", 3), ("group_join", 3)]
+    assert inbox(world, 3) == [("mention", 1)]
+    # admins, usernames, the rows, the counters
+    assert len(statements) == 4
+
+
+def test_counter_matches_rows(world, dispatcher):
+    for i in range(4):
+        notifications.notify_group_join(10, 3)
+    dispatcher.flush(world)
+
+    assert counter_value(world, UNREAD_NOTIFICATIONS, 1) == 4
+    assert reconcile(world, names=[UNREAD_NOTIFICATIONS])[UNREAD_NOTIFICATIONS] == 0
+
+
+def test_flush_takes_one_batch(world, dispatcher):
+    for _ in range(5):
+        notifications.notify_group_join(10, 3)
+
+    assert dispatcher.flush(world, batch_size=2) == 4
+    assert dispatcher.pending() == 3
+
+
+def test_failed_batch_is_put_back(world, dispatcher, monkeypatch):
+    notifications.notify_group_join(10, 3)
+
+    def broken(db, events):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(notifications, "_resolve", broken)
+    with pytest.raises(RuntimeError):
+        dispatcher.flush(world)
+    assert dispatcher.pending() == 1
+
+
+def test_full_backlog_drops_events():
+    small = notifications.NotificationDispatcher(max_pending=1)
+    assert small.emit({"kind": "x"}) is True
+    assert small.emit({"kind": "x"}) is False
+    assert small.pending() == 1
+
+
+def test_run_flushes_on_shutdown(world, dispatcher, sqlite_sessionmaker):
+    async def scenario():
+        task = asyncio.create_task(dispatcher.run(sqlite_sessionmaker, interval=3600))
+        await asyncio.sleep(0)
+        notifications.notify_group_join(10, 3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert dispatcher.pending() == 0
+    assert world.query(Notification).count() == 2
+
+
+# ---------- listing and reading ----------
+def add_notifications(db, user_id, count):
+    db.add_all(Notification(user_id=user_id, kind="group_join", actor_id=3, group_id=10) for _ in range(count))
+    bump(db, UNREAD_NOTIFICATIONS, user_id, count)
+    db.commit()
+
+
+def test_pages_newest_first(world):
+    add_notifications(world, 1, 5)
+
+    first = notifications.list_notifications(world, 1, limit=2)
+    second = notifications.list_notifications(world, 1, limit=2, cursor=first.next_cursor)
+    third = notifications.list_notifications(world, 1, limit=2, cursor=second.next_cursor)
+
+    ids = [n.id for page in (first, second, third) for n in page.items]
+    assert ids == sorted(ids, reverse=True) and len(ids) == 5
+    assert third.next_cursor is None
+    assert first.unread_count == 5
+
+
+def test_mark_read(world):
+    add_notifications(world, 1, 4)
+    ids = sorted(n.id for n in notifications.list_notifications(world, 1).items)
+
+    assert notifications.mark_read(world, 1, up_to_id=ids[1]) == 2
+    unread = notifications.list_notifications(world, 1, unread_only=True).items
+    assert sorted(n.id for n in unread) == ids[2:]
+
+    assert notifications.mark_read(world, 1) == 0
+    # Marking again changes nothing
+    assert notifications.mark_read(world, 1) == 0
+    assert all(n.read for n in notifications.list_notifications(world, 1).items)
+
+
+def test_delete_notifications_keeps_unread_counts(world):
+    add_notifications(world, 1, 3)
+    add_notifications(world, 2, 2)
+    notifications.mark_read(world, 2)
+
+    assert notifications.delete_notifications(world, Notification.actor_id == 3) == 5
+    world.commit()
+
+    assert notifications.unread_count(world, 1) == 0
+    assert notifications.unread_count(world, 2) == 0
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor("x"), encode_cursor(True), encode_cursor(1, 2)])
+def test_invalid_cursor(world, cursor):
+    with pytest.raises(HTTPException) as exc:
+        notifications.list_notifications(world, 1, cursor=cursor)
+    assert exc.value.status_code == 400
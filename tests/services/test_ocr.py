@@ -0,0 +1,171 @@
+# tests/services/test_ocr.py
+
+"""
+Module: app.services.ocr
+
+The database is in-memory SQLite (sqlite_sessionmaker). Engines are
+either a small Python stand-in for the tesseract executable (to test
+TesseractEngine end to end) or in-process fakes.
+"""
+
+import asyncio
+import stat
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.models.post_image import PostImage
+from app.models.posts import Post
+from app.models.user import User
+from app.services import ocr
+
+
+STANDIN = """#!{python}
+# Stand-in for the tesseract CLI: tesseract <image> <output base> [...] txt
+import os, sys
+if os.environ.get("STANDIN_OCR_FAIL"):
+    sys.stderr.write("stand-in failure")
+    sys.exit(1)
+with open(sys.argv[2] + ".txt", "w") as out:
+    out.write(os.environ.get("STANDIN_OCR_TEXT", "") + "\\n")
+"""
+
+
+@pytest.fixture
+def tesseract_standin(tmp_path, monkeypatch):
+    import pytesseract
+
+    script = tmp_path / "tesseract"
+    script.write_text(STANDIN.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(pytesseract.pytesseract, "tesseract_cmd", str(script))
+    return script
+
+
+class FakeEngine(ocr.OcrEngine):
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = []
+
+    def extract(self, path):
+        self.calls.append(path)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def images(sqlite_sessionmaker):
+    db = sqlite_sessionmaker()
+    db.add(User(id=1, username="u1", email="u1@example.com", password_hash="x"))
+    db.add(Post(id=1, content="look", user_id=1))
+    db.add_all(PostImage(id=i, post_id=1, uploader_id=1, digest=f"{i:064x}", extension="png") for i in (1, 2, 3))
+    db.commit()
+    db.close()
+    return sqlite_sessionmaker
+
+
+def path_of(image):
+    return f"/images/{image.id}.png"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def load(sessionmaker, image_id):
+    db = sessionmaker()
+    try:
+        return db.get(PostImage, image_id)
+    finally:
+        db.close()
+
+
+def test_tesseract_engine_reads_the_standin_output(tesseract_standin, tmp_path, monkeypatch):
+    monkeypatch.setenv("STANDIN_OCR_TEXT", "SALE 50% OFF")
+    image = tmp_path / "sign.png"
+    image.write_bytes(b"not decoded by the stand-in")
+
+    assert ocr.TesseractEngine().extract(str(image)) == "SALE 50% OFF"
+
+
+def test_process_stores_text(images, tesseract_standin, monkeypatch):
+    monkeypatch.setenv("STANDIN_OCR_TEXT", "hello world")
+    queue = ocr.OcrQueue(engine=ocr.TesseractEngine())
+
+    assert run(queue.process(images, 1, path_of)) == ocr.DONE
+
+    image = load(images, 1)
+    assert (image.ocr_status, image.ocr_text, image.ocr_attempts) == (ocr.DONE, "hello world", 1)
+
+
+def test_failures_retry_with_backoff_then_give_up(images, tesseract_standin, monkeypatch):
+    monkeypatch.setenv("STANDIN_OCR_FAIL", "1")
+    queue = ocr.OcrQueue(engine=ocr.TesseractEngine())
+
+    assert run(queue.process(images, 1, path_of)) == ocr.PENDING
+    image = load(images, 1)
+    assert image.ocr_attempts == 1
+    assert image.ocr_retry_at > datetime.utcnow() + timedelta(seconds=ocr.OCR_RETRY_BACKOFF - 5)
+
+    for _ in range(ocr.OCR_MAX_ATTEMPTS - 1):
+        status = run(queue.process(images, 1, path_of))
+    assert status == ocr.FAILED
+    assert load(images, 1).ocr_retry_at is None
+
+    # Not pending any more: nothing to do
+    assert run(queue.process(images, 1, path_of)) is None
+
+
+def test_full_queue_refuses_work_with_retry_after():
+    queue = ocr.OcrQueue(engine=FakeEngine([]), maxsize=1)
+
+    assert queue.submit(1) is True
+    assert queue.submit(1) is True  # already queued
+    assert queue.submit(2) is False
+    with pytest.raises(HTTPException) as exc:
+        queue.require_room()
+
+    assert exc.value.status_code == 503
+    assert exc.value.headers["Retry-After"] == str(ocr.OCR_RETRY_AFTER)
+
+
+def test_sweep_submits_due_pending_images_only(images):
+    db = images()
+    db.get(PostImage, 2).ocr_retry_at = datetime.utcnow() + timedelta(minutes=5)
+    db.get(PostImage, 3).ocr_status = ocr.DONE
+    db.commit()
+    db.close()
+    queue = ocr.OcrQueue(engine=FakeEngine([]))
+
+    async def scenario():
+        first = await queue.sweep(images)
+        again = await queue.sweep(images)
+        return first, again
+
+    assert run(scenario()) == (1, 0)
+
+
+def test_workers_drain_the_queue(images):
+    engine = FakeEngine(["one", RuntimeError("crash"), "three"])
+    queue = ocr.OcrQueue(engine=engine)
+
+    async def scenario():
+        runner = asyncio.create_task(queue.run(images, path_of, workers=2, sweep_interval=3600))
+        for _ in range(200):
+            statuses = [load(images, i).ocr_status for i in (1, 2, 3)]
+            attempts = [load(images, i).ocr_attempts for i in (1, 2, 3)]
+            if all(attempts):
+                break
+            await asyncio.sleep(0.01)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        return statuses
+
+    statuses = run(scenario())
+
+    assert sorted(statuses) == [ocr.DONE, ocr.DONE, ocr.PENDING]
+    assert len(engine.calls) == 3
@@ -0,0 +1,117 @@
+# tests/services/test_presence.py
+
+"""
+Module: app.services.presence
+
+Uses the FakeWebSocket from the registry tests; each test runs its own
+event loop.
+"""
+
+from app.services import presence as presence_module
+from app.services.chat_connections import ChatConnection, ConnectionRegistry
+from app.services.chat_protocol import CODECS, JSON_SUBPROTOCOL, LEGACY_CODEC
+from tests.services.test_chat_connections import FakeWebSocket, run, settle
+
+
+JSON = CODECS[JSON_SUBPROTOCOL]
+
+
+def connect(registry, tracker, user_id, friend_ids, codec=JSON):
+    conn = ChatConnection(FakeWebSocket(), user_id, 1, codec)
+    registry.add(conn)
+    online = tracker.connected(user_id, friend_ids)
+    return conn, online
+
+
+def frames(conn):
+    return [JSON.decode(data) for data in conn.websocket.sent]
+
+
+def test_presence_goes_to_online_friends_only():
+    async def scenario():
+        registry = ConnectionRegistry()
+        tracker = presence_module.PresenceTracker(registry)
+        alice, _ = connect(registry, tracker, 1, [2])
+        stranger, _ = connect(registry, tracker, 3, [])
+        tracker.flush()
+        await settle()
+        alice.websocket.sent.clear()
+
+        bob, online = connect(registry, tracker, 2, [1])
+        assert online == [1]
+        tracker.flush()
+        await settle()
+
+        assert [(f["type"], f["user_id"], f["online"]) for f in frames(alice)] == [
+            ("presence", 2, True)
+        ]
+        assert stranger.websocket.sent == []
+
+    run(scenario())
+
+
+def test_reconnect_inside_one_window_is_not_published():
+    async def scenario():
+        registry = ConnectionRegistry()
+        tracker = presence_module.PresenceTracker(registry)
+        alice, _ = connect(registry, tracker, 1, [2])
+        bob, _ = connect(registry, tracker, 2, [1])
+        tracker.flush()
+        await settle()
+        alice.websocket.sent.clear()
+
+        # Bob drops and comes back before the next flush
+        registry.remove(bob)
+        tracker.disconnected(2)
+        connect(registry, tracker, 2, [1])
+        assert tracker.flush() == 0
+
+        # A real disconnect is published once
+        for conn in list(registry.for_user(2)):
+            registry.remove(conn)
+        tracker.disconnected(2)
+        assert tracker.flush() == 1
+        await settle()
+        assert [f["online"] for f in frames(alice)] == [False]
+
+    run(scenario())
+
+
+def test_legacy_watchers_get_no_presence_frames():
+    async def scenario():
+        registry = ConnectionRegistry()
+        tracker = presence_module.PresenceTracker(registry)
+        legacy, _ = connect(registry, tracker, 1, [2], codec=LEGACY_CODEC)
+        connect(registry, tracker, 2, [1])
+
+        tracker.flush()
+        await settle()
+        assert legacy.websocket.sent == []
+
+    run(scenario())
+
+
+def test_typing_is_throttled_per_chat_and_user():
+    tracker = presence_module.PresenceTracker(ConnectionRegistry())
+    window = presence_module.TYPING_WINDOW
+
+    assert tracker.allow_typing(7, 1, now=100.0) is True
+    assert tracker.allow_typing(7, 1, now=100.5) is False
+    assert tracker.allow_typing(8, 1, now=100.5) is True
+    assert tracker.allow_typing(7, 1, now=100.0 + window) is True
+
+
+def test_lookup_reports_last_seen_after_disconnect():
+    async def scenario():
+        registry = ConnectionRegistry()
+        tracker = presence_module.PresenceTracker(registry)
+        conn, _ = connect(registry, tracker, 1, [])
+        registry.remove(conn)
+        tracker.disconnected(1)
+
+        online, offline = tracker.lookup([2, 1])
+        assert online == {"user_id": 2, "online": False, "last_seen": None}
+        assert offline["online"] is False
+        assert offline["last_seen"] is not None
+
+    run(scenario())
@@ -0,0 +1,260 @@
+# tests/services/test_purge.py
+
+"""
+Module: app.services.purge
+
+Runs against in-memory SQLite: the point is the batched SQL.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app.models.block import UserBlock
+from app.models.change_log import ChangeLogEntry
+from app.models.comment import Comment
+from app.models.conversation import Conversation
+from app.models.counter import Counter
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.notification import Notification
+from app.models.post_image import PostImage
+from app.models.reaction import Reaction
+from app.models.tag import PostTag
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import blocks, change_log, comments, counters, purge
+from app.services.membership_cache import MembershipCache
+
+
+def make_user(db, name):
+    user = User(username=name, email=f"{name}@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    return user
+
+
+def make_group(db, owner, name, members, posts):
+    group = Group(name=name, owner_id=owner.id)
+    db.add(group)
+    db.flush()
+    for user in members:
+        db.add(GroupMembership(group_id=group.id, user_id=user.id, is_admin=user is owner))
+        counters.bump(db, counters.GROUP_MEMBERS, group.id)
+    for i in range(posts):
+        db.add(GroupPost(content=f"post {i}", group_id=group.id, user_id=members[i % len(members)].id))
+        counters.bump(db, counters.GROUP_POSTS, group.id)
+    db.flush()
+    return group
+
+
+def run_until_done(db, batch_size):
+    """
+    Run purge_step to the end; return the largest child-row DELETE.
+
+    Counter rows are left out: there are at most a few shards per entity.
+    """
+    largest = 0
+
+    def track(conn, cursor, statement, parameters, context, executemany):
+        nonlocal largest
+        if statement.startswith("DELETE") and "counters" not in statement:
+            largest = max(largest, cursor.rowcount)
+
+    engine = db.get_bind()
+    event.listen(engine, "after_cursor_execute", track)
+    try:
+        steps = 0
+        while purge.purge_step(db, batch_size):
+            steps += 1
+            assert steps < 1000
+    finally:
+        event.remove(engine, "after_cursor_execute", track)
+    return steps, largest
+
+
+def test_group_is_hidden_then_purged_in_batches(sqlite_db):
+    owner = make_user(sqlite_db, "owner")
+    others = [make_user(sqlite_db, f"u{i}") for i in range(6)]
+    group = make_group(sqlite_db, owner, "big", [owner, *others], posts=9)
+    room = Conversation(group_id=group.id)
+    sqlite_db.add(room)
+    sqlite_db.flush()
+    sqlite_db.add_all(Message(conversation_id=room.id, sender_id=owner.id, content="hi") for _ in range(5))
+    first_post = sqlite_db.query(GroupPost).first()
+    sqlite_db.add(PostImage(group_post_id=first_post.id, uploader_id=first_post.user_id, digest="0" * 64, extension="png"))
+    sqlite_db.add(PostTag(tag="news", group_post_id=first_post.id, group_id=group.id,
+                          user_id=first_post.user_id, created_at=datetime.utcnow()))
+    sqlite_db.add(Reaction(user_id=owner.id, group_post_id=first_post.id, group_id=group.id, kind="like"))
+    counters.bump(sqlite_db, counters.GROUP_POST_REACTIONS, first_post.id)
+    sqlite_db.commit()
+    top = comments.add_comment(sqlite_db, owner.id, first_post, "first")
+    comments.add_comment(sqlite_db, others[0].id, first_post, "reply", top.id)
+    group_id = group.id
+
+    purge.mark_group_deleted(sqlite_db, group)
+    steps, largest = run_until_done(sqlite_db, batch_size=3)
+
+    assert largest <= 3
+    assert steps > 5
+    assert sqlite_db.get(Group, group_id) is None
+    assert sqlite_db.query(GroupPost).count() == 0
+    assert sqlite_db.query(PostImage).count() == 0
+    assert sqlite_db.query(PostTag).count() == 0
+    assert sqlite_db.query(Reaction).count() == 0
+    assert sqlite_db.query(Comment).count() == 0
+    assert sqlite_db.query(GroupMembership).count() == 0
+    assert sqlite_db.query(Message).count() == 0
+    assert sqlite_db.query(Conversation).count() == 0
+    assert sqlite_db.query(Counter).count() == 0
+    # Members themselves stay
+    assert sqlite_db.query(User).count() == 7
+
+
+def test_account_purge_keeps_other_counters_right(sqlite_db):
+    alice, bob, carol = (make_user(sqlite_db, n) for n in ("alice", "bob", "carol"))
+    owned = make_group(sqlite_db, alice, "alice's", [alice, bob], posts=2)
+    other = make_group(sqlite_db, bob, "bob's", [bob, alice, carol], posts=3)
+    wall = Post(content="wall", user_id=alice.id)
+    sqlite_db.add(wall)
+    sqlite_db.flush()
+    sqlite_db.add(PostImage(post_id=wall.id, uploader_id=alice.id, digest="0" * 64, extension="png"))
+    sqlite_db.add(PostTag(tag="news", post_id=wall.id, user_id=alice.id, created_at=datetime.utcnow()))
+    # carol likes alice's post, alice likes bob's post in bob's group
+    bobs_post = sqlite_db.query(GroupPost).filter_by(group_id=other.id, user_id=bob.id).first()
+    sqlite_db.add(Reaction(user_id=carol.id, post_id=wall.id, kind="like"))
+    sqlite_db.add(Reaction(user_id=alice.id, group_post_id=bobs_post.id, group_id=other.id, kind="love"))
+    counters.bump(sqlite_db, counters.POST_REACTIONS, wall.id)
+    counters.bump(sqlite_db, counters.GROUP_POST_REACTIONS, bobs_post.id)
+    sqlite_db.execute(
+        user_friends.insert(),
+        [
+            {"user_id": alice.id, "friend_id": bob.id},
+            {"user_id": bob.id, "friend_id": alice.id},
+        ],
+    )
+    counters.bump(sqlite_db, counters.USER_FRIENDS, bob.id)
+    sqlite_db.add(FriendRequest(from_user_id=alice.id, to_user_id=carol.id, status=RequestStatus.pending))
+    counters.bump(sqlite_db, counters.PENDING_REQUESTS, carol.id)
+    sqlite_db.add(Notification(user_id=carol.id, actor_id=alice.id, kind="friend_request"))
+    sqlite_db.add(Notification(user_id=alice.id, actor_id=carol.id, kind="mention"))
+    counters.bump(sqlite_db, counters.UNREAD_NOTIFICATIONS, carol.id)
+    counters.bump(sqlite_db, counters.UNREAD_NOTIFICATIONS, alice.id)
+    chat = Conversation(user1_id=alice.id, user2_id=carol.id)
+    sqlite_db.add(chat)
+    sqlite_db.flush()
+    sqlite_db.add(Message(conversation_id=chat.id, sender_id=carol.id, content="hey"))
+    # alice muted bob and carol; carol blocked alice
+    sqlite_db.add_all([
+        UserBlock(user_id=alice.id, target_id=bob.id, kind="mute"),
+        UserBlock(user_id=alice.id, target_id=carol.id, kind="mute"),
+        UserBlock(user_id=carol.id, target_id=alice.id, kind="block"),
+    ])
+    sqlite_db.commit()
+    assert blocks.hidden_set(sqlite_db, carol.id).blocks(alice.id)
+    # carol comments on alice's post; alice starts a thread under bob's
+    # post that bob and carol answer, next to a comment of bob's
+    comments.add_comment(sqlite_db, carol.id, wall, "nice")
+    thread = comments.add_comment(sqlite_db, alice.id, bobs_post, "question")
+    answer = comments.add_comment(sqlite_db, bob.id, bobs_post, "answer", thread.id)
+    comments.add_comment(sqlite_db, carol.id, bobs_post, "thanks", answer.id)
+    kept = comments.add_comment(sqlite_db, bob.id, bobs_post, "unrelated")
+    alice_id, owned_id, other_id = alice.id, owned.id, other.id
+
+    purge.mark_user_deleted(sqlite_db, alice)
+    run_until_done(sqlite_db, batch_size=2)
+
+    assert sqlite_db.get(User, alice_id) is None
+    assert sqlite_db.get(Group, owned_id) is None
+    assert sqlite_db.query(Post).count() == 0
+    assert sqlite_db.query(PostImage).count() == 0
+    assert sqlite_db.query(PostTag).count() == 0
+    assert sqlite_db.query(Conversation).count() == 0
+    assert sqlite_db.query(user_friends).count() == 0
+    assert sqlite_db.query(UserBlock).count() == 0
+    assert not blocks.hidden_set(sqlite_db, carol.id).hides(alice_id)
+    # Counters of the people and groups left behind
+    assert counters.counter_value(sqlite_db, counters.USER_FRIENDS, bob.id) == 0
+    assert counters.counter_value(sqlite_db, counters.PENDING_REQUESTS, carol.id) == 0
+    assert counters.counter_value(sqlite_db, counters.UNREAD_NOTIFICATIONS, carol.id) == 0
+    assert sqlite_db.query(Notification).count() == 0
+    assert sqlite_db.query(Reaction).count() == 0
+    assert counters.counter_value(sqlite_db, counters.GROUP_POST_REACTIONS, bobs_post.id) == 0
+    assert [c.id for c in sqlite_db.query(Comment)] == [kept.id]
+    assert counters.counter_value(sqlite_db, counters.GROUP_POST_COMMENTS, bobs_post.id) == 1
+    assert counters.counter_value(sqlite_db, counters.GROUP_MEMBERS, other_id) == 2
+    assert counters.counter_value(sqlite_db, counters.GROUP_POSTS, other_id) == 2
+    assert not any(counters.reconcile(sqlite_db).values())
+
+
+def test_purge_resumes_from_the_marker(sqlite_db, sqlite_sessionmaker):
+    owner = make_user(sqlite_db, "owner")
+    group = make_group(sqlite_db, owner, "g", [owner], posts=4)
+    sqlite_db.commit()
+    group_id = group.id
+    purge.mark_group_deleted(sqlite_db, group)
+
+    # One batch, then the worker "restarts" with a fresh session
+    assert purge.purge_step(sqlite_db, batch_size=2) is True
+    fresh = sqlite_sessionmaker()
+    try:
+        run_until_done(fresh, batch_size=2)
+        assert fresh.get(Group, group_id) is None
+    finally:
+        fresh.close()
+
+
+def test_account_purge_leaves_tombstones_in_friends_sync_logs(sqlite_db):
+    alice, bob, carol = (make_user(sqlite_db, n) for n in ("alice", "bob", "carol"))
+    sqlite_db.execute(
+        user_friends.insert(),
+        [{"user_id": alice.id, "friend_id": bob.id}, {"user_id": bob.id, "friend_id": alice.id}],
+    )
+    owned = make_group(sqlite_db, alice, "alice's", [alice, carol], posts=0)
+    request = FriendRequest(from_user_id=alice.id, to_user_id=carol.id, status=RequestStatus.pending)
+    sqlite_db.add(request)
+    wall = Post(content="wall", user_id=alice.id)
+    sqlite_db.add(wall)
+    sqlite_db.flush()
+    change_log.post_changed(sqlite_db, alice.id, wall.id)
+    change_log.record(sqlite_db, [carol.id], change_log.FRIEND_REQUEST, request.id)
+    change_log.friendship_changed(sqlite_db, alice.id, bob.id)
+    sqlite_db.commit()
+    ids = SimpleNamespace(alice=alice.id, bob=bob.id, carol=carol.id, group=owned.id, request=request.id)
+
+    purge.mark_user_deleted(sqlite_db, alice)
+    run_until_done(sqlite_db, batch_size=1)
+
+    rows = {(row.user_id, row.kind, row.entity_id, row.deleted) for row in sqlite_db.query(ChangeLogEntry)}
+    assert rows == {
+        (ids.bob, change_log.FRIEND, ids.alice, True),
+        (ids.carol, change_log.FRIEND_REQUEST, ids.request, True),
+        (ids.carol, change_log.GROUP, ids.group, True),
+    }
+
+
+def test_account_purge_updates_member_caches_after_each_commit(sqlite_db, monkeypatch):
+    owner, leaver = make_user(sqlite_db, "owner"), make_user(sqlite_db, "leaver")
+    group = make_group(sqlite_db, owner, "g", [owner, leaver], posts=0)
+    sqlite_db.commit()
+    group_id, leaver_id = group.id, leaver.id
+    in_transaction = []
+
+    class Cache(MembershipCache):
+        def discard(self, group_id, user_id):
+            in_transaction.append(sqlite_db.in_transaction())
+            super().discard(group_id, user_id)
+
+    cache = Cache()
+    cache.load(group_id, lambda: [owner.id, leaver_id])
+    monkeypatch.setattr(purge, "group_members", cache)
+    purge.mark_user_deleted(sqlite_db, leaver)
+
+    run_until_done(sqlite_db, batch_size=10)
+
+    # A reload between the DELETE and its commit would see the old row
+    assert in_transaction == [False]
+    assert cache.contains(group_id, leaver_id) is False
@@ -0,0 +1,225 @@
+# tests/services/test_reactions.py
+
+"""
+Module: app.services.reactions
+
+Runs against in-memory SQLite (sqlite_db fixture); every test gets a
+private ReactionCounts, so nothing is written behind until it flushes.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.counter import Counter
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.reaction import Reaction
+from app.models.user import User
+from app.schemas.feed import FeedItem
+from app.services import reactions
+from app.services.counters import GROUP_POST_REACTIONS, POST_REACTIONS, counter_value, reconcile
+
+
+@pytest.fixture
+def counts(monkeypatch):
+    fresh = reactions.ReactionCounts()
+    monkeypatch.setattr(reactions, "reaction_counts", fresh)
+    return fresh
+
+
+@pytest.fixture
+def world(sqlite_db):
+    """alice (1) and bob (2); alice is in "club" (10); one wall post (100) and one group post (200)."""
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "alice"), (2, "bob"))
+    )
+    sqlite_db.add(Group(id=10, name="club", owner_id=1))
+    sqlite_db.add(GroupMembership(group_id=10, user_id=1, is_admin=True))
+    sqlite_db.add(Post(id=100, content="wall", user_id=2))
+    sqlite_db.add(GroupPost(id=200, content="club", group_id=10, user_id=1))
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def count_statements(db):
+    statements = []
+    engine = db.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", listener)
+
+
+# ---------- react / unreact ----------
+def test_react_counts_once_per_user(world, counts):
+    post = world.get(Post, 100)
+
+    first = reactions.react(world, 1, post, "like")
+    again = reactions.react(world, 1, post, "love")
+    other = reactions.react(world, 2, post, "like")
+
+    assert (first.reaction_count, first.my_reaction) == (1, "like")
+    assert (again.reaction_count, again.my_reaction) == (1, "love")
+    assert other.reaction_count == 2
+    assert world.query(Reaction).filter_by(user_id=1).one().kind == "love"
+
+
+def test_unreact(world, counts):
+    post = world.get(GroupPost, 200)
+    reactions.react(world, 1, post, "like")
+
+    state = reactions.unreact(world, 1, post)
+    assert (state.reaction_count, state.has_reacted) == (0, False)
+    # Nothing to remove: nothing changes
+    assert reactions.unreact(world, 1, post).reaction_count == 0
+    assert world.query(Reaction).count() == 0
+
+
+def test_unknown_kind_is_rejected(world, counts):
+    with pytest.raises(HTTPException) as exc:
+        reactions.react(world, 1, world.get(Post, 100), "meh")
+    assert exc.value.status_code == 400
+
+
+# ---------- write-behind ----------
+def test_counts_are_written_behind(world, counts):
+    post = world.get(Post, 100)
+    reactions.react(world, 1, post, "like")
+    reactions.react(world, 2, post, "like")
+
+    # Rows are committed, the counter is not written yet
+    assert world.query(Reaction).count() == 2
+    assert world.query(Counter).count() == 0
+    assert reactions.reaction_count(world, "post", 100) == 2
+
+    assert counts.flush(world) == 1
+    assert counts.pending() == 0
+    assert counter_value(world, POST_REACTIONS, 100) == 2
+    assert reactions.reaction_count(world, "post", 100) == 2
+    assert reconcile(world, names=[POST_REACTIONS])[POST_REACTIONS] == 0
+
+
+def test_reconcile_leaves_room_for_unwritten_deltas(world, counts):
+    post = world.get(Post, 100)
+    for user_id in (1, 2, 3):
+        reactions.react(world, user_id, post, "like")
+
+    # The rows are there, the deltas are not written: nothing to repair
+    assert reconcile(world, names=[POST_REACTIONS])[POST_REACTIONS] == 0
+    counts.flush(world)
+    assert counter_value(world, POST_REACTIONS, 100) == 3
+
+    # A drifted counter is repaired to the rows minus what is still pending
+    world.query(Counter).delete()
+    world.commit()
+    reactions.unreact(world, 3, post)
+    assert reconcile(world, names=[POST_REACTIONS])[POST_REACTIONS] == 1
+    counts.flush(world)
+    assert counter_value(world, POST_REACTIONS, 100) == 2
+    assert reactions.reaction_count(world, "post", 100) == 2
+
+
+def test_flush_is_one_statement_per_counter(world, counts):
+    for post_id in range(1000, 1050):
+        counts.add(POST_REACTIONS, post_id, 3)
+    counts.add(GROUP_POST_REACTIONS, 200, 1)
+
+    statements, stop = count_statements(world)
+    try:
+        assert counts.flush(world) == 51
+    finally:
+        stop()
+
+    assert len([s for s in statements if "counters" in s]) == 2
+    assert counter_value(world, POST_REACTIONS, 1049) == 3
+
+
+def test_failed_flush_keeps_the_deltas(world, counts, monkeypatch):
+    counts.add(POST_REACTIONS, 100, 2)
+
+    def broken(db, name, deltas):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(reactions, "bump_many", broken)
+    with pytest.raises(RuntimeError):
+        counts.flush(world)
+
+    assert counts.unflushed(POST_REACTIONS, [100]) == {100: 2}
+
+
+def test_run_flushes_on_shutdown(world, counts, sqlite_sessionmaker):
+    async def scenario():
+        task = asyncio.create_task(counts.run(sqlite_sessionmaker, interval=3600))
+        await asyncio.sleep(0)
+        counts.add(POST_REACTIONS, 100, 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    assert counts.pending() == 0
+    assert counter_value(world, POST_REACTIONS, 100) == 1
+
+
+# ---------- listings ----------
+def test_embed_reactions_on_a_feed_page(world, counts):
+    reactions.react(world, 1, world.get(Post, 100), "like")
+    counts.flush(world)
+    reactions.react(world, 2, world.get(Post, 100), "like")
+    reactions.react(world, 1, world.get(GroupPost, 200), "wow")
+    items = [
+        FeedItem(kind="post", id=100, user_id=2, content="wall", created_at=world.get(Post, 100).created_at),
+        FeedItem(kind="group_post", id=200, user_id=1, group_id=10, content="club",
+                 created_at=world.get(GroupPost, 200).created_at),
+    ]
+
+    statements, stop = count_statements(world)
+    try:
+        reactions.embed_reactions(world, 2, items)
+    finally:
+        stop()
+
+    assert [(i.reaction_count, i.has_reacted) for i in items] == [(2, True), (1, False)]
+    # Counters and reacted ids, per kind
+    assert len(statements) == 4
+
+
+def test_embed_reactions_on_orm_rows(world, counts):
+    posts = [world.get(Post, 100)]
+    reactions.react(world, 1, posts[0], "like")
+
+    reactions.embed_reactions(world, 1, posts, "post")
+
+    assert (posts[0].reaction_count, posts[0].has_reacted) == (1, True)
+
+
+# ---------- deleting ----------
+def test_delete_reactions_lowers_counts(world, counts):
+    reactions.react(world, 1, world.get(Post, 100), "like")
+    reactions.react(world, 2, world.get(Post, 100), "like")
+    reactions.react(world, 1, world.get(GroupPost, 200), "like")
+    counts.flush(world)
+
+    assert reactions.delete_reactions(world, Reaction.user_id == 1) == 2
+    world.commit()
+
+    assert counter_value(world, POST_REACTIONS, 100) == 1
+    assert counter_value(world, GROUP_POST_REACTIONS, 200) == 0
+
+
+def test_delete_post_reactions(world, counts):
+    reactions.react(world, 1, world.get(Post, 100), "like")
+    counts.flush(world)
+    reactions.react(world, 2, world.get(Post, 100), "like")
+
+    reactions.delete_post_reactions(world, 100)
+    world.commit()
+
+    assert world.query(Reaction).count() == 0
+    assert world.query(Counter).count() == 0
+    assert counts.pending() == 0
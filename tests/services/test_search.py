@@ -0,0 +1,216 @@
+# tests/services/test_search.py
+
+"""
+Module: app.services.search
+
+Runs against in-memory SQLite (sqlite_db fixture): the FTS5 indexes,
+their triggers and the visibility rules all live in SQL.
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import encode_cursor
+from app.models.conversation import Conversation
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.post_image import PostImage
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import search
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def world(sqlite_db):
+    """
+    me (1) is friends with friend (2); stranger (3) is not.
+    me and stranger are members of "club" (10); only stranger is in
+    "secret" (20). me and friend have a direct chat (100), friend and
+    stranger another (200); "club" has a room (300).
+    """
+    db = sqlite_db
+    db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "me"), (2, "friend"), (3, "stranger"))
+    )
+    db.execute(
+        user_friends.insert(),
+        [{"user_id": 1, "friend_id": 2}, {"user_id": 2, "friend_id": 1}],
+    )
+    db.add_all([Group(id=10, name="club", owner_id=3), Group(id=20, name="secret", owner_id=3)])
+    db.add_all([
+        GroupMembership(group_id=10, user_id=1),
+        GroupMembership(group_id=10, user_id=3),
+        GroupMembership(group_id=20, user_id=3),
+    ])
+    db.add_all([
+        Conversation(id=100, user1_id=1, user2_id=2),
+        Conversation(id=200, user1_id=2, user2_id=3),
+        Conversation(id=300, group_id=10),
+    ])
+    db.commit()
+    return db
+
+
+def add(db, *rows):
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def found(page):
+    return [(hit.kind, hit.id) for hit in page.items]
+
+
+def test_finds_only_what_the_user_can_read(world):
+    add(
+        world,
+        Post(id=1, content="lunch with me", user_id=1, created_at=T0),
+        Post(id=2, content="lunch with a friend", user_id=2, created_at=T0),
+        Post(id=3, content="lunch with a stranger", user_id=3, created_at=T0),
+        GroupPost(id=1, content="club lunch", group_id=10, user_id=3, created_at=T0),
+        GroupPost(id=2, content="secret lunch", group_id=20, user_id=3, created_at=T0),
+        Message(id=1, content="lunch?", conversation_id=100, sender_id=2, timestamp=T0),
+        Message(id=2, content="lunch!", conversation_id=200, sender_id=3, timestamp=T0),
+        Message(id=3, content="room lunch", conversation_id=300, sender_id=3, timestamp=T0),
+    )
+
+    page = search.search(world, user_id=1, q="lunch")
+
+    assert sorted(found(page)) == [
+        ("group_post", 1),
+        ("message", 1),
+        ("message", 3),
+        ("post", 1),
+        ("post", 2),
+    ]
+    room_message = next(hit for hit in page.items if hit.kind == "message" and hit.id == 3)
+    assert (room_message.group_id, room_message.conversation_id, room_message.user_id) == (10, 300, 3)
+
+
+def test_best_match_first_with_snippet(world):
+    add(
+        world,
+        Post(id=1, content="a long post that mentions tea once among many other words", user_id=1),
+        Post(id=2, content="tea tea tea", user_id=1),
+    )
+
+    page = search.search(world, user_id=1, q="tea")
+
+    assert found(page) == [("post", 2), ("post", 1)]
+    assert "[tea]" in page.items[0].snippet
+
+
+def test_last_word_is_a_prefix(world):
+    add(world, Post(id=1, content="holiday pictures", user_id=1))
+
+    assert found(search.search(world, user_id=1, q="hol")) == [("post", 1)]
+    assert found(search.search(world, user_id=1, q="pictures hol")) == [("post", 1)]
+    assert found(search.search(world, user_id=1, q="hol pictures")) == []
+
+
+def test_operators_are_plain_text(world):
+    add(world, Post(id=1, content="cats OR dogs", user_id=1))
+
+    assert found(search.search(world, user_id=1, q='cats" OR "x')) == []
+    assert search.search(world, user_id=1, q="   ").items == []
+
+
+def test_index_follows_updates_and_deletes(world):
+    (post,) = add(world, Post(id=1, content="old words", user_id=1))
+
+    post.content = "new words"
+    world.commit()
+    assert found(search.search(world, user_id=1, q="old")) == []
+    assert found(search.search(world, user_id=1, q="new")) == [("post", 1)]
+
+    world.delete(post)
+    world.commit()
+    assert found(search.search(world, user_id=1, q="words")) == []
+
+
+def test_image_text_finds_its_post_once(world):
+    add(
+        world,
+        Post(id=1, content="receipt from the bakery", user_id=2),
+        GroupPost(id=1, content="look at this", group_id=10, user_id=3),
+        GroupPost(id=2, content="and this", group_id=20, user_id=3),
+    )
+    add(
+        world,
+        PostImage(id=1, post_id=1, uploader_id=2, digest="a", extension="png"),
+        PostImage(id=2, group_post_id=1, uploader_id=3, digest="b", extension="png"),
+        PostImage(id=3, group_post_id=2, uploader_id=3, digest="c", extension="png"),
+    )
+    # Not searchable before OCR stored the text
+    assert found(search.search(world, user_id=1, q="bakery")) == [("post", 1)]
+
+    for image in world.query(PostImage):
+        image.ocr_text = "BAKERY total 4.20"
+    world.commit()
+
+    page = search.search(world, user_id=1, q="bakery")
+    assert sorted(found(page)) == [("group_post", 1), ("post", 1)]
+    group_hit = next(hit for hit in page.items if hit.kind == "group_post")
+    assert group_hit.snippet == "[BAKERY] total 4.20"
+
+
+def test_deleted_group_is_hidden(world):
+    add(
+        world,
+        GroupPost(id=1, content="club news", group_id=10, user_id=3),
+        Message(id=1, content="room news", conversation_id=300, sender_id=3),
+    )
+    world.get(Group, 10).deleted_at = T0
+    world.commit()
+
+    assert search.search(world, user_id=1, q="news").items == []
+
+
+def test_kinds_filter(world):
+    add(
+        world,
+        Post(id=1, content="hello", user_id=1),
+        Message(id=1, content="hello", conversation_id=100, sender_id=1),
+    )
+
+    assert found(search.search(world, user_id=1, q="hello", kinds=["message"])) == [("message", 1)]
+    assert search.search(world, user_id=1, q="hello", kinds=[]).items == []
+
+
+def test_keyset_pages_cover_every_hit_once(world):
+    # Equal ranks: the order falls back to (kind, id)
+    add(world, *(Post(id=i, content="same text", user_id=1) for i in range(1, 6)))
+    add(world, *(Message(id=i, content="same text", conversation_id=100, sender_id=1) for i in range(1, 4)))
+
+    seen, cursor = [], None
+    while True:
+        page = search.search(world, user_id=1, q="same", limit=3, cursor=cursor)
+        seen += found(page)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == [("post", i) for i in range(1, 6)] + [("message", i) for i in range(1, 4)]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        encode_cursor("x", 0, 1),
+        encode_cursor(-1.0, 7, 1),
+        encode_cursor(-1.0, [0], 1),
+        encode_cursor(True, 0, 1),
+        encode_cursor(-1.0, 0, "1"),
+        "not a cursor",
+    ],
+)
+def test_invalid_cursor(world, cursor):
+    with pytest.raises(HTTPException) as exc:
+        search.search(world, user_id=1, q="x", cursor=cursor)
+    assert exc.value.status_code == 400
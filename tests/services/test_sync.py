@@ -0,0 +1,282 @@
+# tests/services/test_sync.py
+
+"""
+Modules: app.services.change_log, app.services.sync
+
+Runs against in-memory SQLite (sqlite_db fixture): the log is written
+by the same SQL the write paths run, and read back through sync().
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert
+
+from app.core.pagination import encode_cursor
+from app.models.change_log import ChangeLogEntry
+from app.models.conversation import Conversation
+from app.models.friend_request import FriendRequest, RequestStatus
+from app.models.group import Group
+from app.models.group_membership import GroupMembership
+from app.models.message import Message
+from app.models.posts import Post
+from app.models.user import User, user_friends
+from app.services import blocks, change_log, group as group_service, sync
+from app.services.blocks import MUTE
+from app.services.change_log import FRIEND, FRIEND_REQUEST, GROUP, POST
+from app.services.membership_cache import MembershipCache
+
+NOW = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def world(sqlite_db, monkeypatch):
+    """me (1) is friends with friend (2) and pal (3); stranger (4) is not."""
+    monkeypatch.setattr(group_service, "group_members", MembershipCache())
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "me"), (2, "friend"), (3, "pal"), (4, "stranger"))
+    )
+    sqlite_db.execute(
+        user_friends.insert(),
+        [{"user_id": a, "friend_id": b} for a, b in ((1, 2), (2, 1), (1, 3), (3, 1))],
+    )
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def start(db, user_id=1):
+    """A fresh token, as a client gets on its first sync."""
+    page = sync.sync(db, user_id, now=NOW)
+    assert page.reset and not page.changes
+    return page.next_token
+
+
+def write_post(db, user_id, content="hello"):
+    post = Post(content=content, user_id=user_id)
+    db.add(post)
+    db.flush()
+    change_log.post_changed(db, user_id, post.id)
+    db.commit()
+    return post
+
+
+def summary(page):
+    return [(c.kind, c.id, c.deleted) for c in page.changes]
+
+
+# ---------- recording ----------
+def test_post_changes_reach_the_author_and_friends_only(world):
+    tokens = {user_id: start(world, user_id) for user_id in (1, 2, 3, 4)}
+
+    post = write_post(world, 2)
+
+    for user_id in (1, 2):
+        page = sync.sync(world, user_id, tokens[user_id], now=NOW)
+        assert summary(page) == [(POST, post.id, False)]
+        assert page.changes[0].post.content == "hello"
+    # pal is not friend's friend; stranger is nobody's
+    for user_id in (3, 4):
+        assert sync.sync(world, user_id, tokens[user_id], now=NOW).changes == []
+
+
+def test_an_entity_is_one_row_per_user_however_often_it_changes(world):
+    token = start(world)
+    post = write_post(world, 1, "v1")
+    for version in range(2, 6):
+        post.content = f"v{version}"
+        change_log.post_changed(world, 1, post.id)
+        world.commit()
+
+    page = sync.sync(world, 1, token, now=NOW)
+
+    assert world.query(ChangeLogEntry).filter_by(user_id=1).count() == 1
+    assert summary(page) == [(POST, post.id, False)]
+    assert page.changes[0].post.content == "v5"
+
+
+def test_a_change_after_a_sync_is_synced_again(world):
+    post = write_post(world, 1, "first")
+    token = start(world)
+    assert sync.sync(world, 1, token, now=NOW).changes == []
+
+    post.content = "edited"
+    change_log.post_changed(world, 1, post.id)
+    world.commit()
+
+    page = sync.sync(world, 1, token, now=NOW)
+    assert page.changes[0].post.content == "edited"
+    assert sync.sync(world, 1, page.next_token, now=NOW).changes == []
+
+
+# ---------- tombstones ----------
+def test_deleted_posts_and_hidden_authors_are_tombstones(world):
+    token = start(world)
+    gone = write_post(world, 2, "gone")
+    muted = write_post(world, 3, "muted")
+    change_log.post_changed(world, 2, gone.id, deleted=True)
+    world.delete(gone)
+    world.commit()
+    blocks.block_user(world, 1, 3, MUTE)
+
+    page = sync.sync(world, 1, token, now=NOW)
+
+    # The tombstone replaced gone's row, so it comes last
+    assert summary(page) == [(POST, muted.id, True), (POST, gone.id, True)]
+
+
+def test_a_block_ends_the_friendship_and_requests_in_both_logs(world):
+    tokens = {user_id: start(world, user_id) for user_id in (1, 2)}
+    world.add(FriendRequest(id=7, from_user_id=4, to_user_id=1, status=RequestStatus.pending))
+    change_log.record(world, [1], FRIEND_REQUEST, 7)
+    world.commit()
+    page = sync.sync(world, 1, tokens[1], now=NOW)
+    assert (summary(page), page.changes[0].from_user_id) == ([(FRIEND_REQUEST, 7, False)], 4)
+
+    blocks.block_user(world, 1, 2)
+    blocks.block_user(world, 1, 4)
+
+    assert summary(sync.sync(world, 1, tokens[1], now=NOW)) == [(FRIEND, 2, True), (FRIEND_REQUEST, 7, True)]
+    assert summary(sync.sync(world, 2, tokens[2], now=NOW)) == [(FRIEND, 1, True)]
+
+
+def test_friendship_changes_resolve_against_the_friend_list(world):
+    token = start(world)
+    change_log.friendship_changed(world, 1, 2)
+    change_log.friendship_changed(world, 1, 4)
+    world.commit()
+
+    # 4 is not a friend (any more): a tombstone, whatever the row says
+    assert summary(sync.sync(world, 1, token, now=NOW)) == [(FRIEND, 2, False), (FRIEND, 4, True)]
+
+
+# ---------- groups ----------
+def test_membership_and_group_changes(world):
+    world.add(Group(id=10, name="club", owner_id=2))
+    world.add(GroupMembership(group_id=10, user_id=2, is_admin=True))
+    world.commit()
+    token = start(world)
+
+    group_service.join_group(world, 10, SimpleNamespace(id=1))
+    page = sync.sync(world, 1, token, now=NOW)
+    assert summary(page) == [(GROUP, 10, False)]
+    assert page.changes[0].group.name == "club"
+
+    admin_token = start(world, 2)
+    group_service.update_group(world, 10, group_service.GroupUpdate(name="book club"), SimpleNamespace(id=2))
+    assert sync.sync(world, 2, admin_token, now=NOW).changes[0].group.name == "book club"
+    assert sync.sync(world, 1, page.next_token, now=NOW).changes[0].group.name == "book club"
+
+    group_service.leave_group(world, 10, SimpleNamespace(id=1))
+    assert summary(sync.sync(world, 1, token, now=NOW)) == [(GROUP, 10, True)]
+
+
+def test_deleted_group_is_a_tombstone_for_every_member(world):
+    world.add(Group(id=10, name="club", owner_id=2))
+    world.add_all(GroupMembership(group_id=10, user_id=u) for u in (1, 2))
+    world.commit()
+    tokens = {user_id: start(world, user_id) for user_id in (1, 2)}
+
+    group_service.delete_group(world, 10, SimpleNamespace(id=2))
+
+    for user_id in (1, 2):
+        assert summary(sync.sync(world, user_id, tokens[user_id], now=NOW)) == [(GROUP, 10, True)]
+
+
+# ---------- messages ----------
+def test_new_messages_of_the_users_chats_and_rooms(world):
+    world.add(Group(id=10, name="club", owner_id=2))
+    world.add(GroupMembership(group_id=10, user_id=1))
+    chats = [
+        Conversation(id=1, user1_id=1, user2_id=2),
+        Conversation(id=2, group_id=10),
+        Conversation(id=3, user1_id=3, user2_id=4),
+    ]
+    world.add_all(chats)
+    world.add(Message(id=1, conversation_id=1, sender_id=2, content="old"))
+    chats[0].last_message_id = 1
+    world.commit()
+    token = start(world)
+
+    for message_id, chat in ((2, chats[1]), (3, chats[2]), (4, chats[0])):
+        world.add(Message(id=message_id, conversation_id=chat.id, sender_id=2, content=f"m{message_id}"))
+        chat.last_message_id = message_id
+    world.commit()
+
+    page = sync.sync(world, 1, token, now=NOW)
+
+    assert [(m.conversation_id, m.id) for m in page.messages] == [(2, 2), (1, 4)]
+    assert sync.sync(world, 1, page.next_token, now=NOW).messages == []
+
+
+# ---------- tokens and pages ----------
+def test_pages_until_has_more_is_false(world):
+    token = start(world)
+    posts = [write_post(world, 1, f"p{i}") for i in range(5)]
+
+    seen = []
+    while True:
+        page = sync.sync(world, 1, token, limit=2, now=NOW)
+        seen += [change.id for change in page.changes]
+        token = page.next_token
+        if not page.has_more:
+            break
+
+    assert seen == [post.id for post in posts]
+
+
+def test_an_expired_token_resets(world):
+    token = start(world)
+    later = NOW + change_log.SYNC_RETENTION + timedelta(seconds=1)
+
+    assert not sync.sync(world, 1, token, now=NOW + change_log.SYNC_RETENTION).reset
+    assert sync.sync(world, 1, token, now=later).reset
+
+
+@pytest.mark.parametrize("token", ["nope", encode_cursor(1, 2), encode_cursor(1, True, 3), encode_cursor("1", 2, 3)])
+def test_invalid_token_is_400(world, token):
+    with pytest.raises(HTTPException) as exc:
+        sync.sync(world, 1, token, now=NOW)
+    assert exc.value.status_code == 400
+
+
+def test_statement_count_does_not_grow_with_the_data(world):
+    """A sync costs the same few statements with 1 000 friends' posts stored."""
+    world.execute(
+        insert(Post),
+        [{"content": f"p{i}", "user_id": 2 + i % 2, "created_at": NOW} for i in range(1000)],
+    )
+    world.commit()
+    token = start(world)
+    post = write_post(world, 2)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(world.get_bind(), "before_cursor_execute", listener)
+    try:
+        page = sync.sync(world, 1, token, now=NOW)
+    finally:
+        event.remove(world.get_bind(), "before_cursor_execute", listener)
+
+    assert summary(page) == [(POST, post.id, False)]
+    # The log range, the block list, the changed posts, the messages
+    assert len(statements) == 4
+
+
+# ---------- compaction ----------
+def test_compact_drops_only_rows_no_token_can_reach(world):
+    cutoff = NOW - change_log.SYNC_RETENTION - change_log.COMPACT_SLACK
+    world.execute(
+        insert(ChangeLogEntry),
+        [
+            {"user_id": 1, "kind": POST, "entity_id": i, "deleted": True, "created_at": cutoff - timedelta(minutes=1)}
+            for i in range(5)
+        ]
+        + [{"user_id": 1, "kind": POST, "entity_id": 99, "deleted": False, "created_at": cutoff + timedelta(minutes=1)}],
+    )
+    world.commit()
+
+    assert change_log.compact(world, now=NOW, batch_size=2) == 5
+    assert [row.entity_id for row in world.query(ChangeLogEntry)] == [99]
@@ -0,0 +1,226 @@
+# tests/services/test_tags.py
+
+"""
+Module: app.services.tags
+
+Parsing and trending are plain Python; the inverted index and its
+pagination run against in-memory SQLite (sqlite_db fixture).
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from app.core.pagination import encode_cursor
+from app.models.group import Group, GroupPost
+from app.models.group_membership import GroupMembership
+from app.models.posts import Post
+from app.models.tag import PostTag, TagTrend
+from app.models.user import User
+from app.services import tags
+from app.services.blocks import hidden_set
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+# ---------- extract_tags / normalize_tag ----------
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("#Python and #python again", ["python"]),
+        ("mixed #Café, #naïve!", ["café", "naïve"]),
+        ("#tag_with_underscore #2024 #v2", ["tag_with_underscore", "v2"]),
+        ("no#tag http://x.org/#anchor &#35; ##double", []),
+        ("(#inside) #end.", ["inside", "end"]),
+        ("#" + "a" * 65, []),
+    ],
+)
+def test_extract_tags(text, expected):
+    assert tags.extract_tags(text) == expected
+
+
+def test_extract_tags_keeps_the_first_ones():
+    text = " ".join(f"#t{i}" for i in range(tags.MAX_TAGS_PER_POST + 5))
+    assert tags.extract_tags(text) == [f"t{i}" for i in range(tags.MAX_TAGS_PER_POST)]
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [("Python", "python"), ("#Python", "python"), ("123", None), ("two words", None), ("", None)],
+)
+def test_normalize_tag(raw, expected):
+    assert tags.normalize_tag(raw) == expected
+
+
+# ---------- index_post_tags / tag_posts ----------
+@pytest.fixture
+def world(sqlite_db):
+    """me (1) is a member of "club" (10), not of "secret" (20)."""
+    sqlite_db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x")
+        for i, name in ((1, "me"), (2, "other"))
+    )
+    sqlite_db.add_all([Group(id=10, name="club", owner_id=1), Group(id=20, name="secret", owner_id=2)])
+    sqlite_db.add_all([
+        GroupMembership(group_id=10, user_id=1),
+        GroupMembership(group_id=20, user_id=2),
+    ])
+    sqlite_db.commit()
+    return sqlite_db
+
+
+def post(db, content, user_id=1, minute=0, group_id=None):
+    if group_id is None:
+        row = Post(content=content, user_id=user_id, created_at=T0 + timedelta(minutes=minute))
+    else:
+        row = GroupPost(content=content, user_id=user_id, group_id=group_id,
+                        created_at=T0 + timedelta(minutes=minute))
+    db.add(row)
+    added = tags.index_post_tags(db, row)
+    db.commit()
+    return row, added
+
+
+def stored_tags(db):
+    return sorted(db.execute(select(PostTag.tag, PostTag.post_id, PostTag.group_post_id)).all())
+
+
+def test_index_follows_edits(world):
+    row, added = post(world, "#a #b")
+    assert added == ["a", "b"]
+
+    row.content = "#b #c"
+    assert tags.index_post_tags(world, row) == ["c"]
+    world.commit()
+
+    assert stored_tags(world) == [("b", row.id, None), ("c", row.id, None)]
+
+
+def test_tag_posts_newest_first_with_visibility(world):
+    wall, _ = post(world, "#news from me", minute=1)
+    club, _ = post(world, "#news in the club", user_id=1, minute=2, group_id=10)
+    post(world, "#news in secret", user_id=2, minute=3, group_id=20)
+    other, _ = post(world, "#News from other", user_id=2, minute=4)
+    post(world, "#weather", minute=5)
+
+    page = tags.tag_posts(world, user_id=1, tag="news")
+
+    assert [(item.kind, item.id) for item in page.items] == [
+        ("post", other.id),
+        ("group_post", club.id),
+        ("post", wall.id),
+    ]
+    assert page.items[1].group_id == 10
+    assert page.next_cursor is None
+
+
+def test_tag_posts_pages(world):
+    rows = [post(world, f"#daily {i}", minute=i % 3)[0] for i in range(7)]
+
+    seen, cursor = [], None
+    while True:
+        page = tags.tag_posts(world, user_id=1, tag="daily", limit=3, cursor=cursor)
+        seen += [item.id for item in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    newest_first = sorted(rows, key=lambda r: (r.created_at, r.id), reverse=True)
+    assert seen == [r.id for r in newest_first]
+
+
+def test_tag_posts_one_query_per_kind(world):
+    for i in range(5):
+        post(world, "#busy", minute=i)
+        post(world, "#busy", minute=i, group_id=10)
+
+    # The block list is read once, then served from memory
+    hidden_set(world, 1)
+
+    statements = []
+    engine = world.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        page = tags.tag_posts(world, user_id=1, tag="busy", limit=10)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(page.items) == 10
+    # Index page, wall posts, group posts
+    assert len(statements) == 3
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [encode_cursor("yesterday", 1), encode_cursor(T0.isoformat(), True), encode_cursor(1, 2), "x"],
+)
+def test_invalid_cursor(world, cursor):
+    with pytest.raises(HTTPException) as exc:
+        tags.tag_posts(world, user_id=1, tag="news", cursor=cursor)
+    assert exc.value.status_code == 400
+
+
+# ---------- TrendingTags ----------
+def test_recent_uses_weigh_more():
+    now = 1_000_000.0
+    trends = tags.TrendingTags({"1h": 3600.0}, now=now - 7200)
+    trends.record(["old"], now=now - 7200)
+    trends.record(["old"], now=now - 7200)
+    trends.record(["new"], now=now)
+
+    top = trends.top("1h", 10, now=now)
+
+    assert [t.tag for t in top] == ["new", "old"]
+    assert top[0].score == pytest.approx(1.0)
+    # Two uses two time constants ago
+    assert top[1].score == pytest.approx(2 * math.e ** -2, abs=1e-3)
+
+
+def test_rebase_keeps_scores_and_drops_decayed_tags():
+    now = 1_000_000.0
+    trends = tags.TrendingTags({"1h": 3600.0}, now=now - 3600 * 10)
+    trends.record(["gone"], now=now - 3600 * 10)
+    trends.record(["kept"], now=now - 60)
+    before = trends.top("1h", 10, now=now)
+
+    snapshot = trends.rebase(now=now)
+
+    assert set(snapshot["1h"]) == {"kept"}
+    assert trends.top("1h", 10, now=now) == [t for t in before if t.tag == "kept"]
+
+
+def test_checkpoint_round_trip(sqlite_db):
+    now = 1_000_000.0
+    trends = tags.TrendingTags(now=now)
+    trends.record(["python", "sqlite"], now=now)
+    trends.record(["python"], now=now)
+
+    assert trends.checkpoint(sqlite_db, now=now) == 4
+    assert sqlite_db.query(TagTrend).count() == 4
+
+    # A new process, an hour later
+    restarted = tags.TrendingTags(now=now + 3600)
+    rows = sqlite_db.execute(select(TagTrend.window, TagTrend.tag, TagTrend.score, TagTrend.at)).all()
+    restarted.load(rows, now=now + 3600)
+
+    top = restarted.top("1h", 10, now=now + 3600)
+    assert [t.tag for t in top] == ["python", "sqlite"]
+    assert top[0].score == pytest.approx(2 * math.e ** -1, abs=1e-3)
+    day = restarted.top("24h", 10, now=now + 3600)
+    assert day[0].score == pytest.approx(2 * math.e ** (-1 / 24), abs=1e-3)
+
+
+def test_record_rebases_without_checkpoints():
+    now = 1_000_000.0
+    trends = tags.TrendingTags({"1h": 3600.0}, now=now)
+    trends.record(["early"], now=now)
+
+    # A year without a checkpoint: exp() would overflow without the rebase
+    later = now + 365 * 86400
+    trends.record(["late"], now=later)
+
+    assert [t.tag for t in trends.top("1h", 10, now=later)] == ["late"]
@@ -0,0 +1,122 @@
+# tests/services/test_users_service.py
+
+"""
+Module: app.services.users
+
+Runs against in-memory SQLite (sqlite_db fixture).
+"""
+
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models.user import User, user_friends
+from app.services.users import lookup_users, search_users
+
+
+def add_users(db):
+    db.add_all(
+        User(id=i, username=f"u{i}", email=f"u{i}@example.com", password_hash="secret",
+             display_name=f"User {i}")
+        for i in (1, 2, 3)
+    )
+    db.commit()
+
+
+def test_lookup_keeps_request_order_and_skips_unknown_and_deleted(sqlite_db):
+    add_users(sqlite_db)
+    sqlite_db.get(User, 2).deleted_at = datetime(2026, 1, 1)
+    sqlite_db.commit()
+
+    users = lookup_users(sqlite_db, [3, 99, 2, 1])
+
+    assert [u["id"] for u in users] == [3, 1]
+    assert users[0] == {"id": 3, "username": "u3", "display_name": "User 3", "avatar_url": None}
+
+
+def test_lookup_selects_only_requested_columns_in_one_query(sqlite_db):
+    add_users(sqlite_db)
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sqlite_db.get_bind(), "before_cursor_execute", listener)
+    try:
+        users = lookup_users(sqlite_db, [1, 2], ["username"])
+    finally:
+        event.remove(sqlite_db.get_bind(), "before_cursor_execute", listener)
+
+    assert users == [{"id": 1, "username": "u1"}, {"id": 2, "username": "u2"}]
+    assert len(statements) == 1
+    selected = statements[0].split("FROM")[0]
+    assert "username" in selected
+    assert "email" not in selected and "display_name" not in selected
+
+
+def add_people(db):
+    people = [
+        (1, "me", None),
+        (2, "alice", "Alice Smith"),
+        (3, "alicia", "Alicia Keys"),
+        (4, "al", None),
+        (5, "bob", "Bob Alvarez"),
+        (6, "alex_m", None),
+        (7, "zed", "Al"),
+    ]
+    db.add_all(
+        User(id=i, username=name, email=f"{name}@example.com", password_hash="x", display_name=display)
+        for i, name, display in people
+    )
+    db.commit()
+    # me and alicia are friends (stored both ways)
+    db.execute(user_friends.insert(), [{"user_id": 1, "friend_id": 3}, {"user_id": 3, "friend_id": 1}])
+    db.commit()
+
+
+def test_search_ranks_exact_then_friends_then_prefixes(sqlite_db):
+    add_people(sqlite_db)
+
+    hits = search_users(sqlite_db, 1, "Al")
+
+    # exact username "al" and exact display name "Al", then the friend,
+    # then username prefixes (shortest first), then other word prefixes
+    assert [h["username"] for h in hits] == ["al", "zed", "alicia", "alice", "alex_m", "bob"]
+    assert [h["is_friend"] for h in hits] == [False, False, True, False, False, False]
+
+
+def test_search_matches_display_name_words_and_skips_deleted(sqlite_db):
+    add_people(sqlite_db)
+    sqlite_db.get(User, 3).deleted_at = datetime(2026, 1, 1)
+    sqlite_db.commit()
+
+    assert [h["id"] for h in search_users(sqlite_db, 1, "smi")] == [2]
+    assert [h["id"] for h in search_users(sqlite_db, 1, "alici")] == []
+
+
+def test_search_index_follows_profile_updates(sqlite_db):
+    add_people(sqlite_db)
+    sqlite_db.get(User, 5).display_name = "Robert Tables"
+    sqlite_db.commit()
+
+    assert [h["id"] for h in search_users(sqlite_db, 1, "tabl")] == [5]
+    assert search_users(sqlite_db, 1, "alvar") == []
+
+
+def test_search_treats_operators_and_wildcards_as_text(sqlite_db):
+    add_people(sqlite_db)
+
+    assert [h["username"] for h in search_users(sqlite_db, 1, "alex_")] == ["alex_m"]
+    assert search_users(sqlite_db, 1, '"') == []
+    assert search_users(sqlite_db, 1, "%") == []
+    assert search_users(sqlite_db, 1, "   ") == []
+
+
+def test_search_folds_like_sqlite_lower(sqlite_db):
+    add_people(sqlite_db)
+    sqlite_db.add(User(id=8, username="Émile", email="emile@example.com", password_hash="x"))
+    sqlite_db.commit()
+
+    assert [h["id"] for h in search_users(sqlite_db, 1, "Ém")] == [8]
+    with pytest.raises(HTTPException) as exc:
+        search_users(sqlite_db, 1, "\U0010ffff")
+    assert exc.value.status_code == 400
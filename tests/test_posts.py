@@ -130,4 +130,343 @@ def test_delete_post():
 
     # Confirm the post no longer exists
     get_resp = client.get(f"/post/{post_id}", headers=headers)
-    assert get_resp.status_code == 404
\ No newline at end of file
+    assert get_resp.status_code == 404
+# Test the paginated home feed with group posts merged in
+def test_home_feed_with_groups():
+    headers = create_test_user()
+
+    client.post("/post", json={"content": "wall post"}, headers=headers)
+    group_resp = client.post(
+        "/groups/",
+        json={"name": f"feed_{uuid4().hex[:8]}"},
+        headers=headers
+    )
+    assert group_resp.status_code == 201
+    group_id = group_resp.json()["id"]
+    client.post(f"/groups/{group_id}/posts", json={"content": "group post"}, headers=headers)
+
+    walls = client.get("/post/home", headers=headers)
+    assert walls.status_code == 200
+    assert [item["content"] for item in walls.json()["items"]] == ["wall post"]
+
+    merged = client.get("/post/home?include_groups=true&limit=1", headers=headers)
+    assert merged.status_code == 200
+    page = merged.json()
+    assert page["items"][0]["kind"] == "group_post"
+    assert page["items"][0]["group_id"] == group_id
+
+    rest = client.get(
+        f"/post/home?include_groups=true&limit=1&cursor={page['next_cursor']}",
+        headers=headers
+    )
+    assert [item["content"] for item in rest.json()["items"]] == ["wall post"]
+
+
+# Test ?expand=author on posts and group posts
+def test_expand_author():
+    headers = create_test_user()
+    client.post("/post", json={"content": "with author"}, headers=headers)
+
+    plain = client.get("/post/me", headers=headers).json()
+    assert plain[0]["author"] is None
+
+    expanded = client.get("/post/me?expand=author", headers=headers).json()
+    assert expanded[0]["author"]["id"] == expanded[0]["user_id"]
+    assert expanded[0]["author"]["username"].startswith("alice_")
+
+    home = client.get("/post/home?expand=author", headers=headers).json()
+    assert home["items"][0]["author"]["id"] == home["items"][0]["user_id"]
+
+    group_resp = client.post("/groups/", json={"name": f"exp_{uuid4().hex[:8]}"}, headers=headers)
+    group_id = group_resp.json()["id"]
+    client.post(f"/groups/{group_id}/posts", json={"content": "hi"}, headers=headers)
+    group_posts = client.get(f"/groups/{group_id}/posts?expand=author", headers=headers).json()
+    assert group_posts[0]["author"]["id"] == group_posts[0]["user_id"]
+
+    bad = client.get("/post/me?expand=owner", headers=headers)
+    assert bad.status_code == 400
+
+
+# Test attaching an image to a post (OCR runs later, in the background)
+def test_upload_post_image(tmp_path, monkeypatch):
+    import io
+    from PIL import Image
+    from app.services import avatars, ocr, post_images
+    from tests.services.test_ocr import FakeEngine
+
+    monkeypatch.setattr(avatars, "MEDIA_ROOT", tmp_path)
+    queue = ocr.OcrQueue(engine=FakeEngine([]))
+    submitted = []
+    monkeypatch.setattr(queue, "submit", submitted.append)
+    monkeypatch.setattr(post_images, "ocr_queue", queue)
+
+    headers = create_test_user()
+    post_id = client.post("/post", json={"content": "with a picture"}, headers=headers).json()["id"]
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 20), (255, 255, 255)).save(buffer, "PNG")
+
+    res = client.post(
+        f"/post/{post_id}/images",
+        content=buffer.getvalue(),
+        headers={**headers, "Content-Type": "image/png"},
+    )
+    assert res.status_code == 201
+    image = res.json()
+    assert image["ocr_status"] == "pending"
+    assert submitted == [image["id"]]  # handed to the OCR workers
+
+    listed = client.get(f"/post/{post_id}/images", headers=headers).json()
+    assert [i["id"] for i in listed] == [image["id"]]
+    served = client.get(image["url"])
+    assert served.status_code == 200
+    assert served.headers["content-type"] == "image/png"
+
+    # Wrong type, not an image, someone else's post
+    assert client.post(
+        f"/post/{post_id}/images", content=b"x", headers={**headers, "Content-Type": "text/plain"}
+    ).status_code == 415
+    assert client.post(
+        f"/post/{post_id}/images", content=b"nope", headers={**headers, "Content-Type": "image/png"}
+    ).status_code == 400
+    other = create_test_user()
+    assert client.post(
+        f"/post/{post_id}/images", content=buffer.getvalue(), headers={**other, "Content-Type": "image/png"}
+    ).status_code == 403
+
+    # Backpressure: a full OCR queue refuses new uploads
+    full = ocr.OcrQueue(engine=FakeEngine([]), maxsize=1)
+    full.submit(999)
+    monkeypatch.setattr(post_images, "ocr_queue", full)
+    busy = client.post(
+        f"/post/{post_id}/images", content=buffer.getvalue(), headers={**headers, "Content-Type": "image/png"}
+    )
+    assert busy.status_code == 503
+    assert "retry-after" in busy.headers
+
+
+# Test full-text search over the caller's posts and groups
+def test_search():
+    headers = create_test_user()
+    word = f"zebra{uuid4().hex[:8]}"
+    client.post("/post", json={"content": f"a {word} on my wall"}, headers=headers)
+    group_resp = client.post("/groups/", json={"name": f"srch_{uuid4().hex[:8]}"}, headers=headers)
+    group_id = group_resp.json()["id"]
+    client.post(f"/groups/{group_id}/posts", json={"content": f"a {word} in my group"}, headers=headers)
+
+    page = client.get(f"/search?q={word[:-2]}&expand=author", headers=headers).json()
+    assert sorted(hit["kind"] for hit in page["items"]) == ["group_post", "post"]
+    assert all(f"[{word}]" in hit["snippet"] for hit in page["items"])
+    assert page["items"][0]["author"]["id"] == page["items"][0]["user_id"]
+
+    only_posts = client.get(f"/search?q={word}&kinds=post", headers=headers).json()
+    assert [hit["kind"] for hit in only_posts["items"]] == ["post"]
+
+    # Another user sees none of it
+    other = create_test_user()
+    assert client.get(f"/search?q={word}", headers=other).json()["items"] == []
+
+    assert client.get(f"/search?q={word}&kinds=users", headers=headers).status_code == 400
+
+
+# Test hashtags: indexed on create and edit, listed by tag, trending
+def test_hashtags():
+    headers = create_test_user()
+    tag = f"tag{uuid4().hex[:8]}"
+    post_id = client.post("/post", json={"content": f"hello #{tag}"}, headers=headers).json()["id"]
+
+    page = client.get(f"/tags/%23{tag.upper()}", headers=headers).json()
+    assert [item["id"] for item in page["items"]] == [post_id]
+
+    trending = client.get("/tags/trending?window=24h&limit=50", headers=headers).json()
+    assert tag in [t["tag"] for t in trending]
+
+    client.put(f"/post/{post_id}", json={"content": "no tags now"}, headers=headers)
+    assert client.get(f"/tags/{tag}", headers=headers).json()["items"] == []
+
+    assert client.get("/tags/123", headers=headers).status_code == 400
+    assert client.get("/tags/trending?window=week", headers=headers).status_code == 400
+
+
+# Test notifications: friend request, approval and mention, written by the dispatcher
+def test_notifications(monkeypatch):
+    from app.services import notifications
+
+    dispatcher = notifications.NotificationDispatcher()
+    monkeypatch.setattr(notifications, "dispatcher", dispatcher)
+
+    def deliver():
+        db = TestingSessionLocal()
+        try:
+            while dispatcher.pending():
+                dispatcher.flush(db)
+        finally:
+            db.close()
+
+    alice = create_test_user()
+    bob = create_test_user()
+    bob_me = client.get("/users/me", headers=bob).json()
+    alice_me = client.get("/users/me", headers=alice).json()
+
+    request_id = client.post("/friend-request", json={"to_user_id": bob_me["id"]}, headers=alice).json()["request_id"]
+    client.post("/post", json={"content": f"hello @{bob_me['username']}"}, headers=alice)
+    # Nothing is written by the requests themselves
+    assert client.get("/notifications/unread-count", headers=bob).json()["unread_count"] == 0
+
+    deliver()
+    page = client.get("/notifications?expand=author", headers=bob).json()
+    assert [n["kind"] for n in page["items"]] == ["mention", "friend_request"]
+    assert page["items"][0]["actor"]["id"] == alice_me["id"]
+    assert page["unread_count"] == 2
+
+    client.post("/friend-request/respond", json={"request_id": request_id, "action": "approved"}, headers=bob)
+    deliver()
+    assert client.get("/notifications", headers=alice).json()["items"][0]["kind"] == "friend_accepted"
+
+    assert client.post("/notifications/read", json={}, headers=bob).json() == {"unread_count": 0}
+
+
+# Test reactions on posts and group posts, and their counts in listings
+def test_reactions(monkeypatch):
+    from app.services import reactions
+
+    counts = reactions.ReactionCounts()
+    monkeypatch.setattr(reactions, "reaction_counts", counts)
+
+    alice = create_test_user()
+    bob = create_test_user()
+    post_id = client.post("/post", json={"content": "react to me"}, headers=alice).json()["id"]
+    group_id = client.post("/groups/", json={"name": f"react_{uuid4().hex[:8]}"}, headers=alice).json()["id"]
+    group_post_id = client.post(f"/groups/{group_id}/posts", json={"content": "in the group"}, headers=alice).json()["id"]
+
+    resp = client.put(f"/post/{post_id}/reaction", json={"kind": "love"}, headers=bob)
+    assert resp.status_code == 200
+    assert resp.json() == {"reaction_count": 1, "has_reacted": True, "my_reaction": "love"}
+    assert client.put(f"/post/{post_id}/reaction", json={}, headers=alice).json()["reaction_count"] == 2
+    assert client.put(f"/post/{post_id}/reaction", json={"kind": "meh"}, headers=alice).status_code == 400
+
+    # Group posts: members only
+    assert client.put(f"/groups/{group_id}/posts/{group_post_id}/reaction", json={}, headers=bob).status_code == 403
+    assert client.put(f"/groups/{group_id}/posts/{group_post_id}/reaction", json={}, headers=alice).status_code == 200
+
+    # Counts include what is not written yet, and survive the flush
+    db = TestingSessionLocal()
+    try:
+        counts.flush(db)
+    finally:
+        db.close()
+    feed = client.get("/post/home?include_groups=true", headers=alice).json()["items"]
+    assert [(i["kind"], i["reaction_count"], i["has_reacted"]) for i in feed] == [
+        ("group_post", 1, True),
+        ("post", 2, True),
+    ]
+    group_posts = client.get(f"/groups/{group_id}/posts", headers=alice).json()
+    assert group_posts[0]["reaction_count"] == 1
+
+    removed = client.delete(f"/post/{post_id}/reaction", headers=bob).json()
+    assert removed == {"reaction_count": 1, "has_reacted": False, "my_reaction": None}
+    assert client.put("/post/999999/reaction", json={}, headers=bob).status_code == 404
+
+
+# Test threaded comments on posts and group posts
+def test_comments():
+    alice = create_test_user()
+    bob = create_test_user()
+    post_id = client.post("/post", json={"content": "discuss"}, headers=alice).json()["id"]
+
+    top = client.post(f"/post/{post_id}/comments", json={"content": "first"}, headers=bob)
+    assert top.status_code == 201
+    top_id = top.json()["id"]
+    reply = client.post(f"/post/{post_id}/comments", json={"content": "reply", "parent_id": top_id}, headers=alice).json()
+    assert (reply["parent_id"], reply["depth"]) == (top_id, 1)
+    client.post(f"/post/{post_id}/comments", json={"content": "second"}, headers=alice)
+
+    page = client.get(f"/post/{post_id}/comments?limit=1&expand=author", headers=alice).json()
+    assert [(c["content"], c["reply_count"]) for c in page["items"]] == [("first", 1), ("reply", 0)]
+    assert page["items"][0]["author"]["id"] == top.json()["user_id"]
+    assert page["comment_count"] == 3
+    rest = client.get(f"/post/{post_id}/comments?limit=1&cursor={page['next_cursor']}", headers=alice).json()
+    assert [c["content"] for c in rest["items"]] == ["second"]
+
+    replies = client.get(f"/post/{post_id}/comments/{top_id}/replies", headers=bob).json()
+    assert [c["content"] for c in replies["items"]] == ["reply"]
+
+    assert client.delete(f"/post/{post_id}/comments/{top_id}", headers=alice).status_code == 403
+    assert client.delete(f"/post/{post_id}/comments/{top_id}", headers=bob).status_code == 204
+    assert client.get(f"/post/{post_id}/comments", headers=bob).json()["comment_count"] == 1
+
+    # Group posts: members only
+    group_id = client.post("/groups/", json={"name": f"talk_{uuid4().hex[:8]}"}, headers=alice).json()["id"]
+    group_post_id = client.post(f"/groups/{group_id}/posts", json={"content": "agenda"}, headers=alice).json()["id"]
+    url = f"/groups/{group_id}/posts/{group_post_id}/comments"
+    assert client.post(url, json={"content": "hi"}, headers=bob).status_code == 403
+    assert client.post(url, json={"content": "hi"}, headers=alice).status_code == 201
+    assert [c["content"] for c in client.get(url, headers=alice).json()["items"]] == ["hi"]
+
+    # Deleting the post takes its comments
+    assert client.delete(f"/post/{post_id}", headers=alice).status_code == 204
+
+
+# Test muting and blocking: feeds, friend requests and chats
+def test_blocks():
+    alice = create_test_user()
+    bob = create_test_user()
+    bob_id = client.get("/users/me", headers=bob).json()["id"]
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+    request_id = client.post("/friend-request", json={"to_user_id": bob_id}, headers=alice).json()["request_id"]
+    client.post("/friend-request/respond", json={"request_id": request_id, "action": "approved"}, headers=bob)
+    client.post("/post", json={"content": "from bob"}, headers=bob)
+
+    def home(headers):
+        return {item["user_id"] for item in client.get("/post/home", headers=headers).json()["items"]}
+
+    # A mute hides bob from alice only
+    assert client.put(f"/users/{bob_id}/mute", headers=alice).status_code == 204
+    assert bob_id not in home(alice)
+    assert [b["user_id"] for b in client.get("/users/me/blocks?kind=mute", headers=alice).json()["items"]] == [bob_id]
+    assert client.delete(f"/users/{bob_id}/mute", headers=alice).status_code == 204
+    assert bob_id in home(alice)
+
+    # A block ends the friendship; neither side can ask again or chat
+    assert client.put(f"/users/{bob_id}/block", headers=alice).status_code == 204
+    assert bob_id not in home(alice)
+    assert client.post("/friend-request", json={"to_user_id": alice_id}, headers=bob).status_code == 403
+    assert client.post("/chat/chats/start", json={"receiver_id": alice_id}, headers=bob).status_code == 403
+    assert client.put(f"/users/{alice_id}/block", headers=alice).status_code == 400
+
+    assert client.delete(f"/users/{bob_id}/block", headers=alice).status_code == 204
+    assert client.get("/users/me/blocks", headers=alice).json()["items"] == []
+    assert client.post("/friend-request", json={"to_user_id": alice_id}, headers=bob).status_code == 200
+
+
+def test_sync():
+    alice = create_test_user()
+    bob = create_test_user()
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+    bob_id = client.get("/users/me", headers=bob).json()["id"]
+
+    # First sync: no token, a reset and a token
+    first = client.get("/sync", headers=alice).json()
+    assert first["reset"] is True and first["changes"] == []
+    token = first["next_token"]
+
+    request_id = client.post("/friend-request", json={"to_user_id": alice_id}, headers=bob).json()["request_id"]
+    page = client.get(f"/sync?since={token}", headers=alice).json()
+    assert [(c["kind"], c["id"], c["from_user_id"]) for c in page["changes"]] == [("friend_request", request_id, bob_id)]
+
+    client.post("/friend-request/respond", json={"request_id": request_id, "action": "approved"}, headers=alice)
+    post_id = client.post("/post", json={"content": "hi"}, headers=bob).json()["id"]
+    client.put(f"/post/{post_id}", json={"content": "hi again"}, headers=bob)
+    page = client.get(f"/sync?since={page['next_token']}", headers=alice).json()
+    assert [(c["kind"], c["id"], c["deleted"]) for c in page["changes"]] == [
+        ("friend", bob_id, False),
+        ("friend_request", request_id, True),
+        ("post", post_id, False),
+    ]
+    assert page["changes"][-1]["post"]["content"] == "hi again"
+
+    client.delete(f"/post/{post_id}", headers=bob)
+    page = client.get(f"/sync?since={page['next_token']}", headers=alice).json()
+    assert [(c["kind"], c["id"], c["deleted"]) for c in page["changes"]] == [("post", post_id, True)]
+    assert page["has_more"] is False
+
+    assert client.get("/sync?since=nope", headers=alice).status_code == 400